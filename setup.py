@@ -82,6 +82,11 @@ setup(
         "zipp==3.17.0"
 
     ],
+    entry_points={
+        "console_scripts": [
+            "todo=to_do_list_project.cli:main",
+        ],
+    },
     author="Florent BRIAND, Maxime LEDIEU Jaime MONTEA, Edouard DUCLOY, Pierre BILLAUD",
     author_email="florent.briand56@gmail.com",
     description="To Do List helps you manage your agenda by creating a list of your tasks",
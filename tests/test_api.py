@@ -0,0 +1,195 @@
+"""
+test_api.py
+
+This script is dedicated to test all the functionalities from api.py file.
+"""
+
+import asyncio
+
+import pytest
+
+from to_do_list_project.api import TaskServer
+from to_do_list_project.api_load import APIConnection
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.task_manager import TaskManager
+
+TASK = {
+    "name": "Write report",
+    "description": "Monthly report",
+    "due_date": "2030-01-01T10:00:00",
+    "assignee": ["Alice"],
+    "priority": "high",
+    "categories": ["Work"],
+}
+
+
+def serve(tmp_path, scenario) -> TaskServer:
+    """Run a scenario against a server on a free port."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    server = TaskServer(TaskManager(db, lazy=True), port=0)
+
+    async def run() -> None:
+        await server.start()
+        connection = APIConnection(server.host, server.port)
+        try:
+            await scenario(server, connection)
+        finally:
+            connection.close()
+            await server.stop()
+
+    asyncio.run(run())
+    return server
+
+
+def test_task_lifecycle(tmp_path) -> None:
+    """Test if a task is created, read, modified, completed and removed."""
+    async def scenario(server, connection) -> None:
+        status, data = await connection.request("POST", "/tasks", TASK)
+        assert status == 201
+        task_id = data["id"]
+
+        status, task = await connection.request("GET", f"/tasks/{task_id}")
+        assert status == 200
+        assert task["name"] == "Write report"
+        assert task["assignee"] == "Alice"
+        assert task["priority"] == "HIGH"
+
+        status, _ = await connection.request(
+            "PATCH", f"/tasks/{task_id}", {"name": "Read report"}
+        )
+        assert status == 200
+        status, _ = await connection.request(
+            "POST", f"/tasks/{task_id}/complete"
+        )
+        assert status == 200
+        _, task = await connection.request("GET", f"/tasks/{task_id}")
+        assert task["name"] == "Read report"
+        assert task["status"] == "COMPLETE"
+
+        status, stats = await connection.request("GET", "/stats")
+        assert status == 200
+        assert stats["total"] == 1
+
+        assert await connection.request(
+            "DELETE", f"/tasks/{task_id}"
+        ) == (204, None)
+        status, _ = await connection.request("GET", f"/tasks/{task_id}")
+        assert status == 404
+
+    serve(tmp_path, scenario)
+
+
+@pytest.mark.parametrize(
+    "method, path, data, expected",
+    [
+        ("GET", "/tasks/42", None, 404),
+        ("DELETE", "/tasks/42", None, 404),
+        ("GET", "/tasks/abc", None, 404),
+        ("GET", "/unknown", None, 404),
+        ("PUT", "/tasks", None, 405),
+        ("POST", "/tasks", {"name": "No due date"}, 400),
+        ("POST", "/tasks", dict(TASK, priority="urgent"), 400),
+        ("POST", "/tasks", dict(TASK, due_date="tomorrow"), 400),
+        ("GET", "/tasks?limit=ten", None, 400),
+        ("GET", "/search", None, 400),
+    ],
+)
+def test_errors(tmp_path, method, path, data, expected) -> None:
+    """Test if invalid requests are answered with an error status."""
+    async def scenario(server, connection) -> None:
+        status, body = await connection.request(method, path, data)
+        assert status == expected
+        assert "error" in body
+
+    serve(tmp_path, scenario)
+
+
+def test_pages_and_search(tmp_path) -> None:
+    """Test if lists and searches are paged by id."""
+    async def scenario(server, connection) -> None:
+        for index in range(5):
+            await connection.request(
+                "POST", "/tasks", dict(TASK, name=f"Task {index % 2}")
+            )
+        status, first = await connection.request("GET", "/tasks?limit=2")
+        assert status == 200
+        assert [task["id"] for task in first["tasks"]] == [1, 2]
+        _, last = await connection.request(
+            "GET", f"/tasks?limit=3&after={first['next']}"
+        )
+        assert [task["id"] for task in last["tasks"]] == [3, 4, 5]
+        assert last["next"] is None
+
+        _, found = await connection.request("GET", "/search?q=task+1")
+        assert [task["id"] for task in found["tasks"]] == [2, 4]
+
+    serve(tmp_path, scenario)
+
+
+def test_writes_batched(tmp_path) -> None:
+    """Test if concurrent writes are committed in shared transactions."""
+    async def scenario(server, connection) -> None:
+        connections = [
+            APIConnection(server.host, server.port) for _ in range(20)
+        ]
+        responses = await asyncio.gather(*(
+            other.request("POST", "/tasks", TASK) for other in connections
+        ))
+        for other in connections:
+            other.close()
+        assert sorted(data["id"] for _, data in responses) == list(
+            range(1, 21)
+        )
+
+    server = serve(tmp_path, scenario)
+    assert server.writes == 20
+    assert server.batches < 20
+    assert SQLiteDB(str(tmp_path / "tasks.db")).count_tasks() == 20
+
+
+def test_modify_conflict(tmp_path) -> None:
+    """Test if a modification based on an old version is refused."""
+    async def scenario(server, connection) -> None:
+        _, data = await connection.request("POST", "/tasks", TASK)
+        path = f"/tasks/{data['id']}"
+        _, task = await connection.request("GET", path)
+        assert task["version"] == 1
+
+        status, data = await connection.request(
+            "PATCH", path, {"name": "First", "version": 1}
+        )
+        assert (status, data["version"]) == (200, 2)
+        status, data = await connection.request(
+            "PATCH", path, {"name": "Second", "version": 1}
+        )
+        assert status == 409
+        assert data["task"]["name"] == "First"
+        assert data["task"]["version"] == 2
+
+    serve(tmp_path, scenario)
+
+
+def test_unversioned_modifications_batched(tmp_path) -> None:
+    """Test if modifications without version in one batch both apply."""
+    async def scenario(server, connection) -> None:
+        _, data = await connection.request("POST", "/tasks", TASK)
+        path = f"/tasks/{data['id']}"
+        connections = [
+            APIConnection(server.host, server.port) for _ in range(2)
+        ]
+        responses = await asyncio.gather(
+            connections[0].request("PATCH", path, {"name": "Renamed"}),
+            connections[1].request(
+                "PATCH", path, {"description": "Weekly report"}
+            ),
+        )
+        for other in connections:
+            other.close()
+        assert [status for status, _ in responses] == [200, 200]
+        _, task = await connection.request("GET", path)
+        assert (task["name"], task["description"], task["version"]) == (
+            "Renamed", "Weekly report", 3
+        )
+
+    server = serve(tmp_path, scenario)
+    assert server.batches == 2
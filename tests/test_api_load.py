@@ -0,0 +1,48 @@
+"""
+test_api_load.py
+
+This script is dedicated to test all the functionalities from api_load.py
+file.
+"""
+
+import asyncio
+
+from to_do_list_project.api import TaskServer
+from to_do_list_project.api_load import run_api_load_async
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.load_harness import format_report
+from to_do_list_project.task_manager import TaskManager
+
+
+def test_run_api_load(tmp_path) -> None:
+    """Test if concurrent clients report every operation of the mix."""
+    db = SQLiteDB(str(tmp_path / "api.db"))
+    db.bulk_insert(
+        "tasks",
+        [("Task", "Desc", "2030/01/01 10:00:00", "", "Alice", 1, 1, "")] * 5,
+    )
+    server = TaskServer(TaskManager(db, lazy=True), port=0)
+
+    async def run() -> list:
+        await server.start()
+        try:
+            return await run_api_load_async(
+                server.host,
+                server.port,
+                connections=4,
+                duration=0.5,
+                mix="get=1,list=1,search=1,create=1,stats=1",
+            )
+        finally:
+            await server.stop()
+
+    report = asyncio.run(run())
+
+    operations = {entry["operation"]: entry for entry in report}
+    assert set(operations) == {
+        "get", "list", "search", "create", "stats", "total"
+    }
+    assert operations["total"]["errors"] == 0
+    assert server.writes == operations["create"]["count"]
+    assert db.count_tasks() == 5 + operations["create"]["count"]
+    assert "create" in format_report(report)
@@ -0,0 +1,99 @@
+"""
+test_archive.py
+
+This script is dedicated to test all the functionalities from archive.py
+file.
+"""
+
+import sqlite3
+
+from to_do_list_project.archive import benchmark_archive, main
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.task import TaskStatus
+
+
+def make_db(path: str) -> SQLiteDB:
+    """Return a database of four tasks, the first three completed."""
+    db = SQLiteDB(path)
+    db.bulk_insert(
+        "tasks",
+        [("Task", "Desc", "2023/11/12 10:00:00", "2023/12/12 10:00:00",
+          "Anna", 2, 2, "")] * 4,
+    )
+    db.fetch_data(1, "COMPLETE")
+    db.fetch_data(2, "COMPLETE")
+    return db
+
+
+def test_archive_completed(tmp_path) -> None:
+    """Test if only tasks completed long enough ago are archived."""
+    db = make_db(str(tmp_path / "tasks.db"))
+    db.fetch_data(4, "COMPLETE")
+    # Completed before the completion times were stored.
+    conn = sqlite3.connect(db.db_name)
+    conn.execute("UPDATE tasks SET status = ? WHERE id = 3",
+                 (TaskStatus.COMPLETE.value,))
+    conn.execute("UPDATE task_completions SET completed_at = "
+                 "'2000/01/01 00:00:00' WHERE task_id = 1")
+    conn.commit()
+    conn.close()
+    since = db.change_counter()
+
+    assert db.archive_completed(older_than_days=1, batch_size=1) == 1
+    assert [row[0] for row in db.get_all_tasks()] == [2, 3, 4]
+    assert db.changed_task_ids(since) == [1]
+
+    assert db.archive_completed(older_than_days=0, batch_size=1) == 3
+    assert db.get_all_tasks() == []
+    assert [row[0] for row in db.get_all_tasks(include_archived=True)] == [
+        1, 2, 3, 4
+    ]
+    assert db.get_task(2) is None
+    assert db.get_task(2, include_archived=True)[6] == 3
+    assert len(db.query_tasks(TaskStatus.COMPLETE, include_archived=True)) \
+        == 4
+
+
+def test_archived_ids_never_reused(tmp_path) -> None:
+    """Test if a new task never takes the id of an archived one."""
+    path = str(tmp_path / "tasks.db")
+    # Tasks table made before ids were counted with AUTOINCREMENT.
+    conn = sqlite3.connect(path)
+    conn.execute(
+        SQLiteDB.generate_sql_creation_statement().replace(
+            " AUTOINCREMENT", ""
+        )
+    )
+    conn.execute("CREATE INDEX idx_tasks_due_date ON tasks (due_date)")
+    conn.close()
+    db = make_db(path)
+    assert db.archive_completed(older_than_days=0) == 2
+
+    db.remove_task(4)
+    db.remove_task(3)
+    db.bulk_insert(
+        "tasks",
+        [("New", "Desc", "2023/11/12 10:00:00", "2023/12/12 10:00:00",
+          "Anna", 2, 2, "")],
+    )
+    assert [row[0] for row in db.get_all_tasks(include_archived=True)] == [
+        1, 2, 5
+    ]
+    assert db._read(
+        "SELECT name FROM sqlite_master WHERE type = 'index' "
+        "AND name = 'idx_tasks_due_date'"
+    )
+
+
+def test_benchmark_archive(tmp_path, capsys) -> None:
+    """Test if the benchmark times the start before and after the job."""
+    make_db(str(tmp_path / "tasks.db"))
+
+    result = benchmark_archive(
+        str(tmp_path / "tasks.db"), older_than_days=0, runs=1
+    )
+    main(["--db", str(tmp_path / "tasks.db"), "--days", "0"])
+
+    assert result["archived"] == 2 and result["active"] == 2
+    assert result["before"] > 0 and result["after"] > 0
+    assert capsys.readouterr().out == "0 tasks archived.\n"
@@ -0,0 +1,66 @@
+"""
+test_arrow_io.py
+
+This script is dedicated to test all the functionalities from arrow_io.py
+file.
+"""
+
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from to_do_list_project.arrow_io import (
+    rows_to_record_batch,
+    task_schema,
+    write_parquet,
+)
+
+ROWS = [
+    (1, "Clean", "Clean room", "2023/11/12 10:00:00", "2023/12/12 10:00:00",
+     "James, Anna", 2, 3, "House Weekly"),
+    (2, "Shop", "Buy food", "2023/11/13 09:30:00", "2023/11/14 18:00:00",
+     "Anna", 3, 1, ""),
+]
+
+
+def test_task_schema_types() -> None:
+    """Test if the schema uses typed and dictionary encoded columns."""
+    schema = task_schema()
+
+    assert schema.field("id").type == pa.int64()
+    assert schema.field("due_date").type == pa.timestamp("s")
+    assert schema.field("assignee").type == pa.list_(pa.string())
+    assert pa.types.is_dictionary(schema.field("status").type)
+    assert pa.types.is_dictionary(schema.field("priority").type)
+
+
+def test_rows_to_record_batch() -> None:
+    """Test if task rows are converted into typed values."""
+    batch = rows_to_record_batch(ROWS)
+
+    assert batch.to_pylist()[0] == {
+        "id": 1,
+        "name": "Clean",
+        "description": "Clean room",
+        "creation_date": datetime(2023, 11, 12, 10),
+        "due_date": datetime(2023, 12, 12, 10),
+        "assignee": ["James", "Anna"],
+        "status": "IN_PROGRESS",
+        "priority": "HIGH",
+        "categories": ["House", "Weekly"],
+    }
+    assert batch.column("categories").to_pylist()[1] == []
+    assert batch.column("status").to_pylist()[1] == "COMPLETE"
+    assert rows_to_record_batch([]).num_rows == 0
+
+
+def test_write_parquet_row_groups(tmp_path) -> None:
+    """Test if every batch is written as its own row group."""
+    path = str(tmp_path / "tasks.parquet")
+
+    assert write_parquet([ROWS[:1], ROWS[1:]], path) == 2
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.read().column("id").to_pylist() == [1, 2]
@@ -0,0 +1,118 @@
+"""
+test_changes.py
+
+This script is dedicated to test all the functionalities from changes.py
+file.
+"""
+
+from datetime import datetime, timedelta
+import threading
+
+import pytest
+
+from to_do_list_project.changes import ChangeFeed
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.task_manager import TaskManager
+
+ROW = ("Task", "Description", "2024/01/01 10:00:00", "2024/01/02 10:00:00",
+       "Alice", 1, 1, "Work")
+
+
+def test_feed_sorts_changes(tmp_path) -> None:
+    """Test if the changes of another writer are sorted into events."""
+    path = str(tmp_path / "tasks.db")
+    SQLiteDB(path).bulk_insert("tasks", [ROW] * 4)
+    db = SQLiteDB(path)
+    feed = ChangeFeed(db)
+    events = []
+    feed.subscribe(events.append)
+
+    other = SQLiteDB(path)
+    other.bulk_insert("tasks", [ROW] * 2)
+    other.fetch_data(1, to_do="COMPLETE")
+    other.fetch_data(2, to_do="MODIFY", task=ROW[:3] + ("Bob",))
+    other.remove_task(3)
+    other.remove_task(6)
+
+    assert feed.poll() == 4
+    assert events == [
+        {"kind": "added", "task_ids": [5]},
+        {"kind": "modified", "task_ids": [2]},
+        {"kind": "completed", "task_ids": [1]},
+        {"kind": "removed", "task_ids": [3]},
+    ]
+    assert feed.poll() == 0
+    db.close_version_connection()
+    other.close_version_connection()
+
+
+def test_feed_filter(tmp_path) -> None:
+    """Test if subscribers only receive the kinds and tasks asked for."""
+    path = str(tmp_path / "tasks.db")
+    db = SQLiteDB(path)
+    db.bulk_insert("tasks", [ROW] * 3)
+    feed = ChangeFeed(db)
+    completed, task_two = [], []
+    feed.subscribe(completed.append, {"kinds": ["completed"]})
+    feed.subscribe(task_two.append, {"task_ids": [2]})
+
+    db.fetch_data(1, to_do="COMPLETE")
+    db.fetch_data(2, to_do="COMPLETE")
+    db.remove_task(3)
+    feed.poll()
+
+    assert completed == [{"kind": "completed", "task_ids": [1, 2]}]
+    assert task_two == [{"kind": "completed", "task_ids": [2]}]
+    with pytest.raises(ValueError):
+        feed.subscribe(completed.append, {"kinds": ["renamed"]})
+    db.close_version_connection()
+
+
+def test_task_manager_subscribe(tmp_path) -> None:
+    """Test if in-process and external changes reach the subscribers."""
+    path = str(tmp_path / "tasks.db")
+    task_manager = TaskManager(SQLiteDB(path))
+    events, received = [], threading.Event()
+
+    def on_change(event) -> None:
+        events.append(event)
+        received.set()
+
+    subscription = task_manager.subscribe(on_change, poll_interval=0.01)
+    task_id = task_manager.add_task(
+        "Task", "Description", datetime.now() + timedelta(days=1), ["Alice"]
+    )
+    assert events == [{"kind": "added", "task_ids": [task_id]}]
+
+    received.clear()
+    SQLiteDB(path).fetch_data(task_id, to_do="COMPLETE")
+    assert received.wait(5)
+    assert events[-1] == {"kind": "completed", "task_ids": [task_id]}
+
+    task_manager.unsubscribe(subscription)
+    assert task_manager._feed is None
+    task_manager.remove_task(task_id)
+    assert len(events) == 2
+    task_manager._db.close_version_connection()
+
+
+def test_feed_reset_after_pruning(tmp_path) -> None:
+    """Test if a feed behind the pruned log resets every subscriber."""
+    path = str(tmp_path / "tasks.db")
+    db = SQLiteDB(path)
+    db.bulk_insert("tasks", [ROW] * 3)
+    feed = ChangeFeed(db)
+    events, task_three = [], []
+    feed.subscribe(events.append, {"kinds": ["removed"]})
+    feed.subscribe(task_three.append, {"task_ids": [3]})
+
+    db.fetch_data(1, to_do="COMPLETE")
+    db.fetch_data(2, to_do="COMPLETE")
+    db.prune_changes(keep=1, pause=0)
+
+    assert feed.poll() == 1
+    assert events == task_three == [{"kind": "reset", "task_ids": []}]
+    db.remove_task(3)
+    assert feed.poll() == 1
+    assert events[-1] == {"kind": "removed", "task_ids": [3]}
+    db.close_version_connection()
@@ -0,0 +1,283 @@
+"""
+test_cli.py
+
+This script is dedicated to test all the functionalities from cli.py file.
+"""
+
+import json
+import os
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from to_do_list_project.cli import main
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.task_manager import TaskManager
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    """Fixture returning the path of a database holding one task."""
+    path = str(tmp_path / "cli.db")
+    main(["--db", path, "add", "Write report", "--due", "2999/01/31",
+          "--assignee", "Alice,Bob", "--category", "Work"])
+    return path
+
+
+def run(capsys, *argv) -> str:
+    """Run a todo command and return what it printed."""
+    capsys.readouterr()
+    assert main(list(argv)) == 0
+    return capsys.readouterr().out
+
+
+def test_add_and_ls_json(db_path: str, capsys) -> None:
+    """Test if an added task is listed as JSON."""
+    tasks = json.loads(run(capsys, "--db", db_path, "--json", "ls"))
+
+    assert len(tasks) == 1
+    assert tasks[0]["name"] == "Write report"
+    assert tasks[0]["assignee"] == "Alice, Bob"
+    assert tasks[0]["status"] == "IN_PROGRESS"
+
+
+def test_add_invalid_due_date(db_path: str, capsys) -> None:
+    """Test if a past due date is rejected without writing the task."""
+    assert main(["--db", db_path, "add", "Late", "--due", "2000/01/01",
+                 "--assignee", "Alice"]) == 1
+    assert "Due date must be a future date" in capsys.readouterr().err
+    assert len(json.loads(run(capsys, "--db", db_path, "--json", "ls"))) == 1
+
+
+def test_ls_filters(db_path: str, capsys) -> None:
+    """Test if ls filters by status and limits the output."""
+    main(["--db", db_path, "add", "Second", "--due", "2999/01/31",
+          "--assignee", "Bob", "--status", "start"])
+
+    started = json.loads(
+        run(capsys, "--db", db_path, "--json", "ls", "--status", "start")
+    )
+    limited = json.loads(
+        run(capsys, "--db", db_path, "--json", "ls", "--limit", "1")
+    )
+
+    assert [task["name"] for task in started] == ["Second"]
+    assert [task["id"] for task in limited] == [1]
+    assert "Write report" in run(capsys, "--db", db_path, "ls")
+
+
+def test_done_edit_rm(db_path: str, capsys) -> None:
+    """Test if a task can be completed, modified and removed."""
+    assert "marked as complete" in run(capsys, "--db", db_path, "done", "1")
+    edited = json.loads(
+        run(capsys, "--db", db_path, "--json", "edit", "1", "--name", "New")
+    )
+    assert edited[0]["name"] == "New"
+    assert edited[0]["status"] == "COMPLETE"
+
+    assert json.loads(run(capsys, "--db", db_path, "--json", "rm", "1")) == {
+        "id": 1
+    }
+    assert "No tasks." in run(capsys, "--db", db_path, "ls")
+
+
+def test_missing_task(db_path: str, capsys) -> None:
+    """Test if commands on an unknown id fail with exit code 1."""
+    for command in ("rm", "done", "edit"):
+        assert main(["--db", db_path, "--json", command, "42"]) == 1
+        assert json.loads(capsys.readouterr().out) == {
+            "error": "Task with ID 42 not found."
+        }
+
+
+def test_edit_version_conflict(db_path: str, capsys) -> None:
+    """Test if edit refuses to overwrite a task changed since a version."""
+    run(capsys, "--db", db_path, "edit", "1", "--version", "1",
+        "--name", "First")
+
+    assert main(["--db", db_path, "--json", "edit", "1", "--version", "1",
+                 "--name", "Second"]) == 1
+    assert json.loads(capsys.readouterr().out) == {
+        "error": "Task 1 is at version 2, not 1, the task was not modified."
+    }
+    tasks = json.loads(run(capsys, "--db", db_path, "--json", "ls"))
+    assert tasks[0]["name"] == "First"
+
+
+def test_edit_past_due_date(db_path: str, capsys) -> None:
+    """Test if edit refuses a past due date, as add does."""
+    assert main(["--db", db_path, "--json", "edit", "1",
+                 "--due", "2001/01/01"]) == 1
+    assert json.loads(capsys.readouterr().out) == {
+        "error": "Due date must be a future date"
+    }
+    tasks = json.loads(run(capsys, "--db", db_path, "--json", "ls"))
+    assert tasks[0]["due_date"].startswith("2999")
+
+
+def test_stats(db_path: str, capsys) -> None:
+    """Test if stats counts tasks by status and priority."""
+    stats = json.loads(run(capsys, "--db", db_path, "--json", "stats"))
+
+    assert stats == {
+        "total": 1,
+        "by_status": {"IN_PROGRESS": 1},
+        "by_priority": {"MEDIUM": 1},
+        "overdue": 0,
+    }
+    assert "Total: 1" in run(capsys, "--db", db_path, "stats")
+
+
+def test_commands_do_not_load_tasks(db_path: str, capsys) -> None:
+    """Test if the commands never load all the tasks in memory."""
+    with patch.object(TaskManager, "load_tasks_from_db") as load:
+        run(capsys, "--db", db_path, "ls")
+        run(capsys, "--db", db_path, "done", "1")
+        run(capsys, "--db", db_path, "edit", "1", "--name", "New")
+        run(capsys, "--db", db_path, "rm", "1")
+
+    load.assert_not_called()
+
+
+def test_export(db_path: str, tmp_path, capsys) -> None:
+    """Test if export writes the tasks to a Parquet file."""
+    path = str(tmp_path / "tasks.parquet")
+
+    output = run(capsys, "--db", db_path, "--json", "export", path)
+
+    assert json.loads(output) == {"exported": 1}
+    assert os.path.exists(path)
+
+
+def test_export_read_error(db_path: str, tmp_path, capsys) -> None:
+    """Test if an export cut short fails and leaves no file behind."""
+    path = str(tmp_path / "tasks.parquet")
+    stream = SQLiteDB(db_path).iter_task_batches
+
+    def broken(*args, **kwargs):
+        yield from stream(*args, **kwargs)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    with patch.object(SQLiteDB, "iter_task_batches", side_effect=broken):
+        assert main(["--db", db_path, "export", path]) == 1
+
+    assert "disk I/O error" in capsys.readouterr().err
+    assert not os.path.exists(path)
+
+
+def test_due(db_path: str, capsys) -> None:
+    """Test if due lists the open tasks by due date in a period."""
+    main(["--db", db_path, "add", "Sooner", "--due", "2998/06/01",
+          "--assignee", "Bob"])
+    main(["--db", db_path, "add", "Done", "--due", "2997/01/01",
+          "--assignee", "Bob"])
+    main(["--db", db_path, "done", "3"])
+
+    due = json.loads(run(capsys, "--db", db_path, "--json", "due"))
+    ranged = json.loads(run(
+        capsys, "--db", db_path, "--json", "due",
+        "--from", "2998/01/01", "--to", "2998/06/01",
+    ))
+    overdue = json.loads(
+        run(capsys, "--db", db_path, "--json", "due", "--overdue")
+    )
+
+    assert [task["name"] for task in due] == ["Sooner", "Write report"]
+    assert [task["name"] for task in ranged] == ["Sooner"]
+    assert overdue == []
+
+
+def test_archive(db_path: str, capsys) -> None:
+    """Test if archived tasks are only listed with --archived."""
+    main(["--db", db_path, "add", "Last", "--due", "2999/01/31",
+          "--assignee", "Bob"])
+    main(["--db", db_path, "done", "1"])
+
+    archived = json.loads(
+        run(capsys, "--db", db_path, "--json", "archive", "--days", "0")
+    )
+    active = json.loads(run(capsys, "--db", db_path, "--json", "ls"))
+    every = json.loads(
+        run(capsys, "--db", db_path, "--json", "ls", "--archived")
+    )
+
+    assert archived == {"archived": 1}
+    assert [task["name"] for task in active] == ["Last"]
+    assert [task["name"] for task in every] == ["Write report", "Last"]
+
+
+def test_maintain(db_path: str, capsys) -> None:
+    """Test if maintain reports the size of the database."""
+    maintenance = json.loads(
+        run(capsys, "--db", db_path, "--json", "maintain", "--analyze")
+    )
+    message = run(capsys, "--db", db_path, "maintain")
+
+    assert maintenance["auto_vacuum"] == "incremental"
+    assert maintenance["size_after"] == os.path.getsize(db_path)
+    assert "MB freed" in message
+    assert maintenance["changes_pruned"] == 0
+    assert "Change log: 0 entries pruned" in message
+
+
+def test_set_based_commands(db_path: str, capsys) -> None:
+    """Test if rm, done, reassign and priority act on ids and filters."""
+    for name in ("Second", "Third"):
+        main(["--db", db_path, "add", name, "--due", "2998/01/31",
+              "--assignee", "Bob", "--category", "Home"])
+
+    assert main(["--db", db_path, "done"]) == 1
+    assert "Give task ids or a filter." in capsys.readouterr().err
+    assert json.loads(run(
+        capsys, "--db", db_path, "--json", "reassign", "Bob", "Carol", "2"
+    )) == {"ids": [2]}
+    assert "2 tasks set to high priority: 2, 3." in run(
+        capsys, "--db", db_path, "priority", "high", "--category", "Home"
+    )
+    assert json.loads(run(
+        capsys, "--db", db_path, "--json", "done", "1", "3"
+    )) == {"ids": [1, 3]}
+    assert json.loads(run(
+        capsys, "--db", db_path, "--json", "rm", "--status", "complete",
+        "--due-before", "2999/01/01",
+    )) == {"ids": [3]}
+    tasks = json.loads(run(capsys, "--db", db_path, "--json", "ls"))
+    assert [(task["id"], task["assignee"]) for task in tasks] == [
+        (1, "Alice, Bob"), (2, "Carol")
+    ]
+
+
+def test_recurring_tasks(db_path: str, capsys) -> None:
+    """Test if recurring tasks are listed and completed by occurrence."""
+    added = json.loads(run(
+        capsys, "--db", db_path, "--json", "add", "Stand-up",
+        "--due", "2999/01/07", "--assignee", "Alice",
+        "--repeat", "FREQ=WEEKLY;BYDAY=MO,TH",
+    ))
+    listed = json.loads(run(
+        capsys, "--db", db_path, "--json", "occurrences",
+        "--from", "2999/01/01", "--to", "2999/01/31",
+    ))
+    assert [task["due_date"][:10] for task in listed] == [
+        "2999/01/07", "2999/01/10", "2999/01/14", "2999/01/17",
+        "2999/01/21", "2999/01/24", "2999/01/28", "2999/01/31",
+    ]
+    assert {task["series_id"] for task in listed} == {added["series_id"]}
+
+    done = json.loads(run(
+        capsys, "--db", db_path, "--json", "done-occurrence",
+        str(added["series_id"]), "2999/01/10",
+    ))
+    assert done == {"id": 2}
+    listed = json.loads(run(
+        capsys, "--db", db_path, "--json", "occurrences",
+        "--from", "2999/01/10", "--to", "2999/01/10",
+    ))
+    assert [(task["id"], task["status"]) for task in listed] == [
+        (2, "COMPLETE")
+    ]
+    assert main(["--db", db_path, "done-occurrence", "1", "2999/01/11"]) == 1
+    with pytest.raises(SystemExit):
+        main(["--db", db_path, "add", "Bad", "--due", "2999/01/01",
+              "--assignee", "Alice", "--repeat", "FREQ=HOURLY"])
@@ -5,11 +5,15 @@ This script is dedicated to test all the functionalities from db.py file.
 """
 
 from datetime import datetime, timedelta
+import os
 import sqlite3
+import threading
 from unittest.mock import Mock, patch
 import pytest
 
-from to_do_list_project.db import SQLiteDB
+from to_do_list_project.db import SQLiteDB, TaskConflictError
+from to_do_list_project.query_log import SlowQueryLog
+from to_do_list_project.recurrence import RecurrenceRule
 from to_do_list_project.task import TaskPriority, TaskStatus
 
 task_1 = Mock(
@@ -107,3 +111,551 @@ def test_remove_task(db_manager: SQLiteDB):
     db_manager.close_connection()
 
     assert row is None
+
+
+def test_bulk_insert(db_manager: SQLiteDB):
+    """Test if encoded rows can be inserted in batches."""
+    sample_task = {
+        "name": "Test task",
+        "description": "This is a test task.",
+        "creation_date": datetime.now(),
+        "due_date": datetime.now() + timedelta(days=1),
+        "assignee": ["John Doe"],
+        "status": TaskStatus.IN_PROGRESS,
+        "priority": TaskPriority.MEDIUM,
+        "categories": ["Work"],
+    }
+    rows = (SQLiteDB.encode_task_data(sample_task) for _ in range(25))
+
+    assert db_manager.bulk_insert("tasks", rows, batch_size=10) == 25
+    assert len(db_manager.get_all_tasks()) == 25
+
+
+def test_bulk_insert_synchronous(tmp_path):
+    """Test if bulk loads keep synchronous writes unless told otherwise."""
+    db = SQLiteDB(str(tmp_path / "sync.db"))
+    statements = []
+    connect = db.connect
+
+    def traced_connect(*args, **kwargs):
+        connect(*args, **kwargs)
+        db.conn.set_trace_callback(statements.append)
+
+    row = ("Task", "Desc", "", "", "", 1, 1, "")
+    with patch.object(db, "connect", side_effect=traced_connect):
+        db.bulk_insert("tasks", [row])
+        db.bulk_insert("tasks", [row], synchronous="off")
+
+    assert [s for s in statements if "synchronous" in s] == [
+        "PRAGMA synchronous = NORMAL", "PRAGMA synchronous = OFF"
+    ]
+    with pytest.raises(ValueError):
+        db.bulk_insert("tasks", [row], synchronous="OFF; DROP TABLE tasks")
+    assert len(db.get_all_tasks()) == 2
+
+
+def test_slow_query_log(db_manager: SQLiteDB, tmp_path):
+    """Test if the slow-query log records the statements of the db."""
+    assert db_manager.slow_query_summary() == []
+    db_manager.slow_query_log = SlowQueryLog(0, str(tmp_path / "slow.log"))
+
+    db_manager.create_table_tasks()
+    db_manager.get_all_tasks()
+    db_manager.get_all_tasks()
+
+    statements = {
+        item["sql"]: item for item in db_manager.slow_query_summary(top=20)
+    }
+    select = SQLiteDB.generate_sql_select_statement()
+    assert statements[select]["count"] == 2
+    assert statements[select]["plan"] == "SCAN tasks"
+
+
+def test_write_retried_while_locked(tmp_path):
+    """Test if a write waits for another connection's lock to go away."""
+    db = SQLiteDB(str(tmp_path / "locked.db"), busy_timeout=0.01)
+    db.create_table_tasks()
+    sample_task = {
+        "name": "Test task",
+        "description": "This is a test task.",
+        "creation_date": datetime.now(),
+        "due_date": datetime.now() + timedelta(days=1),
+        "assignee": ["John Doe"],
+        "status": TaskStatus.IN_PROGRESS,
+        "priority": TaskPriority.MEDIUM,
+        "categories": ["Work"],
+    }
+    blocker = sqlite3.connect(db.db_name, check_same_thread=False)
+    blocker.execute("BEGIN EXCLUSIVE")
+    release = threading.Timer(0.2, blocker.commit)
+    release.start()
+
+    with patch.object(db.logger, "warning") as mock_warning:
+        task_id = db.insert_data("tasks", sample_task)
+    release.join()
+    blocker.close()
+
+    assert task_id is not None
+    assert mock_warning.called
+    assert len(db.get_all_tasks()) == 1
+
+
+def test_remove_task_with_large_id(db_manager: SQLiteDB):
+    """Test if tasks with multi-digit ids can be removed."""
+    db_manager.create_table_tasks()
+    rows = [("Task", "Desc", "", "", "", 1, 1, "")] * 12
+    db_manager.bulk_insert("tasks", rows)
+
+    db_manager.remove_task(12)
+
+    assert [row[0] for row in db_manager.get_all_tasks()] == list(
+        range(1, 12)
+    )
+
+
+def test_iter_task_batches(db_manager: SQLiteDB):
+    """Test if tasks are streamed in ordered batches."""
+    db_manager.create_table_tasks()
+    rows = [("Task", "Desc", "", f"2030/01/{day:02d} 00:00:00", "", 1, 1, "")
+            for day in range(1, 8)]
+    db_manager.bulk_insert("tasks", rows)
+
+    batches = list(db_manager.iter_task_batches(3))
+    by_due_date = list(
+        db_manager.iter_task_batches(10, order_by="due_date", descending=True)
+    )
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [row[0] for row in by_due_date[0]] == list(range(7, 0, -1))
+    with pytest.raises(ValueError):
+        list(db_manager.iter_task_batches(order_by="id; DROP TABLE tasks"))
+
+
+def test_iter_task_batches_read_error(db_manager: SQLiteDB, tmp_path):
+    """Test if a stream cut short raises after the batches it read."""
+    conn = Mock()
+    conn.execute.return_value.fetchone.return_value = (1,)
+    conn.execute.return_value.fetchmany.side_effect = [
+        [(1,)], sqlite3.OperationalError("disk I/O error")
+    ]
+    batches = []
+
+    with patch.object(db_manager, "_open_reader", return_value=conn):
+        with pytest.raises(sqlite3.OperationalError):
+            for batch in db_manager.iter_task_batches(1):
+                batches.append(batch)
+
+    assert batches == [[(1,)]]
+    conn.close.assert_called_once()
+    empty = SQLiteDB(str(tmp_path / "empty.db"))
+    assert list(empty.iter_task_batches()) == []
+
+
+def test_count_tasks_and_indexes(db_manager: SQLiteDB):
+    """Test if tasks are counted and sorted pages use the indexes."""
+    db_manager.create_table_tasks()
+    rows = [("Task", "Desc", "", f"2030/01/{day:02d} 00:00:00", "", 1,
+             day % 2 + 1, "") for day in range(1, 8)]
+    db_manager.bulk_insert("tasks", rows)
+    db_manager.create_indexes()
+
+    page = list(db_manager.iter_task_batches(
+        10, "priority = ?", (2,), "due_date", True, limit=2, offset=1
+    ))
+    conn = sqlite3.connect(db_manager.db_name, uri=True)
+    plan = SlowQueryLog.explain(
+        conn, "SELECT * FROM tasks ORDER BY due_date DESC, id DESC", ()
+    )
+    conn.close()
+
+    assert db_manager.count_tasks() == 7
+    assert db_manager.count_tasks("priority = ?", (2,)) == 4
+    assert [row[0] for row in page[0]] == [5, 3]
+    assert "idx_tasks_due_date" in plan
+
+
+def test_data_version(db_manager: SQLiteDB):
+    """Test if the data version changes after every write."""
+    db_manager.create_table_tasks()
+    before = db_manager.data_version()
+
+    assert db_manager.data_version() == before
+    db_manager.bulk_insert("tasks", [("Task", "Desc", "", "", "", 1, 1, "")])
+    after = db_manager.data_version()
+    db_manager.remove_task(1)
+
+    assert after != before
+    assert db_manager.data_version() != after
+    db_manager.close_version_connection()
+
+
+def test_change_counter(db_manager: SQLiteDB):
+    """Test if every write transaction increases the change counter."""
+    assert db_manager.change_counter() == 0
+    db_manager.create_table_tasks()
+    db_manager.bulk_insert(
+        "tasks", [("Task", "Desc", "", "", "", 1, 1, "")] * 3, batch_size=2
+    )
+    db_manager.remove_task(1)
+
+    assert db_manager.change_counter() == 4
+
+
+def test_changed_task_ids(db_manager: SQLiteDB):
+    """Test if modified and removed tasks are listed in the change log."""
+    assert db_manager.changed_task_ids(0) == []
+    db_manager.create_table_tasks()
+    db_manager.bulk_insert("tasks", [("Task", "Desc", "", "", "", 1, 1, "")])
+    since = db_manager.change_counter()
+    db_manager.fetch_data(1, "COMPLETE")
+    db_manager.remove_task(1)
+
+    assert db_manager.changed_task_ids(since) == [1]
+    assert db_manager.changed_task_ids(db_manager.change_counter()) == []
+
+
+def test_prune_changes(db_manager: SQLiteDB):
+    """Test if readers behind the pruned log are told to read it all."""
+    assert db_manager.prune_changes(keep=1) == 0
+    db_manager.create_table_tasks()
+    db_manager.bulk_insert(
+        "tasks", [("Task", "Desc", "", "", "", 1, 1, "")] * 3
+    )
+    since = db_manager.change_counter()
+    for task_id in (1, 2, 3):
+        db_manager.fetch_data(task_id, "COMPLETE")
+    counter = db_manager.change_counter()
+
+    assert db_manager.prune_changes(keep=1) == 2
+    assert db_manager.prune_changes(keep=1) == 0
+    assert db_manager.change_counter() == counter
+    assert db_manager.changed_task_ids(since) is None
+    assert db_manager.changed_task_ids(counter - 1) == [3]
+    assert db_manager.changes_since(since, 3)["pruned"]
+    changes = db_manager.changes_since(counter - 1, 3)
+    assert not changes["pruned"] and changes["changed"] == [(3, 3)]
+
+    db_manager.remove_task(3)
+    assert db_manager.maintain(pause=0, keep_changes=0)["changes_pruned"] \
+        == 2
+    assert db_manager.changed_task_ids(counter) is None
+
+
+def test_maintain_releases_free_pages(tmp_path):
+    """Test if maintenance shrinks the file in small vacuum steps."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    db.bulk_insert("tasks", [("Task", "x" * 500, "", "", "", 1, 1, "")] * 2000)
+    db.connect()
+    db.conn.execute("DELETE FROM tasks WHERE id > 100")
+    db.conn.commit()
+    db.close_connection()
+
+    report = db.maintain(pages_per_step=50, pause=0)
+
+    assert report["auto_vacuum"] == "incremental"
+    assert report["freed_bytes"] > 500 * 1800
+    assert report["size_after"] == os.path.getsize(db.db_name)
+    assert report["free_pages_left"] == 0
+    assert report["vacuum_steps"] > 1
+    assert db.count_tasks() == 100
+
+
+def test_enable_incremental_vacuum(tmp_path):
+    """Test if an existing database is migrated to incremental vacuum."""
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(SQLiteDB.generate_sql_creation_statement())
+    conn.close()
+    db = SQLiteDB(path)
+
+    assert db.maintain()["auto_vacuum"] == "none"
+    assert db.enable_incremental_vacuum() == "incremental"
+    assert db.maintain(analyze=True)["auto_vacuum"] == "incremental"
+
+
+def test_read_replica(tmp_path):
+    """Test if reads are served from a replica copied after writes."""
+    path = str(tmp_path / "tasks.db")
+    db = SQLiteDB(path, read_replica=True, replica_step_pages=1)
+    other = SQLiteDB(path)
+    db.bulk_insert("tasks", [("Task", "x" * 500, "", "", "", 1, 1, "")] * 50)
+
+    assert len(db.get_all_tasks()) == 50
+    assert db.count_tasks() == 50
+    assert db.replica_refreshes == 1
+    other.remove_task(1)
+    assert db.get_task(1) is None
+    assert len(list(db.iter_task_batches(20))) == 3
+    assert db.replica_refreshes == 2
+
+    db.remove_task(2)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 48
+    conn.close()
+    assert db.count_tasks() == 48
+    db.close_replica()
+    db.close_version_connection()
+
+
+def test_read_replica_max_lag(tmp_path):
+    """Test if the replica is not checked again before its maximum lag."""
+    path = str(tmp_path / "tasks.db")
+    db = SQLiteDB(path, read_replica=True, replica_max_lag=60)
+    db.bulk_insert("tasks", [("Task", "Desc", "", "", "", 1, 1, "")] * 3)
+
+    assert db.count_tasks() == 3
+    db.remove_task(1)
+    assert db.count_tasks() == 3
+    assert db.refresh_replica(force=True)
+    assert db.count_tasks() == 2
+    db.close_replica()
+    db.close_version_connection()
+
+
+def test_read_replica_replaced_while_read(tmp_path):
+    """Test if reads never open a replica closed by another thread."""
+    db = SQLiteDB(
+        str(tmp_path / "tasks.db"), read_replica=True, replica_max_lag=0
+    )
+    db.bulk_insert("tasks", [("Task", "Desc", "", "", "", 1, 1, "")] * 20)
+    counts = []
+    done = threading.Event()
+
+    def replace() -> None:
+        while not done.is_set():
+            db.refresh_replica(force=True)
+            db.close_replica()
+
+    def read() -> None:
+        counts.extend(db.count_tasks() for _ in range(200))
+
+    replacer = threading.Thread(target=replace)
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    replacer.start()
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    done.set()
+    replacer.join()
+    assert counts == [20] * 800
+    db.close_replica()
+    db.close_version_connection()
+
+
+def test_batch(tmp_path):
+    """Test if a batch commits its writes at once, except failed ones."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    db.bulk_insert("tasks", [("Task", "Desc", "", "", "", 1, 1, "")] * 3)
+    since = db.change_counter()
+
+    with db.batch():
+        db.remove_task(1)
+        with pytest.raises(sqlite3.Error):
+            db._write(
+                lambda cursor: (
+                    cursor.execute("DELETE FROM tasks WHERE id = 2"),
+                    cursor.execute("SELECT * FROM missing_table"),
+                ),
+                [2],
+            )
+        db.fetch_data(3, "COMPLETE")
+        assert SQLiteDB(db.db_name).count_tasks() == 3
+
+    assert db.count_tasks() == 2
+    assert db.get_task(2) is not None
+    assert db.change_counter() == since + 1
+    assert db.changed_task_ids(since) == [1, 3]
+
+
+def test_batch_query_plans(tmp_path):
+    """Test if statements of a batch are explained on its connection."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    db.bulk_insert("tasks", [("Task", "Desc", "", "", "", 1, 1, "")] * 2)
+    db.get_all_tasks()
+    assert db.conn is None
+    db.slow_query_log = SlowQueryLog(0, str(tmp_path / "slow.log"))
+
+    with db.batch():
+        row, version = db.get_versioned_task(1)
+        db.update_task(1, ("Renamed", "Desc", "", "Al"), version)
+        db.remove_task(2)
+
+    plans = [item["plan"] for item in db.slow_query_summary(top=20)]
+    assert len(plans) == 3
+    assert not any(plan.startswith("unavailable") for plan in plans)
+    assert any("USING INTEGER PRIMARY KEY" in plan for plan in plans)
+
+
+def test_search_tasks(db_manager: SQLiteDB):
+    """Test if tasks are found by their text, a page at a time."""
+    db_manager.create_table_tasks()
+    db_manager.bulk_insert("tasks", [
+        ("Write report", "Monthly", "", "", "Alice", 1, 1, "Work"),
+        ("Call", "About the REPORT", "", "", "Bob", 1, 1, "Home"),
+        ("Shop", "Milk", "", "", "Alice", 1, 1, "100%_sure"),
+    ])
+
+    assert [row[0] for row in db_manager.search_tasks("report")] == [1, 2]
+    assert [row[0] for row in db_manager.search_tasks("alice")] == [1, 3]
+    assert [row[0] for row in db_manager.search_tasks("Alice", 1)] == [1]
+    assert [
+        row[0] for row in db_manager.search_tasks("Alice", after_id=1)
+    ] == [3]
+    assert [row[0] for row in db_manager.search_tasks("%_")] == [3]
+    assert db_manager.search_tasks("1_") == []
+
+
+def test_set_based_writes(tmp_path):
+    """Test if filtered writes touch the matching tasks in one commit."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    db.bulk_insert("tasks", [
+        ("A", "", "", "2030/01/01 10:00:00", "Alice, Bob", 1, 1, "Sprint"),
+        ("B", "", "", "2030/02/01 10:00:00", "Bobby", 1, 1, "Sprint Home"),
+        ("C", "", "", "2030/03/01 10:00:00", "Bob", 3, 1, "Home"),
+    ])
+    since = db.change_counter()
+
+    assert db.complete_where(task_ids=[1, 2, 3]) == [1, 2]
+    assert db.change_counter() == since + 1
+    assert db.changed_task_ids(since) == [1, 2]
+    assert db.set_priority_where(
+        TaskPriority.HIGH, "due_date < ?", ("2030/02/15 00:00:00",)
+    ) == [1, 2]
+    assert db.reassign("Bob", "Alice") == [1, 3]
+    assert [row[5] for row in db.get_all_tasks()] == [
+        "Alice", "Bobby", "Alice"
+    ]
+    assert db.reassign("Bobby", "Carol", task_ids=[]) == []
+    assert db.remove_where(task_ids=[2, 42]) == [2]
+    assert db.count_tasks() == 2
+    assert db.complete_where("no_such_column = 1") == []
+
+
+def test_dependencies(tmp_path):
+    """Test if dependencies are stored and dropped with their tasks."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    db.bulk_insert("tasks", [
+        (name, "", "", "2030/01/01 10:00:00", "Anna", 1, 1, "")
+        for name in "ABCD"
+    ])
+    assert db.get_dependencies() == []
+    db.remove_task(4)
+
+    assert db.add_dependencies([(2, 1), (3, 1), (3, 2), (2, 1)]) == 3
+    assert sorted(db.get_dependencies()) == [(2, 1), (3, 1), (3, 2)]
+    assert db.get_task_states()[0] == (1, 1, "2030/01/01 10:00:00")
+    assert db.remove_dependency(3, 1)
+    assert not db.remove_dependency(3, 1)
+    db.remove_task(2)
+    assert db.get_dependencies() == []
+
+    db.add_dependencies([(3, 1)])
+    assert db.remove_where(task_ids=[1]) == [1]
+    assert db.get_dependencies() == []
+
+
+def test_recurring_tasks(tmp_path):
+    """Test if only the occurrences completed or edited are stored."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    assert db.get_series() == [] and db.query_occurrences(
+        datetime(2030, 1, 1), datetime(2031, 1, 1)
+    ) == []
+    series_id = db.insert_series({
+        "name": "Water plants",
+        "description": "Every day",
+        "creation_date": datetime(2029, 1, 1),
+        "due_date": datetime(2030, 1, 1, 9),
+        "assignee": ["Anna"],
+        "status": TaskStatus.START,
+        "priority": TaskPriority.LOW,
+        "categories": ["Home"],
+        "recurrence": RecurrenceRule("daily"),
+    })
+    assert db.get_series()[0][9] == "FREQ=DAILY"
+    assert not db.table_exists("tasks")
+
+    task_id = db.materialize_occurrence(series_id, datetime(2030, 1, 3, 9))
+    assert db.materialize_occurrence(
+        series_id, datetime(2030, 1, 3, 9)
+    ) == task_id
+    assert db.materialize_occurrence(42, datetime(2030, 1, 3, 9)) is None
+    assert db.get_task(task_id)[1:5:3] == (
+        "Water plants", "2030/01/03 09:00:00"
+    )
+    assert db.query_occurrences(
+        datetime(2030, 1, 2), datetime(2030, 1, 4)
+    ) == [(series_id, "2030/01/03 09:00:00", *db.get_task(task_id))]
+
+    db.remove_task(task_id)
+    next_id = db.materialize_occurrence(series_id, datetime(2030, 1, 4, 9))
+    assert db.remove_where(task_ids=[next_id]) == [next_id]
+    # Ids given again, as in a tasks table without AUTOINCREMENT.
+    conn = sqlite3.connect(db.db_name)
+    conn.executemany(
+        "INSERT INTO tasks (id, name) VALUES (?, 'Other')",
+        [(task_id,), (next_id,)],
+    )
+    conn.commit()
+    conn.close()
+    for day in (3, 4):
+        assert db.materialize_occurrence(
+            series_id, datetime(2030, 1, day, 9)
+        ) is None
+    assert [row[2] for row in db.query_occurrences(
+        datetime(2030, 1, 2), datetime(2030, 1, 4, 12)
+    )] == [None, None]
+    assert db.remove_series(series_id)
+    assert not db.remove_series(series_id)
+    assert db.query_occurrences(
+        datetime(2030, 1, 2), datetime(2030, 1, 4)
+    ) == []
+
+
+def test_task_versions(tmp_path):
+    """Test if writes increase the version and stale updates conflict."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    db.bulk_insert("tasks", [("Task", "Desc", "", "2030/01/01 10:00:00",
+                              "Alice", 1, 1, "")] * 2)
+    row, version = db.get_versioned_task(1)
+    assert version == 1
+    assert row == db.get_task(1)
+
+    db.fetch_data(1, "COMPLETE")
+    db.set_priority_where(TaskPriority.HIGH, task_ids=[1])
+    assert db.get_versioned_task(1)[1] == 3
+    assert db.update_task(1, ("New", "Desc", row[4], "Bob"), 3) == 4
+
+    with pytest.raises(TaskConflictError) as conflict:
+        db.update_task(1, ("Stale", "Desc", row[4], "Carol"), version)
+    assert conflict.value.current[1] == "New"
+    assert conflict.value.current_version == 4
+    assert db.get_task(1)[1] == "New"
+
+    db.remove_task(2)
+    with pytest.raises(TaskConflictError, match="was removed"):
+        db.update_task(2, ("Gone", "Desc", row[4], "Bob"), 1)
+    assert db.update_task(2, ("Gone", "Desc", row[4], "Bob")) is None
+    assert db.get_versioned_task(2) is None
+
+
+def test_version_column_added_to_old_tables(tmp_path):
+    """Test if a tasks table made before versions gets the column."""
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE tasks (id INTEGER PRIMARY KEY, name TEXT, "
+        "description TEXT, creation_date DATETIME, due_date DATETIME, "
+        "assignee TEXT, status INTEGER, priority INTEGER, category TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO tasks VALUES (1, 'Old', '', '', '', 'Al', 1, 1, '')"
+    )
+    conn.commit()
+    conn.close()
+
+    db = SQLiteDB(path)
+    assert db.get_versioned_task(1)[1] == 1
+    db.fetch_data(1, "COMPLETE")
+    assert db.get_versioned_task(1)[1] == 2
+    assert len(db.get_all_tasks()[0]) == 9
@@ -0,0 +1,143 @@
+"""
+test_dependencies.py
+
+This script is dedicated to test all the functionalities from
+dependencies.py file.
+"""
+
+from datetime import datetime
+import random
+
+import pytest
+
+from to_do_list_project.dependencies import (
+    DependencyCycleError,
+    DependencyGraph,
+)
+
+
+def make_graph(edges=(), completed=()) -> DependencyGraph:
+    """Return a graph of tasks 1 to 6, task n due on day n of January."""
+    return DependencyGraph(
+        [
+            (task_id, task_id in completed, datetime(2030, 1, task_id))
+            for task_id in range(1, 7)
+        ],
+        edges,
+    )
+
+
+def test_ready_and_blocked() -> None:
+    """Test if tasks are ready once their prerequisites are completed."""
+    graph = make_graph([(2, 1), (3, 1), (3, 2), (4, 3), (9, 1)], [5])
+    assert graph.ready() == [1, 6]
+    assert graph.ready(limit=1) == [1]
+    assert graph.blocked_by(3) == [1, 2]
+
+    graph.complete(1)
+    assert graph.ready() == [2, 6]
+    assert graph.blocked_by(3) == [2]
+    graph.complete(2)
+    assert graph.ready() == [3, 6]
+
+    graph.remove(3)
+    assert graph.ready() == [4, 6]
+    assert graph.prerequisites(4) == []
+    with pytest.raises(KeyError):
+        graph.blocked_by(3)
+
+
+def test_add_and_remove_dependency() -> None:
+    """Test if dependencies are added and removed incrementally."""
+    graph = make_graph(completed=[5])
+    assert graph.add_dependency(2, 1)
+    assert not graph.add_dependency(2, 1)
+    assert graph.add_dependency(6, 5)
+    assert graph.ready() == [1, 3, 4, 6]
+
+    assert graph.add_dependency(1, 4)
+    assert graph.ready() == [3, 4, 6]
+    assert graph.remove_dependency(1, 4)
+    assert not graph.remove_dependency(1, 4)
+    assert graph.ready() == [1, 3, 4, 6]
+
+    graph.add_task(7, datetime(2029, 12, 31))
+    graph.add_dependency(7, 2)
+    assert graph.blocked_by(7) == [2]
+    with pytest.raises(KeyError):
+        graph.add_dependency(8, 1)
+
+
+@pytest.mark.parametrize("edge", [(1, 1), (1, 3), (1, 2)])
+def test_cycles_refused(edge) -> None:
+    """Test if a dependency closing a cycle is refused."""
+    graph = make_graph([(2, 1), (3, 2)])
+    with pytest.raises(DependencyCycleError):
+        graph.add_dependency(*edge)
+    assert graph.blocked_by(1) == []
+
+    with pytest.raises(DependencyCycleError):
+        make_graph([(2, 1), (1, 2)])
+
+
+def test_random_dependencies_match_reachability() -> None:
+    """Test the cycle checks against a search of the whole graph."""
+    rng = random.Random(0)
+    size = 40
+    graph = DependencyGraph(
+        [(task_id, False, datetime(2030, 1, 1)) for task_id in range(size)]
+    )
+    prerequisites = {task_id: set() for task_id in range(size)}
+
+    def depends(task_id: int, other: int) -> bool:
+        stack, seen = [task_id], set()
+        while stack:
+            for prerequisite in prerequisites[stack.pop()]:
+                if prerequisite == other:
+                    return True
+                if prerequisite not in seen:
+                    seen.add(prerequisite)
+                    stack.append(prerequisite)
+        return False
+
+    for _ in range(400):
+        task_id, other = rng.randrange(size), rng.randrange(size)
+        cycle = task_id == other or depends(other, task_id)
+        if cycle:
+            with pytest.raises(DependencyCycleError):
+                graph.add_dependency(task_id, other)
+        else:
+            graph.add_dependency(task_id, other)
+            prerequisites[task_id].add(other)
+    order = graph._order
+    assert all(
+        order[other] < order[task_id]
+        for task_id, others in prerequisites.items()
+        for other in others
+    )
+
+
+def test_critical_path() -> None:
+    """Test if the longest chain is returned with its latest dates."""
+    graph = make_graph([(2, 1), (4, 2), (3, 1), (6, 5)])
+    assert graph.critical_path() == [
+        (1, datetime(2030, 1, 1)),
+        (2, datetime(2030, 1, 2)),
+        (4, datetime(2030, 1, 4)),
+    ]
+
+    # Task 2 now has to be done before task 3, due earlier than it.
+    graph.add_dependency(3, 2)
+    graph.set_due_date(3, datetime(2029, 12, 1))
+    assert graph.critical_path() == [
+        (1, datetime(2029, 12, 1)),
+        (2, datetime(2029, 12, 1)),
+        (3, datetime(2029, 12, 1)),
+    ]
+    graph.complete(1)
+    graph.complete(2)
+    assert graph.critical_path() == [
+        (5, datetime(2030, 1, 5)),
+        (6, datetime(2030, 1, 6)),
+    ]
+    assert DependencyGraph().critical_path() == []
@@ -0,0 +1,76 @@
+"""
+test_due_index.py
+
+This script is dedicated to test all the functionalities from due_index.py
+file.
+"""
+
+from datetime import datetime
+
+from to_do_list_project.due_index import DueIndex
+from to_do_list_project.task import Task, TaskPriority, TaskStatus
+
+
+def make_task(task_id: int, due_date: datetime, status=TaskStatus.START):
+    """Return a task with an id, a due date and a status."""
+    return Task.from_db(
+        task_id,
+        f"Task {task_id}",
+        "Description",
+        datetime(2023, 1, 1),
+        due_date,
+        ["Anna"],
+        status,
+        TaskPriority.MEDIUM,
+        [],
+    )
+
+
+TASKS = [
+    make_task(1, datetime(2024, 3, 1)),
+    make_task(2, datetime(2024, 1, 1)),
+    make_task(3, datetime(2024, 2, 1), TaskStatus.COMPLETE),
+    make_task(4, datetime(2024, 2, 1)),
+    make_task(5, datetime(2024, 1, 1)),
+]
+
+
+def ids(tasks) -> list:
+    """Return the ids of tasks."""
+    return [task.id for task in tasks]
+
+
+def test_queries() -> None:
+    """Test if open tasks are returned by due date, then id."""
+    due_index = DueIndex(TASKS)
+
+    assert len(due_index) == 4
+    assert ids(due_index.next_due(3)) == [2, 5, 4]
+    assert ids(due_index.next_due(10)) == [2, 5, 4, 1]
+    assert ids(due_index.overdue(datetime(2024, 2, 1))) == [2, 5]
+    assert ids(
+        due_index.due_between(datetime(2024, 1, 1), datetime(2024, 2, 1))
+    ) == [2, 5, 4]
+    assert due_index.due_between(datetime(2025, 1, 1), datetime(2026, 1, 1)) \
+        == []
+
+
+def test_add_and_discard() -> None:
+    """Test if changed, completed and removed tasks are kept in order."""
+    due_index = DueIndex(TASKS)
+    task = make_task(6, datetime(2023, 12, 1))
+    due_index.add(task)
+    due_index.discard(2)
+    due_index.discard(42)
+
+    assert ids(due_index.next_due(2)) == [6, 5]
+
+    due_index.discard(task.id)
+    task.due_date = datetime(2030, 1, 1)
+    due_index.add(task)
+    task_1 = TASKS[0]
+    task_1.status = TaskStatus.COMPLETE
+    due_index.add(task_1)
+    task_1.status = TaskStatus.START
+
+    assert ids(due_index.next_due(10)) == [5, 4, 6]
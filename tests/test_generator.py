@@ -0,0 +1,62 @@
+"""
+test_generator.py
+
+This script is dedicated to test all the functionalities from generator.py
+file.
+"""
+
+from collections import Counter
+from datetime import datetime
+
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.generator import generate_rows, main, populate
+from to_do_list_project.task import TaskPriority, TaskStatus
+from to_do_list_project.task_manager import TaskManager
+
+NOW = datetime(2024, 1, 1)
+
+
+def test_generate_rows_is_deterministic() -> None:
+    """Test if the same seed always produces the same rows."""
+    first = list(generate_rows(500, seed=3, now=NOW))
+    second = list(generate_rows(500, seed=3, now=NOW))
+    other = list(generate_rows(500, seed=4, now=NOW))
+
+    assert len(first) == 500
+    assert first == second
+    assert first != other
+
+
+def test_generate_rows_distributions() -> None:
+    """Test if the generated rows are skewed and mix statuses and dates."""
+    rows = list(generate_rows(5000, seed=1, now=NOW, batch_size=1000))
+    now = NOW.strftime("%Y/%m/%d %H:%M:%S")
+
+    assignees = Counter(row[4].split(", ")[0] for row in rows)
+    assert assignees.most_common(1)[0][0] == "Alice"
+    assert {row[5] for row in rows} == {status.value for status in TaskStatus}
+    assert {row[6] for row in rows} == {
+        priority.value for priority in TaskPriority
+    }
+    assert any(row[3] < now for row in rows)
+    assert any(row[3] > now for row in rows)
+    assert all(row[2] < row[3] for row in rows)
+    assert all(len(row[1].split()) >= 30 for row in rows)
+
+
+def test_populate_writes_loadable_tasks(tmp_path) -> None:
+    """Test if generated tasks are written and can be loaded back."""
+    db = SQLiteDB(str(tmp_path / "generated.db"))
+
+    assert populate(db, 1200, seed=7) == 1200
+    assert len(db.get_all_tasks()) == 1200
+    assert len(TaskManager(db)._tasks) == 1200
+
+
+def test_main(tmp_path, capsys) -> None:
+    """Test the command line entry point of the generator."""
+    db_path = tmp_path / "cli.db"
+    main(["--rows", "50", "--seed", "2", "--db", str(db_path)])
+
+    assert "Inserted 50 tasks" in capsys.readouterr().out
+    assert len(SQLiteDB(str(db_path)).get_all_tasks()) == 50
@@ -0,0 +1,64 @@
+"""
+test_import_benchmark.py
+
+This script is dedicated to test all the functionalities from
+import_benchmark.py file.
+"""
+
+import subprocess
+import sys
+
+from to_do_list_project.import_benchmark import (
+    format_report,
+    parse_importtime,
+    run_benchmark,
+)
+
+HEAVY_MODULES = (
+    "tabulate", "pyarrow", "PIL", "streamlit", "cProfile", "tracemalloc"
+)
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _datetime
+import time:      1500 |       1620 | datetime
+import time:       300 |        300 |     re
+import time:       800 |       1100 |   to_do_list_project.task
+import time:       400 |       1500 | to_do_list_project
+"""
+
+
+def test_parse_importtime() -> None:
+    """Test if the -X importtime report is parsed into milliseconds."""
+    timings = parse_importtime(IMPORTTIME_OUTPUT)
+
+    assert timings["datetime"] == (1.5, 1.62, 0)
+    assert timings["re"] == (0.3, 0.3, 2)
+    assert timings["to_do_list_project"] == (0.4, 1.5, 0)
+    assert len(timings) == 5
+
+
+def test_run_benchmark() -> None:
+    """Test if an import is measured with its slowest children."""
+    results = run_benchmark({"to_do_list_project.task": 1000.0}, runs=1)
+
+    assert results[0]["module"] == "to_do_list_project.task"
+    assert 0 < results[0]["best_ms"] < 1000
+    assert "ok" in format_report(results)
+
+
+def test_entry_points_skip_heavy_imports() -> None:
+    """Test if the entry points do not import heavy optional modules."""
+    for module in ("task_manager", "main", "cli"):
+        code = (
+            f"import sys, to_do_list_project.{module}; "
+            f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        assert output.strip() == "[]", module
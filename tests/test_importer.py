@@ -0,0 +1,111 @@
+"""
+test_importer.py
+
+This script is dedicated to test all the functionalities from importer.py
+file.
+"""
+
+from datetime import datetime
+import json
+
+import pytest
+
+from to_do_list_project.importer import (
+    iter_csv_records,
+    iter_valid_rows,
+    parse_enum,
+    parse_import_date,
+    validate_record,
+)
+from to_do_list_project.task import TaskPriority, TaskStatus
+
+VALID_RECORD = {
+    "name": "Write report",
+    "description": "Quarterly report",
+    "due_date": "2999/01/31",
+    "assignee": "Alice, Bob",
+    "status": "start",
+    "priority": "3",
+    "categories": "Work,Finance",
+}
+
+
+def test_parse_import_date() -> None:
+    """Test if the common date formats are accepted."""
+    expected = datetime(2030, 1, 31)
+
+    assert parse_import_date("2030/01/31") == expected
+    assert parse_import_date("2030/01/31 00:00:00") == expected
+    assert parse_import_date("2030-01-31") == expected
+    assert parse_import_date("31-01-2030") == expected
+    with pytest.raises(ValueError):
+        parse_import_date("")
+
+
+def test_parse_enum() -> None:
+    """Test if enums are parsed by name, by value or defaulted."""
+    assert parse_enum("in progress", TaskStatus, None) == (
+        TaskStatus.IN_PROGRESS
+    )
+    assert parse_enum(1, TaskPriority, None) == TaskPriority.LOW
+    assert parse_enum("", TaskPriority, TaskPriority.MEDIUM) == (
+        TaskPriority.MEDIUM
+    )
+    with pytest.raises(ValueError):
+        parse_enum("urgent", TaskPriority, None)
+
+
+def test_validate_record() -> None:
+    """Test if a record is encoded like the rows of insert_data."""
+    row = validate_record(VALID_RECORD)
+
+    assert row[0] == "Write report"
+    assert row[3] == "2999/01/31 00:00:00"
+    assert row[4] == "Alice, Bob"
+    assert row[5:] == (TaskStatus.START.value, 3, "Work Finance")
+
+
+def test_validate_record_applies_task_rules() -> None:
+    """Test if records breaking the Task rules are rejected."""
+    past_record = dict(VALID_RECORD, due_date="2000/01/01")
+
+    with pytest.raises(ValueError, match="Name must be"):
+        validate_record(dict(VALID_RECORD, name=""))
+    with pytest.raises(ValueError, match="Assignee list"):
+        validate_record(dict(VALID_RECORD, assignee=""))
+    with pytest.raises(ValueError, match="future date"):
+        validate_record(past_record)
+    assert validate_record(past_record, allow_past_due=True)[3] == (
+        "2000/01/01 00:00:00"
+    )
+
+
+def test_csv_line_numbers(tmp_path) -> None:
+    """Test if records spanning several lines keep their first line."""
+    path = tmp_path / "tasks.csv"
+    path.write_text('name,description\nA,"multi\nline"\nB,single\n')
+
+    assert [line for line, _ in iter_csv_records(str(path))] == [2, 4]
+
+
+def test_iter_valid_rows_reports_rejections(tmp_path) -> None:
+    """Test if invalid JSON lines are reported with their line number."""
+    path = tmp_path / "tasks.jsonl"
+    path.write_text(
+        "\n".join(
+            [
+                json.dumps(VALID_RECORD),
+                "{not json",
+                "",
+                json.dumps(dict(VALID_RECORD, priority="urgent")),
+                "[1, 2]",
+            ]
+        )
+    )
+    rejected = []
+
+    rows = list(iter_valid_rows(str(path), "jsonl", rejected))
+
+    assert len(rows) == 1
+    assert [row["line"] for row in rejected] == [2, 4, 5]
+    assert rejected[0]["error"].startswith("Invalid JSON")
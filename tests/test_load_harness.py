@@ -0,0 +1,104 @@
+"""
+test_load_harness.py
+
+This script is dedicated to test all the functionalities from
+load_harness.py file.
+"""
+
+import os
+
+from to_do_list_project.load_harness import (
+    format_report,
+    parse_mix,
+    percentile,
+    run_load,
+)
+
+
+def test_parse_mix() -> None:
+    """Test if an operation mix is parsed into weights."""
+    assert parse_mix("insert=50, remove=10") == {"insert": 50, "remove": 10}
+
+
+def test_percentile() -> None:
+    """Test the nearest-rank percentiles."""
+    values = [float(value) for value in range(100, 0, -1)]
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0
+
+
+def test_run_load(tmp_path) -> None:
+    """Test if concurrent writers and readers report without errors."""
+    report = run_load(
+        str(tmp_path / "load.db"),
+        writers=2,
+        readers=1,
+        duration=0.5,
+        write_mix="insert=1,complete=1",
+        read_mix="one=1",
+        seed_rows=100,
+    )
+    by_operation = {item["operation"]: item for item in report}
+
+    assert set(by_operation) == {"insert", "complete", "one", "total"}
+    assert by_operation["total"]["count"] > 0
+    assert by_operation["total"]["errors"] == 0
+    assert by_operation["total"]["p99_ms"] >= by_operation["total"]["p50_ms"]
+    assert "error rate" in format_report(report)
+
+
+def test_run_load_sharded(tmp_path) -> None:
+    """Test if the load test runs on a sharded database."""
+    report = run_load(
+        str(tmp_path / "load.db"),
+        writers=2,
+        readers=1,
+        duration=0.5,
+        write_mix="insert=1,remove=1",
+        read_mix="one=1,all=1",
+        seed_rows=100,
+        db_options={"shards": 2},
+    )
+    by_operation = {item["operation"]: item for item in report}
+
+    assert os.path.exists(tmp_path / "load.shard1.db")
+    assert by_operation["total"]["count"] > 0
+    assert by_operation["total"]["errors"] == 0
+
+
+def test_run_load_read_replica(tmp_path) -> None:
+    """Test if the readers of the load test can use read replicas."""
+    report = run_load(
+        str(tmp_path / "load.db"),
+        writers=1,
+        readers=1,
+        duration=0.5,
+        write_mix="insert=1,complete=1",
+        read_mix="one=1,stats=1",
+        seed_rows=100,
+        db_options={"read_replica": True, "replica_max_lag": 0.1},
+    )
+    by_operation = {item["operation"]: item for item in report}
+
+    assert by_operation["stats"]["count"] > 0
+    assert by_operation["total"]["errors"] == 0
+
+
+def test_run_load_edits(tmp_path) -> None:
+    """Test if optimistic and locked edits run side by side."""
+    report = run_load(
+        str(tmp_path / "load.db"),
+        writers=2,
+        readers=0,
+        duration=0.5,
+        write_mix="edit=1,edit_locked=1",
+        seed_rows=20,
+        edit_work=0.001,
+    )
+    by_operation = {item["operation"]: item for item in report}
+
+    assert by_operation["edit"]["count"] > 0
+    assert by_operation["edit_locked"]["count"] > 0
+    assert by_operation["total"]["errors"] == 0
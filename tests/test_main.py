@@ -11,13 +11,14 @@ from typing import Any, Tuple, Union
 from unittest.mock import call, MagicMock, Mock, mock_open, patch, ANY
 import pytest
 
-from to_do_list_project.db import SQLiteDB
+from to_do_list_project.db import SQLiteDB, TASK_COLUMNS
 from to_do_list_project.main import (
     add_task,
     choice_validator,
     complete_task,
     display_all_tasks,
     get_input,
+    validate_columns,
     main,
     modify_task,
     remove_task,
@@ -258,6 +259,43 @@ def test_display_all_tasks_with_tasks(
     print_mock.assert_called_once_with(tabulate_mock.return_value)
 
 
+def test_display_all_tasks_paged(task_manager: TaskManager) -> None:
+    """Test if tasks are rendered one page at a time with chosen columns."""
+    for index in range(5):
+        task_manager.add_task(
+            f"Task {index}",
+            "Description",
+            datetime.now() + timedelta(days=1),
+            ["user@example.com"],
+        )
+
+    with patch("builtins.print"), patch(
+        "to_do_list_project.main.tabulate"
+    ) as tabulate_mock:
+        display_all_tasks(task_manager, page_size=2, columns=["id", "name"])
+
+    assert tabulate_mock.call_args_list == [
+        call([[1, "Task 0"], [2, "Task 1"]], headers=["id", "name"],
+             tablefmt="fancy_grid"),
+        call([[3, "Task 2"], [4, "Task 3"]], headers=["id", "name"],
+             tablefmt="fancy_grid"),
+        call([[5, "Task 4"]], headers=["id", "name"], tablefmt="fancy_grid"),
+    ]
+
+    with patch("builtins.print"), patch("builtins.input", return_value="q"), \
+            patch("to_do_list_project.main.tabulate") as tabulate_mock:
+        display_all_tasks(task_manager, page_size=2, pause=True)
+
+    tabulate_mock.assert_called_once()
+
+
+def test_validate_columns() -> None:
+    """Test if the displayed columns are validated."""
+    assert validate_columns("") == (True, list(TASK_COLUMNS))
+    assert validate_columns("id, due_date") == (True, ["id", "due_date"])
+    assert validate_columns("id,owner")[0] is False
+
+
 def test_complete_task_successful(
     task_manager_with_tasks: [TaskManager, Any]
 ) -> None:
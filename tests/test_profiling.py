@@ -0,0 +1,130 @@
+"""
+test_profiling.py
+
+This script is dedicated to test all the functionalities from profiling.py
+file.
+"""
+
+import io
+import logging
+import pstats
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from to_do_list_project import profiling
+from to_do_list_project.main import main
+from to_do_list_project.profiling import (
+    ACTION_TIMINGS,
+    action_timer,
+    format_action_timings,
+    profile_session,
+    profiling_enabled,
+    untimed,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_timings() -> None:
+    """Fixture resetting the cumulated action timings around each test."""
+    ACTION_TIMINGS.clear()
+    yield
+    ACTION_TIMINGS.clear()
+
+
+def test_profiling_enabled(monkeypatch) -> None:
+    """Test if profiling is turned on by the flag or the variable."""
+    monkeypatch.delenv("TODO_PROFILE", raising=False)
+    assert not profiling_enabled([])
+    assert profiling_enabled(["--profile"])
+
+    monkeypatch.setenv("TODO_PROFILE", "1")
+    assert profiling_enabled([])
+    monkeypatch.setenv("TODO_PROFILE", "0")
+    assert not profiling_enabled([])
+
+
+def test_action_timer_logs_duration() -> None:
+    """Test if an action is timed, cumulated and logged."""
+    with patch.object(logging.getLogger("action_timing"), "info") as log:
+        with action_timer("display"):
+            pass
+        with action_timer("display"):
+            pass
+
+    assert ACTION_TIMINGS["display"][0] == 2
+    assert log.call_args[0][0].startswith("Action display took")
+    assert "display" in format_action_timings()
+
+
+def test_profile_session_writes_files(tmp_path) -> None:
+    """Test if a session writes a loadable .prof file and a summary."""
+    stream = io.StringIO()
+    with profile_session(
+        "test", output_dir=str(tmp_path), trace_memory=True, stream=stream
+    ) as profiler:
+        assert profiler is not None
+        sorted(range(1000), reverse=True)
+
+    prof_files = list(tmp_path.glob("test-*.prof"))
+    summary_files = list(tmp_path.glob("test-*.txt"))
+    assert len(prof_files) == 1
+    assert len(summary_files) == 1
+    assert pstats.Stats(str(prof_files[0])).total_calls > 0
+    assert "Memory: current" in stream.getvalue()
+    assert "Profile written to" in stream.getvalue()
+
+
+def test_profile_session_disabled(tmp_path) -> None:
+    """Test if a disabled session does nothing."""
+    with profile_session(
+        "test", enabled=False, output_dir=str(tmp_path)
+    ) as profiler:
+        assert profiler is None
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_main_times_menu_actions() -> None:
+    """Test if the menu actions of the CLI are timed."""
+    with patch(
+        "to_do_list_project.main.get_input", side_effect=[3, 6]
+    ), patch("to_do_list_project.main.browse_tasks") as display, patch(
+        "builtins.print"
+    ), patch.object(profiling.logger, "info"):
+        main(object())
+
+    display.assert_called_once()
+    assert ACTION_TIMINGS["display"][0] == 1
+
+
+def test_action_timer_leaves_out_untimed_waits() -> None:
+    """Test if the time spent waiting for the user is not counted."""
+    with patch.object(profiling.logger, "info"):
+        with action_timer("add"):
+            with untimed():
+                time.sleep(0.2)
+        with untimed():
+            pass
+
+    assert ACTION_TIMINGS["add"][1] < 0.1
+
+
+def test_main_leaves_out_prompts() -> None:
+    """Test if a menu action is timed without the user's typing."""
+    def slow_input(prompt: str) -> str:
+        time.sleep(0.2)
+        return "1"
+
+    task_manager = Mock()
+    with patch(
+        "to_do_list_project.main.get_input", side_effect=[2, 6]
+    ), patch("builtins.input", side_effect=slow_input), patch(
+        "builtins.print"
+    ), patch.object(profiling.logger, "info"):
+        main(task_manager)
+
+    task_manager.remove_task.assert_called_once_with(1)
+    assert ACTION_TIMINGS["remove"][0] == 1
+    assert ACTION_TIMINGS["remove"][1] < 0.1
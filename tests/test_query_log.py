@@ -0,0 +1,77 @@
+"""
+test_query_log.py
+
+This script is dedicated to test all the functionalities from query_log.py
+file.
+"""
+
+import sqlite3
+
+from to_do_list_project.query_log import (
+    main,
+    normalize_sql,
+    redact_params,
+    SlowQueryLog,
+    summarize,
+)
+
+
+def test_normalize_sql() -> None:
+    """Test if whitespace differences do not split statements."""
+    assert normalize_sql("SELECT *\n    FROM  tasks ") == "SELECT * FROM tasks"
+
+
+def test_redact_params() -> None:
+    """Test if text parameters are hidden and numbers kept."""
+    assert redact_params(("John", 3, None)) == [
+        "<redacted 4 chars>",
+        3,
+        None,
+    ]
+
+
+def test_record_below_threshold(tmp_path) -> None:
+    """Test if fast statements are not logged."""
+    log_file = tmp_path / "slow.log"
+    log = SlowQueryLog(1000, str(log_file))
+    conn = sqlite3.connect(":memory:")
+
+    log.record(conn, "SELECT 1", (), 0.001)
+
+    assert log.summary() == []
+    assert not log_file.exists()
+
+
+def test_record_and_summarize(tmp_path) -> None:
+    """Test if slow statements are logged with their plan and ranked."""
+    log_file = tmp_path / "slow.log"
+    log = SlowQueryLog(10, str(log_file))
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, name TEXT)")
+
+    log.record(conn, "SELECT * FROM tasks WHERE name = ?", ("Bob",), 0.02)
+    log.record(conn, "SELECT * FROM tasks WHERE name = ?", ("Al",), 0.03)
+    log.record(conn, "SELECT * FROM tasks WHERE id = ?", (1,), 0.04)
+    for handler in log.logger.handlers:
+        handler.flush()
+
+    ranking = summarize(str(log_file))
+    assert [item["count"] for item in ranking] == [2, 1]
+    assert ranking[0]["total_ms"] == 50
+    assert "SCAN tasks" in ranking[0]["plan"]
+    assert "Bob" not in log_file.read_text()
+    assert log.summary(top=1)[0]["sql"] == ranking[0]["sql"]
+
+
+def test_main(tmp_path, capsys) -> None:
+    """Test the summary command on a missing and on an existing log."""
+    log_file = tmp_path / "slow.log"
+    main(["--log", str(log_file)])
+    assert "No slow queries." in capsys.readouterr().out
+
+    log = SlowQueryLog(0, str(log_file))
+    log.record(sqlite3.connect(":memory:"), "SELECT 1", (), 0.5)
+    for handler in log.logger.handlers:
+        handler.flush()
+    main(["--log", str(log_file), "--top", "1"])
+    assert "1 calls" in capsys.readouterr().out
@@ -0,0 +1,83 @@
+"""
+test_recurrence.py
+
+This script is dedicated to test all the functionalities from
+recurrence.py file.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from to_do_list_project.recurrence import RecurrenceRule
+
+# A Tuesday.
+FIRST = datetime(2030, 1, 1, 9, 0)
+
+
+def days(dates) -> list:
+    """Return the day of the month of dates."""
+    return [date.day for date in dates]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("FREQ=DAILY", [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]),
+        ("FREQ=DAILY;INTERVAL=4", [1, 5, 9, 13]),
+        ("FREQ=DAILY;BYDAY=SA,SU", [5, 6, 12, 13]),
+        ("FREQ=WEEKLY", [1, 8, 15]),
+        ("FREQ=WEEKLY;BYDAY=MO,TH", [3, 7, 10, 14]),
+        ("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TU", [1, 14, 15]),
+        ("FREQ=DAILY;UNTIL=20300103", [1, 2, 3]),
+    ],
+)
+def test_occurrences(text, expected) -> None:
+    """Test if the occurrences of a rule follow its frequency and days."""
+    rule = RecurrenceRule.parse(text)
+    end = datetime(2030, 1, 15, 23, 0)
+    assert days(rule.occurrences(FIRST, datetime(2029, 1, 1), end)) == expected
+    assert days(rule.occurrences(FIRST, datetime(2030, 1, 3), end)) == [
+        day for day in expected if day >= 3
+    ]
+    assert all(
+        date.hour == 9 for date in rule.occurrences(FIRST, FIRST, end)
+    )
+    assert RecurrenceRule.parse(str(rule)) == rule
+
+
+def test_window_far_from_start() -> None:
+    """Test if a window years after the start lists only its occurrences."""
+    rule = RecurrenceRule("weekly", 2, [0, 3])
+    start = datetime(2040, 3, 1)
+    occurrences = list(
+        rule.occurrences(FIRST, start, start + timedelta(days=28))
+    )
+    assert len(occurrences) == 4
+    assert {date.weekday() for date in occurrences} == {0, 3}
+    # Weeks with occurrences come every two weeks from the first one.
+    monday = FIRST - timedelta(days=1)
+    assert all((date - monday).days // 7 % 2 == 0 for date in occurrences)
+
+    daily = RecurrenceRule(interval=5)
+    assert [
+        (date - FIRST).days % 5
+        for date in daily.occurrences(FIRST, start, start + timedelta(20))
+    ] == [0] * 4
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "FREQ=MONTHLY",
+        "INTERVAL=2",
+        "FREQ=DAILY;INTERVAL=0",
+        "FREQ=DAILY;BYDAY=XX",
+        "FREQ=DAILY;UNTIL=tomorrow",
+        "FREQ=DAILY;COUNT=3",
+    ],
+)
+def test_invalid_rules(text) -> None:
+    """Test if invalid rules are refused."""
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse(text)
@@ -0,0 +1,153 @@
+"""
+test_reminders.py
+
+This script is dedicated to test all the functionalities from reminders.py
+file.
+"""
+
+from datetime import datetime, timedelta
+import sqlite3
+import threading
+
+import pytest
+
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.reminders import (
+    parse_lead_time,
+    ReminderSweeper,
+)
+from to_do_list_project.task import Task, TaskPriority, TaskStatus
+from to_do_list_project.task_manager import TaskManager
+
+NOW = datetime(2024, 1, 1, 12)
+
+
+class Clock:
+    """Clock of the tests, moved forward by hand."""
+
+    def __init__(self) -> None:
+        """Start the clock at NOW."""
+        self.now = NOW
+
+    def __call__(self) -> datetime:
+        """Return the current time of the clock."""
+        return self.now
+
+
+def make_task(task_id: int, due_in: timedelta, status=TaskStatus.START):
+    """Return a task due some time after NOW."""
+    return Task.from_db(
+        task_id, f"Task {task_id}", "Description", NOW, NOW + due_in,
+        ["Anna"], status, TaskPriority.MEDIUM, [],
+    )
+
+
+def test_run_pending() -> None:
+    """Test if reminders are sent once, at each lead time, in order."""
+    clock, sent = Clock(), []
+    sweeper = ReminderSweeper(
+        [lambda task, lead: sent.append((task.id, lead))],
+        [timedelta(hours=1), timedelta(0)],
+        clock,
+    )
+    sweeper.schedule_all([
+        make_task(1, timedelta(hours=3)),
+        make_task(2, timedelta(hours=2)),
+        make_task(3, timedelta(hours=1), TaskStatus.COMPLETE),
+        make_task(4, timedelta(minutes=30)),
+    ])
+
+    assert len(sweeper) == 3
+    assert sweeper.next_reminder() == NOW + timedelta(minutes=30)
+    assert sweeper.run_pending() == 0
+
+    clock.now = NOW + timedelta(hours=2)
+    assert sweeper.run_pending() == 4
+    assert sent == [
+        (4, timedelta(0)),
+        (2, timedelta(hours=1)),
+        (1, timedelta(hours=1)),
+        (2, timedelta(0)),
+    ]
+    assert len(sweeper) == 1
+    assert sweeper.run_pending() == 0
+
+
+def test_reschedule_and_cancel() -> None:
+    """Test if rescheduled and cancelled tasks drop their old reminders."""
+    clock, sent = Clock(), []
+    sweeper = ReminderSweeper(
+        [lambda task, lead: sent.append(task.id)], clock=clock
+    )
+    sweeper.schedule_all([
+        make_task(1, timedelta(hours=1)),
+        make_task(2, timedelta(hours=2)),
+    ])
+    sweeper.schedule(make_task(1, timedelta(hours=3)))
+    sweeper.cancel(2)
+
+    clock.now = NOW + timedelta(hours=2, minutes=30)
+    assert sweeper.run_pending() == 0
+    clock.now = NOW + timedelta(hours=3)
+    assert sweeper.run_pending() == 1
+    assert sent == [1]
+    assert sweeper.next_reminder() is None
+
+
+def test_failing_callback_does_not_stop_others() -> None:
+    """Test if an exception in a callback is logged, not raised."""
+    clock, sent = Clock(), []
+
+    def fail(task, lead):
+        raise RuntimeError("broken hook")
+
+    sweeper = ReminderSweeper([fail, lambda task, lead: sent.append(task.id)],
+                              clock=clock)
+    sweeper.schedule(make_task(1, timedelta(minutes=1)))
+    clock.now = NOW + timedelta(minutes=1)
+
+    assert sweeper.run_pending() == 1
+    assert sent == [1]
+
+
+def test_parse_lead_time() -> None:
+    """Test if lead times are read in minutes, hours and days."""
+    assert parse_lead_time("30m") == timedelta(minutes=30)
+    assert parse_lead_time("2h") == timedelta(hours=2)
+    assert parse_lead_time("1d") == timedelta(days=1)
+    with pytest.raises(ValueError):
+        parse_lead_time("soon")
+
+
+def test_task_manager_reminders() -> None:
+    """Test if the background thread follows the task manager changes."""
+    task_manager = TaskManager(SQLiteDB("file::memory:?cache=shared"))
+    conn = sqlite3.connect("file::memory:?cache=shared", uri=True)
+    sent = threading.Event()
+    reminded = []
+
+    def remind(task, lead):
+        reminded.append(task.name)
+        sent.set()
+
+    now = datetime.now()
+    done = task_manager.add_task(
+        "Done", "Description", now + timedelta(seconds=0.3), ["Ed"]
+    )
+    moved = task_manager.add_task(
+        "Moved", "Description", now + timedelta(days=1), ["Ed"]
+    )
+    task_manager.attach_reminders(ReminderSweeper([remind]))
+    try:
+        task_manager.complete_task(done)
+        task_manager.modify_task(
+            moved, None, None, now + timedelta(seconds=0.5), None
+        )
+        task_manager.add_task(
+            "Later", "Description", now + timedelta(days=1), ["Ed"]
+        )
+        assert sent.wait(5)
+    finally:
+        task_manager.detach_reminders()
+        conn.close()
+    assert reminded == ["Moved"]
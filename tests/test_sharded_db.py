@@ -0,0 +1,226 @@
+"""
+test_sharded_db.py
+
+This script is dedicated to test all the functionalities from
+sharded_db.py file.
+"""
+
+from datetime import datetime, timedelta
+import os
+
+import pytest
+
+from to_do_list_project.db import TaskConflictError
+from to_do_list_project.recurrence import RecurrenceRule
+from to_do_list_project.sharded_db import shard_names, ShardedSQLiteDB
+from to_do_list_project.task import TaskPriority, TaskStatus
+from to_do_list_project.task_manager import TaskManager
+
+
+def make_row(name: str, category: str, due_day: int, status: int = 1):
+    """Return an encoded task row."""
+    return (name, "Description", "2023/11/12 10:00:00",
+            f"2030/01/{due_day:02d} 10:00:00", "Anna", status, 2, category)
+
+
+ROWS = [
+    make_row("Plan", "Work", 5),
+    make_row("Cook", "Home", 3),
+    make_row("Ship", "Work", 1, status=3),
+    make_row("Read", "Leisure", 4),
+    make_row("Fix", "Home", 2),
+]
+
+
+@pytest.fixture
+def db(tmp_path) -> ShardedSQLiteDB:
+    """Pytest fixture giving a database of three shards with five tasks."""
+    db = ShardedSQLiteDB(str(tmp_path / "tasks.db"), shards=3)
+    db.create_table_tasks()
+    db.bulk_insert("tasks", ROWS, batch_size=2)
+    yield db
+    db.close()
+
+
+def test_shard_files(db: ShardedSQLiteDB, tmp_path) -> None:
+    """Test if every shard has its own file holding part of the tasks."""
+    names = shard_names(str(tmp_path / "tasks.db"), 3)
+
+    assert names[1] == str(tmp_path / "tasks.shard1.db")
+    assert all(os.path.exists(name) for name in names)
+    assert [shard.count_tasks() for shard in db.shards] == [2, 2, 1]
+    assert db.count_tasks() == 5
+
+
+def test_global_ids_route_operations(db: ShardedSQLiteDB) -> None:
+    """Test if ids are unique and lead to the task in its shard."""
+    tasks = db.get_all_tasks()
+    ids = [row[0] for row in tasks]
+
+    assert ids == sorted(set(ids)) and len(ids) == 5
+    assert {db.locate(task_id)[0] for task_id in ids} == {0, 1, 2}
+
+    cook = next(row for row in tasks if row[1] == "Cook")
+    assert db.get_task(cook[0]) == cook
+    db.fetch_data(cook[0], "COMPLETE")
+    assert db.get_task(cook[0])[6] == TaskStatus.COMPLETE.value
+    db.remove_task(cook[0])
+    assert db.get_task(cook[0]) is None
+    assert db.count_tasks() == 4
+
+
+def test_merged_queries(db: ShardedSQLiteDB) -> None:
+    """Test if lists, pages and aggregates merge the shards in order."""
+    ids = [row[0] for row in db.get_all_tasks()]
+
+    assert [row[0] for row in db.query_tasks(limit=2, offset=1)] == ids[1:3]
+    assert [row[0] for row in db.query_tasks(after_id=ids[2])] == ids[3:]
+    assert [row[1] for row in db.query_due(limit=3)] == ["Fix", "Cook", "Read"]
+    home = [row[0] for row in db.search_tasks("home")]
+    assert [row[1] for row in db.search_tasks("home")] == ["Cook", "Fix"]
+    assert [row[0] for row in db.search_tasks("home", 1, home[0])] == home[1:]
+    assert [
+        row[1]
+        for batch in db.iter_task_batches(
+            2, order_by="due_date", descending=True, limit=3, offset=1
+        )
+        for row in batch
+    ] == ["Read", "Cook", "Fix"]
+    stats = db.task_stats()
+    assert stats["total"] == 5
+    assert stats["by_status"] == {"START": 4, "COMPLETE": 1}
+    assert db.change_counter() >= 3
+
+
+def test_set_based_writes(db: ShardedSQLiteDB) -> None:
+    """Test if filtered writes run on every shard with global ids."""
+    ids = [row[0] for row in db.get_all_tasks()]
+
+    assert db.complete_where("category = ?", ("Home",)) == [ids[1], ids[4]]
+    assert db.remove_where(task_ids=[ids[0], ids[4]]) == [ids[0], ids[4]]
+    assert db.reassign("Anna", "Ben", task_ids=[ids[3]]) == [ids[3]]
+    assert db.get_task(ids[3])[5] == "Ben"
+    assert db.set_priority_where(TaskPriority.HIGH, "status = ?", (1,)) == [
+        ids[3]
+    ]
+    assert db.count_tasks() == 3
+
+    row, version = db.get_versioned_task(ids[3])
+    assert row[0] == ids[3]
+    with pytest.raises(TaskConflictError) as conflict:
+        db.update_task(ids[3], row[1:3] + row[4:6], version - 1)
+    assert conflict.value.task_id == ids[3]
+    assert conflict.value.current[0] == ids[3]
+
+
+def test_dependencies_across_shards(db: ShardedSQLiteDB) -> None:
+    """Test if dependencies between shards are kept with global ids."""
+    ids = [row[0] for row in db.get_all_tasks()]
+
+    assert db.add_dependencies([(ids[1], ids[0]), (ids[2], ids[1])]) == 2
+    assert sorted(db.get_dependencies()) == [
+        (ids[1], ids[0]), (ids[2], ids[1])
+    ]
+    assert sorted(row[0] for row in db.get_task_states()) == ids
+    db.remove_task(ids[0])
+    assert db.get_dependencies() == [(ids[2], ids[1])]
+    assert db.remove_where(task_ids=[ids[2]]) == [ids[2]]
+    assert db.get_dependencies() == []
+
+
+def test_category_shard_key(tmp_path) -> None:
+    """Test if the tasks of a category are kept in the same shard."""
+    db = ShardedSQLiteDB(
+        str(tmp_path / "tasks.db"), shards=3, shard_key="category"
+    )
+    db.bulk_insert("tasks", ROWS)
+
+    for category in ("Work", "Home"):
+        shards = {
+            db.locate(row[0])[0]
+            for row in db.get_all_tasks()
+            if row[8] == category
+        }
+        assert len(shards) == 1
+    db.close()
+
+    with pytest.raises(ValueError):
+        ShardedSQLiteDB(str(tmp_path / "tasks.db"), shard_key="team")
+
+
+def test_task_manager_on_shards(tmp_path) -> None:
+    """Test if TaskManager works on a sharded database."""
+    db = ShardedSQLiteDB(str(tmp_path / "tasks.db"), shards=2)
+    task_manager = TaskManager(db)
+    due_date = datetime.now() + timedelta(days=1)
+    ids = [
+        task_manager.add_task(
+            f"Task {index}", "Description", due_date, ["Ed"],
+            priority=TaskPriority.HIGH,
+        )
+        for index in range(3)
+    ]
+    task_manager.complete_task(ids[1])
+
+    assert len(set(ids)) == 3
+    assert [task.id for task in TaskManager(db)._tasks] == sorted(ids)
+    assert TaskManager(db).get_task_by_id(ids[1]).status \
+        is TaskStatus.COMPLETE
+    db.close()
+
+
+def test_recurring_tasks_on_shards(tmp_path) -> None:
+    """Test if series and their occurrences are kept with global ids."""
+    db = ShardedSQLiteDB(str(tmp_path / "tasks.db"), shards=3)
+    task_manager = TaskManager(db)
+    start = (datetime.now() + timedelta(days=1)).replace(
+        hour=9, minute=0, second=0, microsecond=0
+    )
+    series = [
+        task_manager.add_recurring_task(
+            name, "Every day", start, ["Anna"], RecurrenceRule("daily")
+        )
+        for name in ("Water plants", "Feed cat")
+    ]
+    assert [row[0] for row in db.get_series()] == sorted(series)
+    assert db.locate(series[0])[0] != db.locate(series[1])[0]
+
+    task_id = task_manager.complete_occurrence(series[1], start)
+    assert db.locate(task_id)[0] == db.locate(series[1])[0]
+    assert TaskManager(db).get_task_by_id(task_id).name == "Feed cat"
+    listed = list(task_manager.occurrences(start, start))
+    assert [(o.series_id, o.task_id) for o in listed] == [
+        (series[0], None), (series[1], task_id)
+    ]
+
+    task_manager.remove_task(task_id)
+    assert [o.series_id for o in task_manager.occurrences(start, start)] \
+        == [series[0]]
+    assert db.remove_series(series[0])
+    assert [row[0] for row in db.get_series()] == [series[1]]
+    db.close()
+
+
+def test_subscribe_on_shards(db: ShardedSQLiteDB) -> None:
+    """Test if the changes of every shard are delivered by global id."""
+    task_manager = TaskManager(db, lazy=True)
+    events = []
+    task_manager.subscribe(events.append, poll_interval=None)
+    ids = [row[0] for row in db.get_all_tasks()]
+
+    db.bulk_insert("tasks", ROWS[:2])
+    db.fetch_data(ids[0], "COMPLETE")
+    db.remove_task(ids[4])
+    db.remove_task(ids[1])
+    added = sorted(
+        set(row[0] for row in db.get_all_tasks()).difference(ids)
+    )
+    assert task_manager.poll_changes() == 3
+    assert len(added) == 2 and events == [
+        {"kind": "added", "task_ids": added},
+        {"kind": "completed", "task_ids": [ids[0]]},
+        {"kind": "removed", "task_ids": sorted([ids[1], ids[4]])},
+    ]
+    assert task_manager.poll_changes() == 0
+    task_manager.unsubscribe(1)
+    db.close()
@@ -0,0 +1,69 @@
+"""
+test_snapshot.py
+
+This script is dedicated to test all the functionalities from snapshot.py
+file.
+"""
+
+from datetime import datetime
+
+from to_do_list_project.snapshot import (
+    read_snapshot,
+    snapshot_path,
+    write_snapshot,
+)
+from to_do_list_project.task import Task, TaskPriority, TaskStatus
+
+TASKS = [
+    Task.from_db(
+        1,
+        "Clean",
+        "Clean room",
+        datetime(2023, 11, 12, 10, 0, 5),
+        datetime(2020, 1, 1, 8),
+        ["James", "Anna"],
+        TaskStatus.COMPLETE,
+        TaskPriority.HIGH,
+        ["House"],
+    ),
+    Task.from_db(
+        2,
+        "Shop",
+        "Buy food",
+        datetime(2023, 11, 13),
+        datetime(2030, 5, 6, 18, 30),
+        ["Anna"],
+        TaskStatus.START,
+        TaskPriority.LOW,
+        [],
+    ),
+]
+
+
+def test_snapshot_round_trip(tmp_path) -> None:
+    """Test if a current snapshot gives back the saved tasks."""
+    path = str(tmp_path / "tasks.db.snapshot")
+    write_snapshot(path, 7, TASKS)
+
+    tasks = read_snapshot(path, 7)
+
+    assert [vars(task) for task in tasks] == [vars(task) for task in TASKS]
+    assert tasks[0].due_date == datetime(2020, 1, 1, 8)
+    assert tasks[1].status is TaskStatus.START
+
+
+def test_stale_or_broken_snapshot(tmp_path) -> None:
+    """Test if stale, missing and corrupted snapshots are not used."""
+    path = tmp_path / "tasks.db.snapshot"
+    write_snapshot(str(path), 7, TASKS)
+
+    assert read_snapshot(str(path), 8) is None
+    assert read_snapshot(str(tmp_path / "missing.snapshot"), 7) is None
+    path.write_bytes(b"\xc1 not msgpack")
+    assert read_snapshot(str(path), 7) is None
+
+
+def test_snapshot_path() -> None:
+    """Test if snapshots sit next to the db, except for in-memory ones."""
+    assert snapshot_path("/data/tasks.db") == "/data/tasks.db.snapshot"
+    assert snapshot_path("file::memory:?cache=shared") is None
@@ -7,12 +7,14 @@ from test_streamlit.py file, our graphical interface.
 
 from datetime import datetime, timedelta
 import sqlite3
+import threading
 from unittest.mock import patch
 
 import pytest
+import streamlit as st
 
 from to_do_list_project.db import SQLiteDB
-from to_do_list_project.streamlit_app import main
+from to_do_list_project.streamlit_app import count_tasks, main, read_page
 from to_do_list_project.task import TaskPriority, TaskStatus
 from to_do_list_project.task_manager import TaskManager
 
@@ -22,7 +24,12 @@ def task_manager() -> TaskManager:
     """Fixture to create and return a new TaskManager instance."""
     task_manager = TaskManager(SQLiteDB("file::memory:?cache=shared"))
     conn = sqlite3.connect("file::memory:?cache=shared", uri=True)
+    count_tasks.clear()
+    read_page.clear()
+    st.session_state.pop("task_view", None)
     yield task_manager
+    st.session_state.pop("task_view", None)
+    task_manager._db.close_version_connection()
     conn.close()
 
 
@@ -165,3 +172,130 @@ def test_display_view_tasks(task_manager: TaskManager) -> None:
         ) as mock_subheader:
             main(task_manager)
             mock_subheader.assert_called_once_with("Existing Tasks")
+
+
+def test_view_tasks_page(task_manager: TaskManager) -> None:
+    """Test if 'View Tasks' shows one sorted page of tasks as Arrow."""
+    for index in range(30):
+        task_manager.add_task(
+            f"Task {index}",
+            "Description",
+            datetime.now() + timedelta(days=index + 1),
+            ["Alice"],
+        )
+    with patch(
+        "to_do_list_project.streamlit_app.st.sidebar.selectbox",
+        return_value="View Tasks",
+    ), patch(
+        "to_do_list_project.streamlit_app.st.checkbox", return_value=True
+    ), patch(
+        "to_do_list_project.streamlit_app.st.number_input", return_value=2
+    ), patch(
+        "to_do_list_project.streamlit_app.st.dataframe"
+    ) as mock_dataframe:
+        main(task_manager)
+
+    table = mock_dataframe.call_args.args[0]
+    assert table.num_rows == 5
+    assert table.column("name").to_pylist()[0] == "Task 4"
+
+
+def test_view_tasks_cache(task_manager: TaskManager) -> None:
+    """Test if pages are cached until the database is written."""
+    task_manager.add_task(
+        "Task", "Description", datetime.now() + timedelta(days=1), ["Alice"]
+    )
+    with patch(
+        "to_do_list_project.streamlit_app.st.sidebar.selectbox",
+        return_value="View Tasks",
+    ), patch(
+        "to_do_list_project.streamlit_app.st.dataframe"
+    ) as mock_dataframe, patch.object(
+        task_manager, "to_arrow", wraps=task_manager.to_arrow
+    ) as to_arrow:
+        main(task_manager)
+        main(task_manager)
+        assert to_arrow.call_count == 1
+
+        conn = sqlite3.connect("file::memory:?cache=shared", uri=True)
+        conn.execute("UPDATE tasks SET name = 'Renamed'")
+        conn.commit()
+        conn.close()
+        main(task_manager)
+
+    assert to_arrow.call_count == 2
+    table = mock_dataframe.call_args.args[0]
+    assert table.column("name").to_pylist() == ["Renamed"]
+
+
+def test_view_tasks_patched(task_manager: TaskManager) -> None:
+    """Test if tasks completed on the page are patched into it."""
+    for index in range(3):
+        task_manager.add_task(
+            f"Task {index}",
+            "Description",
+            datetime.now() + timedelta(days=1),
+            ["Alice"],
+        )
+    with patch(
+        "to_do_list_project.streamlit_app.st.sidebar.selectbox",
+        return_value="View Tasks",
+    ), patch(
+        "to_do_list_project.streamlit_app.st.dataframe"
+    ) as mock_dataframe, patch.object(
+        task_manager, "to_arrow", wraps=task_manager.to_arrow
+    ) as to_arrow:
+        main(task_manager)
+        task_manager.complete_task(2)
+        main(task_manager)
+        assert to_arrow.call_count == 1
+
+        task_manager.remove_task(3)
+        main(task_manager)
+        assert to_arrow.call_count == 2
+
+    table = mock_dataframe.call_args_list[1].args[0]
+    assert table.column("status").to_pylist()[1] == TaskStatus.COMPLETE.name
+    assert mock_dataframe.call_args.args[0].num_rows == 2
+    # Sessions keep their own position, nothing is left on the manager.
+    assert task_manager._feed is None
+
+
+def test_shared_task_manager_threads(tmp_path) -> None:
+    """Test if sessions can use the shared task manager at the same time."""
+    task_manager = TaskManager(SQLiteDB(str(tmp_path / "tasks.db")), lazy=True)
+    task_manager._db.create_table_tasks()
+    errors = []
+
+    def session(index: int) -> None:
+        # What the pages do, from the thread Streamlit runs a session on.
+        try:
+            for _ in range(20):
+                task_id = task_manager._db.insert_data("tasks", {
+                    "name": f"Task {index}",
+                    "description": "Description",
+                    "creation_date": datetime.now(),
+                    "due_date": datetime.now() + timedelta(days=1),
+                    "assignee": ["Alice"],
+                    "status": TaskStatus.START,
+                    "priority": TaskPriority.LOW,
+                    "categories": [],
+                })
+                task_manager._db.fetch_data(task_id, to_do="COMPLETE")
+                task_manager.data_version()
+                task_manager.to_arrow({"limit": 25})
+                task_manager.count_tasks({})
+        except Exception as e:
+            errors.append(e)
+
+    sessions = [
+        threading.Thread(target=session, args=(index,)) for index in range(8)
+    ]
+    for thread in sessions:
+        thread.start()
+    for thread in sessions:
+        thread.join()
+
+    assert errors == []
+    assert task_manager.count_tasks({"status": TaskStatus.COMPLETE}) == 160
+    task_manager._db.close_version_connection()
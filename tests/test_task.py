@@ -7,8 +7,10 @@ This script is dedicated to test all the functionalities from task.py file.
 from datetime import datetime, timedelta
 import pytest
 
+from to_do_list_project.recurrence import RecurrenceRule
 from to_do_list_project.task import (
     Task,
+    TaskData,
     TaskStatus,
     TaskPriority,
     parse_date,
@@ -226,3 +228,47 @@ def test_invalid_task_categories() -> None:
             1, "Dish", "Wash the dishes after dinner", due_date, assignee
         )
         task.categories = ["Cleaning", 1]
+
+
+def test_task_from_db_accepts_past_due_date() -> None:
+    """Check that a stored task can be rebuilt even when it is overdue."""
+    creation_date = datetime.now() - timedelta(days=10)
+    due_date = datetime.now() - timedelta(days=1)
+    task = Task.from_db(
+        1,
+        "Test Task",
+        "Test Description",
+        creation_date,
+        due_date,
+        ["Test Assignee"],
+        TaskStatus.START,
+        TaskPriority.HIGH,
+        ["Work"],
+    )
+
+    assert task.due_date == due_date
+    assert task.creation_date == creation_date
+    with pytest.raises(ValueError):
+        Task.from_db(
+            1, "", "Test Description", creation_date, due_date,
+            ["Test Assignee"], TaskStatus.START, TaskPriority.HIGH, [],
+        )
+
+
+def test_task_recurrence() -> None:
+    """Check that a task only accepts a recurrence rule or None."""
+    due_date = datetime.now() + timedelta(days=1)
+    rule = RecurrenceRule("weekly", weekdays=[0, 3])
+    task = Task(
+        1, "Dish", "Wash the dishes", due_date, ["Edouard"], recurrence=rule
+    )
+    assert task.recurrence == rule
+    task.recurrence = None
+    assert task.recurrence is None
+    with pytest.raises(ValueError):
+        task.recurrence = "FREQ=DAILY"
+    assert Task.from_db(
+        1, "Dish", "Wash the dishes", due_date, due_date, ["Edouard"],
+        TaskStatus.START, TaskPriority.LOW, [],
+    ).recurrence is None
+    assert TaskData.__optional_keys__ == {"recurrence"}
@@ -0,0 +1,133 @@
+"""
+test_task_index.py
+
+This script is dedicated to test all the functionalities from
+task_index.py file.
+"""
+
+import os
+import threading
+
+import pytest
+
+from to_do_list_project.db import SQLiteDB
+from to_do_list_project.task_index import (
+    _locked,
+    DELETED,
+    HEADER_SIZE,
+    index_dtype,
+    index_path,
+    read_header,
+    TaskIndex,
+    update_index,
+)
+
+ROWS = [
+    ("Clean", "Clean room", "2023/11/12 10:00:00", "2024/01/01 00:00:00",
+     "James", 1, 2, "House"),
+    ("Shop", "Buy food", "2023/11/13 10:00:00", "2024/01/02 00:00:00",
+     "Anna", 2, 3, ""),
+    ("Cook", "Cook dinner", "2023/11/14 10:00:00", "2024/01/03 00:00:00",
+     "James", 3, 1, "House"),
+]
+
+
+@pytest.fixture
+def db(tmp_path) -> SQLiteDB:
+    """Pytest fixture giving a database file with three tasks."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    db.create_table_tasks()
+    db.bulk_insert("tasks", ROWS)
+    return db
+
+
+def test_build_index(db: SQLiteDB) -> None:
+    """Test if the index holds the fields of every task."""
+    result = update_index(db)
+
+    assert result["full"] and result["appended"] == 3
+    with TaskIndex(index_path(db.db_name)) as index:
+        assert index.tasks["id"].tolist() == [1, 2, 3]
+        assert index.tasks["due"][0] == 1704067200
+        assert index.tasks["status"].tolist() == [1, 2, 3]
+        assert index.tasks["priority"].tolist() == [2, 3, 1]
+        james = index.assignee_code("James")
+        assert index.tasks["assignee"].tolist() == [
+            james, index.assignee_code("Anna"), james
+        ]
+        assert index.assignee_code("Bob") is None
+        assert index.count_by_status() == {1: 1, 2: 1, 3: 1}
+
+
+def test_incremental_update(db: SQLiteDB) -> None:
+    """Test if only new and changed tasks are written on update."""
+    update_index(db)
+    path = index_path(db.db_name)
+    index = TaskIndex(path)
+
+    assert update_index(db)["appended"] == 0
+    assert not index.refresh()
+
+    db.fetch_data(1, "COMPLETE")
+    db.remove_task(2)
+    db.bulk_insert("tasks", [ROWS[1][:4] + ("Bob", 1, 3, "")])
+    result = update_index(db)
+
+    assert not result["full"]
+    assert result["appended"] == 1 and result["updated"] == 2
+    assert read_header(path)["change_counter"] == db.change_counter()
+    assert index.refresh()
+    assert index.tasks["id"].tolist() == [1, 2, 3, 4]
+    assert index.tasks["status"].tolist() == [3, DELETED, 3, 1]
+    assert index.tasks["assignee"][3] == index.assignee_code("Bob")
+    assert index.live()["id"].tolist() == [1, 3, 4]
+    index.close()
+
+    assert update_index(db, full=True)["appended"] == 3
+
+
+def test_not_an_index(tmp_path) -> None:
+    """Test if opening a file that is not an index is refused."""
+    path = tmp_path / "tasks.db.index"
+    path.write_bytes(b"not an index")
+
+    with pytest.raises(ValueError):
+        TaskIndex(str(path))
+
+
+def test_update_after_pruning(db: SQLiteDB) -> None:
+    """Test if an index behind the pruned change log is rebuilt."""
+    update_index(db)
+    db.fetch_data(1, "COMPLETE")
+    db.fetch_data(2, "COMPLETE")
+    db.prune_changes(keep=1, pause=0)
+    result = update_index(db)
+
+    assert result["full"] and result["appended"] == 3
+    with TaskIndex(index_path(db.db_name)) as index:
+        assert index.tasks["status"].tolist() == [3, 3, 3]
+
+
+def test_concurrent_updates(db: SQLiteDB) -> None:
+    """Test if an update waits for the one holding the index lock."""
+    update_index(db)
+    path = index_path(db.db_name)
+    db.bulk_insert("tasks", ROWS)
+
+    with _locked(path):
+        results = []
+        updater = threading.Thread(
+            target=lambda: results.append(update_index(db))
+        )
+        updater.start()
+        updater.join(0.2)
+        assert updater.is_alive()
+        db.bulk_insert("tasks", ROWS)
+    updater.join()
+
+    assert results[0]["appended"] == 6
+    header = read_header(path)
+    assert header["count"] == 9
+    assert os.path.getsize(path) == (
+        HEADER_SIZE + header["count"] * index_dtype().itemsize
+    )
@@ -5,11 +5,24 @@ This script is dedicated to test all the functionalities from db.py file.
 """
 
 from datetime import datetime, timedelta
+import json
+import os
 import sqlite3
+import tracemalloc
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
 import pytest
 
-from to_do_list_project.db import SQLiteDB
-from to_do_list_project.task_manager import TaskManager, TaskStatus
+from to_do_list_project.db import DB_DATE_FORMAT, SQLiteDB
+from to_do_list_project.recurrence import RecurrenceRule
+from to_do_list_project.task_manager import (
+    TaskConflictError,
+    TaskManager,
+    TaskNotFoundError,
+    TaskPriority,
+    TaskStatus,
+)
 
 
 @pytest.fixture
@@ -40,7 +53,7 @@ def test_add_task_past_due_date(task_manager: TaskManager) -> None:
     assert len(task_manager._tasks) == 0
 
 
-def test_delete_task(task_manager: TaskManager) -> None:
+def test_delete_task(task_manager: TaskManager, capsys) -> None:
     """Test if a task can be deleted from the task manager."""
     due_date = datetime.now() + timedelta(days=1)
     task_id = task_manager.add_task(
@@ -49,6 +62,7 @@ def test_delete_task(task_manager: TaskManager) -> None:
     assert len(task_manager._tasks) == 1
     task_manager.remove_task(task_id)
     assert len(task_manager._tasks) == 0
+    assert capsys.readouterr().out == ""
 
 
 def test_complete_task(task_manager: TaskManager) -> None:
@@ -80,6 +94,110 @@ def test_modify_task(task_manager: TaskManager) -> None:
     assert task_manager.get_task_by_id(task_id).name == "Modified Task"
 
 
+def test_modify_task_validated_before_write(tmp_path) -> None:
+    """Test if invalid changes are refused before a lazy task is written."""
+    path = str(tmp_path / "tasks.db")
+    due_date = datetime.now() + timedelta(days=1)
+    task_id = TaskManager(SQLiteDB(path)).add_task(
+        "Task", "Description", due_date, ["Al"]
+    )
+    task_manager = TaskManager(SQLiteDB(path), lazy=True)
+
+    for changes in (
+        ("", None, datetime(2001, 1, 1), None),
+        (None, None, None, ["Al", ""]),
+        (None, None, None, "Al, "),
+    ):
+        with pytest.raises(ValueError):
+            task_manager.modify_task(task_id, *changes)
+
+    assert task_manager.find_versioned_task(task_id)[1] == 1
+    task_manager.modify_task(task_id, "", "", None, "Bo, Cy")
+    assert task_manager.find_task(task_id)[5] == "Bo, Cy"
+
+
+def test_modify_task_versions(tmp_path) -> None:
+    """Test if concurrent modifications are merged or reported."""
+    path = str(tmp_path / "tasks.db")
+    task_manager = TaskManager(SQLiteDB(path))
+    due_date = datetime.now() + timedelta(days=1)
+    task_id = task_manager.add_task("Task", "Description", due_date, ["Al"])
+    _, version = task_manager.find_versioned_task(task_id)
+    other = TaskManager(SQLiteDB(path), lazy=True)
+    real_update = task_manager._db.update_task
+
+    def update_after_other_write(*args):
+        if not other.find_task(task_id)[1].startswith("Other"):
+            other.modify_task(task_id, "Other name", None, None, None)
+        return real_update(*args)
+
+    with patch.object(
+        task_manager._db, "update_task", side_effect=update_after_other_write
+    ):
+        new_version = task_manager.modify_task(
+            task_id, None, "Mine", None, None
+        )
+    assert new_version == version + 2
+    assert task_manager.find_task(task_id)[1:3] == ("Other name", "Mine")
+
+    with pytest.raises(TaskConflictError) as conflict:
+        task_manager.modify_task(
+            task_id, "Stale", None, None, None, expected_version=version
+        )
+    assert conflict.value.current_version == new_version
+    assert task_manager.get_task_by_id(task_id).name == "Other name"
+
+
+def test_due_queries(task_manager: TaskManager) -> None:
+    """Test if the due date queries follow the changes of the tasks."""
+    now = datetime.now()
+    first, second, third = (
+        task_manager.add_task(
+            f"Task {days}", "Description", now + timedelta(days=days), ["Ed"]
+        )
+        for days in (3, 1, 2)
+    )
+
+    assert [task.id for task in task_manager.next_due(2)] == [second, third]
+
+    task_manager.complete_task(second)
+    task_manager.modify_task(
+        first, None, None, now + timedelta(hours=1), None
+    )
+    assert [task.id for task in task_manager.next_due(5)] == [first, third]
+    assert task_manager.overdue(now + timedelta(days=1)) == [
+        task_manager.get_task_by_id(first)
+    ]
+    assert [
+        task.id
+        for task in task_manager.due_between(
+            now + timedelta(days=1), now + timedelta(days=3)
+        )
+    ] == [third]
+
+    task_manager.remove_task(third)
+    assert [row[0] for row in task_manager.query_due()] == [first]
+
+
+def test_archive_completed(task_manager: TaskManager) -> None:
+    """Test if archived tasks are only returned on request."""
+    due_date = datetime.now() + timedelta(days=1)
+    first, second = (
+        task_manager.add_task(name, "Description", due_date, ["Ed"])
+        for name in ("Done", "Open")
+    )
+    task_manager.complete_task(first)
+
+    assert task_manager.archive_completed(older_than_days=0) == 1
+    assert [task.id for task in task_manager._tasks] == [second]
+    assert [task.id for task in TaskManager(task_manager._db)._tasks] == [
+        second
+    ]
+    assert task_manager.find_task(first) is None
+    assert task_manager.find_task(first, include_archived=True)[1] == "Done"
+    assert len(task_manager.get_all_tasks(include_archived=True)) == 2
+
+
 def test_get_all_tasks(task_manager: TaskManager) -> None:
     """Test if all tasks can be retrieved from the task manager."""
     due_date = datetime.now() + timedelta(days=1)
@@ -88,3 +206,309 @@ def test_get_all_tasks(task_manager: TaskManager) -> None:
     )
     print(task_manager.get_all_tasks())
     assert len(task_manager.get_all_tasks()) == 1
+
+
+def test_lazy_task_manager_loads_on_first_use() -> None:
+    """Test if a lazy task manager only loads its tasks when needed."""
+    db = SQLiteDB("file::memory:?cache=shared")
+    conn = sqlite3.connect("file::memory:?cache=shared", uri=True)
+    due_date = datetime.now() + timedelta(days=1)
+    TaskManager(db).add_task("Test Task", "Description", due_date, ["Bob"])
+
+    task_manager = TaskManager(db, lazy=True)
+    assert task_manager._loaded_tasks is None
+    assert task_manager.get_stats()["total"] == 1
+    assert task_manager._loaded_tasks is None
+    assert len(task_manager._tasks) == 1
+    conn.close()
+
+
+def test_import_file(task_manager: TaskManager, tmp_path) -> None:
+    """Test if a CSV file is imported in batches with a rejection report."""
+    path = tmp_path / "tasks.csv"
+    lines = ["name,description,due_date,assignee,priority"]
+    lines += [f"Task {index},Imported,2999/01/01,Alice,high"
+              for index in range(25)]
+    lines.append(",Missing name,2999/01/01,Alice,low")
+    path.write_text("\n".join(lines))
+    due_date = datetime.now() + timedelta(days=1)
+    task_manager.add_task("Test Task", "Description", due_date, ["Bob"])
+
+    report = task_manager.import_file(str(path), batch_size=10)
+
+    assert report["imported"] == 25
+    assert report["rejected"] == [
+        {"line": 27, "error": "Name must be a non-empty string"}
+    ]
+    assert len(task_manager._tasks) == 26
+    with pytest.raises(ValueError):
+        task_manager.import_file(str(path), format="xml")
+
+
+def test_import_file_memory_is_constant(
+    task_manager: TaskManager, tmp_path
+) -> None:
+    """Test if importing a ten times bigger file uses about the same memory."""
+
+    def peak_memory(rows: int) -> int:
+        path = tmp_path / f"tasks_{rows}.jsonl"
+        with open(path, "w") as jsonl_file:
+            for index in range(rows):
+                jsonl_file.write(json.dumps({
+                    "name": f"Task {index}", "description": "x" * 200,
+                    "due_date": "2999/01/01", "assignee": "Alice",
+                }) + "\n")
+        tracemalloc.start()
+        task_manager.import_file(str(path), format="jsonl", batch_size=500)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    assert peak_memory(10000) < 2 * peak_memory(1000)
+
+
+def test_export_parquet(task_manager: TaskManager, tmp_path) -> None:
+    """Test if the tasks are exported to Parquet in row groups."""
+    due_date = datetime.now() + timedelta(days=1)
+    for index in range(5):
+        task_manager.add_task(f"Task {index}", "Description", due_date,
+                              ["Alice", "Bob"], categories=["Work"])
+    path = str(tmp_path / "tasks.parquet")
+
+    assert task_manager.export_parquet(path, row_group_size=2) == 5
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column("name").to_pylist()[4] == "Task 4"
+    assert table.column("assignee").to_pylist()[0] == ["Alice", "Bob"]
+
+
+def test_to_arrow(task_manager: TaskManager) -> None:
+    """Test if tasks are read as a filtered, sorted and paged Arrow table."""
+    for index in range(6):
+        task_manager.add_task(
+            f"Task {index}",
+            "Description",
+            datetime.now() + timedelta(days=10 - index),
+            ["Alice"],
+            priority=TaskPriority.HIGH if index % 2 else TaskPriority.LOW,
+        )
+    query = {
+        "priority": TaskPriority.HIGH,
+        "order_by": "due_date",
+        "limit": 2,
+        "offset": 1,
+    }
+
+    table = task_manager.to_arrow(query)
+
+    assert task_manager.to_arrow().num_rows == 6
+    assert table.column("name").to_pylist() == ["Task 3", "Task 1"]
+    assert set(table.column("priority").to_pylist()) == {"HIGH"}
+    assert task_manager.count_tasks(query) == 3
+
+
+def test_snapshot_start(tmp_path) -> None:
+    """Test if tasks come from the snapshot until the database changes."""
+    db = SQLiteDB(str(tmp_path / "tasks.db"))
+    due_date = datetime.now() + timedelta(days=1)
+    TaskManager(db).add_task("Task", "Description", due_date, ["Alice"])
+
+    first = TaskManager(db, snapshot=True)
+    with patch.object(TaskManager, "_read_tasks") as read_tasks:
+        second = TaskManager(db, snapshot=True)
+    read_tasks.assert_not_called()
+    assert os.path.exists(str(tmp_path / "tasks.db.snapshot"))
+    assert [task.name for task in second._tasks] == ["Task"]
+    assert vars(second._tasks[0]) == vars(first._tasks[0])
+
+    second.add_task("Other", "Description", due_date, ["Bob"])
+    third = TaskManager(db, snapshot=True)
+    assert [task.name for task in third._tasks] == ["Task", "Other"]
+
+
+def test_set_based_writes(task_manager: TaskManager) -> None:
+    """Test if filtered writes change the database and loaded tasks."""
+    due_date = datetime.now() + timedelta(days=3)
+    ids = [
+        task_manager.add_task(
+            f"Task {index}", "Description", due_date + timedelta(days=index),
+            assignees, categories=categories,
+        )
+        for index, (assignees, categories) in enumerate([
+            (["Alice", "Bob"], ["Sprint"]),
+            (["Alice"], ["Sprint", "Home"]),
+            (["Bob"], ["Sprint"]),
+            (["Carol"], ["Home"]),
+        ])
+    ]
+
+    with pytest.raises(ValueError):
+        task_manager.complete_where()
+    assert task_manager.reassign("Alice", "Bob") == ids[:2]
+    assert [task.assignee for task in task_manager._tasks[:2]] == [
+        ["Bob"], ["Bob"]
+    ]
+    assert task_manager.find_task(ids[1])[5] == "Bob"
+    assert task_manager.set_priority_where(
+        TaskPriority.HIGH, {"category": "Home"}
+    ) == [ids[1], ids[3]]
+    assert task_manager.complete_where(
+        {"category": "Sprint", "due_before": due_date + timedelta(days=2)}
+    ) == ids[:2]
+    assert task_manager.complete_where({"category": "Sprint"}) == [ids[2]]
+    assert [task.status for task in task_manager._tasks] == [
+        TaskStatus.COMPLETE
+    ] * 3 + [TaskStatus.IN_PROGRESS]
+    assert task_manager._tasks[1].priority == TaskPriority.HIGH
+    assert task_manager.next_due() == [task_manager._tasks[3]]
+
+    assert task_manager.remove_where(
+        {"status": TaskStatus.COMPLETE}, task_ids=[ids[0], ids[3]]
+    ) == [ids[0]]
+    assert [task.id for task in task_manager._tasks] == ids[1:]
+    assert task_manager.count_tasks() == 3
+
+
+def test_dependencies(tmp_path) -> None:
+    """Test if ready and blocked tasks follow completions and removals."""
+    task_manager = TaskManager(
+        SQLiteDB(str(tmp_path / "tasks.db")), lazy=True
+    )
+    due_date = datetime.now() + timedelta(days=10)
+    ids = [
+        task_manager.add_task(
+            f"Task {index}", "Description",
+            due_date + timedelta(days=index), ["Anna"],
+        )
+        for index in range(4)
+    ]
+    assert task_manager.add_dependency(ids[1], ids[0])
+    assert task_manager.add_dependency(ids[2], ids[1])
+    assert not task_manager.add_dependency(ids[2], ids[1])
+    with pytest.raises(ValueError):
+        task_manager.add_dependency(ids[0], ids[2])
+    with pytest.raises(TaskNotFoundError):
+        task_manager.add_dependency(ids[0], 42)
+    assert task_manager._loaded_tasks is None
+
+    assert task_manager.ready_tasks() == [ids[0], ids[3]]
+    assert task_manager.ready_tasks(limit=1) == [ids[0]]
+    assert task_manager.blocked_by(ids[2]) == [ids[1]]
+    assert [task_id for task_id, _ in task_manager.critical_path()] == ids[:3]
+
+    task_manager.complete_task(ids[0])
+    assert task_manager.ready_tasks() == [ids[1], ids[3]]
+    task_manager.modify_task(ids[3], "", "", due_date, [])
+    assert task_manager.ready_tasks() == [ids[3], ids[1]]
+    task_manager.remove_task(ids[1])
+    assert task_manager.blocked_by(ids[2]) == []
+
+    # A new manager builds the same graph from the database.
+    other = TaskManager(SQLiteDB(str(tmp_path / "tasks.db")), lazy=True)
+    assert other.ready_tasks() == [ids[3], ids[2]]
+    assert other.remove_dependency(ids[2], ids[1]) is False
+    other.add_dependency(ids[3], ids[2])
+    assert other.complete_where(task_ids=[ids[2]]) == [ids[2]]
+    assert other.ready_tasks() == [ids[3]]
+
+
+def test_dependencies_follow_other_writers(tmp_path) -> None:
+    """Test if the graph is read again once another writer changed it."""
+    path = str(tmp_path / "tasks.db")
+    task_manager = TaskManager(SQLiteDB(path), lazy=True)
+    due_date = datetime.now() + timedelta(days=10)
+    ids = [
+        task_manager.add_task(
+            f"Task {index}", "Description",
+            due_date + timedelta(days=index), ["Anna"],
+        )
+        for index in range(3)
+    ]
+    task_manager.add_dependency(ids[1], ids[0])
+    graph = task_manager._graph
+
+    # Writes of the manager keep the graph in sync without reading it.
+    task_manager.reassign("Anna", "Ben", task_ids=[ids[2]])
+    task_manager.complete_task(ids[0])
+    assert task_manager.ready_tasks() == [ids[1], ids[2]]
+    assert task_manager._loaded_graph is graph
+
+    other = SQLiteDB(path)
+    other.add_dependencies([(ids[2], ids[1])])
+    assert task_manager.blocked_by(ids[2]) == [ids[1]]
+    other.fetch_data(ids[1], "COMPLETE")
+    assert task_manager.ready_tasks() == [ids[2]]
+    assert task_manager._loaded_graph is not graph
+
+    other.remove_task(ids[2])
+    task_manager.add_task("Task 3", "Description", due_date, ["Anna"])
+    assert ids[2] not in task_manager.ready_tasks()
+    other.close_version_connection()
+    task_manager._db.close_version_connection()
+
+
+def test_recurring_tasks(tmp_path) -> None:
+    """Test if occurrences are listed lazily and stored once changed."""
+    task_manager = TaskManager(SQLiteDB(str(tmp_path / "tasks.db")))
+    start = (datetime.now() + timedelta(days=1)).replace(
+        hour=9, minute=0, second=0, microsecond=0
+    )
+    daily = task_manager.add_recurring_task(
+        "Water plants", "Every day", start, ["Anna"], RecurrenceRule("daily")
+    )
+    weekly = task_manager.add_recurring_task(
+        "Clean", "Every week", start + timedelta(hours=1), ["Ben"],
+        RecurrenceRule("weekly"),
+    )
+    with pytest.raises(ValueError):
+        task_manager.add_recurring_task(
+            "Past", "Past", start - timedelta(days=2), ["Anna"],
+            RecurrenceRule("daily"),
+        )
+
+    occurrences = task_manager.occurrences(start, start + timedelta(days=365))
+    assert next(occurrences) == (
+        daily,
+        start,
+        None,
+        (
+            None, "Water plants", "Every day",
+            task_manager._db.get_series(daily)[0][3],
+            start.strftime(DB_DATE_FORMAT), "Anna", 2, 2, "",
+        ),
+    )
+    assert next(occurrences)[:2] == (weekly, start + timedelta(hours=1))
+    assert len(list(occurrences)) == 366 + 53 - 2
+    assert task_manager.count_tasks() == 0
+
+    second = start + timedelta(days=1)
+    task_id = task_manager.complete_occurrence(daily, second)
+    assert task_manager.complete_occurrence(daily, second) == task_id
+    assert task_manager.get_task_by_id(task_id).status == TaskStatus.COMPLETE
+    edited = task_manager.edit_occurrence(
+        daily, start + timedelta(days=2), new_name="Water the garden"
+    )
+    with pytest.raises(TaskNotFoundError):
+        task_manager.complete_occurrence(daily, second + timedelta(hours=1))
+    assert task_manager.count_tasks() == 2
+
+    listed = list(
+        task_manager.occurrences(second, second + timedelta(days=1), daily)
+    )
+    assert [occurrence.task_id for occurrence in listed] == [task_id, edited]
+    assert listed[0].row[6] == TaskStatus.COMPLETE.value
+    assert listed[1].row[1] == "Water the garden"
+
+    task_manager.remove_task(edited)
+    assert [
+        occurrence.due_date
+        for occurrence in task_manager.occurrences(
+            second, second + timedelta(days=2), daily
+        )
+    ] == [second, second + timedelta(days=2)]
+    assert task_manager.remove_recurring_task(weekly)
+    assert list(task_manager.occurrences(
+        start, start + timedelta(days=6), weekly
+    )) == []
@@ -0,0 +1,592 @@
+"""
+api.py.
+
+This script serves the operations of `TaskManager` as a JSON API over
+HTTP, so that other services read and write tasks through one process
+instead of each opening the database file.
+
+The server runs on asyncio with the standard library only, and keeps
+connections alive between requests. Reads run on a small pool of
+threads, each with its own connection. Writes are queued to a single
+writer thread, which commits everything queued while its previous commit
+ran in one transaction (`SQLiteDB.batch`): under load the write lock is
+taken once per batch instead of once per request, and writers never wait
+for each other's locks. Lists are paged by id: a page holds up to `limit`
+tasks and the id to pass as `after` to read the next one.
+
+Endpoints:
+    GET    /tasks?status=&limit=&after=
+    POST   /tasks
+    GET    /tasks/{id}
+    PATCH  /tasks/{id}      (with "version", 409 if it changed since)
+    DELETE /tasks/{id}
+    POST   /tasks/{id}/complete
+    GET    /search?q=&limit=&after=
+    GET    /stats
+
+Usage:
+    python -m to_do_list_project.api --db task_manager.db --port 8080
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .cli import task_to_dict
+from .db import DB_DATE_FORMAT, SQLiteDB
+from .task import TaskPriority, TaskStatus
+from .task_manager import TaskConflictError, TaskManager, TaskNotFoundError
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BODY_SIZE = 1 << 20
+REASONS = {
+    200: "OK",
+    201: "Created",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    """Exception answered to the client with an HTTP status."""
+
+    def __init__(
+        self, status: int, message: str, details: Optional[dict] = None
+    ) -> None:
+        """
+        Initialize the HTTPError object.
+
+        Args:
+            status (int): HTTP status of the response.
+            message (str): Error returned in the JSON body.
+            details (dict, optional): Other fields of the JSON body.
+        """
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parse a due date given as ISO 8601, YYYY/MM/DD HH:MM:SS or YYYY/MM/DD.
+
+    Raises:
+        HTTPError: If the date has none of these formats.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        pass
+    for date_format in (DB_DATE_FORMAT, "%Y/%m/%d"):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise HTTPError(400, f"Invalid date '{value}'")
+
+
+def parse_names(value: Any) -> List[str]:
+    """Return a list of names given as a list or a comma separated string."""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        raise HTTPError(400, "Expected a list of names")
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+def parse_enum(enum, value: str):
+    """Return the member of a TaskStatus or TaskPriority from its name."""
+    try:
+        return enum[str(value).upper()]
+    except KeyError:
+        names = ", ".join(member.name.lower() for member in enum)
+        raise HTTPError(400, f"Invalid value '{value}', use {names}")
+
+
+def parse_int(params: Dict[str, List[str]], name: str, default=None):
+    """Return an integer parameter of the query string."""
+    if name not in params:
+        return default
+    try:
+        return int(params[name][0])
+    except ValueError:
+        raise HTTPError(400, f"Parameter '{name}' must be an integer")
+
+
+def page(rows: List[tuple], limit: int) -> dict:
+    """
+    Build a page of tasks from up to `limit + 1` rows.
+
+    The extra row, when there is one, only tells that a next page exists.
+
+    Returns:
+        dict: The tasks and the id after which the next page starts, None
+        on the last page.
+    """
+    rows = rows or []
+    tasks = [task_to_dict(row) for row in rows[:limit]]
+    return {
+        "tasks": tasks,
+        "next": tasks[-1]["id"] if len(rows) > limit else None,
+    }
+
+
+class TaskServer:
+    """HTTP server exposing a TaskManager as a JSON API."""
+
+    def __init__(
+        self,
+        task_manager: TaskManager,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        readers: int = 4,
+        max_batch: int = 256,
+    ) -> None:
+        """
+        Initialize the TaskServer object.
+
+        Args:
+            task_manager (TaskManager): Manager of the served tasks,
+                preferably lazy so that they are not loaded in memory.
+            host (str): Interface the server listens on.
+            port (int): Port the server listens on, 0 for any free one.
+            readers (int): Number of threads running the reads.
+            max_batch (int): Maximum number of writes committed together.
+        """
+        self.task_manager = task_manager
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.batches = 0
+        self.writes = 0
+        self._readers = ThreadPoolExecutor(
+            readers, thread_name_prefix="api-reader"
+        )
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="api-writer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._write_loop_task: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Start listening and writing."""
+        self._queue = asyncio.Queue()
+        self._write_loop_task = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop listening, and writing once the queued writes are done."""
+        self._server.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        self._write_loop_task.cancel()
+        self._readers.shutdown()
+        self._writer.shutdown()
+
+    async def serve_forever(self) -> None:
+        """Serve until cancelled, starting the server if needed."""
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def _batch(self):
+        """Return the context grouping the writes of a batch."""
+        db = self.task_manager._db
+        # Sharded databases commit on each of their files.
+        return db.batch() if isinstance(db, SQLiteDB) else nullcontext()
+
+    def _run_batch(
+        self, operations: List[Callable[[], Any]]
+    ) -> List[Tuple[Any, Optional[Exception]]]:
+        """Run writes in one transaction, in the writer thread."""
+        results = []
+        with self._batch():
+            for operation in operations:
+                try:
+                    results.append((operation(), None))
+                except Exception as e:
+                    results.append((None, e))
+        self.batches += 1
+        self.writes += len(operations)
+        return results
+
+    async def _write_loop(self) -> None:
+        """Commit the queued writes, all those waiting at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(
+                    self._writer,
+                    self._run_batch,
+                    [operation for operation, _ in batch],
+                )
+            except Exception as e:
+                # The transaction failed as a whole, nothing was written.
+                results = [(None, e)] * len(batch)
+            for (_, future), (result, error) in zip(batch, results):
+                if not future.done():
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+
+    async def write(self, operation: Callable[[], Any]) -> Any:
+        """Queue a write for the writer thread and wait for its commit."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def read(self, operation: Callable[..., Any], *args) -> Any:
+        """Run a read in the pool of reader threads."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._readers, operation, *args
+        )
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer the requests of a connection until it is closed."""
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = self._keep_alive(headers)
+                    status, payload = await self.dispatch(
+                        method, target, body
+                    )
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e), **e.details}
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(
+        reader: asyncio.StreamReader,
+    ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """
+        Read one request from a connection.
+
+        Returns:
+            Optional[tuple]: Method, target, headers with lower case names
+            and body, None when the client closed the connection.
+
+        Raises:
+            HTTPError: If the request is malformed or too large.
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Request head too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+            headers = {
+                name.strip().lower(): value.strip()
+                for name, value in (
+                    line.split(":", 1) for line in lines[1:] if line
+                )
+            }
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Malformed request")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, "Request body too large")
+        headers[":version"] = version
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    @staticmethod
+    def _keep_alive(headers: Dict[str, str]) -> bool:
+        """Tell whether the client keeps the connection open."""
+        connection = headers.get("connection", "").lower()
+        if headers[":version"] == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    @staticmethod
+    def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+        """Encode a JSON response."""
+        body = b"" if payload is None else json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        return head.encode("latin-1") + body
+
+    async def dispatch(
+        self, method: str, target: str, body: bytes = b""
+    ) -> Tuple[int, Any]:
+        """
+        Run the operation of a request.
+
+        Args:
+            method (str): HTTP method.
+            target (str): Path and query string.
+            body (bytes): JSON body of the request.
+
+        Returns:
+            Tuple[int, Any]: HTTP status and JSON payload.
+
+        Raises:
+            HTTPError: If the request cannot be carried out.
+        """
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        routes = {
+            ("tasks",): {"GET": self.list_tasks, "POST": self.create_task},
+            ("tasks", "{id}"): {
+                "GET": self.get_task,
+                "PATCH": self.modify_task,
+                "DELETE": self.remove_task,
+            },
+            ("tasks", "{id}", "complete"): {"POST": self.complete_task},
+            ("search",): {"GET": self.search_tasks},
+            ("stats",): {"GET": self.get_stats},
+        }
+        args = []
+        if len(parts) > 1 and parts[0] == "tasks":
+            if not parts[1].isdigit():
+                raise HTTPError(404, f"No task '{parts[1]}'")
+            args.append(int(parts[1]))
+            parts[1] = "{id}"
+        handlers = routes.get(tuple(parts))
+        if handlers is None:
+            raise HTTPError(404, f"No endpoint {url.path}")
+        handler = handlers.get(method)
+        if handler is None:
+            raise HTTPError(405, f"Method {method} not allowed on {url.path}")
+        if method in ("POST", "PATCH") and handler != self.complete_task:
+            try:
+                data = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "Body is not valid JSON")
+            if not isinstance(data, dict):
+                raise HTTPError(400, "Body must be a JSON object")
+            args.append(data)
+        elif method == "GET":
+            args.append(params)
+        try:
+            return await handler(*args)
+        except HTTPError:
+            raise
+        except TaskNotFoundError:
+            raise HTTPError(404, f"Task {args[0]} not found")
+        except TaskConflictError as e:
+            current = None
+            if e.current is not None:
+                current = dict(
+                    task_to_dict(e.current), version=e.current_version
+                )
+            raise HTTPError(409, str(e), {"task": current})
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        except Exception:
+            logger.exception(f"Error answering {method} {target}")
+            raise HTTPError(500, "Internal error")
+
+    @staticmethod
+    def _limit(params: Dict[str, List[str]]) -> int:
+        """Return the page size asked for, within the allowed range."""
+        limit = parse_int(params, "limit", DEFAULT_PAGE_SIZE)
+        return min(max(limit, 1), MAX_PAGE_SIZE)
+
+    async def list_tasks(self, params: Dict[str, List[str]]) -> tuple:
+        """List a page of tasks, optionally in a status."""
+        status = None
+        if "status" in params:
+            status = parse_enum(TaskStatus, params["status"][0])
+        limit = self._limit(params)
+        rows = await self.read(
+            self.task_manager.query_tasks,
+            status,
+            limit + 1,
+            0,
+            parse_int(params, "after"),
+        )
+        return 200, page(rows, limit)
+
+    async def search_tasks(self, params: Dict[str, List[str]]) -> tuple:
+        """List a page of the tasks containing a string."""
+        text = params.get("q", [""])[0]
+        if not text:
+            raise HTTPError(400, "Parameter 'q' is required")
+        limit = self._limit(params)
+        rows = await self.read(
+            self.task_manager.search_tasks,
+            text,
+            limit + 1,
+            parse_int(params, "after"),
+        )
+        return 200, page(rows, limit)
+
+    async def get_stats(self, params: Dict[str, List[str]]) -> tuple:
+        """Count the tasks by status and priority."""
+        return 200, await self.read(self.task_manager.get_stats)
+
+    async def _existing_task(self, task_id: int) -> tuple:
+        """Return the row of a task, failing when it does not exist."""
+        task_row = await self.read(self.task_manager.find_task, task_id)
+        if task_row is None:
+            raise HTTPError(404, f"Task {task_id} not found")
+        return task_row
+
+    async def get_task(
+        self, task_id: int, params: Dict[str, List[str]]
+    ) -> tuple:
+        """Return one task with its version."""
+        versioned = await self.read(
+            self.task_manager.find_versioned_task, task_id
+        )
+        if versioned is None:
+            raise HTTPError(404, f"Task {task_id} not found")
+        task_row, version = versioned
+        return 200, dict(task_to_dict(task_row), version=version)
+
+    async def create_task(self, data: dict) -> tuple:
+        """Add a task from its JSON fields."""
+        if not data.get("name") or not data.get("due_date"):
+            raise HTTPError(400, "Fields 'name' and 'due_date' are required")
+        name = str(data["name"])
+        description = str(data.get("description") or name)
+        due_date = parse_datetime(data["due_date"])
+        assignee = parse_names(data.get("assignee", []))
+        status = parse_enum(TaskStatus, data.get("status", "in_progress"))
+        priority = parse_enum(TaskPriority, data.get("priority", "medium"))
+        categories = parse_names(data.get("categories", []))
+        task_id = await self.write(
+            lambda: self.task_manager.add_task(
+                name,
+                description,
+                due_date,
+                assignee,
+                status,
+                priority,
+                categories,
+            )
+        )
+        if task_id is None:
+            raise HTTPError(500, "Task could not be written")
+        return 201, {"id": task_id}
+
+    async def modify_task(self, task_id: int, data: dict) -> tuple:
+        """
+        Modify the name, description, due date or assignees of a task.
+
+        With a "version" field, the task is only modified if it is still
+        at that version, and the conflict is answered with its current
+        data otherwise.
+        """
+        due_date = data.get("due_date")
+        assignee = data.get("assignee")
+        expected_version = data.get("version")
+        if expected_version is not None and not isinstance(
+            expected_version, int
+        ):
+            raise HTTPError(400, "Field 'version' must be an integer")
+        version = await self.write(
+            lambda: self.task_manager.modify_task(
+                task_id,
+                data.get("name"),
+                data.get("description"),
+                parse_datetime(due_date) if due_date else None,
+                parse_names(assignee) if assignee else None,
+                expected_version,
+            )
+        )
+        return 200, {"id": task_id, "version": version}
+
+    async def complete_task(self, task_id: int) -> tuple:
+        """Mark a task as complete."""
+        await self._existing_task(task_id)
+        await self.write(lambda: self.task_manager.complete_task(task_id))
+        return 200, {"id": task_id}
+
+    async def remove_task(self, task_id: int) -> tuple:
+        """Remove a task."""
+        await self._existing_task(task_id)
+        await self.write(lambda: self.task_manager.remove_task(task_id))
+        return 204, None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the API server from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Serve the tasks of a database as a JSON API."
+    )
+    parser.add_argument("--db", default="task_manager.db",
+                        help="database file served")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--readers", type=int, default=4,
+                        help="threads running the reads")
+    parser.add_argument("--max-batch", type=int, default=256,
+                        help="writes committed together at most")
+    parser.add_argument("--wal", action="store_true",
+                        help="switch the db to write-ahead logging first")
+    args = parser.parse_args(argv)
+
+    db = SQLiteDB(args.db)
+    if args.wal:
+        db.enable_wal()
+    server = TaskServer(
+        TaskManager(db, lazy=True),
+        args.host,
+        args.port,
+        args.readers,
+        args.max_batch,
+    )
+
+    async def serve() -> None:
+        await server.start()
+        print(f"Serving {args.db} on http://{server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+api_load.py.
+
+This script load tests a running API server, the way several services
+would share it.
+
+N clients each keep one connection open and send requests drawn from a
+weighted mix of operations for a fixed duration, each waiting for the
+previous response. The report gives the requests per second, the p50/p99
+latencies and the error rate of every operation, as the load harness of
+the database does. Responses with a status of 400 or more are errors.
+
+Usage:
+    python -m to_do_list_project.api --db load_test.db --port 8080
+    python -m to_do_list_project.api_load --port 8080 --connections 16 \
+        --duration 10 --mix get=40,list=20,search=10,create=20,complete=10
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .load_harness import build_report, format_report, OperationReport
+from .load_harness import parse_mix
+
+DEFAULT_API_MIX = "get=40,list=20,search=10,create=20,complete=5,stats=5"
+SEARCH_TERMS = ["report", "meeting", "review", "Alice", "urgent"]
+
+
+class APIConnection:
+    """Kept-alive HTTP connection to the API server."""
+
+    def __init__(self, host: str, port: int) -> None:
+        """
+        Initialize the APIConnection object.
+
+        Args:
+            host (str): Host of the server.
+            port (int): Port of the server.
+        """
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(
+        self, method: str, path: str, data=None
+    ) -> Tuple[int, object]:
+        """
+        Send a request and read its response.
+
+        The connection is opened on first use, and again after the server
+        closed it.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path and query string.
+            data: Object sent as the JSON body.
+
+        Returns:
+            Tuple[int, object]: Status and decoded JSON body of the
+            response, None when it has no body.
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        body = b"" if data is None else json.dumps(data).encode()
+        self._writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await self._writer.drain()
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ")[1])
+        headers = {
+            name.strip().lower(): value.strip()
+            for name, value in (
+                line.split(":", 1) for line in lines[1:] if line
+            )
+        }
+        length = int(headers.get("content-length", 0))
+        payload = await self._reader.readexactly(length) if length else b""
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, json.loads(payload) if payload else None
+
+    def close(self) -> None:
+        """Close the connection."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+
+def new_task(rng: random.Random) -> dict:
+    """Return the JSON fields of a task created by the load test."""
+    due_date = datetime.now() + timedelta(days=rng.randint(1, 30))
+    return {
+        "name": f"Load {rng.choice(SEARCH_TERMS)} {rng.random():.6f}",
+        "description": "Created by the API load test",
+        "due_date": due_date.isoformat(timespec="seconds"),
+        "assignee": ["Harness"],
+        "priority": rng.choice(["low", "medium", "high"]),
+        "categories": ["Load"],
+    }
+
+
+async def run_operation(
+    connection: APIConnection,
+    operation: str,
+    rng: random.Random,
+    task_ids: List[int],
+) -> int:
+    """
+    Send the request of one operation of the mix.
+
+    Args:
+        connection (APIConnection): Connection of the client.
+        operation (str): get, list, search, create, complete, modify,
+            remove or stats.
+        rng (random.Random): Random generator of the client.
+        task_ids (List[int]): Ids of existing tasks, shared by the
+            clients and completed with the tasks they create.
+
+    Returns:
+        int: Status of the response.
+    """
+    task_id = rng.choice(task_ids) if task_ids else 1
+    if operation == "get":
+        status, _ = await connection.request("GET", f"/tasks/{task_id}")
+    elif operation == "list":
+        after = rng.choice([0, task_id])
+        status, _ = await connection.request(
+            "GET", f"/tasks?limit=50&after={after}"
+        )
+    elif operation == "search":
+        status, _ = await connection.request(
+            "GET", f"/search?q={rng.choice(SEARCH_TERMS)}&limit=20"
+        )
+    elif operation == "create":
+        status, data = await connection.request(
+            "POST", "/tasks", new_task(rng)
+        )
+        if status == 201:
+            task_ids.append(data["id"])
+    elif operation == "complete":
+        status, _ = await connection.request(
+            "POST", f"/tasks/{task_id}/complete"
+        )
+    elif operation == "modify":
+        status, _ = await connection.request(
+            "PATCH", f"/tasks/{task_id}", {"description": "Modified"}
+        )
+    elif operation == "remove":
+        status, _ = await connection.request("DELETE", f"/tasks/{task_id}")
+        if status == 204:
+            task_ids.remove(task_id)
+    elif operation == "stats":
+        status, _ = await connection.request("GET", "/stats")
+    else:
+        raise ValueError(f"Unknown operation: {operation}")
+    return status
+
+
+async def client(
+    host: str,
+    port: int,
+    mix: Dict[str, int],
+    deadline: float,
+    rng: random.Random,
+    task_ids: List[int],
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+) -> None:
+    """Send requests from the mix on one connection until the deadline."""
+    connection = APIConnection(host, port)
+    operations, weights = list(mix), list(mix.values())
+    try:
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            start = time.perf_counter()
+            try:
+                failed = (
+                    await run_operation(connection, operation, rng, task_ids)
+                    >= 400
+                )
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                connection.close()
+                failed = True
+            latencies.setdefault(operation, []).append(
+                time.perf_counter() - start
+            )
+            errors[operation] = errors.get(operation, 0) + failed
+    finally:
+        connection.close()
+
+
+async def run_api_load_async(
+    host: str,
+    port: int,
+    connections: int = 8,
+    duration: float = 10.0,
+    mix: str = DEFAULT_API_MIX,
+    seed: int = 0,
+) -> List[OperationReport]:
+    """Run the clients of the load test, see `run_api_load`."""
+    connection = APIConnection(host, port)
+    _, first_page = await connection.request("GET", "/tasks?limit=500")
+    connection.close()
+    task_ids = [task["id"] for task in first_page["tasks"]]
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    operations = parse_mix(mix)
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(
+        *(
+            client(
+                host,
+                port,
+                operations,
+                deadline,
+                random.Random(seed + index),
+                task_ids,
+                latencies,
+                errors,
+            )
+            for index in range(connections)
+        )
+    )
+    return build_report(latencies, errors, duration)
+
+
+def run_api_load(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    connections: int = 8,
+    duration: float = 10.0,
+    mix: str = DEFAULT_API_MIX,
+    seed: int = 0,
+) -> List[OperationReport]:
+    """
+    Load test a running API server.
+
+    Args:
+        host (str): Host of the server.
+        port (int): Port of the server.
+        connections (int): Number of clients, each with one connection.
+        duration (float): Seconds the clients keep sending requests.
+        mix (str): Operation weights such as "get=80,create=20".
+        seed (int): Seed of the random generators.
+
+    Returns:
+        List[OperationReport]: One entry per operation, plus a "total".
+    """
+    return asyncio.run(
+        run_api_load_async(host, port, connections, duration, mix, seed)
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the API load test from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Load test a running task API server."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=8,
+                        help="clients, each keeping one connection open")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds the clients run")
+    parser.add_argument("--mix", default=DEFAULT_API_MIX,
+                        help="operation weights")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run_api_load(
+        args.host,
+        args.port,
+        args.connections,
+        args.duration,
+        args.mix,
+        args.seed,
+    )
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+archive.py.
+
+This script runs the archive job of a database: the tasks completed more
+than N days ago are moved from `tasks` to `archived_tasks`, in batches,
+so that loading the active tasks no longer reads them.
+
+The first run migrates the database: it creates the archive tables and
+dates the tasks already completed to the migration, since their
+completion time was not stored before.
+
+With `--benchmark`, the start of a `TaskManager` is timed before and
+after the job; the job still moves the tasks, so run it on a copy:
+    python -m to_do_list_project.archive --db task_manager.db --days 30
+    python -m to_do_list_project.archive --db copy.db --days 0 --benchmark
+"""
+
+import argparse
+import time
+from typing import List, Optional
+
+from .db import SQLiteDB
+
+
+def time_start(db: SQLiteDB, runs: int = 3) -> float:
+    """
+    Time the creation of a TaskManager loading all the active tasks.
+
+    Args:
+        db (SQLiteDB): Database to load.
+        runs (int): Number of starts timed.
+
+    Returns:
+        float: Best start time in seconds.
+    """
+    from .task_manager import TaskManager
+
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        TaskManager(db)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_archive(
+    db_name: str,
+    older_than_days: float = 30,
+    batch_size: int = 1000,
+    runs: int = 3,
+) -> dict:
+    """
+    Time the start of a TaskManager before and after archiving.
+
+    Args:
+        db_name (str): Database to archive.
+        older_than_days (float): Days since completion after which a
+            task is archived.
+        batch_size (int): Number of tasks moved per transaction.
+        runs (int): Number of starts timed before and after.
+
+    Returns:
+        dict: Best start time in seconds "before" and "after", time of
+        the job, and numbers of tasks "archived" and still "active".
+    """
+    db = SQLiteDB(db_name)
+    before = time_start(db, runs)
+    start = time.perf_counter()
+    archived = db.archive_completed(older_than_days, batch_size)
+    job = time.perf_counter() - start
+    return {
+        "before": before,
+        "after": time_start(db, runs),
+        "job": job,
+        "archived": archived,
+        "active": db.count_tasks(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the archive job from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Archive the tasks completed long ago."
+    )
+    parser.add_argument("--db", default="task_manager.db",
+                        help="database file to archive")
+    parser.add_argument("--days", type=float, default=30,
+                        help="days since completion, default 30")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="tasks moved per transaction")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time the TaskManager start before and after")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="starts timed for the benchmark")
+    args = parser.parse_args(argv)
+
+    if not args.benchmark:
+        archived = SQLiteDB(args.db).archive_completed(
+            args.days, args.batch_size
+        )
+        print(f"{archived} tasks archived.")
+        return
+    result = benchmark_archive(args.db, args.days, args.batch_size, args.runs)
+    print(f"{result['archived']} tasks archived in {result['job']:.2f} s, "
+          f"{result['active']} active tasks left")
+    print(f"start before: {result['before']:.3f} s")
+    print(f"start after:  {result['after']:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
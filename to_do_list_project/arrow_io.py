@@ -0,0 +1,162 @@
+"""
+arrow_io.py.
+
+This script converts the task rows of the database into typed Apache
+Arrow data, for the tables shown by the web UI and the Parquet files of
+the data warehouse.
+
+Rows are converted batch by batch with vectorised Arrow kernels:
+ids are integers, statuses and priorities are dictionary encoded, dates
+are timestamps, and assignees and categories are lists of strings.
+
+`pyarrow` is only imported when a conversion is requested, so the rest
+of the application does not pay for it.
+"""
+
+from typing import Iterable, List
+
+from .db import DB_DATE_FORMAT
+from .task import TaskPriority, TaskStatus
+
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+
+def task_schema():
+    """
+    Return the Arrow schema of the tasks.
+
+    Returns:
+        pyarrow.Schema: Schema of the exported tasks.
+    """
+    import pyarrow as pa
+
+    status = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("name", pa.string()),
+            ("description", pa.string()),
+            ("creation_date", pa.timestamp("s")),
+            ("due_date", pa.timestamp("s")),
+            ("assignee", pa.list_(pa.string())),
+            ("status", status),
+            ("priority", status),
+            ("categories", pa.list_(pa.string())),
+        ]
+    )
+
+
+def _enum_column(values, enum_class):
+    """Encode enum values stored as integers 1, 2, 3 as a dictionary."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    names = pa.array([member.name for member in enum_class])
+    indices = pc.subtract(pa.array(values, pa.int8()), pa.scalar(1, pa.int8()))
+    return pa.DictionaryArray.from_arrays(indices, names)
+
+
+def rows_to_record_batch(rows: List[tuple]):
+    """
+    Convert task rows of the database into an Arrow record batch.
+
+    Args:
+        rows (List[tuple]): Task rows in the column order of the db.
+
+    Returns:
+        pyarrow.RecordBatch: Typed batch following `task_schema`.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    schema = task_schema()
+    if not rows:
+        return pa.RecordBatch.from_pylist([], schema=schema)
+
+    (
+        ids,
+        names,
+        descriptions,
+        creation_dates,
+        due_dates,
+        assignees,
+        statuses,
+        priorities,
+        categories,
+    ) = zip(*rows)
+    string_list = pa.list_(pa.string())
+    categories = pa.array(categories, pa.string())
+
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(ids, pa.int64()),
+            pa.array(names, pa.string()),
+            pa.array(descriptions, pa.string()),
+            pc.strptime(
+                pa.array(creation_dates, pa.string()), DB_DATE_FORMAT, "s"
+            ),
+            pc.strptime(
+                pa.array(due_dates, pa.string()), DB_DATE_FORMAT, "s"
+            ),
+            pc.split_pattern_regex(pa.array(assignees, pa.string()), r",\s*"),
+            _enum_column(statuses, TaskStatus),
+            _enum_column(priorities, TaskPriority),
+            pc.if_else(
+                pc.equal(categories, ""),
+                pa.scalar([], string_list),
+                pc.utf8_split_whitespace(categories),
+            ),
+        ],
+        schema=schema,
+    )
+
+
+def rows_to_table(batches: Iterable[List[tuple]]):
+    """
+    Build an Arrow table from batches of task rows.
+
+    Each batch becomes one chunk of the table, so the converted columns
+    are referenced by the table instead of being concatenated again.
+
+    Args:
+        batches (Iterable[List[tuple]]): Batches of task rows.
+
+    Returns:
+        pyarrow.Table: Typed table following `task_schema`.
+    """
+    import pyarrow as pa
+
+    return pa.Table.from_batches(
+        [rows_to_record_batch(rows) for rows in batches], task_schema()
+    )
+
+
+def write_parquet(
+    batches: Iterable[List[tuple]],
+    path: str,
+    compression: str = "zstd",
+) -> int:
+    """
+    Write batches of task rows to a Parquet file, one row group each.
+
+    Only one batch is converted and held in memory at a time.
+
+    Args:
+        batches (Iterable[List[tuple]]): Batches of task rows.
+        path (str): Parquet file to write.
+        compression (str): Parquet compression codec.
+
+    Returns:
+        int: Number of rows written.
+    """
+    import pyarrow.parquet as pq
+
+    written = 0
+    with pq.ParquetWriter(
+        path, task_schema(), compression=compression
+    ) as writer:
+        for rows in batches:
+            batch = rows_to_record_batch(rows)
+            writer.write_batch(batch, row_group_size=batch.num_rows)
+            written += batch.num_rows
+    return written
@@ -0,0 +1,230 @@
+"""
+changes.py.
+
+This script delivers the changes made to the tasks to subscribers, such
+as live views that patch what they display instead of reading it again.
+
+A `ChangeFeed` reads what changed since its last poll from the database:
+the tasks added are the ones with an id above the highest seen, and the
+tasks modified, completed or removed are the ones in the `task_changes`
+log, told apart by their current row. Several writes to a task between
+two polls are delivered as one event for its latest state, which is what
+a view needs to catch up. Archived tasks leave the active tasks, so they
+are delivered as removed. When `maintain` pruned the log past the last
+poll, every subscriber receives a "reset" event instead, whatever its
+filter, and reads again what it shows.
+
+A poll only reads the log when `PRAGMA data_version` shows the database
+was written. `TaskManager` polls after each of its writes, so the changes
+made in-process are delivered at once, and the background thread started
+by `start` polls at an interval for the changes of other processes.
+"""
+
+import itertools
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, TypedDict
+
+from .db import SQLiteDB, TaskChanges
+from .task import TaskStatus
+
+EVENT_KINDS = ("added", "modified", "completed", "removed")
+# Event telling that the changes are unknown, with no task ids.
+RESET = "reset"
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeEvent(TypedDict):
+    """Tasks that changed in the same way."""
+
+    kind: str
+    task_ids: List[int]
+
+
+class ChangeFilter(TypedDict, total=False):
+    """Events a subscriber receives, all of them by default."""
+
+    kinds: Iterable[str]
+    task_ids: Iterable[int]
+
+
+ChangeCallback = Callable[[ChangeEvent], None]
+
+
+def change_events(changes: TaskChanges) -> List[ChangeEvent]:
+    """
+    Sort the tasks written since a poll into events.
+
+    Args:
+        changes (TaskChanges): Tasks read by `SQLiteDB.changes_since`.
+
+    Returns:
+        List[ChangeEvent]: One event per kind of change that happened, or
+        a single "reset" event when the log no longer holds them.
+    """
+    if changes.get("pruned"):
+        return [{"kind": RESET, "task_ids": []}]
+    task_ids: Dict[str, List[int]] = {kind: [] for kind in EVENT_KINDS}
+    task_ids["added"] = list(changes["added"])
+    for task_id, status in changes["changed"]:
+        if status is None:
+            task_ids["removed"].append(task_id)
+        elif status == TaskStatus.COMPLETE.value:
+            task_ids["completed"].append(task_id)
+        else:
+            task_ids["modified"].append(task_id)
+    return [
+        {"kind": kind, "task_ids": ids}
+        for kind, ids in task_ids.items()
+        if ids
+    ]
+
+
+class ChangeFeed:
+    """Changes of the tasks of a database, delivered to subscribers."""
+
+    def __init__(self, db: SQLiteDB) -> None:
+        """
+        Initialize the ChangeFeed object.
+
+        Only the changes made after it is created are delivered.
+
+        Args:
+            db (SQLiteDB): Database whose changes are followed, or a
+                `ShardedSQLiteDB`, whose positions in the change log are
+                kept per shard.
+        """
+        self.db = db
+        self._subscribers: Dict[int, tuple] = {}
+        self._subscription_ids = itertools.count(1)
+        # Reentrant, so that callbacks can write tasks and poll again.
+        self._lock = threading.RLock()
+        self._version = db.data_version()
+        position = db.changes_since()
+        self._change_counter = position["change_counter"]
+        self._last_id = position["last_id"]
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def __len__(self) -> int:
+        """Return the number of subscribers."""
+        return len(self._subscribers)
+
+    def subscribe(
+        self, callback: ChangeCallback, filter: Optional[ChangeFilter] = None
+    ) -> int:
+        """
+        Call a function with the changes matching a filter.
+
+        Args:
+            callback (ChangeCallback): Function receiving the events.
+            filter (ChangeFilter, optional): Kinds of events and tasks the
+                callback receives; events are reduced to the tasks asked
+                for and dropped when none is left.
+
+        Returns:
+            int: Subscription id, to unsubscribe.
+
+        Raises:
+            ValueError: If the filter holds an unknown kind of event.
+        """
+        filter = filter or {}
+        kinds = set(filter.get("kinds", EVENT_KINDS))
+        unknown = kinds.difference(EVENT_KINDS)
+        if unknown:
+            raise ValueError(
+                f"Unknown change kinds {sorted(unknown)}, "
+                f"use {', '.join(EVENT_KINDS)}"
+            )
+        task_ids = filter.get("task_ids")
+        if task_ids is not None:
+            task_ids = set(task_ids)
+        with self._lock:
+            subscription = next(self._subscription_ids)
+            self._subscribers[subscription] = (callback, kinds, task_ids)
+        return subscription
+
+    def unsubscribe(self, subscription: int) -> None:
+        """Stop calling the callback of a subscription."""
+        with self._lock:
+            self._subscribers.pop(subscription, None)
+
+    def poll(self) -> int:
+        """
+        Deliver the changes made since the last poll.
+
+        Returns:
+            int: Number of events found.
+        """
+        with self._lock:
+            version = self.db.data_version()
+            if version == self._version:
+                return 0
+            # A write made while the log is read changes the version again,
+            # and is read on the next poll if it was missed by this one.
+            self._version = version
+            changes = self.db.changes_since(
+                self._change_counter, self._last_id
+            )
+            self._change_counter = changes["change_counter"]
+            self._last_id = changes["last_id"]
+            events = change_events(changes)
+            for event in events:
+                self._deliver(event)
+            return len(events)
+
+    def _deliver(self, event: ChangeEvent) -> None:
+        """Call the subscribers interested in an event."""
+        for callback, kinds, task_ids in list(self._subscribers.values()):
+            matching = event
+            # A reset concerns every subscriber, whatever its filter.
+            if event["kind"] != RESET and event["kind"] not in kinds:
+                continue
+            if event["kind"] != RESET and task_ids is not None:
+                matching = {
+                    "kind": event["kind"],
+                    "task_ids": [
+                        task_id
+                        for task_id in event["task_ids"]
+                        if task_id in task_ids
+                    ],
+                }
+                if not matching["task_ids"]:
+                    continue
+            try:
+                callback(matching)
+            except Exception:
+                logger.exception(f"Change callback failed: {callback}")
+
+    def _run(self, interval: float) -> None:
+        """Poll at an interval until stopped."""
+        while not self._stopping.wait(interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling the task changes failed")
+
+    def start(self, interval: float = 1.0) -> None:
+        """
+        Poll for the changes of other processes in a background thread.
+
+        Args:
+            interval (float): Seconds between two polls.
+        """
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="change-feed",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and wait for it."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,628 @@
+"""
+cli.py.
+
+This is the non-interactive command line interface of the Task Manager
+application, meant for scripting. Each command does one operation and
+exits, and `--json` switches the output to JSON:
+
+    todo add "Write report" --due 2030/01/31 --assignee Alice,Bob
+    todo add "Stand-up" --due 2030/01/07 --assignee Alice \
+        --repeat "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"
+    todo occurrences --from 2030/01/01 --to 2030/12/31
+    todo done-occurrence 1 2030/01/08
+    todo rm 3
+    todo done 4
+    todo done 4 5 6
+    todo done --assignee Alice --category Sprint-12
+    todo reassign Alice Bob --status in_progress
+    todo priority high --due-before 2030/02/01
+    todo edit 5 --name "New name"
+    todo ls --status in_progress --limit 20
+    todo due --overdue
+    todo import tasks.csv --format csv
+    todo export tasks.parquet
+    todo archive --days 30
+    todo maintain
+    todo --json stats
+
+With several ids or a filter, `rm`, `done`, `reassign` and `priority`
+change all the matching tasks with one statement in one transaction.
+
+The commands only touch the database: the tasks are never all loaded in
+memory, and `tabulate` is only imported when a table is printed.
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import json
+import sqlite3
+import sys
+from typing import List, Optional
+
+from .arrow_io import DEFAULT_ROW_GROUP_SIZE
+from .db import KEEP_CHANGES, SQLiteDB, TASK_COLUMNS, TaskQuery
+from .importer import IMPORT_FORMATS
+from .recurrence import RecurrenceRule
+from .task import TaskPriority, TaskStatus
+from .task_manager import TaskConflictError, TaskManager, TaskNotFoundError
+
+STATUS_CHOICES = [status.name.lower() for status in TaskStatus]
+PRIORITY_CHOICES = [priority.name.lower() for priority in TaskPriority]
+
+
+class CommandError(Exception):
+    """Exception raised when a command cannot be carried out."""
+
+
+def parse_due_date(date_str: str) -> datetime:
+    """Parse a due date given as YYYY/MM/DD."""
+    try:
+        return datetime.strptime(date_str, "%Y/%m/%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Invalid date format. It should be YYYY/MM/DD."
+        )
+
+
+def split_list(value: str) -> List[str]:
+    """Split a comma separated argument into a list of values."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def task_to_dict(task_row: tuple) -> dict:
+    """
+    Convert a task row of the database into a JSON friendly dict.
+
+    Args:
+        task_row (tuple): Task data in the column order of the db.
+
+    Returns:
+        dict: Task data with status and priority names.
+    """
+    task = dict(zip(TASK_COLUMNS, task_row))
+    task["status"] = TaskStatus(task["status"]).name
+    task["priority"] = TaskPriority(task["priority"]).name
+    return task
+
+
+def print_tasks(task_rows: List[tuple], as_json: bool) -> None:
+    """Print task rows as JSON or as a table."""
+    if as_json:
+        print(json.dumps([task_to_dict(row) for row in task_rows], indent=2))
+    elif not task_rows:
+        print("No tasks.")
+    else:
+        from tabulate import tabulate
+
+        print(tabulate(task_rows, headers=TASK_COLUMNS, tablefmt="simple"))
+
+
+def report(args: argparse.Namespace, message: str, data: dict) -> None:
+    """Print the outcome of a command as a message or as JSON."""
+    print(json.dumps(data) if args.json else message)
+
+
+def get_existing_task(task_manager: TaskManager, task_id: int) -> tuple:
+    """Return the row of a task, failing when it does not exist."""
+    task_row = task_manager.find_task(task_id)
+    if task_row is None:
+        raise CommandError(f"Task with ID {task_id} not found.")
+    return task_row
+
+
+def parse_rule(text: str) -> RecurrenceRule:
+    """Parse a recurrence rule such as "FREQ=WEEKLY;BYDAY=MO,TH"."""
+    try:
+        return RecurrenceRule.parse(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def command_add(task_manager: TaskManager, args: argparse.Namespace) -> None:
+    """Add a task, or a recurring task."""
+    try:
+        if args.repeat is not None:
+            series_id = task_manager.add_recurring_task(
+                args.name,
+                args.description or args.name,
+                args.due,
+                args.assignee,
+                args.repeat,
+                priority=TaskPriority[args.priority.upper()],
+                categories=args.category,
+            )
+            report(
+                args,
+                f"Recurring task {series_id} added.",
+                {"series_id": series_id},
+            )
+            return
+        task_id = task_manager.add_task(
+            args.name,
+            args.description or args.name,
+            args.due,
+            args.assignee,
+            status=TaskStatus[args.status.upper()],
+            priority=TaskPriority[args.priority.upper()],
+            categories=args.category,
+        )
+    except ValueError as e:
+        raise CommandError(str(e))
+    report(args, f"Task {task_id} added.", {"id": task_id})
+
+
+def selection_query(args: argparse.Namespace) -> TaskQuery:
+    """Build the filter of a set-based command from its options."""
+    query: TaskQuery = {}
+    if args.status:
+        query["status"] = TaskStatus[args.status.upper()]
+    if args.filter_priority:
+        query["priority"] = TaskPriority[args.filter_priority.upper()]
+    if args.assignee:
+        query["assignee"] = args.assignee
+    if args.category:
+        query["category"] = args.category
+    due_before = args.due_before
+    if args.overdue:
+        due_before = min(due_before or datetime.max, datetime.now())
+    if due_before is not None:
+        query["due_before"] = due_before
+    return query
+
+
+def single_task(args: argparse.Namespace) -> Optional[int]:
+    """Return the id of a command given exactly one id and no filter."""
+    if len(args.ids) == 1 and not selection_query(args):
+        return args.ids[0]
+    return None
+
+
+def selection(args: argparse.Namespace) -> tuple:
+    """
+    Return the filter and ids selecting the tasks of a set-based command.
+
+    Raises:
+        CommandError: If neither ids nor a filter are given.
+    """
+    query = selection_query(args)
+    task_ids = args.ids or None
+    if not query and task_ids is None:
+        raise CommandError("Give task ids or a filter.")
+    return query, task_ids
+
+
+def report_ids(
+    args: argparse.Namespace, task_ids: List[int], action: str
+) -> None:
+    """Print the tasks changed by a set-based command."""
+    listed = ", ".join(str(task_id) for task_id in task_ids)
+    message = f"{len(task_ids)} tasks {action}"
+    report(args, f"{message}: {listed}." if listed else f"{message}.",
+           {"ids": task_ids})
+
+
+def command_rm(task_manager: TaskManager, args: argparse.Namespace) -> None:
+    """Remove a task, or all the tasks given or matching a filter."""
+    task_id = single_task(args)
+    if task_id is not None:
+        get_existing_task(task_manager, task_id)
+        task_manager.remove_task(task_id)
+        report(args, f"Task {task_id} removed.", {"id": task_id})
+        return
+    report_ids(args, task_manager.remove_where(*selection(args)), "removed")
+
+
+def command_done(task_manager: TaskManager, args: argparse.Namespace) -> None:
+    """Mark a task, or all the tasks given or matching a filter, complete."""
+    task_id = single_task(args)
+    if task_id is not None:
+        get_existing_task(task_manager, task_id)
+        task_manager.complete_task(task_id)
+        report(args, f"Task {task_id} marked as complete.", {"id": task_id})
+        return
+    report_ids(
+        args,
+        task_manager.complete_where(*selection(args)),
+        "marked as complete",
+    )
+
+
+def command_reassign(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Give the tasks of an assignee to another one."""
+    try:
+        reassigned = task_manager.reassign(
+            args.from_assignee,
+            args.to_assignee,
+            selection_query(args),
+            args.ids or None,
+        )
+    except ValueError as e:
+        raise CommandError(str(e))
+    report_ids(args, reassigned, f"reassigned to {args.to_assignee}")
+
+
+def command_priority(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Change the priority of the tasks given or matching a filter."""
+    priority = TaskPriority[args.level.upper()]
+    report_ids(
+        args,
+        task_manager.set_priority_where(priority, *selection(args)),
+        f"set to {args.level} priority",
+    )
+
+
+def command_edit(task_manager: TaskManager, args: argparse.Namespace) -> None:
+    """Modify the name, description, due date or assignees of a task."""
+    try:
+        task_manager.modify_task(
+            args.id, args.name, args.description, args.due, args.assignee,
+            expected_version=args.version,
+        )
+    except TaskNotFoundError:
+        raise CommandError(f"Task with ID {args.id} not found.")
+    except TaskConflictError as e:
+        raise CommandError(f"{e}, the task was not modified.")
+    except ValueError as e:
+        raise CommandError(str(e))
+    print_tasks([get_existing_task(task_manager, args.id)], args.json)
+
+
+def command_import(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Import the tasks of a CSV or JSON lines file."""
+    try:
+        import_report = task_manager.import_file(
+            args.path,
+            format=args.format,
+            allow_past_due=args.allow_past_due,
+        )
+    except OSError as e:
+        raise CommandError(str(e))
+    if args.json:
+        print(json.dumps(import_report, indent=2))
+        return
+    print(f"{import_report['imported']} tasks imported.")
+    for row in import_report["rejected"]:
+        print(f"Line {row['line']} rejected: {row['error']}")
+
+
+def command_export(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Export the tasks to a Parquet file."""
+    try:
+        exported = task_manager.export_parquet(
+            args.path, row_group_size=args.row_group_size
+        )
+    except (OSError, sqlite3.Error) as e:
+        raise CommandError(str(e))
+    report(args, f"{exported} tasks exported.", {"exported": exported})
+
+
+def command_ls(task_manager: TaskManager, args: argparse.Namespace) -> None:
+    """List tasks."""
+    status = TaskStatus[args.status.upper()] if args.status else None
+    print_tasks(
+        task_manager.query_tasks(
+            status, args.limit, args.offset,
+            include_archived=args.archived,
+        ),
+        args.json,
+    )
+
+
+def command_archive(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Move the tasks completed long ago to the archive."""
+    archived = task_manager.archive_completed(args.days, args.batch_size)
+    report(args, f"{archived} tasks archived.", {"archived": archived})
+
+
+def command_maintain(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Shrink the database and refresh its statistics."""
+    maintenance = task_manager.maintain(
+        args.pages, args.pause, args.analyze, args.migrate, args.keep_changes
+    )
+    if args.json:
+        print(json.dumps(maintenance, indent=2))
+        return
+    print(f"Auto-vacuum: {maintenance['auto_vacuum']}")
+    print(f"Size: {maintenance['size_before'] / 1e6:.1f} MB -> "
+          f"{maintenance['size_after'] / 1e6:.1f} MB "
+          f"({maintenance['freed_bytes'] / 1e6:.1f} MB freed)")
+    print(f"Vacuum steps: {maintenance['vacuum_steps']}, longest "
+          f"{maintenance['longest_step_ms']:.1f} ms")
+    print(f"Change log: {maintenance['changes_pruned']} entries pruned")
+    if maintenance["auto_vacuum"] != "incremental":
+        print(f"{maintenance['free_pages_left']} free pages kept, run with "
+              "--migrate once to release them")
+
+
+def command_due(task_manager: TaskManager, args: argparse.Namespace) -> None:
+    """List the open tasks by due date."""
+    end = None
+    if args.to is not None:
+        # The whole last day is included.
+        end = args.to + timedelta(days=1, seconds=-1)
+    if args.overdue:
+        end = min(end or datetime.max, datetime.now())
+    print_tasks(
+        task_manager.query_due(args.from_, end, args.limit), args.json
+    )
+
+
+def command_occurrences(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """List the occurrences of the recurring tasks in a period."""
+    start = args.from_ or datetime.now().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    end = (args.to or start + timedelta(days=6)) + timedelta(
+        days=1, seconds=-1
+    )
+    occurrences = list(task_manager.occurrences(start, end, args.series))
+    if args.json:
+        print(json.dumps(
+            [
+                dict(task_to_dict(occurrence.row), series_id=occurrence[0])
+                for occurrence in occurrences
+            ],
+            indent=2,
+        ))
+    elif not occurrences:
+        print("No occurrences.")
+    else:
+        from tabulate import tabulate
+
+        print(tabulate(
+            [(occurrence[0], *occurrence.row) for occurrence in occurrences],
+            headers=("series_id",) + TASK_COLUMNS,
+            tablefmt="simple",
+        ))
+
+
+def command_done_occurrence(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Mark the occurrence of a recurring task on a day as complete."""
+    day = list(task_manager.occurrences(
+        args.date, args.date + timedelta(days=1, seconds=-1), args.series
+    ))
+    if not day:
+        raise CommandError(
+            f"Recurring task {args.series} has no occurrence on "
+            f"{args.date:%Y/%m/%d}."
+        )
+    task_id = task_manager.complete_occurrence(args.series, day[0].due_date)
+    report(
+        args, f"Occurrence stored as task {task_id}, completed.",
+        {"id": task_id},
+    )
+
+
+def command_stats(
+    task_manager: TaskManager, args: argparse.Namespace
+) -> None:
+    """Print task counts by status and priority."""
+    stats = task_manager.get_stats()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    print(f"Total: {stats['total']}")
+    print(f"Overdue: {stats['overdue']}")
+    for group in ("by_status", "by_priority"):
+        for name, count in sorted(stats[group].items()):
+            print(f"{name.replace('_', ' ').title()}: {count}")
+
+
+def add_ids_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the ids selecting the tasks of a set-based command."""
+    parser.add_argument("ids", type=int, nargs="*",
+                        help="ids of the tasks, all matching ones if none")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the parser of the todo command and its subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="todo", description="Manage tasks from scripts."
+    )
+    parser.add_argument("--db", default="task_manager.db",
+                        help="database file to use")
+    parser.add_argument("--json", action="store_true",
+                        help="print the output as JSON")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Options selecting the tasks of the set-based commands.
+    selected = argparse.ArgumentParser(add_help=False)
+    selected.add_argument("--status", choices=STATUS_CHOICES)
+    selected.add_argument("--priority", dest="filter_priority",
+                          choices=PRIORITY_CHOICES)
+    selected.add_argument("--assignee", help="one of the assignees")
+    selected.add_argument("--category", help="one of the categories")
+    selected.add_argument("--due-before", type=parse_due_date,
+                          help="due before this date, YYYY/MM/DD")
+    selected.add_argument("--overdue", action="store_true",
+                          help="only the tasks past their due date")
+
+    add = subparsers.add_parser("add", help="add a task")
+    add.add_argument("name")
+    add.add_argument("--description", help="defaults to the name")
+    add.add_argument("--due", type=parse_due_date, required=True,
+                     help="due date, YYYY/MM/DD")
+    add.add_argument("--assignee", type=split_list, required=True,
+                     help="comma separated assignees")
+    add.add_argument("--priority", choices=PRIORITY_CHOICES,
+                     default="medium")
+    add.add_argument("--status", choices=STATUS_CHOICES,
+                     default="in_progress")
+    add.add_argument("--category", type=split_list, default=[],
+                     help="comma separated categories")
+    add.add_argument("--repeat", type=parse_rule,
+                     help="recurrence rule from the due date on, such as "
+                          "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO;UNTIL=20301231")
+    add.set_defaults(handler=command_add)
+
+    rm = subparsers.add_parser(
+        "rm", parents=[selected], help="remove tasks"
+    )
+    add_ids_argument(rm)
+    rm.set_defaults(handler=command_rm)
+
+    done = subparsers.add_parser(
+        "done", parents=[selected], help="mark tasks as complete"
+    )
+    add_ids_argument(done)
+    done.set_defaults(handler=command_done)
+
+    reassign = subparsers.add_parser(
+        "reassign", parents=[selected],
+        help="give the tasks of an assignee to another one",
+    )
+    reassign.add_argument("from_assignee", metavar="from")
+    reassign.add_argument("to_assignee", metavar="to")
+    add_ids_argument(reassign)
+    reassign.set_defaults(handler=command_reassign)
+
+    priority = subparsers.add_parser(
+        "priority", parents=[selected], help="change the priority of tasks"
+    )
+    priority.add_argument("level", choices=PRIORITY_CHOICES)
+    add_ids_argument(priority)
+    priority.set_defaults(handler=command_priority)
+
+    edit = subparsers.add_parser("edit", help="modify a task")
+    edit.add_argument("id", type=int)
+    edit.add_argument("--name")
+    edit.add_argument("--description")
+    edit.add_argument("--due", type=parse_due_date,
+                      help="due date, YYYY/MM/DD")
+    edit.add_argument("--assignee", type=split_list,
+                      help="comma separated assignees")
+    edit.add_argument("--version", type=int,
+                      help="only modify the task if still at this version")
+    edit.set_defaults(handler=command_edit)
+
+    import_ = subparsers.add_parser(
+        "import", help="import tasks from a CSV or JSON lines file"
+    )
+    import_.add_argument("path")
+    import_.add_argument("--format", choices=IMPORT_FORMATS, default="csv")
+    import_.add_argument("--allow-past-due", action="store_true",
+                         help="accept due dates in the past")
+    import_.set_defaults(handler=command_import)
+
+    export = subparsers.add_parser(
+        "export", help="export the tasks to a Parquet file"
+    )
+    export.add_argument("path")
+    export.add_argument("--row-group-size", type=int,
+                        default=DEFAULT_ROW_GROUP_SIZE,
+                        help="tasks per Parquet row group")
+    export.set_defaults(handler=command_export)
+
+    ls = subparsers.add_parser("ls", help="list tasks")
+    ls.add_argument("--status", choices=STATUS_CHOICES)
+    ls.add_argument("--limit", type=int)
+    ls.add_argument("--offset", type=int, default=0)
+    ls.add_argument("--archived", action="store_true",
+                    help="include the archived tasks")
+    ls.set_defaults(handler=command_ls)
+
+    archive = subparsers.add_parser(
+        "archive", help="archive the tasks completed long ago"
+    )
+    archive.add_argument("--days", type=float, default=30,
+                         help="days since completion, default 30")
+    archive.add_argument("--batch-size", type=int, default=1000,
+                         help="tasks moved per transaction")
+    archive.set_defaults(handler=command_archive)
+
+    maintain = subparsers.add_parser(
+        "maintain", help="shrink the database and refresh its statistics"
+    )
+    maintain.add_argument("--pages", type=int, default=256,
+                          help="pages released per transaction")
+    maintain.add_argument("--pause", type=float, default=0.02,
+                          help="seconds between two transactions")
+    maintain.add_argument("--analyze", action="store_true",
+                          help="run a sampled ANALYZE of every index")
+    maintain.add_argument("--migrate", action="store_true",
+                          help="switch an existing database to incremental "
+                               "vacuum first (locks it while rebuilt)")
+    maintain.add_argument("--keep-changes", type=int, default=KEEP_CHANGES,
+                          help="writes whose entries stay in the change log")
+    maintain.set_defaults(handler=command_maintain)
+
+    due = subparsers.add_parser(
+        "due", help="list the open tasks due next"
+    )
+    due.add_argument("--overdue", action="store_true",
+                     help="only the tasks past their due date")
+    due.add_argument("--from", dest="from_", type=parse_due_date,
+                     help="earliest due date, YYYY/MM/DD")
+    due.add_argument("--to", type=parse_due_date,
+                     help="latest due date, YYYY/MM/DD")
+    due.add_argument("--limit", type=int, default=10)
+    due.set_defaults(handler=command_due)
+
+    occurrences = subparsers.add_parser(
+        "occurrences", help="list the occurrences of recurring tasks"
+    )
+    occurrences.add_argument("--from", dest="from_", type=parse_due_date,
+                             help="first day, YYYY/MM/DD, today by default")
+    occurrences.add_argument("--to", type=parse_due_date,
+                             help="last day, YYYY/MM/DD, a week later by "
+                                  "default")
+    occurrences.add_argument("--series", type=int,
+                             help="only this recurring task")
+    occurrences.set_defaults(handler=command_occurrences)
+
+    done_occurrence = subparsers.add_parser(
+        "done-occurrence", help="complete an occurrence of a recurring task"
+    )
+    done_occurrence.add_argument("series", type=int)
+    done_occurrence.add_argument("date", type=parse_due_date,
+                                 help="day of the occurrence, YYYY/MM/DD")
+    done_occurrence.set_defaults(handler=command_done_occurrence)
+
+    stats = subparsers.add_parser("stats", help="count tasks")
+    stats.set_defaults(handler=command_stats)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run one todo command.
+
+    Args:
+        argv (List[str], optional): Command line arguments. Defaults to
+            the arguments of the process.
+
+    Returns:
+        int: Exit code, 0 on success and 1 when the command failed.
+    """
+    args = build_parser().parse_args(argv)
+    task_manager = TaskManager(SQLiteDB(args.db), lazy=True)
+    try:
+        args.handler(task_manager, args)
+    except CommandError as e:
+        if args.json:
+            print(json.dumps({"error": str(e)}))
+        else:
+            print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
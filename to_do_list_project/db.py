@@ -12,245 +12,2550 @@ to a task manager application.This includes methods for adding,
 removing, and updating tasks, among others.
 """
 
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+import json
 import logging
 import os
+import random
 import sqlite3
-from typing import List, Type, Union
+import threading
+import time
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypedDict,
+    TypeVar,
+    Union,
+)
 
-from .task import TaskData, TaskStatus
+from .query_log import SLOW_QUERY_ENV_VAR, SlowQueryLog
+from .task import TaskData, TaskPriority, TaskStatus
+
+DB_DATE_FORMAT = "%Y/%m/%d %H:%M:%S"
+
+# Set to 1 to serve the reads of the default database from a replica.
+READ_REPLICA_ENV_VAR = "TODO_READ_REPLICA"
+
+TASK_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "creation_date",
+    "due_date",
+    "assignee",
+    "status",
+    "priority",
+    "category",
+)
+
+# Columns the tasks are commonly sorted by, indexed so that any page of
+# a sorted listing is read without sorting the whole table.
+INDEXED_COLUMNS = ("creation_date", "due_date", "priority")
+
+COMPLETIONS_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS task_completions "
+    "(task_id INTEGER PRIMARY KEY, completed_at DATETIME NOT NULL)"
+)
+ARCHIVE_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS archived_tasks (id INTEGER PRIMARY KEY, "
+    "name TEXT, description TEXT, creation_date DATETIME, "
+    "due_date DATETIME, assignee TEXT, status INTEGER, priority INTEGER, "
+    "category TEXT, completed_at DATETIME)"
+)
+# Dependencies between tasks, one row per task and task it waits for;
+# the index finds the tasks waiting for a completed or removed one.
+EDGES_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS task_edges (task_id INTEGER NOT NULL, "
+    "depends_on INTEGER NOT NULL, PRIMARY KEY (task_id, depends_on)) "
+    "WITHOUT ROWID"
+)
+EDGES_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_task_edges_depends_on "
+    "ON task_edges (depends_on)"
+)
+# Recurring tasks, stored once with their rule, and the occurrences
+# stored as tasks once completed or edited, by series and date; a
+# removed occurrence keeps its row without task id.
+SERIES_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS task_series (id INTEGER PRIMARY KEY, "
+    "name TEXT, description TEXT, creation_date DATETIME, "
+    "due_date DATETIME, assignee TEXT, status INTEGER, priority INTEGER, "
+    "category TEXT, rule TEXT NOT NULL)"
+)
+OCCURRENCES_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS task_occurrences "
+    "(series_id INTEGER NOT NULL, due_date DATETIME NOT NULL, "
+    "task_id INTEGER, PRIMARY KEY (series_id, due_date)) "
+    "WITHOUT ROWID"
+)
+OCCURRENCES_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_task_occurrences_due_date "
+    "ON task_occurrences (due_date)"
+)
+OCCURRENCES_TASK_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_task_occurrences_task_id "
+    "ON task_occurrences (task_id)"
+)
+
+AUTO_VACUUM_INCREMENTAL = 2
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+# Values of `PRAGMA synchronous` a bulk load can run with.
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+# Write transactions whose entries `maintain` keeps in the change log;
+# readers further behind read everything again.
+KEEP_CHANGES = 10000
+# Entries of the change log deleted per transaction when it is pruned.
+PRUNE_BATCH = 10000
+
+T = TypeVar("T")
+
+
+class TaskConflictError(Exception):
+    """Exception raised when a task changed since the version a write read."""
+
+    def __init__(
+        self,
+        task_id: int,
+        expected_version: Optional[int],
+        current: Optional[tuple],
+        current_version: Optional[int],
+    ) -> None:
+        """
+        Initialize the TaskConflictError object.
+
+        Args:
+            task_id (int): Id of the task written.
+            expected_version (int, optional): Version the write was based on.
+            current (tuple, optional): Current data of the task, None when
+                it was removed.
+            current_version (int, optional): Current version of the task.
+        """
+        if current is None:
+            message = f"Task {task_id} was removed"
+        else:
+            message = (
+                f"Task {task_id} is at version {current_version}, "
+                f"not {expected_version}"
+            )
+        super().__init__(message)
+        self.task_id = task_id
+        self.expected_version = expected_version
+        self.current = current
+        self.current_version = current_version
+
+
+class MaintenanceReport(TypedDict):
+    """Outcome of a maintenance run."""
+
+    auto_vacuum: str
+    size_before: int
+    size_after: int
+    freed_bytes: int
+    free_pages_left: int
+    vacuum_steps: int
+    longest_step_ms: float
+    changes_pruned: int
+    seconds: float
+
+
+class TaskChanges(TypedDict):
+    """Tasks written since a change, read from one snapshot."""
+
+    change_counter: int
+    last_id: int
+    changed: List[Tuple[int, Optional[int]]]
+    added: List[int]
+    # The log no longer holds every change made after the one asked
+    # for: `changed` is empty and everything has to be read again.
+    pruned: bool
+
+
+class TaskQuery(TypedDict, total=False):
+    """Filter, order and page of tasks read from the database."""
+
+    status: TaskStatus
+    priority: TaskPriority
+    assignee: str
+    category: str
+    due_before: datetime
+    order_by: str
+    descending: bool
+    limit: int
+    offset: int
+
+
+def task_filter(query: TaskQuery) -> Tuple[Optional[str], tuple]:
+    """
+    Build the WHERE clause of a task query.
+
+    Args:
+        query (TaskQuery): Query holding the status, priority, assignee,
+            category and latest due date wanted.
+
+    Returns:
+        Tuple[Optional[str], tuple]: Condition, or None to match every
+        task, and its parameters.
+    """
+    conditions, params = [], []
+    for column in ("status", "priority"):
+        if query.get(column) is not None:
+            conditions.append(f"{column} = ?")
+            params.append(query[column].value)
+    # Assignees are stored separated by commas, categories by spaces.
+    if query.get("assignee") is not None:
+        conditions.append(
+            "instr(',' || replace(assignee, ', ', ',') || ',', ?) > 0"
+        )
+        params.append(f",{query['assignee']},")
+    if query.get("category") is not None:
+        conditions.append("instr(' ' || category || ' ', ?) > 0")
+        params.append(f" {query['category']} ")
+    if query.get("due_before") is not None:
+        conditions.append("due_date < ?")
+        params.append(query["due_before"].strftime(DB_DATE_FORMAT))
+    return " AND ".join(conditions) or None, tuple(params)
 
 
 class SQLiteDB:
     """A class for managing tasks in a SQLite database."""
 
-    def __init__(self, db_name: str = "task_manager.db") -> None:
-        """Initialize the SQLiteDB object.
+    def __init__(
+        self,
+        db_name: str = "task_manager.db",
+        slow_query_threshold_ms: Optional[float] = None,
+        busy_timeout: float = 5.0,
+        max_retries: int = 5,
+        retry_backoff: float = 0.05,
+        read_replica: Optional[bool] = None,
+        replica_max_lag: float = 0.0,
+        replica_step_pages: int = 1024,
+    ) -> None:
+        """Initialize the SQLiteDB object.
+
+        Sets up the database connection and the logger for db operations.
+
+        Args:
+            db_name (str): Name of the db file. Default is "task_manager.db".
+            slow_query_threshold_ms (float, optional): Log the statements
+                slower than this many milliseconds. Defaults to the
+                `TODO_SLOW_QUERY_MS` environment variable, and to no
+                slow-query log when it is not set either.
+            busy_timeout (float): Seconds SQLite waits for a lock held by
+                another connection before giving up.
+            max_retries (int): Times a write is retried when the lock
+                still could not be taken.
+            retry_backoff (float): First retry delay in seconds, doubled
+                after each attempt.
+            read_replica (bool, optional): Serve the reads from an
+                in-memory copy of the database, copied again when it has
+                been written. Defaults to the `TODO_READ_REPLICA`
+                environment variable, and to no replica when it is not set.
+            replica_max_lag (float): Seconds during which the replica is
+                used without checking whether the database changed.
+            replica_step_pages (int): Pages copied per step of the backup
+                refreshing the replica.
+        """
+        current_dir = os.path.dirname(__file__)
+        parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+
+        if db_name == "file::memory:?cache=shared":
+            self.db_name = db_name
+        else:
+            self.db_name = os.path.join(parent_dir, db_name)
+
+        # Connections are per thread, so that one object can serve the
+        # reads of several threads.
+        self._local = threading.local()
+        self._version_conn = None
+        self._version_lock = threading.Lock()
+        # Whether the tasks table is known to have its version column.
+        self._versioned = False
+        self.busy_timeout = busy_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        if read_replica is None:
+            read_replica = os.environ.get(READ_REPLICA_ENV_VAR, "0") != "0"
+        self.read_replica = read_replica
+        self.replica_max_lag = replica_max_lag
+        self.replica_step_pages = replica_step_pages
+        self.replica_refreshes = 0
+        self._replica_conn = None
+        self._replica_name = None
+        self._replica_version = None
+        self._replica_checked = 0.0
+        # Reentrant, as readers connect to the copy they just refreshed.
+        self._replica_lock = threading.RLock()
+        self.logger = self.setup_logger(
+            os.path.join(parent_dir, "logs", "data_base.log")
+        )
+
+        if slow_query_threshold_ms is None:
+            threshold = os.environ.get(SLOW_QUERY_ENV_VAR)
+            if threshold:
+                slow_query_threshold_ms = float(threshold)
+        self.slow_query_log = (
+            None
+            if slow_query_threshold_ms is None
+            else SlowQueryLog(slow_query_threshold_ms)
+        )
+
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        """Connection of the operation running in this thread."""
+        return getattr(self._local, "conn", None)
+
+    @conn.setter
+    def conn(self, conn: Optional[sqlite3.Connection]) -> None:
+        self._local.conn = conn
+
+    def setup_logger(self, log_file: str) -> Type[logging.Logger]:
+        """
+        Set up a logger to write all actions in data base.
+
+        Args:
+            log_file (str): path where the log file is stored.
+
+        Returns:
+            Type[logging.Logger]: Logger object.
+        """
+        logger = logging.getLogger("task_manager_database")
+        if not logger.handlers:
+            logger.setLevel(logging.INFO)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            file_handler = logging.FileHandler(log_file, delay=True)
+            file_handler.setFormatter(formatter)
+            logger.addHandler(file_handler)
+
+        return logger
+
+    @contextmanager
+    def _timed(
+        self,
+        sql: str,
+        params=(),
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> Iterator[None]:
+        """
+        Time the statement run inside the context for the slow-query log.
+
+        Fetching the rows has to happen inside the context too, since
+        SQLite only steps through a query while it is being read.
+
+        Args:
+            sql (str): Statement being run.
+            params: Parameters bound to the statement.
+            conn (sqlite3.Connection, optional): Connection the statement
+                runs on, whose query plan is captured. Defaults to
+                `self.conn`, which is not the one of a batch.
+        """
+        start = time.perf_counter()
+        yield
+        if self.slow_query_log is not None:
+            self.slow_query_log.record(
+                conn or self.conn, sql, params, time.perf_counter() - start
+            )
+
+    def slow_query_summary(self, top: int = 10) -> list:
+        """
+        Rank the slow statements seen by this database object.
+
+        Args:
+            top (int): Number of statements returned.
+
+        Returns:
+            list: Worst statements by total time, empty when the
+                  slow-query log is off.
+        """
+        if self.slow_query_log is None:
+            return []
+        return self.slow_query_log.summary(top)
+
+    def connect(self, read_only: bool = False) -> None:
+        """
+        Connect to the data base.
+
+        Args:
+            read_only (bool): The connection is only used to read tasks,
+                so it is opened on the read replica when there is one.
+        """
+        if read_only:
+            # Errors refreshing the replica reach the read, which retries
+            # on lock errors.
+            self.conn = self._open_reader()
+            self.logger.info(f"Connected to database: {self.db_name}")
+            return
+        try:
+            self.conn = sqlite3.connect(
+                self.db_name, uri=True, timeout=self.busy_timeout
+            )
+            self.logger.info(f"Connected to database: {self.db_name}")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error connecting to database: {e}")
+
+    @staticmethod
+    def is_lock_error(error: sqlite3.Error) -> bool:
+        """Tell whether an error comes from another connection's lock."""
+        message = str(error).lower()
+        return "locked" in message or "busy" in message
+
+    def _retry(self, operation: Callable[[], T]) -> T:
+        """
+        Run an operation, retrying it while the database is locked.
+
+        SQLite already waits up to `busy_timeout` seconds for the lock.
+        When it still cannot be taken, the operation is retried after an
+        exponential backoff with jitter instead of being dropped.
+
+        Args:
+            operation (Callable): Operation to run.
+
+        Returns:
+            The result of the operation.
+        """
+        attempt = 0
+        while True:
+            try:
+                return operation()
+            except sqlite3.OperationalError as e:
+                if not self.is_lock_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2**attempt
+                delay *= random.uniform(0.5, 1.5)
+                attempt += 1
+                self.logger.warning(
+                    f"Database locked, retry {attempt} in {delay:.3f}s: {e}"
+                )
+                time.sleep(delay)
+
+    def _write(
+        self,
+        operation: Callable[[sqlite3.Cursor], T],
+        task_ids: Iterable[int] = (),
+    ) -> T:
+        """
+        Run a write operation in its own transaction.
+
+        The connection is opened, committed and closed around the
+        operation, and the whole transaction is retried on lock errors.
+
+        Args:
+            operation (Callable): Operation receiving a cursor.
+            task_ids (Iterable[int]): Existing tasks modified or removed
+                by the operation, recorded in the change log.
+
+        Returns:
+            The result of the operation.
+        """
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            return self._write_in_batch(batch, operation, task_ids)
+
+        def transaction() -> T:
+            self.connect()
+            try:
+                cursor = self.conn.cursor()
+                self._ensure_versioned(cursor)
+                result = operation(cursor)
+                self._count_change(cursor, task_ids)
+                self.conn.commit()
+                return result
+            finally:
+                self.close_connection()
+
+        return self._retry(transaction)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Commit the writes made in this thread inside the context at once.
+
+        The write lock is taken when the context is entered, and every
+        write of the methods of this object then runs on the same
+        transaction, in a savepoint: a write that fails is undone alone
+        and reported as usual, the others are committed together on exit.
+        Grouping many small writes saves a commit, and a disk sync, per
+        write.
+
+        Raises:
+            sqlite3.Error: If the transaction cannot be started or
+                committed, in which case none of its writes are kept.
+        """
+        conn = sqlite3.connect(
+            self.db_name, uri=True, timeout=self.busy_timeout
+        )
+        try:
+            self._retry(lambda: conn.execute("BEGIN IMMEDIATE"))
+            self._ensure_versioned(conn.cursor())
+            batch = {"conn": conn, "task_ids": [], "savepoints": 0}
+            self._local.batch = batch
+            try:
+                yield
+            finally:
+                self._local.batch = None
+            self._count_change(conn.cursor(), batch["task_ids"])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _write_in_batch(
+        self,
+        batch: dict,
+        operation: Callable[[sqlite3.Cursor], T],
+        task_ids: Iterable[int],
+    ) -> T:
+        """Run a write operation in a savepoint of the current batch."""
+        conn = batch["conn"]
+        batch["savepoints"] += 1
+        savepoint = f"write_{batch['savepoints']}"
+        conn.execute(f"SAVEPOINT {savepoint}")
+        self.conn = conn
+        try:
+            result = operation(conn.cursor())
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            raise
+        finally:
+            conn.execute(f"RELEASE {savepoint}")
+            self.conn = None
+        batch["task_ids"].extend(task_ids)
+        return result
+
+    def _ensure_versioned(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Add the version column to a tasks table made before it existed.
+
+        Adding a column with a default value does not rewrite the table.
+        It is checked once per object, on its first write, with the ids
+        of an archived table (see `_keep_archived_ids`).
+        """
+        if self._versioned:
+            return
+        columns = [
+            row[1] for row in cursor.execute("PRAGMA table_info(tasks)")
+        ]
+        if not columns:
+            return
+        if "version" not in columns:
+            try:
+                cursor.execute(
+                    "ALTER TABLE tasks ADD COLUMN "
+                    "version INTEGER NOT NULL DEFAULT 1"
+                )
+            except sqlite3.OperationalError as e:
+                # Another process added it meanwhile.
+                if "duplicate column" not in str(e):
+                    raise
+        self._keep_archived_ids(cursor)
+        self._versioned = True
+
+    def _keep_archived_ids(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Stop SQLite from giving the id of an archived task to a new task.
+
+        Without AUTOINCREMENT, a new task takes the highest id in `tasks`
+        plus one, which is the id of an archived task once the tasks
+        above it are gone. A tasks table made before AUTOINCREMENT is
+        rebuilt with it, in the current transaction, when the database
+        has an archive, and its sequence starts above the highest id of
+        both tables.
+        """
+        tables = dict(
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'table' "
+                "AND name IN ('tasks', 'archived_tasks')"
+            ).fetchall()
+        )
+        if (
+            "archived_tasks" not in tables
+            or "AUTOINCREMENT" in tables.get("tasks", "AUTOINCREMENT")
+        ):
+            return
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        indexes = [
+            row[0]
+            for row in cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = 'tasks' AND sql IS NOT NULL"
+            )
+        ]
+        columns = ", ".join(TASK_COLUMNS + ("version",))
+        cursor.execute(
+            self.generate_sql_creation_statement().replace(
+                "IF NOT EXISTS tasks", "tasks_rebuilt"
+            )
+        )
+        cursor.execute(
+            f"INSERT INTO tasks_rebuilt ({columns}) "
+            f"SELECT {columns} FROM tasks"
+        )
+        cursor.execute("DROP TABLE tasks")
+        cursor.execute("ALTER TABLE tasks_rebuilt RENAME TO tasks")
+        for index_sql in indexes:
+            cursor.execute(index_sql)
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+        cursor.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', "
+            "MAX(COALESCE((SELECT MAX(id) FROM tasks), 0), "
+            "COALESCE((SELECT MAX(id) FROM archived_tasks), 0))"
+        )
+
+    @staticmethod
+    def _count_change(
+        cursor: sqlite3.Cursor, task_ids: Iterable[int] = ()
+    ) -> None:
+        """
+        Increase the change counter in the transaction of a write.
+
+        The counter lives in the `task_meta` table, created on first use
+        so that databases made before it keep working. The ids of the
+        existing tasks modified or removed are written to the
+        `task_changes` log with the new counter value; inserted tasks are
+        not logged, they are the ones with an id above those already seen.
+
+        Args:
+            cursor (sqlite3.Cursor): Cursor of the write transaction.
+            task_ids (Iterable[int]): Existing tasks modified or removed.
+        """
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS task_meta "
+            "(key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        cursor.execute(
+            "INSERT INTO task_meta (key, value) VALUES ('change_counter', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+        )
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS task_changes "
+            "(change INTEGER NOT NULL, task_id INTEGER NOT NULL)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_changes_change "
+            "ON task_changes (change)"
+        )
+        change = cursor.execute(
+            "SELECT value FROM task_meta WHERE key = 'change_counter'"
+        ).fetchone()[0]
+        cursor.executemany(
+            "INSERT INTO task_changes (change, task_id) VALUES (?, ?)",
+            [(change, task_id) for task_id in task_ids],
+        )
+
+    @staticmethod
+    def _record_completions(
+        cursor: sqlite3.Cursor, task_ids: Iterable[int]
+    ) -> None:
+        """
+        Store when tasks were completed, in the transaction completing them.
+
+        Completion times live in the `task_completions` table, created on
+        first use like `task_meta`; the archive job reads them.
+        """
+        cursor.execute(COMPLETIONS_TABLE_SQL)
+        completed_at = datetime.now().strftime(DB_DATE_FORMAT)
+        cursor.executemany(
+            "INSERT OR REPLACE INTO task_completions (task_id, completed_at) "
+            "VALUES (?, ?)",
+            [(task_id, completed_at) for task_id in task_ids],
+        )
+
+    def change_counter(self) -> int:
+        """
+        Return the number of write transactions made on the database.
+
+        Unlike `data_version`, the counter is stored in the database, so
+        it can tag data saved outside of it, such as snapshots, and be
+        compared later by another process.
+
+        Returns:
+            int: Change counter, 0 for a database never written.
+        """
+        try:
+            rows = self._read(
+                "SELECT value FROM task_meta WHERE key = 'change_counter'"
+            )
+        except sqlite3.Error:
+            # The table does not exist until the first write.
+            return 0
+        return rows[0][0] if rows else 0
+
+    def changed_task_ids(self, since: int) -> Optional[List[int]]:
+        """
+        Return the existing tasks modified or removed after a change.
+
+        Args:
+            since (int): Change counter value already seen.
+
+        Returns:
+            Optional[List[int]]: Ids of the tasks logged in a later
+            change, None if the log was pruned past it.
+        """
+        try:
+            rows = self._read(
+                "SELECT DISTINCT task_id FROM task_changes WHERE change > ?",
+                (since,),
+            )
+        except sqlite3.Error:
+            # The log does not exist until a task is modified.
+            rows = []
+        # Read after the log: entries pruned meanwhile are noticed.
+        if since < self._pruned_change():
+            return None
+        return [row[0] for row in rows]
+
+    def _pruned_change(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Return the last change whose entries were pruned from the log."""
+        query = "SELECT value FROM task_meta WHERE key = 'changes_pruned'"
+        try:
+            if conn is not None:
+                rows = conn.execute(query).fetchall()
+            else:
+                rows = self._read(query, replica=False)
+        except sqlite3.Error:
+            # The table does not exist until the first write.
+            return 0
+        return rows[0][0] if rows else 0
+
+    def prune_changes(
+        self, keep: int = KEEP_CHANGES, pause: float = 0.02
+    ) -> int:
+        """
+        Delete the entries of the change log but those of the last writes.
+
+        The last pruned change is stored first, so readers behind it read
+        everything again instead of missing the entries deleted. The
+        entries are then deleted a batch per transaction with a pause in
+        between, and the change counter is left as is, so snapshots and
+        indexes tagged with it stay valid.
+
+        Args:
+            keep (int): Number of write transactions whose entries are kept.
+            pause (float): Seconds between two transactions.
+
+        Returns:
+            int: Number of entries deleted.
+        """
+
+        def mark() -> int:
+            self.connect()
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                tables = {
+                    row[0]
+                    for row in self.conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table'"
+                    )
+                }
+                if not {"task_meta", "task_changes"} <= tables:
+                    return 0
+                last = self.conn.execute(
+                    "SELECT value FROM task_meta "
+                    "WHERE key = 'change_counter'"
+                ).fetchone()[0] - keep
+                if last <= self._pruned_change(self.conn):
+                    return 0
+                self.conn.execute(
+                    "INSERT INTO task_meta (key, value) "
+                    "VALUES ('changes_pruned', ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    (last,),
+                )
+                self.conn.commit()
+                return last
+            finally:
+                self.close_connection()
+
+        def delete(last: int) -> int:
+            self.connect()
+            try:
+                deleted = self.conn.execute(
+                    "DELETE FROM task_changes WHERE rowid IN (SELECT rowid "
+                    "FROM task_changes WHERE change <= ? LIMIT ?)",
+                    (last, PRUNE_BATCH),
+                ).rowcount
+                self.conn.commit()
+                return deleted
+            finally:
+                self.close_connection()
+
+        pruned = 0
+        try:
+            last = self._retry(mark)
+            while last:
+                deleted = self._retry(lambda: delete(last))
+                pruned += deleted
+                if deleted < PRUNE_BATCH:
+                    break
+                time.sleep(pause)
+            self.logger.info(f"{pruned} change log entries pruned")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error pruning the change log: {e}")
+        return pruned
+
+    def changes_since(
+        self, since: Optional[int] = None, last_id: int = 0
+    ) -> TaskChanges:
+        """
+        Return the tasks written after a change, in one read transaction.
+
+        Args:
+            since (int, optional): Change counter value already seen. When
+                None, only the current counter and highest id are read.
+            last_id (int): Highest task id already seen.
+
+        Returns:
+            TaskChanges: Current change counter and highest task id seen,
+            which stays `last_id` when the tasks above it were removed,
+            tasks logged in a later change with their current status
+            (None once removed), and ids of the tasks added since; if the
+            log was pruned past `since`, `pruned` is set instead of the
+            changed tasks.
+        """
+
+        def read() -> TaskChanges:
+            self.connect()
+            try:
+                self.conn.execute("BEGIN")
+                changes: TaskChanges = {
+                    "change_counter": 0,
+                    "last_id": last_id,
+                    "changed": [],
+                    "added": [],
+                    "pruned": False,
+                }
+                # The tables do not exist until the first write, and the
+                # log until the first task is modified.
+                tables = {
+                    row[0]
+                    for row in self.conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table'"
+                    )
+                }
+                if "task_meta" in tables:
+                    changes["change_counter"] = self.conn.execute(
+                        "SELECT value FROM task_meta "
+                        "WHERE key = 'change_counter'"
+                    ).fetchone()[0]
+                if "tasks" not in tables:
+                    return changes
+                changes["last_id"] = max(
+                    last_id,
+                    self.conn.execute(
+                        "SELECT COALESCE(MAX(id), 0) FROM tasks"
+                    ).fetchone()[0],
+                )
+                if since is None:
+                    return changes
+                changes["added"] = [
+                    row[0]
+                    for row in self.conn.execute(
+                        "SELECT id FROM tasks WHERE id > ? ORDER BY id",
+                        (last_id,),
+                    )
+                ]
+                if since < self._pruned_change(self.conn):
+                    changes["pruned"] = True
+                elif "task_changes" in tables:
+                    changes["changed"] = self.conn.execute(
+                        "SELECT c.task_id, t.status FROM (SELECT DISTINCT "
+                        "task_id FROM task_changes WHERE change > ? "
+                        "AND task_id <= ?) c "
+                        "LEFT JOIN tasks t ON t.id = c.task_id "
+                        "ORDER BY c.task_id",
+                        (since, last_id),
+                    ).fetchall()
+                return changes
+            finally:
+                self.close_connection()
+
+        return self._retry(read)
+
+    def table_exists(self, table_name: str) -> bool:
+        """
+        Verify if the table already exists in data base.
+
+        Args:
+            table_name (str): Table name to check.
+
+        Returns:
+            bool: boolean that verify existance of table.
+        """
+        query = "SELECT name FROM sqlite_master WHERE type='table' AND name=?"  # noqa: E501
+
+        def lookup() -> Optional[tuple]:
+            self.connect()
+            try:
+                with self._timed(query, (table_name,)):
+                    return self.conn.execute(query, (table_name,)).fetchone()
+            finally:
+                self.close_connection()
+
+        response = None
+        try:
+            response = self._retry(lookup)
+        except sqlite3.Error as e:
+            self.logger.error(
+                f"Error checking if table is already in data base: {e}"
+            )
+
+        if response is None:
+            return False
+        return True
+
+    def _task_source(self, include_archived: bool) -> str:
+        """
+        Return the table the tasks of a query are read from.
+
+        Args:
+            include_archived (bool): Read the archived tasks too.
+
+        Returns:
+            str: "tasks", or a union with the archive once it exists.
+        """
+        if not include_archived or not self.table_exists("archived_tasks"):
+            return "tasks"
+        columns = ", ".join(TASK_COLUMNS)
+        return (
+            f"(SELECT {columns} FROM tasks "
+            f"UNION ALL SELECT {columns} FROM archived_tasks)"
+        )
+
+    def create_table_tasks(self) -> None:
+        """
+        Create a table to initialize data base.
+
+        Args:
+            table_name (str): Table to be created.
+        """
+        create_table_sql = self.generate_sql_creation_statement()
+
+        def create(cursor: sqlite3.Cursor) -> None:
+            # Only applies to a database without tables yet, so that free
+            # pages can later be given back by `maintain`.
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            with self._timed(create_table_sql, conn=cursor.connection):
+                cursor.execute(create_table_sql)
+
+        try:
+            self._write(create)
+            self.logger.info("Table tasks created successfully")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error creating table: {e}")
+
+    def create_indexes(self) -> None:
+        """
+        Create the indexes of the sortable columns if they are missing.
+
+        They are not part of the table creation since they slow down bulk
+        inserts; the web UI creates them when it starts.
+        """
+
+        def create(cursor: sqlite3.Cursor) -> None:
+            for column in INDEXED_COLUMNS:
+                statement = (
+                    f"CREATE INDEX IF NOT EXISTS idx_tasks_{column} "
+                    f"ON tasks ({column})"
+                )
+                with self._timed(statement, conn=cursor.connection):
+                    cursor.execute(statement)
+
+        try:
+            self._write(create)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error creating indexes: {e}")
+
+    def insert_data(self, table_name: str, data: TaskData) -> Union[int, None]:
+        """
+        Insert new data in table.
+
+        Args:
+            table_name (str): Table where data is going to be inserted.
+            data (Type[Task]): Task to be inserted in table.
+
+        Returns:
+            Type[Task]: Task id of new task inserted.
+        """
+        table_in_data_base = self.table_exists(table_name)
+        if not table_in_data_base:
+            self.create_table_tasks()
+        insert_sql = self.generate_sql_insert_statement(table_name)
+        row = self.encode_task_data(data)
+
+        def insert(cursor: sqlite3.Cursor) -> int:
+            with self._timed(insert_sql, row, conn=cursor.connection):
+                cursor.execute(insert_sql, row)
+            return cursor.lastrowid
+
+        task_id = None
+        try:
+            task_id = self._write(insert)
+            self.logger.info("Data inserted successfully.")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting data: {e}")
+        return task_id
+
+    def bulk_insert(
+        self,
+        table_name: str,
+        rows: Iterable[tuple],
+        batch_size: int = 50000,
+        synchronous: str = "NORMAL",
+    ) -> int:
+        """
+        Insert many already encoded rows through a single connection.
+
+        Rows follow the column order of the insert statement, as returned
+        by `encode_task_data`. They are sent with executemany and committed
+        once per batch. Synchronous writes default to NORMAL, which keeps
+        the database intact on a power loss; OFF is faster but can corrupt
+        the whole file, so it is only meant for throwaway data such as the
+        synthetic tasks of the generator.
+
+        Args:
+            table_name (str): Table where the rows are going to be inserted.
+            rows (Iterable[tuple]): Encoded rows to insert.
+            batch_size (int): Number of rows committed at a time.
+            synchronous (str): `PRAGMA synchronous` of the load, one of
+                OFF, NORMAL, FULL or EXTRA.
+
+        Returns:
+            int: Number of rows inserted.
+
+        Raises:
+            ValueError: If the synchronous mode is not known.
+        """
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Unknown synchronous mode '{synchronous}'")
+        if not self.table_exists(table_name):
+            self.create_table_tasks()
+        inserted = 0
+        rows = iter(rows)
+        insert_sql = self.generate_sql_insert_statement(table_name)
+        try:
+            self.connect()
+            cursor = self.conn.cursor()
+            cursor.execute(f"PRAGMA synchronous = {synchronous}")
+
+            def insert_batch() -> None:
+                try:
+                    with self._timed(
+                        insert_sql, batch[0], conn=cursor.connection
+                    ):
+                        cursor.executemany(insert_sql, batch)
+                    self._count_change(cursor)
+                    self.conn.commit()
+                except sqlite3.Error:
+                    self.conn.rollback()
+                    raise
+
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self._retry(insert_batch)
+                inserted += len(batch)
+            self.logger.info(f"{inserted} rows bulk inserted successfully.")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error bulk inserting data: {e}")
+        finally:
+            self.close_connection()
+        return inserted
+
+    def fetch_data(
+        self, task_id: int, to_do: str = "COMPLETE", task=None
+    ) -> None:
+        """
+        Modify task.
+
+        It changes the status to COMPLETE by default.
+
+        Args:
+            task_id (int): Task id of task to be modified.
+            to_do (str, optional): Action to be performed
+            on the task. Defaults to "COMPLETE".
+            task (_type_, optional): Task to be modified. Defaults to None.
+        """
+        if to_do == "COMPLETE":
+            query = self.generate_sql_complete_statement()
+            params = (TaskStatus.COMPLETE.value, task_id)
+            message = "Task completed successfully"
+        elif to_do == "MODIFY":
+            query = self.generate_sql_modify_statement()
+            params = (task[0], task[1], task[2], task[3], task_id)
+            message = "Task modified successfully"
+        else:
+            return
+
+        def update(cursor: sqlite3.Cursor) -> None:
+            with self._timed(query, params, conn=cursor.connection):
+                cursor.execute(query, params)
+            if to_do == "COMPLETE" and cursor.rowcount:
+                self._record_completions(cursor, (task_id,))
+
+        try:
+            self._write(update, task_ids=(task_id,))
+            self.logger.info(message)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error fetching data: {e}")
+
+    def remove_task(self, task_id: int) -> None:
+        """
+        Remove a task from the data base by its id.
+
+        Args:
+            task_id (int): Task id of the task to be removed.
+        """
+        remove_sql = self.generate_sql_remove_statement()
+
+        def remove(cursor: sqlite3.Cursor) -> None:
+            with self._timed(remove_sql, (task_id,), conn=cursor.connection):
+                cursor.execute(remove_sql, (task_id,))
+            self._forget_removed(cursor, [task_id])
+
+        try:
+            self._write(remove, task_ids=(task_id,))
+            self.logger.info("Data removed successfully")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error removing data: {e}")
+
+    def _write_where(
+        self,
+        statement: str,
+        statement_params: tuple,
+        condition: Optional[str],
+        params,
+        task_ids: Optional[Iterable[int]],
+        message: str,
+        on_written: Optional[Callable] = None,
+    ) -> List[int]:
+        """
+        Update or delete the tasks matching a filter in one statement.
+
+        Args:
+            statement (str): UPDATE or DELETE statement ending with the
+                start of its WHERE clause, completed here by the filter.
+            statement_params (tuple): Parameters of the statement.
+            condition (str, optional): Condition on the tasks.
+            params: Parameters of the condition.
+            task_ids (Iterable[int], optional): Only touch these tasks.
+            message (str): Logged with the number of tasks touched.
+            on_written (Callable, optional): Called with the cursor and
+                the ids touched, in the same transaction.
+
+        Returns:
+            List[int]: Ids of the tasks touched, in ascending order.
+        """
+        conditions, all_params = [], list(statement_params)
+        if condition:
+            conditions.append(f"({condition})")
+            all_params.extend(params)
+        if task_ids is not None:
+            # One parameter whatever the number of ids.
+            conditions.append("id IN (SELECT value FROM json_each(?))")
+            all_params.append(json.dumps(list(task_ids)))
+        query = f"{statement} {' AND '.join(conditions) or '1'} RETURNING id"
+        changed: List[int] = []
+
+        def write(cursor: sqlite3.Cursor) -> None:
+            with self._timed(
+                query, tuple(all_params), conn=cursor.connection
+            ):
+                ids = sorted(row[0] for row in cursor.execute(
+                    query, tuple(all_params)
+                ))
+            if ids and on_written is not None:
+                on_written(cursor, ids)
+            changed[:] = ids
+
+        try:
+            self._write(write, task_ids=changed)
+            self.logger.info(f"{len(changed)} tasks {message}")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error writing tasks: {e}")
+            return []
+        return changed
+
+    def complete_where(
+        self,
+        condition: Optional[str] = None,
+        params=(),
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Mark every open task matching a filter as complete at once.
+
+        Args:
+            condition (str, optional): Condition on the tasks, such as
+                built by `task_filter`.
+            params: Parameters of the condition.
+            task_ids (Iterable[int], optional): Only complete these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks completed.
+        """
+        return self._write_where(
+            "UPDATE tasks SET status = ?, version = version + 1 "
+            "WHERE status != ? AND",
+            (TaskStatus.COMPLETE.value, TaskStatus.COMPLETE.value),
+            condition,
+            params,
+            task_ids,
+            "completed",
+            self._record_completions,
+        )
+
+    def remove_where(
+        self,
+        condition: Optional[str] = None,
+        params=(),
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Remove every task matching a filter at once.
+
+        Args:
+            condition (str, optional): Condition on the tasks.
+            params: Parameters of the condition.
+            task_ids (Iterable[int], optional): Only remove these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks removed.
+        """
+        return self._write_where(
+            "DELETE FROM tasks WHERE", (), condition, params, task_ids,
+            "removed",
+            self._forget_removed,
+        )
+
+    def reassign(
+        self,
+        from_assignee: str,
+        to_assignee: str,
+        condition: Optional[str] = None,
+        params=(),
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Give the tasks of an assignee to another one at once.
+
+        The assignee is replaced in the comma separated list of each
+        task, and only dropped from it when the new one is already there.
+
+        Args:
+            from_assignee (str): Assignee whose tasks are given away.
+            to_assignee (str): Assignee receiving them.
+            condition (str, optional): Condition on the tasks.
+            params: Parameters of the condition.
+            task_ids (Iterable[int], optional): Only reassign these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks reassigned.
+        """
+        listed = "(',' || replace(assignee, ', ', ',') || ',')"
+        return self._write_where(
+            "UPDATE tasks SET assignee = replace(trim("
+            f"CASE WHEN instr({listed}, ?) > 0 "
+            f"THEN replace({listed}, ?, ',') "
+            f"ELSE replace({listed}, ?, ?) END, ','), ',', ', '), "
+            "version = version + 1 "
+            f"WHERE instr({listed}, ?) > 0 AND",
+            (
+                f",{to_assignee},",
+                f",{from_assignee},",
+                f",{from_assignee},",
+                f",{to_assignee},",
+                f",{from_assignee},",
+            ),
+            condition,
+            params,
+            task_ids,
+            f"reassigned from {from_assignee} to {to_assignee}",
+        )
+
+    def set_priority_where(
+        self,
+        priority: TaskPriority,
+        condition: Optional[str] = None,
+        params=(),
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Change the priority of every task matching a filter at once.
+
+        Args:
+            priority (TaskPriority): New priority.
+            condition (str, optional): Condition on the tasks.
+            params: Parameters of the condition.
+            task_ids (Iterable[int], optional): Only change these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks whose priority changed.
+        """
+        return self._write_where(
+            "UPDATE tasks SET priority = ?, version = version + 1 "
+            "WHERE priority != ? AND",
+            (priority.value, priority.value),
+            condition,
+            params,
+            task_ids,
+            f"set to priority {priority.name}",
+        )
+
+    @classmethod
+    def _forget_removed(
+        cls, cursor: sqlite3.Cursor, task_ids: List[int]
+    ) -> None:
+        """
+        Drop the links of removed tasks, in their transaction.
+
+        Their dependencies are deleted. An occurrence of a recurring task
+        whose task is removed keeps its row with no task id, which marks
+        it as skipped, so a task later given the same id is never taken
+        for it.
+        """
+        cls._delete_edges(cursor, task_ids)
+        if cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+            "AND name = 'task_occurrences'"
+        ).fetchone() is None:
+            return
+        cursor.execute(
+            "UPDATE task_occurrences SET task_id = NULL "
+            "WHERE task_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(task_ids),),
+        )
+
+    @staticmethod
+    def _delete_edges(cursor: sqlite3.Cursor, task_ids: List[int]) -> None:
+        """Delete the dependencies of removed tasks, in their transaction."""
+        if cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+            "AND name = 'task_edges'"
+        ).fetchone() is None:
+            return
+        ids = json.dumps(task_ids)
+        cursor.execute(
+            "DELETE FROM task_edges "
+            "WHERE task_id IN (SELECT value FROM json_each(?)) "
+            "OR depends_on IN (SELECT value FROM json_each(?))",
+            (ids, ids),
+        )
+
+    def add_dependencies(self, edges: Iterable[Tuple[int, int]]) -> int:
+        """
+        Store dependencies between tasks, in one transaction.
+
+        The `task_edges` table is created on first use. Dependencies
+        already stored are ignored; cycles are checked by the caller.
+
+        Args:
+            edges (Iterable[Tuple[int, int]]): Id of a task and id of the
+                task it depends on.
+
+        Returns:
+            int: Number of dependencies added.
+        """
+        rows = list(edges)
+
+        def insert(cursor: sqlite3.Cursor) -> int:
+            cursor.execute(EDGES_TABLE_SQL)
+            cursor.execute(EDGES_INDEX_SQL)
+            cursor.executemany(
+                "INSERT OR IGNORE INTO task_edges (task_id, depends_on) "
+                "VALUES (?, ?)",
+                rows,
+            )
+            return cursor.rowcount
+
+        try:
+            added = self._write(insert)
+            self.logger.info(f"{added} dependencies added")
+            return added
+        except sqlite3.Error as e:
+            self.logger.error(f"Error adding dependencies: {e}")
+            return 0
+
+    def remove_dependency(self, task_id: int, depends_on: int) -> bool:
+        """
+        Delete the dependency of a task on another one.
+
+        Returns:
+            bool: False if there was no such dependency.
+        """
+
+        def delete(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute(EDGES_TABLE_SQL)
+            cursor.execute(
+                "DELETE FROM task_edges WHERE task_id = ? AND depends_on = ?",
+                (task_id, depends_on),
+            )
+            return cursor.rowcount > 0
+
+        try:
+            return self._write(delete)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error removing dependency: {e}")
+            return False
+
+    def remove_task_edges(self, task_ids: Iterable[int]) -> None:
+        """
+        Delete every dependency from or to some tasks.
+
+        It completes the removal of the tasks from another database, where
+        it is counted, so it is not counted as a change of its own.
+        """
+        ids = list(task_ids)
+
+        def delete() -> None:
+            self.connect()
+            try:
+                self._delete_edges(self.conn.cursor(), ids)
+                self.conn.commit()
+            finally:
+                self.close_connection()
+
+        try:
+            self._retry(delete)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error removing dependencies: {e}")
+
+    def get_dependencies(self) -> List[Tuple[int, int]]:
+        """Get every dependency, as task id and id of the task it waits for."""
+        if not self.table_exists("task_edges"):
+            return []
+        try:
+            return self._read(
+                "SELECT task_id, depends_on FROM task_edges", replica=False
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading dependencies: {e}")
+            return []
+
+    def get_task_states(self) -> List[tuple]:
+        """
+        Get the id, status and due date of every active task.
+
+        It is all the dependency graph needs, read without the text
+        columns of the tasks.
+        """
+        try:
+            return self._read(
+                "SELECT id, status, due_date FROM tasks", replica=False
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading task states: {e}")
+            return []
+
+    def insert_series(self, data: TaskData) -> Optional[int]:
+        """
+        Store a recurring task once, with its rule.
+
+        Its occurrences are not stored: they are computed when listed,
+        and only become tasks once completed or edited. The tables are
+        created on first use.
+
+        Args:
+            data (TaskData): Task whose due date starts the series, with
+                its "recurrence" rule.
+
+        Returns:
+            int: Id of the series, None if it could not be stored.
+        """
+        row = self.encode_task_data(data) + (str(data["recurrence"]),)
+
+        def insert(cursor: sqlite3.Cursor) -> int:
+            cursor.execute(SERIES_TABLE_SQL)
+            cursor.execute(
+                "INSERT INTO task_series (name, description, creation_date, "
+                "due_date, assignee, status, priority, category, rule) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            return cursor.lastrowid
+
+        try:
+            return self._write(insert)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting recurring task: {e}")
+            return None
+
+    def get_series(self, series_id: Optional[int] = None) -> List[tuple]:
+        """
+        Get the recurring tasks, or one of them.
+
+        Returns:
+            List[tuple]: Rows in the column order of the tasks table,
+            followed by the rule.
+        """
+        if not self.table_exists("task_series"):
+            return []
+        query = f"SELECT {', '.join(TASK_COLUMNS)}, rule FROM task_series"
+        params: tuple = ()
+        if series_id is not None:
+            query += " WHERE id = ?"
+            params = (series_id,)
+        try:
+            return self._read(query, params)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading recurring tasks: {e}")
+            return []
+
+    def remove_series(self, series_id: int) -> bool:
+        """
+        Delete a recurring task.
+
+        Its occurrences already stored stay as ordinary tasks.
+
+        Returns:
+            bool: False if there was no such series.
+        """
+
+        def delete(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute(SERIES_TABLE_SQL)
+            cursor.execute(OCCURRENCES_TABLE_SQL)
+            cursor.execute(
+                "DELETE FROM task_occurrences WHERE series_id = ?",
+                (series_id,),
+            )
+            cursor.execute(
+                "DELETE FROM task_series WHERE id = ?", (series_id,)
+            )
+            return cursor.rowcount > 0
+
+        try:
+            return self._write(delete)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error removing recurring task: {e}")
+            return False
+
+    def materialize_occurrence(
+        self, series_id: int, due_date: datetime
+    ) -> Optional[int]:
+        """
+        Store an occurrence of a recurring task as a task, if not done yet.
+
+        The task is copied from the series with the date of the
+        occurrence as due date, and linked to the series and date in the
+        same transaction.
+
+        Args:
+            series_id (int): Id of the series.
+            due_date (datetime): Date of the occurrence.
+
+        Returns:
+            int: Id of the task of the occurrence, None if the series does
+            not exist or if the task was removed.
+        """
+        occurrence = due_date.strftime(DB_DATE_FORMAT)
+        if not self.table_exists("tasks"):
+            self.create_table_tasks()
+
+        def materialize(cursor: sqlite3.Cursor) -> Optional[int]:
+            cursor.execute(SERIES_TABLE_SQL)
+            cursor.execute(OCCURRENCES_TABLE_SQL)
+            cursor.execute(OCCURRENCES_INDEX_SQL)
+            cursor.execute(OCCURRENCES_TASK_INDEX_SQL)
+            linked = cursor.execute(
+                "SELECT t.id FROM task_occurrences o "
+                "LEFT JOIN tasks t ON t.id = o.task_id "
+                "WHERE o.series_id = ? AND o.due_date = ?",
+                (series_id, occurrence),
+            ).fetchone()
+            if linked is not None:
+                return linked[0]
+            cursor.execute(
+                "INSERT INTO tasks (name, description, creation_date, "
+                "due_date, assignee, status, priority, category) "
+                "SELECT name, description, ?, ?, assignee, status, "
+                "priority, category FROM task_series WHERE id = ?",
+                (
+                    datetime.now().strftime(DB_DATE_FORMAT),
+                    occurrence,
+                    series_id,
+                ),
+            )
+            if not cursor.rowcount:
+                return None
+            task_id = cursor.lastrowid
+            cursor.execute(
+                "INSERT INTO task_occurrences (series_id, due_date, task_id) "
+                "VALUES (?, ?, ?)",
+                (series_id, occurrence, task_id),
+            )
+            return task_id
+
+        try:
+            return self._write(materialize)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error storing occurrence: {e}")
+            return None
+
+    def query_occurrences(
+        self, start: datetime, end: datetime
+    ) -> List[tuple]:
+        """
+        Get the occurrences stored as tasks in a period.
+
+        The index on their date reads only those of the period, whatever
+        the number of occurrences stored.
+
+        Args:
+            start (datetime): Earliest occurrence date returned.
+            end (datetime): Latest occurrence date returned.
+
+        Returns:
+            List[tuple]: Series id and occurrence date, followed by the
+            task row, all None when the task was removed or archived.
+        """
+        if not self.table_exists("task_occurrences"):
+            return []
+        columns = ", ".join(f"t.{column}" for column in TASK_COLUMNS)
+        query = (
+            f"SELECT o.series_id, o.due_date, {columns} "
+            "FROM task_occurrences o LEFT JOIN tasks t ON t.id = o.task_id "
+            "WHERE o.due_date BETWEEN ? AND ?"
+        )
+        try:
+            return self._read(
+                query,
+                (
+                    start.strftime(DB_DATE_FORMAT),
+                    end.strftime(DB_DATE_FORMAT),
+                ),
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading occurrences: {e}")
+            return []
+
+    def migrate_archive(self) -> None:
+        """
+        Create the archive tables and date the completed tasks.
+
+        Tasks completed before completion times were stored are dated to
+        the migration, so they become archivable once they have been
+        completed for the archive delay from then. Running it again only
+        dates the completed tasks that are not dated yet, such as the
+        imported ones.
+        """
+
+        def migrate(cursor: sqlite3.Cursor) -> None:
+            cursor.execute(ARCHIVE_TABLE_SQL)
+            cursor.execute(COMPLETIONS_TABLE_SQL)
+            cursor.execute(
+                "INSERT OR IGNORE INTO task_completions "
+                "(task_id, completed_at) SELECT id, ? FROM tasks "
+                "WHERE status = ?",
+                (
+                    datetime.now().strftime(DB_DATE_FORMAT),
+                    TaskStatus.COMPLETE.value,
+                ),
+            )
+            self._keep_archived_ids(cursor)
+
+        self.create_table_tasks()
+        try:
+            self._write(migrate)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error migrating the archive: {e}")
+
+    def archive_completed(
+        self, older_than_days: float = 30, batch_size: int = 1000
+    ) -> int:
+        """
+        Move the tasks completed long ago to the `archived_tasks` table.
+
+        Tasks are moved in transactions of `batch_size`, so the job never
+        holds the write lock for long, and the moved ids are written to
+        the change log. The tasks table counts its ids with AUTOINCREMENT,
+        so the id of an archived task is never given to a new task.
+
+        Args:
+            older_than_days (float): Days since completion after which a
+                task is archived.
+            batch_size (int): Number of tasks moved per transaction.
+
+        Returns:
+            int: Number of tasks archived.
+        """
+        self.migrate_archive()
+        cutoff = (
+            datetime.now() - timedelta(days=older_than_days)
+        ).strftime(DB_DATE_FORMAT)
+        archived, last_id = 0, 0
+        columns = ", ".join(TASK_COLUMNS)
+        selected = ", ".join(f"t.{column}" for column in TASK_COLUMNS)
+        try:
+            while True:
+                ids = [
+                    row[0]
+                    for row in self._read(
+                        "SELECT c.task_id FROM task_completions c "
+                        "JOIN tasks t ON t.id = c.task_id "
+                        "WHERE c.task_id > ? "
+                        "AND c.completed_at <= ? AND t.status = ? "
+                        "ORDER BY c.task_id LIMIT ?",
+                        (last_id, cutoff, TaskStatus.COMPLETE.value,
+                         batch_size),
+                        replica=False,
+                    )
+                ]
+                if not ids:
+                    break
+                batch = (ids[0], ids[-1])
+
+                def move(cursor: sqlite3.Cursor) -> int:
+                    cursor.execute(
+                        f"INSERT INTO archived_tasks ({columns}, "
+                        f"completed_at) SELECT {selected}, c.completed_at "
+                        "FROM tasks t "
+                        "JOIN task_completions c ON c.task_id = t.id "
+                        "WHERE c.task_id BETWEEN ? AND ? "
+                        "AND c.completed_at <= ? AND t.status = ?",
+                        (*batch, cutoff, TaskStatus.COMPLETE.value),
+                    )
+                    moved = cursor.rowcount
+                    for table, column in (
+                        ("tasks", "id"), ("task_completions", "task_id")
+                    ):
+                        cursor.execute(
+                            f"DELETE FROM {table} WHERE {column} IN "
+                            "(SELECT id FROM archived_tasks "
+                            "WHERE id BETWEEN ? AND ?)",
+                            batch,
+                        )
+                    return moved
+
+                archived += self._write(move, task_ids=ids)
+                last_id = ids[-1]
+            self.logger.info(f"{archived} completed tasks archived.")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error archiving tasks: {e}")
+        return archived
+
+    def get_all_tasks(self, include_archived: bool = False) -> List[tuple]:
+        """
+        Return all tasks stored in data base.
+
+        Args:
+            include_archived (bool): Also return the archived tasks.
+
+        Returns:
+            List[tuple]: List of tuples. This list has all tasks in db.
+                         Each tuple represents the data of a task.
+        """
+        data = None
+        source = self._task_source(include_archived)
+        try:
+            self.connect(read_only=True)
+            cursor = self.conn.cursor()
+            query = self.generate_sql_select_statement(source=source)
+            if source != "tasks":
+                query += " ORDER BY id"
+            with self._timed(query, conn=cursor.connection):
+                cursor.execute(query)
+                data = cursor.fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting all tasks: {e}")
+        finally:
+            self.close_connection()
+        return data
+
+    def _pragmas(self) -> dict:
+        """Read the page and vacuum settings of the database."""
+        names = (
+            "page_size", "page_count", "freelist_count", "auto_vacuum",
+            "journal_mode",
+        )
 
-        Sets up the database connection and the logger for db operations.
+        def read() -> dict:
+            self.connect()
+            try:
+                return {
+                    name: self.conn.execute(f"PRAGMA {name}").fetchone()[0]
+                    for name in names
+                }
+            finally:
+                self.close_connection()
 
-        Args:
-            db_name (str): Name of the db file. Default is "task_manager.db".
+        return self._retry(read)
+
+    def enable_incremental_vacuum(self) -> str:
         """
-        current_dir = os.path.dirname(__file__)
-        parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+        Switch an existing database to incremental auto-vacuum.
 
-        if db_name == "file::memory:?cache=shared":
-            self.db_name = db_name
-        else:
-            self.db_name = os.path.join(parent_dir, db_name)
+        The mode of a database with tables only changes when it is rebuilt
+        by VACUUM, which locks it for the whole rebuild: this migration is
+        meant to be run once, while nobody uses the database. Databases
+        created by `create_table_tasks` already use it.
 
-        self.conn = None
-        self.logger = self.setup_logger(
-            os.path.join(parent_dir, "logs", "data_base.log")
-        )
+        Returns:
+            str: Auto-vacuum mode in use after the change.
+        """
+        if self._pragmas()["auto_vacuum"] != AUTO_VACUUM_INCREMENTAL:
+            try:
+                self.connect()
+                self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                self.conn.execute("VACUUM")
+                self.logger.info("Database rebuilt with incremental vacuum")
+            except sqlite3.Error as e:
+                self.logger.error(f"Error enabling incremental vacuum: {e}")
+            finally:
+                self.close_connection()
+        return AUTO_VACUUM_MODES[self._pragmas()["auto_vacuum"]]
 
-    def setup_logger(self, log_file: str) -> Type[logging.Logger]:
+    def maintain(
+        self,
+        pages_per_step: int = 256,
+        pause: float = 0.02,
+        analyze: bool = False,
+        keep_changes: Optional[int] = KEEP_CHANGES,
+    ) -> MaintenanceReport:
         """
-        Set up a logger to write all actions in data base.
+        Give free pages back to the file system and refresh statistics.
+
+        The change log is first pruned to the entries of the last
+        `keep_changes` writes, so that it does not grow forever. Free
+        pages are then released by `PRAGMA incremental_vacuum`, a few
+        pages per transaction with a pause in between, so the write lock
+        is only held for milliseconds at a time and interactive writes go
+        through between the steps. The query planner statistics are then
+        refreshed by `PRAGMA optimize`, or by an `ANALYZE` limited to a
+        sample of each index.
 
         Args:
-            log_file (str): path where the log file is stored.
+            pages_per_step (int): Pages released per transaction.
+            pause (float): Seconds between two transactions.
+            analyze (bool): Run ANALYZE on every table and index instead
+                of letting `PRAGMA optimize` choose.
+            keep_changes (int, optional): Write transactions whose entries
+                stay in the change log, None to keep them all.
 
         Returns:
-            Type[logging.Logger]: Logger object.
+            MaintenanceReport: Sizes before and after and freed space.
         """
-        logger = logging.getLogger("task_manager_database")
-        if not logger.handlers:
-            logger.setLevel(logging.INFO)
-            formatter = logging.Formatter(
-                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-            )
-            file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+        start = time.perf_counter()
+        pruned = 0
+        if keep_changes is not None:
+            pruned = self.prune_changes(keep_changes, pause)
+        before = self._pragmas()
+        steps, longest = 0, 0.0
+        free_pages = before["freelist_count"]
 
-        return logger
+        def vacuum_step() -> int:
+            self.connect()
+            try:
+                # execute() would only step the pragma once, releasing a
+                # single page; executescript() runs it to the end.
+                self.conn.executescript(
+                    f"PRAGMA incremental_vacuum({int(pages_per_step)});"
+                )
+                return self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            finally:
+                self.close_connection()
 
-    def connect(self) -> None:
-        """Connect to the data base."""
         try:
-            self.conn = sqlite3.connect(self.db_name, uri=True)
-            self.logger.info(f"Connected to database: {self.db_name}")
+            while (
+                before["auto_vacuum"] == AUTO_VACUUM_INCREMENTAL
+                and free_pages
+            ):
+                step_start = time.perf_counter()
+                free_pages = self._retry(vacuum_step)
+                longest = max(longest, time.perf_counter() - step_start)
+                steps += 1
+                if free_pages:
+                    time.sleep(pause)
+            self.connect()
+            try:
+                if analyze:
+                    self.conn.execute("PRAGMA analysis_limit = 1000")
+                    self.conn.execute("ANALYZE")
+                else:
+                    self.conn.execute("PRAGMA optimize")
+                if before["journal_mode"] == "wal":
+                    # The file only shrinks once the WAL is copied back.
+                    self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            finally:
+                self.close_connection()
         except sqlite3.Error as e:
-            self.logger.error(f"Error connecting to database: {e}")
+            self.logger.error(f"Error maintaining database: {e}")
 
-    def table_exists(self, table_name: str) -> bool:
+        after = self._pragmas()
+        size_before = before["page_count"] * before["page_size"]
+        size_after = after["page_count"] * after["page_size"]
+        self.logger.info(
+            f"Maintenance freed {size_before - size_after} bytes"
+        )
+        return {
+            "auto_vacuum": AUTO_VACUUM_MODES[after["auto_vacuum"]],
+            "size_before": size_before,
+            "size_after": size_after,
+            "freed_bytes": size_before - size_after,
+            "free_pages_left": after["freelist_count"],
+            "vacuum_steps": steps,
+            "longest_step_ms": longest * 1000,
+            "changes_pruned": pruned,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def enable_wal(self) -> str:
         """
-        Verify if the table already exists in data base.
+        Switch the database file to write-ahead logging.
 
-        Args:
-            table_name (str): Table name to check.
+        With WAL, readers no longer block the writer and the other way
+        round. The setting is stored in the file, so it only needs to be
+        done once per database.
 
         Returns:
-            bool: boolean that verify existance of table.
+            str: Journal mode in use after the change.
         """
+        mode = None
         try:
             self.connect()
-            cursor = self.conn.cursor()
-            cursor.execute(
-                f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'"  # noqa: E501
-            )
-            response = cursor.fetchone()
+            mode = self.conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            self.logger.info(f"Journal mode set to {mode}")
         except sqlite3.Error as e:
-            self.logger.error(
-                f"Error checking if table is already in data base: {e}"
-            )
+            self.logger.error(f"Error enabling WAL: {e}")
         finally:
             self.close_connection()
+        return mode
 
-        if response is None:
-            return False
-        return True
+    def data_version(self) -> int:
+        """
+        Return a number that changes whenever the database is written.
 
-    def create_table_tasks(self) -> None:
+        It is the `PRAGMA data_version` of a connection kept open for this
+        purpose, which changes with every commit made by any other
+        connection, so by the writes of this object (each made on its own
+        connection) as well as by other processes. Reading it does not
+        touch the tables, so it can be polled to invalidate caches.
+
+        Returns:
+            int: Current data version.
         """
-        Create a table to initialize data base.
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(
+                    self.db_name,
+                    uri=True,
+                    timeout=self.busy_timeout,
+                    check_same_thread=False,
+                )
+            return self._version_conn.execute(
+                "PRAGMA data_version"
+            ).fetchone()[0]
+
+    def close_version_connection(self) -> None:
+        """Close the connection used by `data_version`."""
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+
+    def refresh_replica(self, force: bool = False) -> bool:
+        """
+        Copy the database into the read replica if it has been written.
+
+        The replica is a shared in-memory database, so that every read
+        still opens its own connection to it. It is copied with the
+        backup API a few pages at a time, into a new database that
+        replaces the previous one once complete, so reads keep using the
+        previous copy in the meantime. The copy is read from a single
+        snapshot of the database: in WAL mode the writers carry on while
+        it is made, otherwise they wait for it like for any long read. It
+        is tagged with the data version read before it, so writes made
+        during the copy are copied on the next read.
 
         Args:
-            table_name (str): Table to be created.
+            force (bool): Copy the database even if it did not change.
+
+        Returns:
+            bool: True if the replica was copied again.
+        """
+        with self._replica_lock:
+            now = time.monotonic()
+            if self._replica_conn is not None and not force:
+                if now - self._replica_checked < self.replica_max_lag:
+                    return False
+            self._replica_checked = now
+            version = self.data_version()
+            if (
+                self._replica_conn is not None
+                and not force
+                and version == self._replica_version
+            ):
+                return False
+            self.replica_refreshes += 1
+            name = (
+                f"file:todo_replica_{id(self)}_{self.replica_refreshes}"
+                "?mode=memory&cache=shared"
+            )
+            # The database lives as long as this connection is open.
+            replica = sqlite3.connect(name, uri=True, check_same_thread=False)
+            source = sqlite3.connect(
+                self.db_name, uri=True, timeout=self.busy_timeout
+            )
+            try:
+                start = time.perf_counter()
+                # A backup starts again whenever another connection writes
+                # the database, which under steady writes never ends: the
+                # read transaction keeps the copy on one snapshot instead.
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                source.backup(replica, pages=self.replica_step_pages)
+            except sqlite3.Error:
+                replica.close()
+                raise
+            finally:
+                source.close()
+            previous = self._replica_conn
+            self._replica_conn, self._replica_name = replica, name
+            self._replica_version = version
+            if previous is not None:
+                # Reads still running on the previous copy keep it alive
+                # until they close their connection.
+                previous.close()
+            self.logger.info(
+                f"Read replica refreshed in "
+                f"{time.perf_counter() - start:.3f}s"
+            )
+            return True
+
+    def _open_reader(self) -> sqlite3.Connection:
+        """
+        Open a connection for reads, on the read replica when there is one.
+
+        The replica is refreshed and connected to under the replica lock:
+        otherwise another thread could replace and close it in between,
+        which drops the in-memory copy, and the connection would open a
+        new empty database under its name.
+        """
+        if not self.read_replica:
+            return sqlite3.connect(
+                self.db_name, uri=True, timeout=self.busy_timeout
+            )
+        with self._replica_lock:
+            self.refresh_replica()
+            return sqlite3.connect(
+                self._replica_name, uri=True, timeout=self.busy_timeout
+            )
+
+    def close_replica(self) -> None:
+        """Drop the read replica, copied again on the next read."""
+        with self._replica_lock:
+            if self._replica_conn is not None:
+                self._replica_conn.close()
+                self._replica_conn = None
+                self._replica_name = None
+
+    def _read(
+        self, query: str, params=(), replica: bool = True
+    ) -> List[tuple]:
         """
+        Run a read query on its own connection and return all its rows.
+
+        Args:
+            query (str): Query to run.
+            params: Parameters bound to the query.
+            replica (bool): Read from the read replica when there is one;
+                reads made between the writes of a job use the database.
+
+        Returns:
+            List[tuple]: Rows returned by the query.
+        """
+
+        def read() -> List[tuple]:
+            self.connect(read_only=replica)
+            try:
+                with self._timed(query, params):
+                    return self.conn.execute(query, params).fetchall()
+            finally:
+                self.close_connection()
+
+        return self._retry(read)
+
+    def get_versioned_task(
+        self, task_id: int
+    ) -> Optional[Tuple[tuple, int]]:
+        """
+        Return one task with its version, read from the database file.
+
+        The version is increased by every write of the task, so a write
+        based on this version can check the task did not change since.
+        Inside `batch`, it is read on the connection of the batch, which
+        sees the writes of the batch not committed yet.
+
+        Args:
+            task_id (int): Task id of the task to return.
+
+        Returns:
+            Optional[Tuple[tuple, int]]: Data and version of the task, None
+            if it does not exist.
+        """
+        query = (
+            f"SELECT {', '.join(TASK_COLUMNS)}, version "
+            "FROM tasks WHERE id = ?"
+        )
+        rows = []
         try:
-            self.connect()
-            cursor = self.conn.cursor()
-            create_table_sql = self.generate_sql_creation_statement()
-            cursor.execute(create_table_sql)
-            self.conn.commit()
-            self.logger.info("Table tasks created successfully")
+            batch = getattr(self._local, "batch", None)
+            if batch is not None:
+                conn = batch["conn"]
+                with self._timed(query, (task_id,), conn):
+                    rows = conn.execute(query, (task_id,)).fetchall()
+                return (rows[0][:-1], rows[0][-1]) if rows else None
+            if not self._versioned:
+                self.connect()
+                try:
+                    self._retry(
+                        lambda: self._ensure_versioned(self.conn.cursor())
+                    )
+                    self.conn.commit()
+                finally:
+                    self.close_connection()
+            rows = self._read(query, (task_id,), replica=False)
         except sqlite3.Error as e:
-            self.logger.error(f"Error creating table: {e}")
-        finally:
-            self.close_connection()
+            self.logger.error(f"Error getting task: {e}")
+        return (rows[0][:-1], rows[0][-1]) if rows else None
 
-    def insert_data(self, table_name: str, data: TaskData) -> Union[int, None]:
+    def update_task(
+        self,
+        task_id: int,
+        task: tuple,
+        expected_version: Optional[int] = None,
+    ) -> Optional[int]:
         """
-        Insert new data in table.
+        Modify a task unless it changed since a version was read.
+
+        The check and the write are one `UPDATE ... WHERE id = ? AND
+        version = ?` statement, so the write lock is only held while it
+        runs, never while the new values are prepared.
 
         Args:
-            table_name (str): Table where data is going to be inserted.
-            data (Type[Task]): Task to be inserted in table.
+            task_id (int): Task id of task to be modified.
+            task (tuple): New name, description, due date and assignees.
+            expected_version (int, optional): Version the new values are
+                based on; the task is written whatever its version if None.
 
         Returns:
-            Type[Task]: Task id of new task inserted.
+            Optional[int]: New version of the task, None if it does not
+            exist or could not be written.
+
+        Raises:
+            TaskConflictError: If the task is no longer at the expected
+                version, with its current data.
         """
-        table_in_data_base = self.table_exists(table_name)
-        if not table_in_data_base:
-            self.create_table_tasks()
-        task_id = None
-        try:
-            self.connect()
-            cursor = self.conn.cursor()
-            insert_sql = self.generate_sql_insert_statement(table_name)
-            name = data["name"]
-            description = data["description"]
-            creation_date = data["creation_date"].strftime("%Y/%m/%d %H:%M:%S")
-            due_date = data["due_date"].strftime("%Y/%m/%d %H:%M:%S")
-            assignee = ", ".join(data["assignee"])
-            status = data["status"].value
-            priority = data["priority"].value
-            category = (
-                "" if not data["categories"] else " ".join(data["categories"])
+        query = self.generate_sql_versioned_modify_statement()
+        params = (*task[:4], task_id, expected_version, expected_version)
+        select = (
+            f"SELECT {', '.join(TASK_COLUMNS)}, version FROM tasks "
+            "WHERE id = ?"
+        )
+
+        def update(cursor: sqlite3.Cursor) -> Optional[int]:
+            with self._timed(query, params, conn=cursor.connection):
+                row = cursor.execute(query, params).fetchone()
+            if row is not None:
+                return row[0]
+            if expected_version is None:
+                return None
+            current = cursor.execute(select, (task_id,)).fetchone()
+            raise TaskConflictError(
+                task_id,
+                expected_version,
+                current[:-1] if current else None,
+                current[-1] if current else None,
             )
 
-            cursor.execute(
-                insert_sql,
-                (
-                    name,
-                    description,
-                    creation_date,
-                    due_date,
-                    assignee,
-                    status,
-                    priority,
-                    category,
+        try:
+            version = self._write(update, task_ids=(task_id,))
+        except sqlite3.Error as e:
+            self.logger.error(f"Error updating task: {e}")
+            return None
+        if version is None:
+            self.logger.error(f"Task {task_id} not found")
+        else:
+            self.logger.info("Task modified successfully")
+        return version
+
+    def get_task(
+        self, task_id: int, include_archived: bool = False
+    ) -> Optional[tuple]:
+        """
+        Return one task stored in data base.
+
+        Args:
+            task_id (int): Task id of the task to return.
+            include_archived (bool): Also look for it in the archive.
+
+        Returns:
+            Optional[tuple]: Data of the task, None if it does not exist.
+        """
+        rows = []
+        try:
+            rows = self._read(
+                self.generate_sql_select_statement(
+                    "id = ?", self._task_source(include_archived)
                 ),
+                (task_id,),
             )
-            self.conn.commit()
-            task_id = cursor.lastrowid
-            self.logger.info("Data inserted successfully.")
         except sqlite3.Error as e:
-            self.logger.error(f"Error inserting data: {e}")
-        finally:
-            self.close_connection()
-        return task_id
+            self.logger.error(f"Error getting task: {e}")
+        return rows[0] if rows else None
 
-    def fetch_data(
-        self, task_id: int, to_do: str = "COMPLETE", task=None
-    ) -> None:
+    def query_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        after_id: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> List[tuple]:
         """
-        Modify task.
+        Return the tasks matching a status, ordered by id.
 
-        It changes the status to COMPLETE by default.
+        Args:
+            status (TaskStatus, optional): Only return tasks in this status.
+            limit (int, optional): Maximum number of tasks returned.
+            offset (int): Number of matching tasks skipped.
+            after_id (int, optional): Only return tasks with a higher id.
+                Paging on the last id seen is as fast for the last page
+                as for the first, unlike an offset.
+            include_archived (bool): Also return the archived tasks.
+
+        Returns:
+            List[tuple]: Data of the matching tasks.
+        """
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status.value)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        query = self.generate_sql_select_statement(
+            " AND ".join(conditions) or None,
+            self._task_source(include_archived),
+        ) + " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend((limit, offset))
+        data = []
+        try:
+            data = self._read(query, tuple(params))
+        except sqlite3.Error as e:
+            self.logger.error(f"Error querying tasks: {e}")
+        return data
+
+    def search_tasks(
+        self,
+        text: str,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[tuple]:
+        """
+        Return the tasks whose text contains a string, ordered by id.
+
+        The name, description, assignees and categories are searched,
+        ignoring the case of ASCII letters. Every task is scanned, so
+        pages are read by id to stop at the first `limit` matches.
 
         Args:
-            task_id (int): Task id of task to be modified.
-            to_do (str, optional): Action to be performed
-            on the task. Defaults to "COMPLETE".
-            task (_type_, optional): Task to be modified. Defaults to None.
+            text (str): String looked for.
+            limit (int, optional): Maximum number of tasks returned.
+            after_id (int, optional): Only return tasks with a higher id.
+
+        Returns:
+            List[tuple]: Data of the matching tasks.
+        """
+        escaped = (
+            text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        condition = " OR ".join(
+            f"{column} LIKE ? ESCAPE '\\'"
+            for column in ("name", "description", "assignee", "category")
+        )
+        conditions, params = [f"({condition})"], [f"%{escaped}%"] * 4
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        query = self.generate_sql_select_statement(
+            " AND ".join(conditions)
+        ) + " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        data = []
+        try:
+            data = self._read(query, tuple(params))
+        except sqlite3.Error as e:
+            self.logger.error(f"Error searching tasks: {e}")
+        return data
+
+    def query_due(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[tuple]:
+        """
+        Return the open tasks due in a period, ordered by due date.
+
+        With the index on due_date the matching rows are read in order,
+        without sorting the table.
+
+        Args:
+            start (datetime, optional): Earliest due date returned.
+            end (datetime, optional): Latest due date returned.
+            limit (int, optional): Maximum number of tasks returned.
+
+        Returns:
+            List[tuple]: Data of the matching tasks.
         """
+        conditions, params = ["status != ?"], [TaskStatus.COMPLETE.value]
+        if start is not None:
+            conditions.append("due_date >= ?")
+            params.append(start.strftime(DB_DATE_FORMAT))
+        if end is not None:
+            conditions.append("due_date <= ?")
+            params.append(end.strftime(DB_DATE_FORMAT))
+        query = self.generate_sql_select_statement(
+            " AND ".join(conditions)
+        ) + " ORDER BY due_date, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        data = []
         try:
-            self.connect()
-            cursor = self.conn.cursor()
-            if to_do == "COMPLETE":
-                query = self.generate_sql_complete_statement()
-                cursor.execute(query, (TaskStatus.COMPLETE.value, task_id))
-                self.logger.info("Task completed successfully")
-            elif to_do == "MODIFY":
-                query = self.generate_sql_modify_statement()
-                cursor.execute(
-                    query, (task[0], task[1], task[2], task[3], task_id)
-                )
-                self.logger.info("Task modified successfully")
-            self.conn.commit()
+            data = self._read(query, tuple(params))
         except sqlite3.Error as e:
-            self.logger.error(f"Error fetching data: {e}")
-        finally:
-            self.close_connection()
+            self.logger.error(f"Error querying due tasks: {e}")
+        return data
 
-    def remove_task(self, task_id: int) -> None:
+    def iter_task_batches(
+        self,
+        batch_size: int = 10000,
+        condition: Optional[str] = None,
+        params=(),
+        order_by: str = "id",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Iterator[List[tuple]]:
         """
-        Remove a task from the data base by its id.
+        Stream the tasks of the database in batches.
+
+        A single cursor walks the table on its own connection, to the
+        read replica when there is one, and only `batch_size` rows are
+        held at a time, so whole tables can be exported without loading
+        them in memory.
 
         Args:
-            task_id (int): Task id of the task to be removed.
+            batch_size (int): Maximum number of rows per batch.
+            condition (str, optional): WHERE clause of the query.
+            params: Parameters bound to the condition.
+            order_by (str): Column the tasks are sorted by.
+            descending (bool): Sort from the highest value.
+            limit (int, optional): Maximum number of rows streamed.
+            offset (int): Number of matching rows skipped.
+
+        Yields:
+            List[tuple]: Batches of task rows.
+
+        Raises:
+            sqlite3.Error: If the tasks cannot be read, after the batches
+                already read, so that a stream cut short is never taken
+                for all the tasks.
         """
+        if order_by not in TASK_COLUMNS:
+            raise ValueError(f"Unknown column '{order_by}'")
+        query = self.generate_sql_select_statement(condition)
+        direction = "DESC" if descending else "ASC"
+        query += f" ORDER BY {order_by} {direction}"
+        if order_by != "id":
+            # Ties follow the same direction, so the index of the column,
+            # which also orders by id, serves the whole ORDER BY.
+            query += f", id {direction}"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params = (*params, limit, offset)
+        conn = self._open_reader()
         try:
-            self.connect()
-            cursor = self.conn.cursor()
-            remove_sql = self.generate_sql_remove_statement()
-            cursor.execute(remove_sql, str(task_id))
-            self.conn.commit()
-            self.logger.info("Data removed successfully")
+            if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = 'tasks'"
+            ).fetchone() is None:
+                # A database never written holds no tasks.
+                return
+            cursor = conn.execute(query, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
         except sqlite3.Error as e:
-            self.logger.error(f"Error removing data: {e}")
+            self.logger.error(f"Error streaming tasks: {e}")
+            raise
         finally:
-            self.close_connection()
+            conn.close()
 
-    def get_all_tasks(self) -> List[tuple]:
+    def iter_index_rows(
+        self,
+        batch_size: int = 100000,
+        after_id: Optional[int] = None,
+        ids: Optional[Sequence[int]] = None,
+    ) -> Iterator[List[tuple]]:
         """
-        Return all tasks stored in data base.
+        Stream the fields of the tasks kept in the binary task index.
+
+        Rows hold the id, status, priority, due date in seconds since the
+        epoch (computed by SQLite) and assignee text of a task, by id.
+
+        Args:
+            batch_size (int): Maximum number of rows per batch.
+            after_id (int, optional): Only stream tasks with a higher id.
+            ids (Sequence[int], optional): Only stream these tasks.
+
+        Yields:
+            List[tuple]: Batches of index rows.
+
+        Raises:
+            sqlite3.Error: If the tasks cannot be read, since an index
+                built from part of them would be wrong.
+        """
+        select_sql = (
+            "SELECT id, status, priority, COALESCE(CAST(strftime('%s', "
+            "replace(due_date, '/', '-')) AS INTEGER), 0), assignee "
+            "FROM tasks"
+        )
+        if ids is not None:
+            # Ids are looked up in chunks below the SQLite variable limit.
+            ids = list(ids)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._read(
+                    f"{select_sql} WHERE id IN ({placeholders}) ORDER BY id",
+                    tuple(chunk),
+                )
+                if rows:
+                    yield rows
+            return
+        query, params = select_sql, ()
+        if after_id is not None:
+            query += " WHERE id > ?"
+            params = (after_id,)
+        conn = self._open_reader()
+        try:
+            cursor = conn.execute(query + " ORDER BY id", params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            conn.close()
+
+    def count_tasks(
+        self, condition: Optional[str] = None, params=()
+    ) -> int:
+        """
+        Count the tasks matching a condition.
+
+        Args:
+            condition (str, optional): WHERE clause of the count.
+            params: Parameters bound to the condition.
 
         Returns:
-            List[tuple]: List of tuples. This list has all tasks in db.
-                         Each tuple represents the data of a task.
+            int: Number of matching tasks.
         """
-        data = None
+        query = "SELECT COUNT(*) FROM tasks"
+        if condition:
+            query += f" WHERE {condition}"
         try:
-            self.connect()
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM tasks")
-            data = cursor.fetchall()
+            return self._read(query, params)[0][0]
         except sqlite3.Error as e:
-            self.logger.error(f"Error getting all tasks: {e}")
-        finally:
-            self.close_connection()
-        return data
+            self.logger.error(f"Error counting tasks: {e}")
+            return 0
+
+    def task_stats(self) -> dict:
+        """
+        Count the tasks by status and priority.
+
+        Returns:
+            dict: Total number of tasks, counts by status and priority
+                  names, and number of open tasks past their due date.
+        """
+        stats = {"total": 0, "by_status": {}, "by_priority": {}, "overdue": 0}
+        try:
+            rows = self._read(
+                """SELECT status, priority, COUNT(*),
+                          SUM(due_date < ? AND status != ?)
+                   FROM tasks GROUP BY status, priority""",
+                (
+                    datetime.now().strftime(DB_DATE_FORMAT),
+                    TaskStatus.COMPLETE.value,
+                ),
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error computing task stats: {e}")
+            return stats
+        for status, priority, count, overdue in rows:
+            status_name = TaskStatus(status).name
+            priority_name = TaskPriority(priority).name
+            stats["total"] += count
+            stats["overdue"] += overdue
+            stats["by_status"][status_name] = (
+                stats["by_status"].get(status_name, 0) + count
+            )
+            stats["by_priority"][priority_name] = (
+                stats["by_priority"].get(priority_name, 0) + count
+            )
+        return stats
 
     def close_connection(self) -> None:
         """Close connection of data base."""
         if self.conn:
             self.conn.close()
+            # Never reused once closed, nor taken for a batch's connection.
+            self.conn = None
             self.logger.info("Database connection closed")
 
+    @staticmethod
+    def encode_task_data(data: TaskData) -> tuple:
+        """
+        Convert task data into a row ready to be inserted.
+
+        Args:
+            data (TaskData): Task to be encoded.
+
+        Returns:
+            tuple: Values in the column order of the insert statement.
+        """
+        return (
+            data["name"],
+            data["description"],
+            data["creation_date"].strftime(DB_DATE_FORMAT),
+            data["due_date"].strftime(DB_DATE_FORMAT),
+            ", ".join(data["assignee"]),
+            data["status"].value,
+            data["priority"].value,
+            "" if not data["categories"] else " ".join(data["categories"]),
+        )
+
     @staticmethod
     def generate_sql_creation_statement() -> str:
         """
@@ -263,8 +2568,8 @@ class SQLiteDB:
             str: SQL statement.
         """
         create_table_sql = """
-                                    CREATE TABLE tasks (
-                                        id INTEGER PRIMARY KEY,
+                                    CREATE TABLE IF NOT EXISTS tasks (
+                                        id INTEGER PRIMARY KEY AUTOINCREMENT,
                                         name TEXT,
                                         description TEXT,
                                         creation_date DATETIME,
@@ -272,7 +2577,8 @@ class SQLiteDB:
                                         assignee TEXT,
                                         status INTEGER,
                                         priority INTEGER,
-                                        category TEXT
+                                        category TEXT,
+                                        version INTEGER NOT NULL DEFAULT 1
                                         )
                                                             """
 
@@ -298,6 +2604,25 @@ class SQLiteDB:
             """
         return insert_sql
 
+    @staticmethod
+    def generate_sql_select_statement(
+        condition: Optional[str] = None, source: str = "tasks"
+    ) -> str:
+        """
+        Return SQL statement to read tasks.
+
+        Args:
+            condition (str, optional): WHERE clause of the statement.
+            source (str): Table or subquery the tasks are read from.
+
+        Returns:
+            str: SQL statement.
+        """
+        select_sql = f"SELECT {', '.join(TASK_COLUMNS)} FROM {source}"
+        if condition:
+            select_sql += f" WHERE {condition}"
+        return select_sql
+
     @staticmethod
     def generate_sql_remove_statement() -> str:
         """
@@ -316,7 +2641,8 @@ class SQLiteDB:
         Returns:
             str: SQL statement.
         """
-        return """UPDATE tasks SET status = ? WHERE id = ?"""
+        return """UPDATE tasks SET status = ?, version = version + 1
+                  WHERE id = ?"""
 
     @staticmethod
     def generate_sql_modify_statement() -> str:
@@ -330,5 +2656,23 @@ class SQLiteDB:
                   SET  name = ?,
                        description = ?,
                        due_date = ?,
-                       assignee = ?
+                       assignee = ?,
+                       version = version + 1
                   WHERE id = ?"""
+
+    @staticmethod
+    def generate_sql_versioned_modify_statement() -> str:
+        """
+        Return SQL statement to modify a task still at an expected version.
+
+        Returns:
+            str: SQL statement returning the new version.
+        """
+        return """UPDATE tasks
+                  SET  name = ?,
+                       description = ?,
+                       due_date = ?,
+                       assignee = ?,
+                       version = version + 1
+                  WHERE id = ? AND (? IS NULL OR version = ?)
+                  RETURNING version"""
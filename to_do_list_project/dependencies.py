@@ -0,0 +1,342 @@
+"""
+dependencies.py.
+
+This script keeps the dependencies between tasks in memory, so that the
+tasks ready to start and the tasks blocking another one are found
+without walking the graph again.
+
+The graph is a DAG: a task depends on its prerequisites, which have to
+be completed first. Every task keeps the number of its open
+prerequisites, updated when one is completed or removed, and the open
+tasks whose counter is zero form the set of ready tasks.
+
+Cycles are refused when a dependency is added, with the dynamic
+topological order of Pearce and Kelly: the tasks are kept in an order
+where prerequisites come first, so a new dependency that agrees with it
+needs no check at all, and one that does not is only checked, and the
+order repaired, between the positions of its two tasks.
+"""
+
+from datetime import datetime
+from heapq import nsmallest
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class DependencyCycleError(ValueError):
+    """Exception raised when a dependency would close a cycle."""
+
+
+class DependencyGraph:
+    """Dependencies between tasks, with their open prerequisite counts."""
+
+    def __init__(
+        self,
+        tasks: Iterable[Tuple[int, bool, datetime]] = (),
+        edges: Iterable[Tuple[int, int]] = (),
+    ) -> None:
+        """
+        Initialize the DependencyGraph object.
+
+        Args:
+            tasks (Iterable[Tuple[int, bool, datetime]]): Id, whether the
+                task is completed, and due date of every task.
+            edges (Iterable[Tuple[int, int]]): Task id and id of the task
+                it depends on; dependencies on unknown tasks, such as
+                archived ones, are ignored.
+
+        Raises:
+            DependencyCycleError: If the dependencies contain a cycle.
+        """
+        self._due: Dict[int, datetime] = {}
+        self._completed: Set[int] = set()
+        for task_id, completed, due_date in tasks:
+            self._due[task_id] = due_date
+            if completed:
+                self._completed.add(task_id)
+        self._prerequisites: Dict[int, List[int]] = {
+            task_id: [] for task_id in self._due
+        }
+        self._dependents: Dict[int, List[int]] = {
+            task_id: [] for task_id in self._due
+        }
+        for task_id, depends_on in edges:
+            if task_id in self._due and depends_on in self._due:
+                self._prerequisites[task_id].append(depends_on)
+                self._dependents[depends_on].append(task_id)
+        self._blocking: Dict[int, int] = {
+            task_id: sum(
+                prerequisite not in self._completed
+                for prerequisite in prerequisites
+            )
+            for task_id, prerequisites in self._prerequisites.items()
+        }
+        self._ready: Set[int] = {
+            task_id
+            for task_id, blocking in self._blocking.items()
+            if not blocking and task_id not in self._completed
+        }
+        self._order = self._topological_order()
+        self._next_position = len(self._order)
+
+    def _topological_order(self) -> Dict[int, int]:
+        """Return the position of every task, prerequisites first."""
+        remaining = {
+            task_id: len(prerequisites)
+            for task_id, prerequisites in self._prerequisites.items()
+        }
+        queue = [task_id for task_id, count in remaining.items() if not count]
+        order: Dict[int, int] = {}
+        while queue:
+            task_id = queue.pop()
+            order[task_id] = len(order)
+            for dependent in self._dependents[task_id]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    queue.append(dependent)
+        if len(order) < len(remaining):
+            raise DependencyCycleError("The task dependencies contain a cycle")
+        return order
+
+    def __len__(self) -> int:
+        """Return the number of tasks in the graph."""
+        return len(self._due)
+
+    def __contains__(self, task_id: int) -> bool:
+        """Tell whether a task is in the graph."""
+        return task_id in self._due
+
+    def add_task(
+        self, task_id: int, due_date: datetime, completed: bool = False
+    ) -> None:
+        """Add a task without dependencies."""
+        if task_id in self._due:
+            return
+        self._due[task_id] = due_date
+        self._prerequisites[task_id] = []
+        self._dependents[task_id] = []
+        self._blocking[task_id] = 0
+        if completed:
+            self._completed.add(task_id)
+        else:
+            self._ready.add(task_id)
+        # Last in the order, which no dependency contradicts yet.
+        self._order[task_id] = self._next_position
+        self._next_position += 1
+
+    def set_due_date(self, task_id: int, due_date: datetime) -> None:
+        """Change the due date of a task."""
+        if task_id in self._due:
+            self._due[task_id] = due_date
+
+    def add_dependency(self, task_id: int, depends_on: int) -> bool:
+        """
+        Make a task depend on another one.
+
+        Args:
+            task_id (int): Task that has to wait.
+            depends_on (int): Task to complete first.
+
+        Returns:
+            bool: False if the dependency already existed.
+
+        Raises:
+            KeyError: If a task is not in the graph.
+            DependencyCycleError: If the other task already depends on the
+                task, directly or not, or if both are the same.
+        """
+        if task_id not in self._due or depends_on not in self._due:
+            raise KeyError(task_id if task_id not in self._due else depends_on)
+        if task_id == depends_on:
+            raise DependencyCycleError(
+                f"Task {task_id} cannot depend on itself"
+            )
+        if depends_on in self._prerequisites[task_id]:
+            return False
+        if self._order[depends_on] > self._order[task_id]:
+            self._reorder(depends_on, task_id)
+        self._prerequisites[task_id].append(depends_on)
+        self._dependents[depends_on].append(task_id)
+        if depends_on not in self._completed:
+            self._blocking[task_id] += 1
+            self._ready.discard(task_id)
+        return True
+
+    def _reorder(self, first: int, last: int) -> None:
+        """
+        Move `first` before `last` in the order, which has them reversed.
+
+        Only the tasks placed between them can be affected: the ones that
+        `last` leads to are searched up to the position of `first`, and a
+        cycle is found if `first` is among them. Otherwise, the tasks
+        leading to `first` from that range take the earliest positions
+        that both groups held, followed by the tasks `last` leads to.
+
+        Raises:
+            DependencyCycleError: If `first` depends on `last`.
+        """
+        lower, upper = self._order[last], self._order[first]
+        forward = self._search(last, self._dependents, lambda p: p <= upper)
+        if first in forward:
+            raise DependencyCycleError(
+                f"Task {first} already depends on task {last}"
+            )
+        backward = self._search(
+            first, self._prerequisites, lambda p: p >= lower
+        )
+        moved = sorted(backward, key=self._order.__getitem__) + sorted(
+            forward, key=self._order.__getitem__
+        )
+        positions = sorted(self._order[task_id] for task_id in moved)
+        for task_id, position in zip(moved, positions):
+            self._order[task_id] = position
+
+    def _search(self, start: int, links: Dict[int, List[int]], keep) -> set:
+        """Return the tasks reached from one through links within a range."""
+        seen = {start}
+        stack = [start]
+        while stack:
+            for task_id in links[stack.pop()]:
+                if task_id not in seen and keep(self._order[task_id]):
+                    seen.add(task_id)
+                    stack.append(task_id)
+        return seen
+
+    def remove_dependency(self, task_id: int, depends_on: int) -> bool:
+        """
+        Stop a task from depending on another one.
+
+        Returns:
+            bool: False if there was no such dependency.
+        """
+        prerequisites = self._prerequisites.get(task_id, [])
+        if depends_on not in prerequisites:
+            return False
+        prerequisites.remove(depends_on)
+        self._dependents[depends_on].remove(task_id)
+        if depends_on not in self._completed:
+            self._unblock(task_id)
+        return True
+
+    def _unblock(self, task_id: int) -> None:
+        """Count one open prerequisite of a task less."""
+        self._blocking[task_id] -= 1
+        if not self._blocking[task_id] and task_id not in self._completed:
+            self._ready.add(task_id)
+
+    def complete(self, task_id: int) -> None:
+        """Mark a task as completed, unblocking the tasks waiting for it."""
+        if task_id not in self._due or task_id in self._completed:
+            return
+        self._completed.add(task_id)
+        self._ready.discard(task_id)
+        for dependent in self._dependents[task_id]:
+            self._unblock(dependent)
+
+    def remove(self, task_id: int) -> None:
+        """Remove a task and its dependencies from the graph."""
+        if task_id not in self._due:
+            return
+        self.complete(task_id)
+        for prerequisite in self._prerequisites.pop(task_id):
+            self._dependents[prerequisite].remove(task_id)
+        for dependent in self._dependents.pop(task_id):
+            self._prerequisites[dependent].remove(task_id)
+        self._completed.discard(task_id)
+        del self._due[task_id], self._blocking[task_id], self._order[task_id]
+
+    def ready(self, limit: Optional[int] = None) -> List[int]:
+        """
+        Return the open tasks whose prerequisites are all completed.
+
+        Args:
+            limit (int, optional): Only return the ones due first.
+
+        Returns:
+            List[int]: Ids of the tasks, by due date then id.
+        """
+        key = self._due_key
+        if limit is None:
+            return sorted(self._ready, key=key)
+        return nsmallest(limit, self._ready, key=key)
+
+    def _due_key(self, task_id: int) -> Tuple[datetime, int]:
+        """Return the sort key of a task by due date."""
+        return self._due[task_id], task_id
+
+    def blocked_by(self, task_id: int) -> List[int]:
+        """
+        Return the open prerequisites of a task.
+
+        Raises:
+            KeyError: If the task is not in the graph.
+        """
+        return sorted(
+            prerequisite
+            for prerequisite in self._prerequisites[task_id]
+            if prerequisite not in self._completed
+        )
+
+    def prerequisites(self, task_id: int) -> List[int]:
+        """Return every prerequisite of a task, completed or not."""
+        return sorted(self._prerequisites.get(task_id, []))
+
+    def critical_path(self) -> List[Tuple[int, datetime]]:
+        """
+        Return the longest chain of open tasks that depend on each other.
+
+        Every open task is given the latest date it can be completed
+        without making a task depending on it late: its due date, or the
+        earliest such date of its dependents. The chain with the most
+        tasks is the one that takes the most steps to complete; among
+        chains of the same length, the one whose first task has the
+        earliest such date is returned. It is computed in one pass over
+        the open tasks in topological order, O(tasks + dependencies).
+
+        Returns:
+            List[Tuple[int, datetime]]: Ids of the tasks of the chain, in
+            the order they have to be completed, with their latest date.
+        """
+        open_tasks = sorted(
+            (
+                task_id for task_id in self._due
+                if task_id not in self._completed
+            ),
+            key=self._order.__getitem__,
+        )
+        latest: Dict[int, datetime] = {}
+        for task_id in reversed(open_tasks):
+            latest[task_id] = min(
+                [self._due[task_id]]
+                + [
+                    latest[dependent]
+                    for dependent in self._dependents[task_id]
+                    if dependent in latest
+                ]
+            )
+        # Longest chain starting at each task, and the next task on it.
+        length: Dict[int, int] = {}
+        following: Dict[int, Optional[int]] = {}
+        for task_id in reversed(open_tasks):
+            best = min(
+                (
+                    dependent for dependent in self._dependents[task_id]
+                    if dependent in length
+                ),
+                key=self._path_key(length, latest),
+                default=None,
+            )
+            length[task_id] = 1 + (length[best] if best is not None else 0)
+            following[task_id] = best
+        if not open_tasks:
+            return []
+        task_id = min(open_tasks, key=self._path_key(length, latest))
+        path = []
+        while task_id is not None:
+            path.append((task_id, latest[task_id]))
+            task_id = following[task_id]
+        return path
+
+    @staticmethod
+    def _path_key(length: Dict[int, int], latest: Dict[int, datetime]):
+        """Return the key preferring longer chains, then earlier dates."""
+        return lambda task_id: (-length[task_id], latest[task_id], task_id)
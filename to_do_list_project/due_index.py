@@ -0,0 +1,84 @@
+"""
+due_index.py.
+
+This script keeps the open tasks of a `TaskManager` sorted by due date,
+so the tasks due next, the overdue ones and the ones due in a period are
+found without sorting all the tasks again.
+
+The tasks are kept in a list of (due date, id) keys sorted with `bisect`:
+a lookup is a binary search followed by a slice of the k tasks returned,
+O(log n + k). Unlike a heap, the sorted list also answers range queries.
+Completed tasks are not kept in the index.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+import math
+from typing import Dict, Iterable, List, Tuple
+
+from .task import Task, TaskStatus
+
+
+class DueIndex:
+    """Open tasks sorted by due date, then id."""
+
+    def __init__(self, tasks: Iterable[Task] = ()) -> None:
+        """
+        Initialize the DueIndex object.
+
+        Args:
+            tasks (Iterable[Task]): Tasks to index; completed ones are
+                skipped.
+        """
+        self._tasks: Dict[int, Task] = {
+            task.id: task
+            for task in tasks
+            if task.status is not TaskStatus.COMPLETE
+        }
+        self._keys: List[Tuple[datetime, int]] = sorted(
+            (task.due_date, task.id) for task in self._tasks.values()
+        )
+
+    def __len__(self) -> int:
+        """Return the number of indexed tasks."""
+        return len(self._keys)
+
+    def add(self, task: Task) -> None:
+        """Index a task, or index it again after a change."""
+        self.discard(task.id)
+        if task.status is TaskStatus.COMPLETE:
+            return
+        self._tasks[task.id] = task
+        insort(self._keys, (task.due_date, task.id))
+
+    def discard(self, task_id: int) -> None:
+        """
+        Remove a task from the index, if it is in it.
+
+        The task is looked up with the due date it was indexed with, so
+        this must be called before its due date is changed.
+        """
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return
+        position = bisect_left(self._keys, (task.due_date, task_id))
+        del self._keys[position]
+
+    def _slice(self, start: int, stop: int) -> List[Task]:
+        """Return the tasks of a range of keys."""
+        return [self._tasks[task_id] for _, task_id in self._keys[start:stop]]
+
+    def next_due(self, n: int = 1) -> List[Task]:
+        """Return the n open tasks with the earliest due dates."""
+        return self._slice(0, max(n, 0))
+
+    def overdue(self, now: datetime) -> List[Task]:
+        """Return the open tasks due before a date, oldest first."""
+        return self._slice(0, bisect_left(self._keys, (now,)))
+
+    def due_between(self, start: datetime, end: datetime) -> List[Task]:
+        """Return the open tasks due from start to end included."""
+        return self._slice(
+            bisect_left(self._keys, (start,)),
+            bisect_right(self._keys, (end, math.inf)),
+        )
@@ -0,0 +1,211 @@
+"""
+generator.py.
+
+This script generates synthetic tasks for load testing. The data mimics
+a production workload: a few assignees and categories own most of the
+tasks, statuses and priorities are mixed, due dates fall both in the
+past and in the future, and descriptions are long.
+
+Rows are produced column by column in batches and written straight into
+a SQLite database through `SQLiteDB.bulk_insert`, bypassing
+`TaskManager.add_task`, so that millions of tasks can be created in
+seconds.
+
+Usage:
+    python -m to_do_list_project.generator --rows 1000000 --seed 42
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from itertools import accumulate
+import random
+import time
+from typing import Iterator, List, Optional
+
+from .db import DB_DATE_FORMAT, SQLiteDB
+from .task import TaskPriority, TaskStatus
+
+ASSIGNEES = [
+    "Alice", "Bob", "Charlie", "Diane", "Edouard", "Florent", "Gabriel",
+    "Hugo", "Ines", "Jaime", "Karim", "Louise", "Maxime", "Nina", "Oscar",
+    "Pierre", "Quentin", "Rose", "Sofia", "Theo", "Ugo", "Victor", "Wendy",
+    "Xavier", "Yasmine", "Zoe",
+]
+
+CATEGORIES = [
+    "Work", "Personal", "Shopping", "House", "Finance", "Health", "Travel",
+    "Study", "Family", "Admin", "Sport", "Garden", "Car", "Events", "Others",
+]
+
+VERBS = [
+    "Review", "Prepare", "Write", "Fix", "Plan", "Call", "Clean", "Update",
+    "Organize", "Check", "Send", "Book", "Buy", "Refactor", "Deploy",
+]
+
+NOUNS = [
+    "report", "budget", "meeting", "invoice", "kitchen", "slides", "tests",
+    "roadmap", "newsletter", "garage", "appointment", "contract", "backlog",
+    "release", "documentation", "presentation", "groceries", "tickets",
+]
+
+WORDS = NOUNS + [
+    "the", "with", "before", "after", "team", "client", "deadline", "notes",
+    "quarterly", "follow", "up", "details", "draft", "final", "version",
+    "share", "feedback", "priority", "schedule", "review", "and", "for",
+]
+
+STATUS_WEIGHTS = {
+    TaskStatus.START: 20,
+    TaskStatus.IN_PROGRESS: 45,
+    TaskStatus.COMPLETE: 35,
+}
+
+PRIORITY_WEIGHTS = {
+    TaskPriority.LOW: 30,
+    TaskPriority.MEDIUM: 50,
+    TaskPriority.HIGH: 20,
+}
+
+HISTORY_HOURS = 365 * 24
+DUE_WINDOW_HOURS = 120 * 24
+DESCRIPTION_POOL_SIZE = 2048
+
+
+def zipf_cum_weights(size: int, exponent: float = 1.1) -> List[float]:
+    """
+    Return cumulative weights following a Zipf law.
+
+    Args:
+        size (int): Number of items to weight.
+        exponent (float): Skew of the distribution, higher is more skewed.
+
+    Returns:
+        List[float]: Cumulative weights usable by `random.choices`.
+    """
+    return list(accumulate(1 / (rank ** exponent)
+                           for rank in range(1, size + 1)))
+
+
+def generate_rows(
+    count: int,
+    seed: int = 0,
+    now: Optional[datetime] = None,
+    batch_size: int = 10000,
+) -> Iterator[tuple]:
+    """
+    Generate synthetic task rows ready for `SQLiteDB.bulk_insert`.
+
+    The same seed and reference time always produce the same rows.
+
+    Args:
+        count (int): Number of rows to generate.
+        seed (int): Seed of the random generator.
+        now (datetime, optional): Reference time for the dates.
+            Defaults to the current time truncated to the hour.
+        batch_size (int): Number of rows generated at a time.
+
+    Yields:
+        tuple: Encoded task rows.
+    """
+    rng = random.Random(seed)
+    if now is None:
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    # Dates are drawn on an hourly grid so that every timestamp is
+    # formatted once up front instead of once per row.
+    first_hour = now - timedelta(hours=HISTORY_HOURS)
+    hours = [
+        (first_hour + timedelta(hours=offset)).strftime(DB_DATE_FORMAT)
+        for offset in range(HISTORY_HOURS + DUE_WINDOW_HOURS + 1)
+    ]
+
+    names = [f"{verb} {noun}" for verb in VERBS for noun in NOUNS]
+    descriptions = [
+        " ".join(rng.choices(WORDS, k=rng.randint(30, 120))).capitalize()
+        for _ in range(DESCRIPTION_POOL_SIZE)
+    ]
+    assignee_weights = zipf_cum_weights(len(ASSIGNEES))
+    category_weights = zipf_cum_weights(len(CATEGORIES))
+    statuses = [status.value for status in STATUS_WEIGHTS]
+    status_weights = list(accumulate(STATUS_WEIGHTS.values()))
+    priorities = [priority.value for priority in PRIORITY_WEIGHTS]
+    priority_weights = list(accumulate(PRIORITY_WEIGHTS.values()))
+    creation_range = range(HISTORY_HOURS + 1)
+    due_range = range(1, DUE_WINDOW_HOURS + 1)
+
+    remaining = count
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        remaining -= size
+
+        assignees = rng.choices(ASSIGNEES, cum_weights=assignee_weights,
+                                k=size)
+        co_assignees = rng.choices(ASSIGNEES, cum_weights=assignee_weights,
+                                   k=size)
+        assignees = [
+            f"{first}, {second}" if rng.random() < 0.15 and first != second
+            else first
+            for first, second in zip(assignees, co_assignees)
+        ]
+        categories = rng.choices(CATEGORIES, cum_weights=category_weights,
+                                 k=size)
+        created = rng.choices(creation_range, k=size)
+        due = [
+            start + delay
+            for start, delay in zip(created, rng.choices(due_range, k=size))
+        ]
+
+        yield from zip(
+            rng.choices(names, k=size),
+            rng.choices(descriptions, k=size),
+            [hours[offset] for offset in created],
+            [hours[offset] for offset in due],
+            assignees,
+            rng.choices(statuses, cum_weights=status_weights, k=size),
+            rng.choices(priorities, cum_weights=priority_weights, k=size),
+            categories,
+        )
+
+
+def populate(db: SQLiteDB, count: int, seed: int = 0) -> int:
+    """
+    Write `count` synthetic tasks into the database.
+
+    Synchronous writes are turned off for the load: the tasks can be
+    generated again, so speed matters more than surviving a power loss.
+
+    Args:
+        db (SQLiteDB): Database receiving the tasks.
+        count (int): Number of tasks to create.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        int: Number of tasks inserted.
+    """
+    return db.bulk_insert(
+        "tasks", generate_rows(count, seed), synchronous="OFF"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the generator from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Fill a task database with synthetic tasks."
+    )
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="number of tasks to generate")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random generator")
+    parser.add_argument("--db", default="load_test.db",
+                        help="database file to write into")
+    args = parser.parse_args(argv)
+
+    db = SQLiteDB(args.db)
+    start = time.perf_counter()
+    inserted = populate(db, args.rows, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {inserted} tasks into {db.db_name} in {elapsed:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
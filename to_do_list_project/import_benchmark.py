@@ -0,0 +1,179 @@
+"""
+import_benchmark.py.
+
+This script measures how long the modules of the package take to import,
+with the `-X importtime` option of the interpreter, and checks them
+against a time budget.
+
+Every module is imported in a fresh interpreter a few times and the best
+cumulative time is kept, which leaves out the interpreter start-up and
+most of the noise of the machine. Modules imported by the interpreter
+itself (site, encodings...) are not counted.
+
+Bytecode should be compiled beforehand, as it is after a first run or an
+install, otherwise the times include the compilation of the sources:
+    python -m compileall -q to_do_list_project
+    python -m to_do_list_project.import_benchmark --runs 5
+
+The exit code is 1 when a module exceeds its budget.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+# Import time budgets in milliseconds.
+DEFAULT_BUDGETS = {
+    "to_do_list_project.task_manager": 50.0,
+    "to_do_list_project.main": 50.0,
+    "to_do_list_project.cli": 50.0,
+}
+
+IMPORTTIME_LINE = re.compile(
+    r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$"
+)
+
+
+class ImportTiming(TypedDict):
+    """Import time of one module, in milliseconds."""
+
+    module: str
+    best_ms: float
+    budget_ms: float
+    slowest_children: List[Tuple[str, float]]
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[float, float, int]]:
+    """
+    Parse the report written on stderr by `-X importtime`.
+
+    Args:
+        output (str): Text written by the interpreter.
+
+    Returns:
+        Dict[str, Tuple[float, float, int]]: Self time and cumulative time
+        in milliseconds, and nesting level, of every imported module.
+    """
+    timings = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings[module] = (
+                int(self_us) / 1000,
+                int(cumulative_us) / 1000,
+                len(indent) // 2,
+            )
+    return timings
+
+
+def measure_import(module: str, runs: int = 5) -> Dict[str, tuple]:
+    """
+    Import a module in fresh interpreters and keep the fastest run.
+
+    Args:
+        module (str): Module to import.
+        runs (int): Number of interpreters started.
+
+    Returns:
+        Dict[str, tuple]: Timings of the fastest run, as returned by
+        `parse_importtime`.
+    """
+    best = None
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings = parse_importtime(process.stderr)
+        if best is None or timings[module][1] < best[module][1]:
+            best = timings
+    return best
+
+
+def run_benchmark(
+    budgets: Optional[Dict[str, float]] = None, runs: int = 5, top: int = 5
+) -> List[ImportTiming]:
+    """
+    Measure the import time of modules against their budgets.
+
+    Args:
+        budgets (Dict[str, float], optional): Budget in milliseconds of
+            every module. Defaults to `DEFAULT_BUDGETS`.
+        runs (int): Number of interpreters started per module.
+        top (int): Number of slowest imports kept per module.
+
+    Returns:
+        List[ImportTiming]: One entry per module.
+    """
+    budgets = budgets or DEFAULT_BUDGETS
+    results = []
+    for module, budget in budgets.items():
+        timings = measure_import(module, runs)
+        level = timings[module][2]
+        # Modules imported while importing `module` are listed right
+        # before it by the interpreter, one level deeper.
+        names = list(timings)
+        children = []
+        for name in reversed(names[: names.index(module)]):
+            if timings[name][2] <= level:
+                break
+            if timings[name][2] == level + 1:
+                children.append((name, timings[name][1]))
+        children.sort(key=lambda child: child[1], reverse=True)
+        results.append(
+            {
+                "module": module,
+                "best_ms": timings[module][1],
+                "budget_ms": budget,
+                "slowest_children": children[:top],
+            }
+        )
+    return results
+
+
+def format_report(results: List[ImportTiming]) -> str:
+    """Format the import times for the terminal."""
+    lines = []
+    for item in results:
+        status = "ok" if item["best_ms"] <= item["budget_ms"] else "OVER"
+        lines.append(
+            f"{item['module']}: {item['best_ms']:.1f} ms "
+            f"(budget {item['budget_ms']:.0f} ms) {status}"
+        )
+        for name, cumulative_ms in item["slowest_children"]:
+            lines.append(f"    {name}: {cumulative_ms:.1f} ms")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the import benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Check the import time of the package modules."
+    )
+    parser.add_argument("--runs", type=int, default=5,
+                        help="interpreters started per module")
+    parser.add_argument("--budget", type=float,
+                        help="budget in ms applied to every module")
+    parser.add_argument("modules", nargs="*",
+                        help="modules to measure, defaults to the main ones")
+    args = parser.parse_args(argv)
+
+    budgets = dict(DEFAULT_BUDGETS)
+    if args.modules:
+        budgets = {
+            module: budgets.get(module, 50.0) for module in args.modules
+        }
+    if args.budget is not None:
+        budgets = {module: args.budget for module in budgets}
+    results = run_benchmark(budgets, args.runs)
+    print(format_report(results))
+    return int(any(item["best_ms"] > item["budget_ms"] for item in results))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+importer.py.
+
+This script reads tasks exported from other trackers, in CSV or JSON
+lines files, and turns them into rows ready for `SQLiteDB.bulk_insert`.
+
+Files are streamed record by record, so the memory used does not depend
+on their size. Every record is validated with the same rules as `Task`;
+the records that fail are reported with their line number instead of
+being inserted.
+
+Recognised fields are name, description, due_date, creation_date,
+assignee, status, priority and categories (or category). Lists may be
+given comma separated, and statuses and priorities by name or value.
+"""
+
+import csv
+from datetime import datetime
+import json
+from typing import Iterator, List, Tuple, TypedDict, Union
+
+from .db import DB_DATE_FORMAT, SQLiteDB
+from .task import parse_date, Task, TaskPriority, TaskStatus
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+class RejectedRow(TypedDict):
+    """A record of an import file that could not be imported."""
+
+    line: int
+    error: str
+
+
+class ImportReport(TypedDict):
+    """Outcome of an import."""
+
+    imported: int
+    rejected: List[RejectedRow]
+
+
+def iter_csv_records(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Stream the records of a CSV file with a header row.
+
+    Args:
+        path (str): Path of the file.
+
+    Yields:
+        Tuple[int, dict]: Line where the record starts and the record.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as csv_file:
+        reader = csv.DictReader(csv_file)
+        # Reading the header first keeps line_num in step with the records.
+        reader.fieldnames
+        line = reader.line_num + 1
+        for record in reader:
+            yield line, record
+            line = reader.line_num + 1
+
+
+def iter_jsonl_records(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Stream the records of a JSON lines file.
+
+    Lines that are not JSON objects are yielded as their parsing error,
+    so that they end up in the import report.
+
+    Args:
+        path (str): Path of the file.
+
+    Yields:
+        Tuple[int, dict]: Line number and the record.
+    """
+    with open(path, encoding="utf-8") as jsonl_file:
+        for line, text in enumerate(jsonl_file, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError as e:
+                record = ValueError(f"Invalid JSON: {e.msg}")
+            else:
+                if not isinstance(record, dict):
+                    record = ValueError("Invalid JSON: expected an object")
+            yield line, record
+
+
+def parse_import_date(value: Union[str, datetime]) -> datetime:
+    """
+    Parse a date written by another tracker.
+
+    ISO 8601, 'YYYY/MM/DD' with or without time and 'DD-MM-YYYY' dates
+    are accepted.
+
+    Args:
+        value (Union[str, datetime]): Date to parse.
+
+    Returns:
+        datetime: Parsed date.
+    """
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("Missing date")
+    value = value.strip()
+    for date_format in (DB_DATE_FORMAT, "%Y/%m/%d"):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parse_date(value)
+
+
+def parse_list(value) -> List[str]:
+    """Parse a list given as a JSON list or as comma separated text."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value]
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def parse_enum(value, enum_class, default):
+    """Parse an enum member given by name, value or not at all."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, str) and not value.strip().isdigit():
+        try:
+            return enum_class[value.strip().upper().replace(" ", "_")]
+        except KeyError:
+            raise ValueError(f"Invalid {enum_class.__name__} '{value}'")
+    return enum_class(int(value))
+
+
+def validate_record(record: dict, allow_past_due: bool = False) -> tuple:
+    """
+    Validate an imported record and encode it for the database.
+
+    Args:
+        record (dict): Record read from the import file.
+        allow_past_due (bool): Accept due dates in the past, as for tasks
+            migrated with their history.
+
+    Returns:
+        tuple: Row ready for `SQLiteDB.bulk_insert`.
+
+    Raises:
+        ValueError: If the record breaks one of the Task rules.
+    """
+    due_date = parse_import_date(record.get("due_date"))
+    creation_date = (
+        parse_import_date(record["creation_date"])
+        if record.get("creation_date")
+        else datetime.now()
+    )
+    categories = parse_list(
+        record.get("categories", record.get("category"))
+    )
+    values = (
+        record.get("name"),
+        record.get("description"),
+        due_date,
+        parse_list(record.get("assignee")),
+        parse_enum(record.get("status"), TaskStatus, TaskStatus.IN_PROGRESS),
+        parse_enum(record.get("priority"), TaskPriority, TaskPriority.MEDIUM),
+        categories,
+    )
+    if allow_past_due:
+        task = Task.from_db(-1, *values[:2], creation_date, *values[2:])
+        task.categories = categories
+    else:
+        task = Task(-1, *values)
+    return SQLiteDB.encode_task_data(
+        {
+            "name": task.name,
+            "description": task.description,
+            "creation_date": creation_date,
+            "due_date": task.due_date,
+            "assignee": task.assignee,
+            "status": task.status,
+            "priority": task.priority,
+            "categories": task.categories,
+        }
+    )
+
+
+def iter_valid_rows(
+    path: str,
+    file_format: str,
+    rejected: List[RejectedRow],
+    allow_past_due: bool = False,
+) -> Iterator[tuple]:
+    """
+    Stream the valid rows of an import file.
+
+    Args:
+        path (str): Path of the file.
+        file_format (str): "csv" or "jsonl".
+        rejected (List[RejectedRow]): Receives the invalid records.
+        allow_past_due (bool): Accept due dates in the past.
+
+    Yields:
+        tuple: Rows ready for `SQLiteDB.bulk_insert`.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(
+            f"Unknown import format '{file_format}', use csv or jsonl"
+        )
+    records = (
+        iter_csv_records(path)
+        if file_format == "csv"
+        else iter_jsonl_records(path)
+    )
+    for line, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            row = validate_record(record, allow_past_due)
+        except (ValueError, TypeError) as e:
+            rejected.append({"line": line, "error": str(e)})
+            continue
+        yield row
@@ -0,0 +1,483 @@
+"""
+load_harness.py.
+
+This script runs a multi-process load test against one SQLite file, the
+way the CLI, several Streamlit sessions and batch scripts share
+`task_manager.db` in production.
+
+N writer and M reader processes start together and run a configurable
+mix of operations through `SQLiteDB` for a fixed duration. Errors are
+counted from the database logger, since `SQLiteDB` logs failed
+statements instead of raising. The report gives the throughput, the
+p50/p99 latencies and the error rate of every operation.
+
+The "edit" and "edit_locked" operations read a task, prepare new values
+for `EDIT_WORK_SECONDS` and write them back, among the first
+`EDIT_HOT_TASKS` tasks so that writers contend for the same ones: "edit"
+writes with a compare-and-swap on the task version and retries on
+conflict, "edit_locked" holds the write lock from the read to the write,
+to compare both approaches.
+
+With `--shards N` the tasks are spread over N files by
+`ShardedSQLiteDB`, to compare the write throughput with one file. With
+`--read-replica LAG` the readers query in-memory copies of the database
+instead, to compare the latencies of both kinds of operations.
+
+Usage:
+    python -m to_do_list_project.load_harness --writers 4 --readers 4 \
+        --duration 10 --mix insert=50,complete=25,modify=15,remove=10
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import logging
+import multiprocessing
+import random
+import time
+from typing import Dict, List, Optional, TypedDict, Union
+
+from .db import SQLiteDB, TaskConflictError
+from .generator import populate
+from .sharded_db import ShardedSQLiteDB
+from .task import TaskPriority, TaskStatus
+from .task_manager import MODIFY_ATTEMPTS
+
+DEFAULT_WRITE_MIX = "insert=50,complete=25,modify=15,remove=10"
+DEFAULT_READ_MIX = "all=20,one=80"
+EDIT_WORK_SECONDS = 0.002
+EDIT_HOT_TASKS = 100
+
+
+class OperationReport(TypedDict):
+    """Aggregated results of one kind of operation."""
+
+    operation: str
+    count: int
+    errors: int
+    throughput: float
+    p50_ms: float
+    p99_ms: float
+
+
+class ErrorCounter(logging.Handler):
+    """Logging handler counting the errors reported by SQLiteDB."""
+
+    def __init__(self) -> None:
+        """Initialize the ErrorCounter object."""
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Count an error record."""
+        self.count += 1
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """
+    Parse an operation mix such as "insert=50,remove=10".
+
+    Args:
+        mix (str): Comma separated operation=weight pairs.
+
+    Returns:
+        Dict[str, int]: Weight of every operation.
+    """
+    weights = {}
+    for item in mix.split(","):
+        operation, weight = item.split("=")
+        weights[operation.strip()] = int(weight)
+    return weights
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Return the nearest-rank percentile of a list of values.
+
+    Args:
+        values (List[float]): Values, in any order.
+        fraction (float): Percentile between 0 and 1, e.g. 0.99.
+
+    Returns:
+        float: The percentile, or 0 for an empty list.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def open_db(
+    db_name: str, db_options: Optional[dict] = None
+) -> Union[SQLiteDB, ShardedSQLiteDB]:
+    """
+    Open the database of a load test.
+
+    Args:
+        db_name (str): Database file.
+        db_options (dict, optional): Extra SQLiteDB arguments; a "shards"
+            entry above 1 opens a sharded database instead.
+
+    Returns:
+        Union[SQLiteDB, ShardedSQLiteDB]: The database.
+    """
+    db_options = dict(db_options or {})
+    shards = db_options.pop("shards", 1)
+    if shards > 1:
+        return ShardedSQLiteDB(db_name, shards, **db_options)
+    return SQLiteDB(db_name, **db_options)
+
+
+def edit_task(
+    db: SQLiteDB,
+    task_id: int,
+    rng: random.Random,
+    locked: bool,
+    work_seconds: float = EDIT_WORK_SECONDS,
+) -> None:
+    """
+    Read a task, prepare a new description and write it back.
+
+    Args:
+        db (SQLiteDB): Database holding the task.
+        task_id (int): Id of the task edited.
+        rng (random.Random): Random generator of the worker.
+        locked (bool): Hold the write lock from the read to the write,
+            instead of checking the version of the task when writing.
+        work_seconds (float): Time taken to prepare the new values.
+
+    Raises:
+        TaskConflictError: If the task kept changing while retried.
+        ValueError: If the write lock is asked for on a sharded database.
+    """
+    description = f"Edited by harness {rng.random():.6f}"
+    if locked:
+        if not isinstance(db, SQLiteDB):
+            raise ValueError("Locked edits need a single database file")
+        # The same reads and writes, inside one transaction taking the
+        # write lock before the read.
+        with db.batch():
+            versioned = db.get_versioned_task(task_id)
+            if versioned is not None:
+                row = versioned[0]
+                time.sleep(work_seconds)
+                db.update_task(task_id, (row[1], description, *row[4:6]))
+        return
+    for attempt in range(MODIFY_ATTEMPTS):
+        versioned = db.get_versioned_task(task_id)
+        if versioned is None:
+            return
+        row, version = versioned
+        time.sleep(work_seconds)
+        try:
+            db.update_task(task_id, (row[1], description, *row[4:6]), version)
+            return
+        except TaskConflictError:
+            if attempt == MODIFY_ATTEMPTS - 1:
+                raise
+
+
+def run_operation(
+    db: SQLiteDB,
+    operation: str,
+    rng: random.Random,
+    max_id: int,
+    edit_work: float = EDIT_WORK_SECONDS,
+) -> None:
+    """
+    Run one operation of the mix against the database.
+
+    Args:
+        db (SQLiteDB): Database to run the operation on.
+        operation (str): insert, complete, modify, edit, edit_locked,
+            remove, all, one or stats.
+        rng (random.Random): Random generator of the worker.
+        max_id (int): Highest task id expected to exist.
+        edit_work (float): Seconds an edit takes to prepare new values.
+    """
+    task_id = rng.randint(1, max_id)
+    if operation == "insert":
+        db.insert_data(
+            "tasks",
+            {
+                "name": f"Load task {rng.random():.6f}",
+                "description": "Inserted by the load harness",
+                "creation_date": datetime.now(),
+                "due_date": datetime.now() + timedelta(days=7),
+                "assignee": ["Harness"],
+                "status": TaskStatus.START,
+                "priority": TaskPriority.MEDIUM,
+                "categories": ["Load"],
+            },
+        )
+    elif operation == "complete":
+        db.fetch_data(task_id, to_do="COMPLETE")
+    elif operation == "modify":
+        due_date = datetime.now() + timedelta(days=rng.randint(1, 30))
+        db.fetch_data(
+            task_id,
+            to_do="MODIFY",
+            task=(
+                "Modified by harness",
+                "Updated description",
+                due_date.strftime("%Y/%m/%d %H:%M:%S"),
+                "Harness",
+            ),
+        )
+    elif operation in ("edit", "edit_locked"):
+        edit_task(
+            db,
+            rng.randint(1, min(max_id, EDIT_HOT_TASKS)),
+            rng,
+            locked=operation == "edit_locked",
+            work_seconds=edit_work,
+        )
+    elif operation == "remove":
+        db.remove_task(task_id)
+    elif operation == "all":
+        db.get_all_tasks()
+    elif operation == "one":
+        db.get_task(task_id)
+    elif operation == "stats":
+        db.task_stats()
+    else:
+        raise ValueError(f"Unknown operation: {operation}")
+
+
+def worker(
+    db_name: str,
+    mix: Dict[str, int],
+    duration: float,
+    max_id: int,
+    seed: int,
+    start_event,
+    results,
+    db_options: dict,
+    edit_work: float = EDIT_WORK_SECONDS,
+) -> None:
+    """
+    Run operations from the mix until the duration is over.
+
+    Each operation is timed, and the errors logged by SQLiteDB while it
+    ran are counted. The per-operation latencies and error counts are
+    put on the results queue when the worker stops.
+    """
+    db = open_db(db_name, db_options)
+    counter = ErrorCounter()
+    db.logger.addHandler(counter)
+    rng = random.Random(seed)
+    operations = list(mix)
+    weights = list(mix.values())
+    latencies: Dict[str, List[float]] = {operation: [] for operation in mix}
+    errors: Dict[str, int] = {operation: 0 for operation in mix}
+
+    start_event.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        errors_before = counter.count
+        start = time.perf_counter()
+        try:
+            run_operation(db, operation, rng, max_id, edit_work)
+            failed = counter.count > errors_before
+        except Exception:
+            failed = True
+        latencies[operation].append(time.perf_counter() - start)
+        if failed:
+            errors[operation] += 1
+    results.put((latencies, errors))
+
+
+def run_load(
+    db_name: str,
+    writers: int = 4,
+    readers: int = 4,
+    duration: float = 10.0,
+    write_mix: str = DEFAULT_WRITE_MIX,
+    read_mix: str = DEFAULT_READ_MIX,
+    seed_rows: int = 10000,
+    seed: int = 0,
+    db_options: Optional[dict] = None,
+    edit_work: float = EDIT_WORK_SECONDS,
+) -> List[OperationReport]:
+    """
+    Run writer and reader processes against one database file.
+
+    Args:
+        db_name (str): Database file shared by all the processes.
+        writers (int): Number of writer processes.
+        readers (int): Number of reader processes.
+        duration (float): Seconds each process keeps running.
+        write_mix (str): Operation weights of the writers.
+        read_mix (str): Operation weights of the readers.
+        seed_rows (int): Synthetic tasks created before the run when the
+            database is empty.
+        seed (int): Seed of the random generators.
+        db_options (dict, optional): Extra SQLiteDB arguments used by the
+            workers, e.g. {"max_retries": 0}, and their number of shards,
+            e.g. {"shards": 4}.
+        edit_work (float): Seconds an edit takes to prepare new values.
+
+    Returns:
+        List[OperationReport]: One entry per operation, plus a "total".
+    """
+    db_options = db_options or {}
+    db = open_db(db_name, {"shards": db_options.get("shards", 1)})
+    if seed_rows and not db.table_exists("tasks"):
+        populate(db, seed_rows, seed)
+    if isinstance(db, ShardedSQLiteDB):
+        # The worker processes must not inherit the threads of its pool.
+        db.close()
+
+    context = multiprocessing.get_context()
+    start_event = context.Event()
+    results = context.Queue()
+    mixes = [parse_mix(write_mix)] * writers + [parse_mix(read_mix)] * readers
+    processes = [
+        context.Process(
+            target=worker,
+            args=(
+                db_name,
+                mix,
+                duration,
+                max(seed_rows, 1),
+                seed + index,
+                start_event,
+                results,
+                db_options,
+                edit_work,
+            ),
+        )
+        for index, mix in enumerate(mixes)
+    ]
+    for process in processes:
+        process.start()
+    start_event.set()
+    worker_results = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for worker_latencies, worker_errors in worker_results:
+        for operation, values in worker_latencies.items():
+            latencies.setdefault(operation, []).extend(values)
+            errors[operation] = errors.get(operation, 0) + worker_errors[
+                operation
+            ]
+    return build_report(latencies, errors, duration)
+
+
+def build_report(
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    duration: float,
+) -> List[OperationReport]:
+    """
+    Aggregate the latencies and errors of a load test by operation.
+
+    Args:
+        latencies (Dict[str, List[float]]): Seconds taken by every call,
+            by operation.
+        errors (Dict[str, int]): Number of failed calls by operation.
+        duration (float): Seconds the load test ran.
+
+    Returns:
+        List[OperationReport]: One entry per operation, plus a "total".
+    """
+    latencies = dict(latencies)
+    latencies["total"] = [
+        value for values in latencies.values() for value in values
+    ]
+    errors = {**errors, "total": sum(errors.values())}
+    return [
+        {
+            "operation": operation,
+            "count": len(values),
+            "errors": errors.get(operation, 0),
+            "throughput": len(values) / duration,
+            "p50_ms": percentile(values, 0.5) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+        for operation, values in latencies.items()
+    ]
+
+
+def format_report(report: List[OperationReport]) -> str:
+    """Format the load test report for the terminal."""
+    lines = [
+        "operation     count   ops/s   p50 (ms)   p99 (ms)   error rate"
+    ]
+    for item in report:
+        error_rate = item["errors"] / item["count"] if item["count"] else 0
+        lines.append(
+            f"{item['operation']:<10} {item['count']:>8} "
+            f"{item['throughput']:>7.1f} {item['p50_ms']:>10.2f} "
+            f"{item['p99_ms']:>10.2f} {error_rate:>11.2%}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the load harness from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Run concurrent writers and readers on one task db."
+    )
+    parser.add_argument("--db", default="load_test.db",
+                        help="database file shared by the processes")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds each process runs")
+    parser.add_argument("--mix", default=DEFAULT_WRITE_MIX,
+                        help="writer operation weights")
+    parser.add_argument("--read-mix", default=DEFAULT_READ_MIX,
+                        help="reader operation weights")
+    parser.add_argument("--seed-rows", type=int, default=10000,
+                        help="tasks generated when the db does not exist")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--wal", action="store_true",
+                        help="switch the db to write-ahead logging first")
+    parser.add_argument("--no-retry", action="store_true",
+                        help="disable busy timeout and retries, to compare")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="spread the tasks over this many db files")
+    parser.add_argument("--read-replica", type=float, metavar="LAG",
+                        help="serve the reads from in-memory replicas, "
+                             "checked for changes every LAG seconds")
+    parser.add_argument("--edit-work-ms", type=float,
+                        default=EDIT_WORK_SECONDS * 1000,
+                        help="time an edit takes to prepare new values")
+    args = parser.parse_args(argv)
+
+    db_options = (
+        {"busy_timeout": 0, "max_retries": 0} if args.no_retry else {}
+    )
+    db_options["shards"] = args.shards
+    if args.read_replica is not None:
+        db_options["read_replica"] = True
+        db_options["replica_max_lag"] = args.read_replica
+    if args.wal:
+        db = open_db(args.db, {"shards": args.shards})
+        if not db.table_exists("tasks"):
+            populate(db, args.seed_rows, args.seed)
+        db.enable_wal()
+        if isinstance(db, ShardedSQLiteDB):
+            db.close()
+    report = run_load(
+        args.db,
+        writers=args.writers,
+        readers=args.readers,
+        duration=args.duration,
+        write_mix=args.mix,
+        read_mix=args.read_mix,
+        seed_rows=args.seed_rows,
+        seed=args.seed,
+        db_options=db_options,
+        edit_work=args.edit_work_ms / 1000,
+    )
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,12 @@ modify, and view tasks.
 from datetime import datetime
 import logging
 import os
-from typing import Callable, Tuple, Type, Union
-
-from tabulate import tabulate
+import sys
+from typing import Callable, List, Optional, Sequence, Tuple, Type, Union
 
+from .db import TASK_COLUMNS
+from .profiling import action_timer, profile_session, profiling_enabled
+from .profiling import untimed
 from .task import TaskPriority
 from .task_manager import TaskManager
 from .task_manager import TaskNotFoundError
@@ -34,7 +36,7 @@ def setup_logger(log_file: str) -> Type[logging.Logger]:
         formatter = logging.Formatter(
             "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
         )
-        file_handler = logging.FileHandler(log_file)
+        file_handler = logging.FileHandler(log_file, delay=True)
         file_handler.setFormatter(formatter)
         logger.addHandler(file_handler)
 
@@ -43,9 +45,17 @@ def setup_logger(log_file: str) -> Type[logging.Logger]:
 
 current_dir = os.path.dirname(__file__)
 parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+# The log file is only opened when the first message is written.
 logger = setup_logger(os.path.join(parent_dir, "logs", "user_input.log"))
 
 
+def tabulate(*args, **kwargs) -> str:
+    """Render a table with `tabulate`, imported on first use."""
+    from tabulate import tabulate as render_table
+
+    return render_table(*args, **kwargs)
+
+
 def validate_date(date_str: str) -> Tuple[bool, str]:
     """Validate a date string and return a datetime object if valid."""
     try:
@@ -74,6 +84,12 @@ def validate_priority(
         return False, "Invalid priority value. Use LOW, MEDIUM, or HIGH."
 
 
+def read_input(prompt: str) -> str:
+    """Ask the user for input, without counting the wait in the action."""
+    with untimed():
+        return input(prompt)
+
+
 def get_input(
     prompt: str, validator_func: Callable[[str], Tuple[bool, Union[int, str]]]
 ) -> Union[int, str]:
@@ -89,7 +105,7 @@ def get_input(
         value: The user's input after it has been validated.
     """
     while True:
-        user_input = input(prompt)
+        user_input = read_input(prompt)
         logger.info(f"Prompt: {prompt}, User input: {user_input}")
         is_valid, value = validator_func(user_input)
         if is_valid:
@@ -142,7 +158,7 @@ def add_task(task_manager: TaskManager) -> None:
 def remove_task(task_manager: TaskManager) -> None:
     """Remove a task by its ID."""
     try:
-        task_id = int(input("Enter the task ID to remove: "))
+        task_id = int(read_input("Enter the task ID to remove: "))
     except ValueError:
         print("Please enter a valid integer for task ID.")
         logger.error("Input ID is not a valid integer.")
@@ -159,7 +175,9 @@ def remove_task(task_manager: TaskManager) -> None:
 def complete_task(task_manager: TaskManager) -> None:
     """Mark a task as completed by its ID."""
     try:
-        task_id = int(input("Enter the task ID to mark as completed: "))
+        task_id = int(
+            read_input("Enter the task ID to mark as completed: ")
+        )
         task_manager.complete_task(task_id)
         print(f"Task with ID {task_id} marked as complete.")
         logger.info("Task with ID {task_id} marked as complete.")
@@ -177,7 +195,7 @@ def complete_task(task_manager: TaskManager) -> None:
 def modify_task(task_manager) -> None:
     """Modify a task by its ID."""
     try:
-        task_id = int(input("Enter the task ID to modify: "))
+        task_id = int(read_input("Enter the task ID to modify: "))
     except ValueError:
         print("Please enter a valid integer for task ID.")
         logger.error("Input ID is not a valid integer")
@@ -191,14 +209,16 @@ def modify_task(task_manager) -> None:
         logger.error(f"Task with ID {task_id} not found.")
         return
 
-    name = input("Enter new name[Press enter to not change]: ")
-    description = input("Enter new description[Press enter to not change]: ")
-    due_date = input(
+    name = read_input("Enter new name[Press enter to not change]: ")
+    description = read_input(
+        "Enter new description[Press enter to not change]: "
+    )
+    due_date = read_input(
         "Enter new due_date (YYYY/MM/DD)[Press enter to not change]: "
     )
 
     due_date = datetime.strptime(due_date, "%Y/%m/%d")
-    assignee = input("Enter new assignee[Press enter to not change]: ")
+    assignee = read_input("Enter new assignee[Press enter to not change]: ")
     task_manager.modify_task(task_id, name, description, due_date, assignee)
 
     print("Task modified successfully.")
@@ -225,28 +245,86 @@ def choice_validator(user_input: str) -> Tuple[bool, Union[str, int]]:
         return False, "Please enter a valid integer."
 
 
-def display_all_tasks(task_manager) -> None:
-    """Display all tasks."""
-    tasks = task_manager.get_all_tasks()
-    if tasks:
-        columns = (
-            "id",
-            "name",
-            "description",
-            "creation_date",
-            "due_date",
-            "assignee",
-            "status",
-            "priority",
-            "category",
-        )
-        print(
-            tabulate(
-                [columns] + tasks, headers="firstrow", tablefmt="fancy_grid"
+DISPLAY_PAGE_SIZE = 50
+
+
+def validate_columns(
+    columns_str: str,
+) -> Tuple[bool, Union[str, List[str]]]:
+    """Validate a comma separated list of columns, empty for all of them."""
+    columns = [column.strip() for column in columns_str.split(",")]
+    columns = [column for column in columns if column]
+    if not columns:
+        return True, list(TASK_COLUMNS)
+    unknown = [column for column in columns if column not in TASK_COLUMNS]
+    if unknown:
+        logger.error(f"Unknown columns: {', '.join(unknown)}.")
+        return False, f"Unknown columns. Use: {', '.join(TASK_COLUMNS)}."
+    return True, columns
+
+
+def display_all_tasks(
+    task_manager,
+    page_size: Optional[int] = None,
+    columns: Sequence[str] = TASK_COLUMNS,
+    pause: bool = False,
+) -> None:
+    """
+    Display all tasks, as one table or page by page.
+
+    In pages, only one page of tasks is fetched and rendered at a time,
+    with the columns sized from that page, so the first tasks show up
+    right away whatever the number of tasks.
+
+    Args:
+        task_manager (TaskManager): Manager of the tasks to display.
+        page_size (int, optional): Number of tasks per page. Defaults to
+            a single table of all the tasks.
+        columns (Sequence[str]): Columns to display.
+        pause (bool): Wait for the user between pages.
+    """
+    indexes = [TASK_COLUMNS.index(column) for column in columns]
+    if page_size is None:
+        tasks = task_manager.get_all_tasks()
+        if tasks:
+            rows = [tuple(task[index] for index in indexes) for task in tasks]
+            print(
+                tabulate(
+                    [tuple(columns)] + rows,
+                    headers="firstrow",
+                    tablefmt="fancy_grid",
+                )
             )
-        )
-    else:
-        print("No tasks.")
+        else:
+            print("No tasks.")
+        return
+
+    last_id, page_number = None, 1
+    while True:
+        tasks = task_manager.query_tasks(limit=page_size, after_id=last_id)
+        if not tasks:
+            if last_id is None:
+                print("No tasks.")
+            return
+        rows = [[task[index] for index in indexes] for task in tasks]
+        print(tabulate(rows, headers=columns, tablefmt="fancy_grid"))
+        print(f"Page {page_number}", flush=True)
+        if len(tasks) < page_size:
+            return
+        last_id, page_number = tasks[-1][0], page_number + 1
+        if pause and read_input(
+            "Enter for the next page, q to stop: "
+        ) == "q":
+            return
+
+
+def browse_tasks(task_manager: TaskManager) -> None:
+    """Display the tasks page by page, with the columns chosen by the user."""
+    columns = get_input(
+        "Columns to display (comma separated, Enter for all): ",
+        validate_columns,
+    )
+    display_all_tasks(task_manager, DISPLAY_PAGE_SIZE, columns, pause=True)
 
 
 def main(task_manager: TaskManager) -> None:
@@ -263,21 +341,24 @@ def main(task_manager: TaskManager) -> None:
 
         choice = get_input("Your choice: ", choice_validator)
 
-        if choice == 1:
-            add_task(task_manager)
-        elif choice == 2:
-            remove_task(task_manager)
-        elif choice == 3:
-            display_all_tasks(task_manager)
-        elif choice == 4:
-            complete_task(task_manager)
-        elif choice == 5:
-            modify_task(task_manager)
-        elif choice == 6:
+        if choice == 6:
             print("Exiting the Task Manager.")
             break
 
+        actions = {
+            1: ("add", add_task),
+            2: ("remove", remove_task),
+            3: ("display", browse_tasks),
+            4: ("complete", complete_task),
+            5: ("modify", modify_task),
+        }
+        if choice in actions:
+            action_name, action = actions[choice]
+            with action_timer(action_name):
+                action(task_manager)
+
 
 if __name__ == "__main__":
-    task_manager = TaskManager()
-    main(task_manager)
+    with profile_session("cli", enabled=profiling_enabled(sys.argv[1:])):
+        task_manager = TaskManager()
+        main(task_manager)
@@ -0,0 +1,228 @@
+"""
+profiling.py.
+
+This script provides the built-in profiling hooks of the application.
+
+A profiling session is turned on with the `--profile` command line flag
+or the `TODO_PROFILE` environment variable. It wraps the whole run in
+`cProfile`, optionally in `tracemalloc` (`TODO_PROFILE_MEMORY`), and on
+exit writes a `.prof` file together with a top-N text summary in the
+`logs` folder or in `TODO_PROFILE_DIR`. The resulting `.prof` files can
+be opened with `python -m pstats` or snakeviz.
+
+Independently of profiling sessions, every menu action is timed and
+written to `logs/action_timing.log`, so the hot actions can be spotted
+from the log alone. The time spent waiting at the prompts is not
+counted.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Type, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cProfile
+
+PROFILE_ENV_VAR = "TODO_PROFILE"
+PROFILE_MEMORY_ENV_VAR = "TODO_PROFILE_MEMORY"
+PROFILE_DIR_ENV_VAR = "TODO_PROFILE_DIR"
+PROFILE_FLAG = "--profile"
+
+LOGS_DIR = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)),
+    "logs",
+)
+
+# Cumulated timings of the menu actions: action -> [calls, total seconds].
+ACTION_TIMINGS: Dict[str, List[float]] = {}
+# Seconds spent waiting for the user by each action being timed.
+_RUNNING_TIMERS: List[List[float]] = []
+
+
+def setup_logger(log_file: str) -> Type[logging.Logger]:
+    """
+    Set up a logger to write the duration of every user action.
+
+    Args:
+        log_file (str): path where the log file is stored.
+
+    Returns:
+        Type[logging.Logger]: Logger object.
+    """
+    logger = logging.getLogger("action_timing")
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+        file_handler = logging.FileHandler(log_file, delay=True)
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+
+    return logger
+
+
+logger = setup_logger(os.path.join(LOGS_DIR, "action_timing.log"))
+
+
+def _flag_set(value: Optional[str]) -> bool:
+    """Return True if an environment variable value means 'enabled'."""
+    return bool(value) and value.lower() not in ("0", "false", "no", "off")
+
+
+def profiling_enabled(argv: Optional[List[str]] = None) -> bool:
+    """
+    Tell whether a profiling session has been requested.
+
+    Args:
+        argv (List[str], optional): Command line arguments to inspect.
+            Defaults to `sys.argv`.
+
+    Returns:
+        bool: True if `--profile` is passed or `TODO_PROFILE` is set.
+    """
+    if argv is None:
+        argv = sys.argv
+    return PROFILE_FLAG in argv or _flag_set(os.environ.get(PROFILE_ENV_VAR))
+
+
+@contextmanager
+def action_timer(action: str) -> Iterator[None]:
+    """
+    Time a user action and log its duration.
+
+    The time spent in `untimed` contexts, waiting for the user, is left
+    out, so that the duration is the work done for the action.
+
+    Args:
+        action (str): Name of the action, e.g. "add" or "display".
+    """
+    paused = [0.0]
+    _RUNNING_TIMERS.append(paused)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - paused[0]
+        _RUNNING_TIMERS.remove(paused)
+        timing = ACTION_TIMINGS.setdefault(action, [0, 0.0])
+        timing[0] += 1
+        timing[1] += elapsed
+        logger.info(f"Action {action} took {elapsed * 1000:.1f} ms")
+
+
+@contextmanager
+def untimed() -> Iterator[None]:
+    """Leave the time spent inside the context out of the running actions."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for paused in _RUNNING_TIMERS:
+            paused[0] += elapsed
+
+
+def format_action_timings() -> str:
+    """
+    Format the cumulated action timings, slowest action first.
+
+    Returns:
+        str: One line per action with its calls, total and mean time.
+    """
+    lines = ["action      calls    total (ms)    mean (ms)"]
+    ranking = sorted(
+        ACTION_TIMINGS.items(), key=lambda item: item[1][1], reverse=True
+    )
+    for action, (calls, total) in ranking:
+        lines.append(
+            f"{action:<10} {calls:>6} {total * 1000:>13.1f} "
+            f"{total * 1000 / calls:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+@contextmanager
+def profile_session(
+    name: str,
+    enabled: bool = True,
+    output_dir: Optional[str] = None,
+    top: int = 25,
+    trace_memory: Optional[bool] = None,
+    stream=None,
+) -> Iterator[Optional["cProfile.Profile"]]:
+    """
+    Profile everything run inside the context.
+
+    On exit the profile is dumped to `<name>-<timestamp>.prof` and a
+    summary with the top functions by cumulative time, the action timings
+    and, when memory tracing is on, the top allocation sites is written
+    next to it and printed on `stream`.
+
+    Args:
+        name (str): Prefix of the files written, e.g. "cli".
+        enabled (bool): If False, the context does nothing.
+        output_dir (str, optional): Folder receiving the files. Defaults
+            to `TODO_PROFILE_DIR` or the `logs` folder.
+        top (int): Number of entries kept in the summary.
+        trace_memory (bool, optional): Also trace allocations with
+            tracemalloc. Defaults to the `TODO_PROFILE_MEMORY` variable.
+        stream (optional): Where the summary is printed. Defaults to
+            stderr.
+
+    Yields:
+        Optional[cProfile.Profile]: The running profiler, or None when
+        profiling is disabled.
+    """
+    if not enabled:
+        yield None
+        return
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    if output_dir is None:
+        output_dir = os.environ.get(PROFILE_DIR_ENV_VAR, LOGS_DIR)
+    if trace_memory is None:
+        trace_memory = _flag_set(os.environ.get(PROFILE_MEMORY_ENV_VAR))
+    if stream is None:
+        stream = sys.stderr
+
+    if trace_memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        base_path = os.path.join(output_dir, f"{name}-{stamp}")
+        profiler.dump_stats(f"{base_path}.prof")
+
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        if ACTION_TIMINGS:
+            summary.write(format_action_timings() + "\n")
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            summary.write(
+                f"\nMemory: current {current / 1024:.1f} KiB, "
+                f"peak {peak / 1024:.1f} KiB\n"
+            )
+            for stat in snapshot.statistics("lineno")[:top]:
+                summary.write(f"{stat}\n")
+
+        with open(f"{base_path}.txt", "w") as summary_file:
+            summary_file.write(summary.getvalue())
+        stream.write(summary.getvalue())
+        stream.write(f"Profile written to {base_path}.prof\n")
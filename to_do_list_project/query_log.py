@@ -0,0 +1,284 @@
+"""
+query_log.py.
+
+This script provides the opt-in slow-query log of the SQLite database.
+
+When `SQLiteDB` is given a threshold (or the `TODO_SLOW_QUERY_MS`
+environment variable is set), every statement slower than the threshold
+is appended as a JSON line to `logs/slow_queries.log`, with its
+parameters (text values redacted by default) and its duration. The
+`EXPLAIN QUERY PLAN` output of a statement is captured the first time it
+shows up as slow.
+
+The log can be summarised from the command line, ranking the worst
+statements by total time:
+    python -m to_do_list_project.query_log --top 10
+"""
+
+import argparse
+from datetime import datetime
+import json
+import logging
+import os
+import re
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Type, TypedDict
+
+SLOW_QUERY_ENV_VAR = "TODO_SLOW_QUERY_MS"
+
+DEFAULT_LOG_FILE = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)),
+    "logs",
+    "slow_queries.log",
+)
+
+
+class QueryStats(TypedDict):
+    """Aggregated timings of one normalized statement."""
+
+    sql: str
+    count: int
+    total_ms: float
+    max_ms: float
+    plan: Optional[str]
+
+
+def setup_logger(log_file: str) -> Type[logging.Logger]:
+    """
+    Set up a logger writing one JSON document per slow statement.
+
+    Args:
+        log_file (str): path where the log file is stored.
+
+    Returns:
+        Type[logging.Logger]: Logger object.
+    """
+    logger = logging.getLogger(f"slow_queries.{log_file}")
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        file_handler = logging.FileHandler(log_file, delay=True)
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(file_handler)
+
+    return logger
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse the whitespace of a statement so it can be used as a key."""
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def redact_params(params) -> list:
+    """
+    Hide the text values of statement parameters.
+
+    Numbers and None are kept since they are ids, statuses or priorities,
+    while text may hold names, descriptions or assignees.
+
+    Args:
+        params: Parameters bound to the statement.
+
+    Returns:
+        list: Parameters safe to be written to the log.
+    """
+    return [
+        f"<redacted {len(value)} chars>" if isinstance(value, str) else value
+        for value in params
+    ]
+
+
+class SlowQueryLog:
+    """Record the statements of a database that exceed a duration."""
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        log_file: str = DEFAULT_LOG_FILE,
+        redact: bool = True,
+    ) -> None:
+        """
+        Initialize the SlowQueryLog object.
+
+        Args:
+            threshold_ms (float): Statements at least this slow are logged.
+            log_file (str): JSON lines file receiving the slow statements.
+            redact (bool): Hide text parameters in the log.
+        """
+        self.threshold_ms = threshold_ms
+        self.log_file = log_file
+        self.redact = redact
+        self.stats: Dict[str, QueryStats] = {}
+        self.logger = setup_logger(log_file)
+
+    def record(
+        self,
+        conn: sqlite3.Connection,
+        sql: str,
+        params,
+        duration: float,
+    ) -> None:
+        """
+        Record a statement if it is slower than the threshold.
+
+        Args:
+            conn (sqlite3.Connection): Connection the statement ran on,
+                used to capture its query plan.
+            sql (str): Statement that was executed.
+            params: Parameters bound to the statement.
+            duration (float): Duration of the statement in seconds.
+        """
+        duration_ms = duration * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        key = normalize_sql(sql)
+        stats = self.stats.get(key)
+        entry = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "sql": key,
+            "params": redact_params(params) if self.redact else list(params),
+            "duration_ms": round(duration_ms, 3),
+        }
+        if stats is None:
+            stats = self.stats[key] = {
+                "sql": key,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "plan": self.explain(conn, sql, params),
+            }
+            entry["plan"] = stats["plan"]
+        stats["count"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        self.logger.info(json.dumps(entry))
+
+    @staticmethod
+    def explain(
+        conn: Optional[sqlite3.Connection], sql: str, params
+    ) -> str:
+        """
+        Return the EXPLAIN QUERY PLAN output of a statement.
+
+        Args:
+            conn (sqlite3.Connection): Connection to run the plan on.
+            sql (str): Statement to explain.
+            params: Parameters bound to the statement.
+
+        Returns:
+            str: One line per plan step, or the error raised by SQLite.
+        """
+        if conn is None:
+            return "unavailable: no open connection"
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return "\n".join(row[-1] for row in rows.fetchall())
+        except sqlite3.Error as e:
+            return f"unavailable: {e}"
+
+    def summary(self, top: int = 10) -> List[QueryStats]:
+        """
+        Rank the slow statements recorded by this process.
+
+        Args:
+            top (int): Number of statements returned.
+
+        Returns:
+            List[QueryStats]: Worst statements by total time.
+        """
+        return rank(self.stats.values(), top)
+
+
+def rank(stats, top: int = 10) -> List[QueryStats]:
+    """Return the `top` statements with the highest total time."""
+    return sorted(stats, key=lambda item: item["total_ms"], reverse=True)[
+        :top
+    ]
+
+
+def read_log(log_file: str = DEFAULT_LOG_FILE) -> Iterator[dict]:
+    """
+    Read the entries of a slow-query log.
+
+    Args:
+        log_file (str): JSON lines file written by SlowQueryLog.
+
+    Yields:
+        dict: One entry per slow statement execution.
+    """
+    with open(log_file) as log:
+        for line in log:
+            if line.strip():
+                yield json.loads(line)
+
+
+def summarize(log_file: str = DEFAULT_LOG_FILE, top: int = 10) -> List[
+    QueryStats
+]:
+    """
+    Aggregate a slow-query log by statement.
+
+    Args:
+        log_file (str): JSON lines file written by SlowQueryLog.
+        top (int): Number of statements returned.
+
+    Returns:
+        List[QueryStats]: Worst statements by total time.
+    """
+    stats: Dict[str, QueryStats] = {}
+    for entry in read_log(log_file):
+        item = stats.setdefault(
+            entry["sql"],
+            {
+                "sql": entry["sql"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "plan": None,
+            },
+        )
+        item["count"] += 1
+        item["total_ms"] += entry["duration_ms"]
+        item["max_ms"] = max(item["max_ms"], entry["duration_ms"])
+        if item["plan"] is None and "plan" in entry:
+            item["plan"] = entry["plan"]
+    return rank(stats.values(), top)
+
+
+def format_summary(stats: List[QueryStats]) -> str:
+    """Format ranked statements for the terminal."""
+    if not stats:
+        return "No slow queries."
+    lines = []
+    for position, item in enumerate(stats, start=1):
+        lines.append(
+            f"{position}. total {item['total_ms']:.1f} ms, "
+            f"{item['count']} calls, max {item['max_ms']:.1f} ms\n"
+            f"   {item['sql']}"
+        )
+        if item["plan"]:
+            lines.extend(
+                f"   plan: {step}" for step in item["plan"].splitlines()
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Print the worst statements of a slow-query log."""
+    parser = argparse.ArgumentParser(
+        description="Rank the slow statements of the task database."
+    )
+    parser.add_argument("--log", default=DEFAULT_LOG_FILE,
+                        help="slow-query log to summarise")
+    parser.add_argument("--top", type=int, default=10,
+                        help="number of statements to show")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.log):
+        print("No slow queries.")
+        return
+    print(format_summary(summarize(args.log, args.top)))
+
+
+if __name__ == "__main__":
+    main()
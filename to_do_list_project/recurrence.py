@@ -0,0 +1,177 @@
+"""
+recurrence.py.
+
+This script describes when a recurring task comes back, and lists its
+occurrences in a period without storing them.
+
+A rule is a subset of the iCalendar RRULE: a frequency, daily or weekly,
+an interval, the weekdays the task falls on and an end date, written as
+"FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;UNTIL=20301231T235959". A series
+starts at its due date, which gives the time of day of its occurrences
+and from which the periods are counted. The first period of a listed
+range is found with one division, so listing it costs the number of
+occurrences it holds, however long ago the series started.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+FREQUENCIES = ("DAILY", "WEEKLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+UNTIL_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class Occurrence(NamedTuple):
+    """Occurrence of a recurring task in a listed period."""
+
+    series_id: int
+    # Date the rule gives it, which identifies it within its series.
+    due_date: datetime
+    # Id of the task storing it once completed or edited, None before.
+    task_id: Optional[int]
+    # Task row, in the column order of the tasks table.
+    row: tuple
+
+
+class RecurrenceRule:
+    """When a recurring task comes back."""
+
+    def __init__(
+        self,
+        frequency: str = "DAILY",
+        interval: int = 1,
+        weekdays: Iterable[int] = (),
+        until: Optional[datetime] = None,
+    ) -> None:
+        """
+        Initialize the RecurrenceRule object.
+
+        Args:
+            frequency (str): "DAILY" or "WEEKLY".
+            interval (int): Number of days or weeks between two periods
+                with occurrences.
+            weekdays (Iterable[int]): Days the task falls on, 0 for
+                Monday. Weekly tasks default to the weekday they start
+                on; daily tasks skip the other days.
+            until (datetime, optional): Latest date of an occurrence.
+
+        Raises:
+            ValueError: If a value is not valid.
+        """
+        frequency = frequency.upper()
+        if frequency not in FREQUENCIES:
+            raise ValueError(
+                f"Unknown frequency '{frequency}', use daily or weekly"
+            )
+        if not isinstance(interval, int) or interval < 1:
+            raise ValueError("Interval must be a positive integer")
+        weekdays = tuple(sorted(set(weekdays)))
+        if any(day not in range(7) for day in weekdays):
+            raise ValueError("Weekdays must be integers from 0 to 6")
+        self.frequency = frequency
+        self.interval = interval
+        self.weekdays: Tuple[int, ...] = weekdays
+        self.until = until
+
+    @classmethod
+    def parse(cls, text: str) -> "RecurrenceRule":
+        """
+        Read a rule written as "FREQ=DAILY;INTERVAL=2;BYDAY=MO,TU".
+
+        Raises:
+            ValueError: If the text is not a valid rule.
+        """
+        parts = {}
+        for part in text.strip().upper().split(";"):
+            name, _, value = part.partition("=")
+            parts[name.strip()] = value.strip()
+        unknown = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "UNTIL"}
+        if unknown or "FREQ" not in parts:
+            raise ValueError(f"Invalid recurrence rule: {text}")
+        try:
+            weekdays = [
+                WEEKDAYS.index(day)
+                for day in parts.get("BYDAY", "").split(",")
+                if day
+            ]
+            until = parts.get("UNTIL")
+            return cls(
+                parts["FREQ"],
+                int(parts.get("INTERVAL", 1)),
+                weekdays,
+                None if until is None else cls._parse_until(until),
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid recurrence rule: {text} ({e})")
+
+    @staticmethod
+    def _parse_until(value: str) -> datetime:
+        """Read an end date, with or without its time of day."""
+        if "T" in value:
+            return datetime.strptime(value, UNTIL_FORMAT)
+        return datetime.strptime(value, "%Y%m%d").replace(
+            hour=23, minute=59, second=59
+        )
+
+    def __str__(self) -> str:
+        """Return the rule in its text form."""
+        parts = [f"FREQ={self.frequency}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.weekdays:
+            parts.append(
+                "BYDAY=" + ",".join(WEEKDAYS[day] for day in self.weekdays)
+            )
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.strftime(UNTIL_FORMAT)}")
+        return ";".join(parts)
+
+    def __repr__(self) -> str:
+        """Return the rule as it can be parsed again."""
+        return f"RecurrenceRule.parse({str(self)!r})"
+
+    def __eq__(self, other: object) -> bool:
+        """Tell whether two rules give the same occurrences."""
+        return isinstance(other, RecurrenceRule) and str(self) == str(other)
+
+    def occurrences(
+        self, first: datetime, start: datetime, end: datetime
+    ) -> Iterator[datetime]:
+        """
+        Generate the occurrences of a series in a period, in order.
+
+        Args:
+            first (datetime): Start of the series, whose time of day
+                every occurrence keeps.
+            start (datetime): Earliest occurrence returned.
+            end (datetime): Latest occurrence returned.
+
+        Yields:
+            datetime: Dates of the occurrences.
+        """
+        if self.until is not None:
+            end = min(end, self.until)
+        start = max(start, first)
+        if start > end:
+            return
+        if self.frequency == "DAILY":
+            step = timedelta(days=self.interval)
+            # Ceiling division: the first period on or after the start.
+            date = first + step * -((first - start) // step)
+            while date <= end:
+                if not self.weekdays or date.weekday() in self.weekdays:
+                    yield date
+                date += step
+            return
+        days = self.weekdays or (first.weekday(),)
+        step = timedelta(weeks=self.interval)
+        monday = first - timedelta(days=first.weekday())
+        week = monday + step * ((start - monday) // step)
+        while week <= end:
+            for day in days:
+                date = week + timedelta(days=day)
+                if date > end:
+                    return
+                if date >= start:
+                    yield date
+            week += step
@@ -0,0 +1,278 @@
+"""
+reminders.py.
+
+This script sends reminders when open tasks get close to their due date.
+
+A `ReminderSweeper` keeps one entry per open task and lead time in a heap
+ordered by the time the reminder is due, and a background thread sleeps
+until the earliest one. Waking up only pops the reminders that are due,
+so the cost follows the number of reminders sent, not the number of
+tasks. When a task is rescheduled or closed its entries are not searched
+for in the heap: they are dropped when they come up.
+
+Callbacks receive the task and the lead time of the reminder;
+`log_reminder` and `print_reminder` are provided, and any function with
+the same signature can be added.
+
+Usage:
+    python -m to_do_list_project.reminders --db task_manager.db --lead 1h
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import logging
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .task import Task, TaskStatus
+
+ReminderCallback = Callable[[Task, timedelta], None]
+
+DEFAULT_LEAD_TIMES = (timedelta(0),)
+
+logger = logging.getLogger(__name__)
+
+
+def log_reminder(task: Task, lead: timedelta) -> None:
+    """Write a reminder to the log."""
+    logger.warning(
+        f"Task {task.id} '{task.name}' is due {describe_lead(lead)}"
+    )
+
+
+def print_reminder(task: Task, lead: timedelta) -> None:
+    """Print a reminder on the standard output."""
+    print(f"Reminder: task {task.id} '{task.name}' is due "
+          f"{describe_lead(lead)} ({task.due_date:%Y/%m/%d %H:%M}).")
+
+
+def describe_lead(lead: timedelta) -> str:
+    """Describe when a task is due relative to its reminder."""
+    if not lead:
+        return "now"
+    minutes = int(lead.total_seconds() // 60)
+    if minutes % (24 * 60) == 0:
+        return f"in {minutes // (24 * 60)} day(s)"
+    if minutes % 60 == 0:
+        return f"in {minutes // 60} hour(s)"
+    return f"in {minutes} minute(s)"
+
+
+def parse_lead_time(value: str) -> timedelta:
+    """
+    Parse a lead time such as '30m', '2h' or '1d'.
+
+    Raises:
+        ValueError: If the value is not a number followed by m, h or d.
+    """
+    match = re.fullmatch(r"(\d+)([mhd])", value.strip())
+    if not match:
+        raise ValueError(
+            f"Invalid lead time '{value}', use minutes, hours or days "
+            "such as 30m, 2h or 1d"
+        )
+    unit = {"m": "minutes", "h": "hours", "d": "days"}[match.group(2)]
+    return timedelta(**{unit: int(match.group(1))})
+
+
+class ReminderSweeper:
+    """Background thread firing reminders before tasks are due."""
+
+    def __init__(
+        self,
+        callbacks: Sequence[ReminderCallback] = (log_reminder,),
+        lead_times: Iterable[timedelta] = DEFAULT_LEAD_TIMES,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        """
+        Initialize the ReminderSweeper object.
+
+        Args:
+            callbacks (Sequence[ReminderCallback]): Functions called with
+                the task and the lead time of every reminder.
+            lead_times (Iterable[timedelta]): How long before the due date
+                reminders are sent; 0 sends one when the task is due.
+            clock (Callable[[], datetime]): Current time, replaced in
+                tests.
+        """
+        self.callbacks = list(callbacks)
+        self.lead_times = sorted(set(lead_times), reverse=True)
+        self.clock = clock
+        # Entries are (time, sequence, task id, generation, lead): the
+        # sequence keeps the order of ties without comparing the rest.
+        self._heap: List[Tuple[datetime, int, int, int, timedelta]] = []
+        # Task, generation of its entries and number of them left.
+        self._tasks: Dict[int, list] = {}
+        self._sequence = itertools.count()
+        self._generation = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        """Return the number of scheduled tasks."""
+        return len(self._tasks)
+
+    def _entries(self, task: Task, now: datetime) -> List[tuple]:
+        """Register a task and return its heap entries still to come."""
+        generation = next(self._generation)
+        entries = [
+            (task.due_date - lead, next(self._sequence), task.id,
+             generation, lead)
+            for lead in self.lead_times
+            if task.due_date - lead > now
+        ]
+        if entries:
+            self._tasks[task.id] = [task, generation, len(entries)]
+        else:
+            self._tasks.pop(task.id, None)
+        return entries
+
+    def schedule(self, task: Task) -> None:
+        """
+        Schedule the reminders of a task, replacing the previous ones.
+
+        Reminders whose time has already passed are not sent, and
+        completed tasks are only unscheduled.
+        """
+        with self._condition:
+            if task.status is TaskStatus.COMPLETE:
+                self._tasks.pop(task.id, None)
+                return
+            earliest = self._heap[0][0] if self._heap else None
+            for entry in self._entries(task, self.clock()):
+                heapq.heappush(self._heap, entry)
+            if self._heap and self._heap[0][0] != earliest:
+                self._condition.notify()
+
+    def schedule_all(self, tasks: Iterable[Task]) -> None:
+        """Replace the scheduled tasks, building the heap in one go."""
+        with self._condition:
+            now = self.clock()
+            self._tasks = {}
+            self._heap = [
+                entry
+                for task in tasks
+                if task.status is not TaskStatus.COMPLETE
+                for entry in self._entries(task, now)
+            ]
+            heapq.heapify(self._heap)
+            self._condition.notify()
+
+    def cancel(self, task_id: int) -> None:
+        """Stop the reminders of a task."""
+        with self._condition:
+            self._tasks.pop(task_id, None)
+
+    def next_reminder(self) -> Optional[datetime]:
+        """Return the time of the next reminder, None if there is none."""
+        with self._condition:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self) -> None:
+        """Pop the entries of tasks rescheduled or closed since."""
+        while self._heap:
+            _, _, task_id, generation, _ = self._heap[0]
+            scheduled = self._tasks.get(task_id)
+            if scheduled is not None and scheduled[1] == generation:
+                return
+            heapq.heappop(self._heap)
+
+    def run_pending(self) -> int:
+        """
+        Send the reminders that are due.
+
+        Returns:
+            int: Number of reminders sent.
+        """
+        due = []
+        with self._condition:
+            now = self.clock()
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, task_id, _, lead = heapq.heappop(self._heap)
+                scheduled = self._tasks[task_id]
+                due.append((scheduled[0], lead))
+                scheduled[2] -= 1
+                if not scheduled[2]:
+                    del self._tasks[task_id]
+                self._drop_stale()
+        for task, lead in due:
+            for callback in self.callbacks:
+                try:
+                    callback(task, lead)
+                except Exception:
+                    logger.exception(f"Reminder callback failed: {callback}")
+        return len(due)
+
+    def _run(self) -> None:
+        """Sleep until the next reminder and send it, until stopped."""
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                self._drop_stale()
+                timeout = None
+                if self._heap:
+                    timeout = (self._heap[0][0] - self.clock()).total_seconds()
+                if timeout is None or timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+            self.run_pending()
+
+    def start(self) -> None:
+        """Start the background thread."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="reminder-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and wait for it."""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Print the reminders of a database until interrupted."""
+    from .db import SQLiteDB
+    from .task_manager import TaskManager
+
+    parser = argparse.ArgumentParser(
+        description="Print reminders before tasks are due."
+    )
+    parser.add_argument("--db", default="task_manager.db",
+                        help="database file to watch")
+    parser.add_argument("--lead", type=parse_lead_time, action="append",
+                        help="reminder lead time such as 30m, 2h or 1d, "
+                             "may be repeated; defaults to the due time")
+    args = parser.parse_args(argv)
+
+    task_manager = TaskManager(SQLiteDB(args.db))
+    sweeper = ReminderSweeper(
+        [print_reminder], args.lead or DEFAULT_LEAD_TIMES
+    )
+    task_manager.attach_reminders(sweeper)
+    print(f"Watching {len(sweeper)} open tasks, press Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sweeper.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,720 @@
+"""
+sharded_db.py.
+
+This script spreads the tasks over several SQLite files, so that teams
+whose tasks never interact no longer wait for the same write lock.
+
+`ShardedSQLiteDB` offers the methods of `SQLiteDB` used by `TaskManager`
+and the CLI. A new task goes to the shard chosen by its shard key: its
+first category, its first assignee, or its id, which spreads the tasks
+evenly. Ids stay unique across the shards because the shard is part of
+them: the task with local id `n` in shard `s` out of `N` has the global id
+`n * N + s`. Operations on one task are sent to its shard without any
+lookup; lists and aggregates are run on every shard in a thread pool and
+their results merged.
+
+Recurring tasks are placed like tasks, and their occurrences are stored
+in the shard of their series. The number of shards is part of the ids, so
+it cannot change once tasks are stored. Dependencies between tasks can
+cross shards, so they are kept with their global ids in a file of their
+own, "tasks.edges.db".
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from heapq import merge
+from itertools import count, islice
+import os
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+import zlib
+
+from .db import (
+    KEEP_CHANGES,
+    MaintenanceReport,
+    SQLiteDB,
+    TASK_COLUMNS,
+    TaskConflictError,
+)
+from .task import TaskData, TaskPriority, TaskStatus
+
+SHARD_KEYS = ("category", "assignee", "id")
+
+T = TypeVar("T")
+
+
+def shard_names(db_name: str, shards: int) -> List[str]:
+    """
+    Return the database files of the shards of a database.
+
+    Args:
+        db_name (str): Name of the sharded database, e.g. "tasks.db".
+        shards (int): Number of shards.
+
+    Returns:
+        List[str]: "tasks.shard0.db", "tasks.shard1.db"...
+    """
+    root, extension = os.path.splitext(db_name)
+    return [f"{root}.shard{index}{extension or '.db'}"
+            for index in range(shards)]
+
+
+class ShardedSQLiteDB:
+    """Tasks partitioned over several SQLite database files."""
+
+    def __init__(
+        self,
+        db_name: str = "task_manager.db",
+        shards: int = 4,
+        shard_key: str = "id",
+        **db_options,
+    ) -> None:
+        """
+        Initialize the ShardedSQLiteDB object.
+
+        Args:
+            db_name (str): Name the shard files are derived from.
+            shards (int): Number of shard files.
+            shard_key (str): "category", "assignee" or "id".
+            **db_options: Extra SQLiteDB arguments of every shard.
+
+        Raises:
+            ValueError: If the number of shards or the shard key is wrong.
+        """
+        if shards < 1:
+            raise ValueError("A sharded database needs at least one shard")
+        if shard_key not in SHARD_KEYS:
+            raise ValueError(
+                f"Unknown shard key '{shard_key}', use one of "
+                f"{', '.join(SHARD_KEYS)}"
+            )
+        self.shards = [
+            SQLiteDB(name, **db_options)
+            for name in shard_names(db_name, shards)
+        ]
+        root, extension = os.path.splitext(db_name)
+        self.edges = SQLiteDB(
+            f"{root}.edges{extension or '.db'}", **db_options
+        )
+        self.shard_key = shard_key
+        self.db_name = os.path.join(
+            os.path.dirname(self.shards[0].db_name),
+            os.path.basename(db_name),
+        )
+        self.logger = self.shards[0].logger
+        self._next_shard = count()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def global_id(self, shard: int, local_id: Optional[int]) -> Optional[int]:
+        """Return the global id of a task of a shard."""
+        if local_id is None:
+            return None
+        return local_id * len(self.shards) + shard
+
+    def locate(self, task_id: int) -> tuple:
+        """Return the shard index and the local id of a task."""
+        local_id, shard = divmod(task_id, len(self.shards))
+        return shard, local_id
+
+    def _globalize(self, shard: int, rows: Optional[List[tuple]]) -> list:
+        """Replace the local ids of task rows by their global ids."""
+        size = len(self.shards)
+        return [(row[0] * size + shard, *row[1:]) for row in rows or []]
+
+    def shard_for(self, row: tuple) -> int:
+        """
+        Choose the shard of a new task.
+
+        Args:
+            row (tuple): Task encoded by `SQLiteDB.encode_task_data`.
+
+        Returns:
+            int: Index of the shard.
+        """
+        if self.shard_key == "id":
+            return next(self._next_shard) % len(self.shards)
+        if self.shard_key == "category":
+            values = row[7].split()
+        else:
+            values = row[4].split(",")
+        key = values[0].strip() if values else ""
+        # crc32 gives the same shard in every process, unlike hash().
+        return zlib.crc32(key.encode("utf-8")) % len(self.shards)
+
+    def _fan_out(self, operation: Callable[[int, SQLiteDB], T]) -> List[T]:
+        """Run an operation on every shard in parallel, in shard order."""
+        if len(self.shards) == 1:
+            return [operation(0, self.shards[0])]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=len(self.shards), thread_name_prefix="shard"
+            )
+        return list(
+            self._pool.map(operation, range(len(self.shards)), self.shards)
+        )
+
+    def close(self) -> None:
+        """Stop the threads of the pool and close the shard connections."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.close_version_connection()
+        self.close_replica()
+
+    def table_exists(self, table_name: str) -> bool:
+        """Verify if the table exists in every shard."""
+        return all(
+            self._fan_out(lambda _, shard: shard.table_exists(table_name))
+        )
+
+    def create_table_tasks(self) -> None:
+        """Create the tasks table in every shard."""
+        self._fan_out(lambda _, shard: shard.create_table_tasks())
+
+    def create_indexes(self) -> None:
+        """Create the indexes of the sortable columns in every shard."""
+        self._fan_out(lambda _, shard: shard.create_indexes())
+
+    def enable_wal(self) -> Optional[str]:
+        """Switch every shard to write-ahead logging."""
+        modes = self._fan_out(lambda _, shard: shard.enable_wal())
+        return modes[0] if len(set(modes)) == 1 else None
+
+    def insert_data(self, table_name: str, data: TaskData) -> Optional[int]:
+        """
+        Insert a task in its shard.
+
+        Returns:
+            Optional[int]: Global id of the new task, None on error.
+        """
+        shard = self.shard_for(SQLiteDB.encode_task_data(data))
+        return self.global_id(
+            shard, self.shards[shard].insert_data(table_name, data)
+        )
+
+    def bulk_insert(
+        self,
+        table_name: str,
+        rows: Iterable[tuple],
+        batch_size: int = 50000,
+        synchronous: str = "NORMAL",
+    ) -> int:
+        """
+        Insert many encoded rows, every shard loading its part in parallel.
+
+        Args:
+            table_name (str): Table where the rows are going to be inserted.
+            rows (Iterable[tuple]): Encoded rows to insert.
+            batch_size (int): Number of rows dispatched at a time.
+            synchronous (str): `PRAGMA synchronous` of every shard's load.
+
+        Returns:
+            int: Number of rows inserted.
+        """
+        rows = iter(rows)
+        inserted = 0
+        while True:
+            parts: List[List[tuple]] = [[] for _ in self.shards]
+            for row in islice(rows, batch_size):
+                parts[self.shard_for(row)].append(row)
+            if not any(parts):
+                return inserted
+            inserted += sum(
+                self._fan_out(
+                    lambda index, shard: shard.bulk_insert(
+                        table_name, parts[index], batch_size, synchronous
+                    ) if parts[index] else 0
+                )
+            )
+
+    def fetch_data(
+        self, task_id: int, to_do: str = "COMPLETE", task=None
+    ) -> None:
+        """Complete or modify a task in its shard."""
+        shard, local_id = self.locate(task_id)
+        self.shards[shard].fetch_data(local_id, to_do, task)
+
+    def remove_task(self, task_id: int) -> None:
+        """Remove a task from its shard."""
+        shard, local_id = self.locate(task_id)
+        self.shards[shard].remove_task(local_id)
+        self.edges.remove_task_edges([task_id])
+
+    def _write_where(
+        self,
+        write: Callable[..., List[int]],
+        task_ids: Optional[Iterable[int]],
+    ) -> List[int]:
+        """
+        Run a set-based write on every shard, or on those of some tasks.
+
+        Each shard commits its part in its own transaction.
+
+        Args:
+            write (Callable): SQLiteDB method called on every shard with
+                the local ids of the shard as `task_ids`.
+            task_ids (Iterable[int], optional): Global ids of the tasks.
+
+        Returns:
+            List[int]: Global ids of the tasks written, in ascending order.
+        """
+        local_ids: List[Optional[List[int]]] = [None] * len(self.shards)
+        if task_ids is not None:
+            local_ids = [[] for _ in self.shards]
+            for task_id in task_ids:
+                shard, local_id = self.locate(task_id)
+                local_ids[shard].append(local_id)
+
+        def shard_write(index: int, shard: SQLiteDB) -> List[int]:
+            if local_ids[index] == []:
+                return []
+            return [
+                self.global_id(index, local_id)
+                for local_id in write(shard, task_ids=local_ids[index])
+            ]
+
+        return sorted(
+            task_id for ids in self._fan_out(shard_write) for task_id in ids
+        )
+
+    def complete_where(
+        self, condition: Optional[str] = None, params=(), task_ids=None
+    ) -> List[int]:
+        """Mark the open tasks matching a filter as complete, per shard."""
+        return self._write_where(
+            lambda shard, task_ids: shard.complete_where(
+                condition, params, task_ids
+            ),
+            task_ids,
+        )
+
+    def remove_where(
+        self, condition: Optional[str] = None, params=(), task_ids=None
+    ) -> List[int]:
+        """Remove the tasks matching a filter, per shard."""
+        removed = self._write_where(
+            lambda shard, task_ids: shard.remove_where(
+                condition, params, task_ids
+            ),
+            task_ids,
+        )
+        if removed:
+            self.edges.remove_task_edges(removed)
+        return removed
+
+    def reassign(
+        self,
+        from_assignee: str,
+        to_assignee: str,
+        condition: Optional[str] = None,
+        params=(),
+        task_ids=None,
+    ) -> List[int]:
+        """Give the tasks of an assignee to another one, per shard."""
+        return self._write_where(
+            lambda shard, task_ids: shard.reassign(
+                from_assignee, to_assignee, condition, params, task_ids
+            ),
+            task_ids,
+        )
+
+    def set_priority_where(
+        self,
+        priority: TaskPriority,
+        condition: Optional[str] = None,
+        params=(),
+        task_ids=None,
+    ) -> List[int]:
+        """Change the priority of the tasks matching a filter, per shard."""
+        return self._write_where(
+            lambda shard, task_ids: shard.set_priority_where(
+                priority, condition, params, task_ids
+            ),
+            task_ids,
+        )
+
+    def add_dependencies(self, edges: Iterable[Tuple[int, int]]) -> int:
+        """Store dependencies between tasks, by global id."""
+        return self.edges.add_dependencies(edges)
+
+    def remove_dependency(self, task_id: int, depends_on: int) -> bool:
+        """Delete the dependency of a task on another one."""
+        return self.edges.remove_dependency(task_id, depends_on)
+
+    def get_dependencies(self) -> List[Tuple[int, int]]:
+        """Return every dependency, by global id."""
+        return self.edges.get_dependencies()
+
+    def get_task_states(self) -> List[tuple]:
+        """Return the id, status and due date of the tasks of every shard."""
+        return [
+            row
+            for rows in self._fan_out(
+                lambda index, shard: self._globalize(
+                    index, shard.get_task_states()
+                )
+            )
+            for row in rows
+        ]
+
+    def insert_series(self, data: TaskData) -> Optional[int]:
+        """
+        Store a recurring task in the shard chosen for its tasks.
+
+        Its occurrences are stored as tasks in the same shard, so a series
+        gets a global id the same way a task does.
+
+        Returns:
+            Optional[int]: Global id of the series, None on error.
+        """
+        shard = self.shard_for(SQLiteDB.encode_task_data(data))
+        return self.global_id(shard, self.shards[shard].insert_series(data))
+
+    def get_series(self, series_id: Optional[int] = None) -> List[tuple]:
+        """Return the recurring tasks of every shard, or one of them."""
+        if series_id is not None:
+            shard, local_id = self.locate(series_id)
+            return self._globalize(
+                shard, self.shards[shard].get_series(local_id)
+            )
+        return list(
+            self._merged(lambda _, shard: sorted(shard.get_series()))
+        )
+
+    def remove_series(self, series_id: int) -> bool:
+        """Delete a recurring task from its shard."""
+        shard, local_id = self.locate(series_id)
+        return self.shards[shard].remove_series(local_id)
+
+    def materialize_occurrence(
+        self, series_id: int, due_date: datetime
+    ) -> Optional[int]:
+        """Store an occurrence as a task of the shard of its series."""
+        shard, local_id = self.locate(series_id)
+        return self.global_id(
+            shard,
+            self.shards[shard].materialize_occurrence(local_id, due_date),
+        )
+
+    def query_occurrences(
+        self, start: datetime, end: datetime
+    ) -> List[tuple]:
+        """Return the occurrences stored as tasks in a period, by global id."""
+        size = len(self.shards)
+        return [
+            (
+                row[0] * size + index,
+                row[1],
+                None if row[2] is None else row[2] * size + index,
+                *row[3:],
+            )
+            for index, rows in enumerate(
+                self._fan_out(
+                    lambda _, shard: shard.query_occurrences(start, end)
+                )
+            )
+            for row in rows
+        ]
+
+    def enable_incremental_vacuum(self) -> str:
+        """Switch every shard to incremental auto-vacuum."""
+        modes = self._fan_out(
+            lambda _, shard: shard.enable_incremental_vacuum()
+        )
+        return modes[0] if len(set(modes)) == 1 else "mixed"
+
+    def maintain(
+        self,
+        pages_per_step: int = 256,
+        pause: float = 0.02,
+        analyze: bool = False,
+        keep_changes: Optional[int] = KEEP_CHANGES,
+    ) -> MaintenanceReport:
+        """Maintain every shard in parallel and add up the reports."""
+        reports = self._fan_out(
+            lambda _, shard: shard.maintain(
+                pages_per_step, pause, analyze, keep_changes
+            )
+        )
+        modes = {report["auto_vacuum"] for report in reports}
+        total = {
+            key: sum(report[key] for report in reports)
+            for key in (
+                "size_before", "size_after", "freed_bytes",
+                "free_pages_left", "vacuum_steps", "changes_pruned",
+            )
+        }
+        return {
+            "auto_vacuum": modes.pop() if len(modes) == 1 else "mixed",
+            **total,
+            "longest_step_ms": max(
+                report["longest_step_ms"] for report in reports
+            ),
+            "seconds": max(report["seconds"] for report in reports),
+        }
+
+    def migrate_archive(self) -> None:
+        """Create the archive tables of every shard."""
+        self._fan_out(lambda _, shard: shard.migrate_archive())
+
+    def archive_completed(
+        self, older_than_days: float = 30, batch_size: int = 1000
+    ) -> int:
+        """Archive the tasks completed long ago in every shard."""
+        return sum(
+            self._fan_out(
+                lambda _, shard: shard.archive_completed(
+                    older_than_days, batch_size
+                )
+            )
+        )
+
+    def get_task(
+        self, task_id: int, include_archived: bool = False
+    ) -> Optional[tuple]:
+        """Return one task, read from its shard."""
+        shard, local_id = self.locate(task_id)
+        row = self.shards[shard].get_task(local_id, include_archived)
+        return None if row is None else self._globalize(shard, [row])[0]
+
+    def get_versioned_task(self, task_id: int) -> Optional[tuple]:
+        """Return one task with its version, read from its shard."""
+        shard, local_id = self.locate(task_id)
+        versioned = self.shards[shard].get_versioned_task(local_id)
+        if versioned is None:
+            return None
+        row, version = versioned
+        return self._globalize(shard, [row])[0], version
+
+    def update_task(
+        self, task_id: int, task: tuple, expected_version=None
+    ) -> Optional[int]:
+        """Modify a task in its shard unless it changed since a version."""
+        shard, local_id = self.locate(task_id)
+        try:
+            return self.shards[shard].update_task(
+                local_id, task, expected_version
+            )
+        except TaskConflictError as e:
+            current = e.current
+            if current is not None:
+                current = self._globalize(shard, [current])[0]
+            raise TaskConflictError(
+                task_id, expected_version, current, e.current_version
+            ) from None
+
+    def _merged(
+        self, operation: Callable[[int, SQLiteDB], List[tuple]], key=None
+    ) -> Iterator[tuple]:
+        """Run a query on every shard and merge the sorted results."""
+        results = self._fan_out(
+            lambda index, shard: self._globalize(
+                index, operation(index, shard)
+            )
+        )
+        return merge(*results, key=key or (lambda row: row[0]))
+
+    def get_all_tasks(self, include_archived: bool = False) -> List[tuple]:
+        """Return the tasks of every shard, ordered by id."""
+        return list(
+            self._merged(
+                lambda _, shard: sorted(
+                    shard.get_all_tasks(include_archived) or []
+                )
+            )
+        )
+
+    def query_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        after_id: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> List[tuple]:
+        """
+        Return the tasks matching a status, ordered by id.
+
+        Every shard returns its first `offset + limit` tasks after the id,
+        of which the merge keeps the page asked for.
+        """
+        size = len(self.shards)
+
+        def query(index: int, shard: SQLiteDB) -> List[tuple]:
+            # Local ids above this one have a global id above after_id.
+            local_after = (
+                None if after_id is None else (after_id - index) // size
+            )
+            return shard.query_tasks(
+                status,
+                None if limit is None else offset + limit,
+                0,
+                local_after,
+                include_archived,
+            )
+
+        stop = None if limit is None else offset + limit
+        return list(islice(self._merged(query), offset, stop))
+
+    def search_tasks(
+        self,
+        text: str,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[tuple]:
+        """Return the tasks whose text contains a string, ordered by id."""
+        size = len(self.shards)
+
+        def search(index: int, shard: SQLiteDB) -> List[tuple]:
+            local_after = (
+                None if after_id is None else (after_id - index) // size
+            )
+            return shard.search_tasks(text, limit, local_after)
+
+        return list(islice(self._merged(search), limit))
+
+    def query_due(self, start=None, end=None, limit=None) -> List[tuple]:
+        """Return the open tasks due in a period, ordered by due date."""
+        due = TASK_COLUMNS.index("due_date")
+        return list(
+            islice(
+                self._merged(
+                    lambda _, shard: shard.query_due(start, end, limit),
+                    key=lambda row: (row[due], row[0]),
+                ),
+                limit,
+            )
+        )
+
+    def iter_task_batches(
+        self,
+        batch_size: int = 10000,
+        condition: Optional[str] = None,
+        params=(),
+        order_by: str = "id",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Iterator[List[tuple]]:
+        """
+        Stream the tasks of every shard in batches, in one sorted order.
+
+        The streams of the shards are merged as they are read, so memory
+        stays bounded by one batch per shard. The condition must not refer
+        to ids, which are local to each shard.
+        """
+        if order_by not in TASK_COLUMNS:
+            raise ValueError(f"Unknown column '{order_by}'")
+        column = TASK_COLUMNS.index(order_by)
+        shard_limit = None if limit is None else offset + limit
+
+        def stream(index: int, shard: SQLiteDB) -> Iterator[tuple]:
+            for batch in shard.iter_task_batches(
+                batch_size, condition, params, order_by, descending,
+                shard_limit,
+            ):
+                yield from self._globalize(index, batch)
+
+        rows = merge(
+            *(stream(index, shard) for index, shard in enumerate(self.shards)),
+            key=lambda row: (row[column], row[0]),
+            reverse=descending,
+        )
+        rows = islice(rows, offset, shard_limit)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def count_tasks(self, condition: Optional[str] = None, params=()) -> int:
+        """Count the tasks of every shard matching a condition."""
+        return sum(
+            self._fan_out(
+                lambda _, shard: shard.count_tasks(condition, params)
+            )
+        )
+
+    def task_stats(self) -> dict:
+        """Count the tasks of every shard by status and priority."""
+        stats = {"total": 0, "by_status": {}, "by_priority": {}, "overdue": 0}
+        for shard_stats in self._fan_out(lambda _, shard: shard.task_stats()):
+            stats["total"] += shard_stats["total"]
+            stats["overdue"] += shard_stats["overdue"]
+            for group in ("by_status", "by_priority"):
+                for name, value in shard_stats[group].items():
+                    stats[group][name] = stats[group].get(name, 0) + value
+        return stats
+
+    def change_counter(self) -> int:
+        """Return the number of write transactions made on all the files."""
+        return self.edges.change_counter() + sum(
+            self._fan_out(lambda _, shard: shard.change_counter())
+        )
+
+    def changes_since(
+        self, since: Optional[tuple] = None, last_id=0
+    ) -> dict:
+        """
+        Return the tasks written on every shard after a position.
+
+        Each shard has its own change counter and highest id, so the
+        position is a tuple of one value per shard, returned by a
+        previous call; without it only the current position is read.
+
+        Args:
+            since (tuple, optional): Change counters already seen.
+            last_id (tuple): Highest local ids already seen, 0 for none.
+
+        Returns:
+            dict: Position reached, and the changed and added tasks of
+            `SQLiteDB.changes_since` with their global ids, by id.
+        """
+        size = len(self.shards)
+        if not isinstance(last_id, tuple):
+            last_id = (last_id,) * size
+        shard_changes = self._fan_out(
+            lambda index, shard: shard.changes_since(
+                None if since is None else since[index], last_id[index]
+            )
+        )
+        return {
+            "change_counter": tuple(
+                changes["change_counter"] for changes in shard_changes
+            ),
+            "last_id": tuple(changes["last_id"] for changes in shard_changes),
+            "changed": sorted(
+                (task_id * size + index, status)
+                for index, changes in enumerate(shard_changes)
+                for task_id, status in changes["changed"]
+            ),
+            "added": sorted(
+                task_id * size + index
+                for index, changes in enumerate(shard_changes)
+                for task_id in changes["added"]
+            ),
+            "pruned": any(changes["pruned"] for changes in shard_changes),
+        }
+
+    def data_version(self) -> int:
+        """Return a number that changes whenever a file is written."""
+        return self.edges.data_version() + sum(
+            self._fan_out(lambda _, shard: shard.data_version())
+        )
+
+    def close_version_connection(self) -> None:
+        """Close the connections used by `data_version`."""
+        for shard in [*self.shards, self.edges]:
+            shard.close_version_connection()
+
+    def close_replica(self) -> None:
+        """Drop the read replicas of the shards."""
+        for shard in self.shards:
+            shard.close_replica()
@@ -0,0 +1,211 @@
+"""
+snapshot.py.
+
+This script saves the tasks loaded by `TaskManager` to a msgpack file
+next to the database, so that the next start can skip reading, parsing
+and validating every row of SQLite.
+
+A snapshot is tagged with the change counter of the database it was
+built from. It is only used while the counter has not moved; after any
+write it is stale, and the tasks are loaded from SQLite again and saved
+in a new snapshot.
+
+The tasks are stored column by column, with dates as seconds since the
+epoch and statuses and priorities as their values, which msgpack reads
+back much faster than SQLite rows can be decoded.
+
+The cold start with and without a snapshot can be compared with:
+    python -m to_do_list_project.snapshot --db task_manager.db --runs 3
+"""
+
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import gc
+import os
+import time
+from typing import Iterator, List, Optional
+
+from .task import Task, TaskPriority, TaskStatus
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".snapshot"
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def snapshot_path(db_name: str) -> Optional[str]:
+    """
+    Return the snapshot file of a database.
+
+    Args:
+        db_name (str): Path of the database file.
+
+    Returns:
+        Optional[str]: Path of the snapshot, None for in-memory databases.
+    """
+    if db_name.startswith("file::memory:") or db_name == ":memory:":
+        return None
+    return db_name + SNAPSHOT_SUFFIX
+
+
+def _seconds(date: datetime) -> int:
+    """Convert a date into whole seconds since the epoch."""
+    return int((date - EPOCH).total_seconds())
+
+
+def _date(seconds: int) -> datetime:
+    """Convert seconds since the epoch into a date."""
+    return EPOCH + timedelta(0, seconds)
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pause the garbage collector inside the context.
+
+    Loading creates millions of objects that all stay alive, and the
+    collections they trigger would scan them again and again for nothing.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def write_snapshot(path: str, change_counter: int, tasks: List[Task]) -> None:
+    """
+    Save tasks in a snapshot file.
+
+    The file is written next to its final path and then renamed, so a
+    reader never sees half a snapshot.
+
+    Args:
+        path (str): Snapshot file to write.
+        change_counter (int): Change counter of the database the tasks
+            were read from.
+        tasks (List[Task]): Tasks to save.
+    """
+    import msgpack
+
+    data = {
+        "format": SNAPSHOT_FORMAT,
+        "change_counter": change_counter,
+        "id": [task.id for task in tasks],
+        "name": [task.name for task in tasks],
+        "description": [task.description for task in tasks],
+        "creation_date": [_seconds(task.creation_date) for task in tasks],
+        "due_date": [_seconds(task.due_date) for task in tasks],
+        "assignee": [task.assignee for task in tasks],
+        "status": [task.status.value for task in tasks],
+        "priority": [task.priority.value for task in tasks],
+        "categories": [task.categories for task in tasks],
+    }
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as snapshot_file:
+        msgpack.pack(data, snapshot_file)
+    os.replace(temporary_path, path)
+
+
+def read_snapshot(path: str, change_counter: int) -> Optional[List[Task]]:
+    """
+    Load the tasks of a snapshot if it is current.
+
+    Args:
+        path (str): Snapshot file to read.
+        change_counter (int): Current change counter of the database.
+
+    Returns:
+        Optional[List[Task]]: The tasks, or None when the snapshot is
+        missing, unreadable or was built before the last write.
+    """
+    import msgpack
+
+    with _gc_paused():
+        try:
+            with open(path, "rb") as snapshot_file:
+                data = msgpack.unpack(snapshot_file)
+        except (OSError, ValueError, msgpack.UnpackException):
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("format") != SNAPSHOT_FORMAT
+            or data.get("change_counter") != change_counter
+        ):
+            return None
+
+        statuses = {status.value: status for status in TaskStatus}
+        priorities = {priority.value: priority for priority in TaskPriority}
+        return list(
+            map(
+                Task.from_snapshot,
+                data["id"],
+                data["name"],
+                data["description"],
+                map(_date, data["creation_date"]),
+                map(_date, data["due_date"]),
+                data["assignee"],
+                map(statuses.__getitem__, data["status"]),
+                map(priorities.__getitem__, data["priority"]),
+                data["categories"],
+            )
+        )
+
+
+def benchmark_cold_start(db_name: str, runs: int = 3) -> dict:
+    """
+    Time the creation of a TaskManager with and without a snapshot.
+
+    Args:
+        db_name (str): Database to load.
+        runs (int): Number of starts timed for each case.
+
+    Returns:
+        dict: Best start time in seconds for "sqlite" and "snapshot", the
+        number of tasks loaded and the size of the snapshot.
+    """
+    from .db import SQLiteDB
+    from .task_manager import TaskManager
+
+    db = SQLiteDB(db_name)
+    path = snapshot_path(db.db_name)
+    timings = {}
+    for name, snapshot in (("sqlite", False), ("snapshot", True)):
+        if snapshot:
+            # The first start with snapshots writes the file.
+            TaskManager(db, snapshot=True)
+        best = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            task_manager = TaskManager(db, snapshot=snapshot)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    timings["tasks"] = len(task_manager._tasks)
+    timings["snapshot_bytes"] = os.path.getsize(path)
+    return timings
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Compare the cold start with and without a snapshot."""
+    parser = argparse.ArgumentParser(
+        description="Time TaskManager start with and without a snapshot."
+    )
+    parser.add_argument("--db", default="task_manager.db",
+                        help="database file to load")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="starts timed for each case")
+    args = parser.parse_args(argv)
+
+    timings = benchmark_cold_start(args.db, args.runs)
+    print(f"{timings['tasks']} tasks, "
+          f"snapshot of {timings['snapshot_bytes'] / 1e6:.1f} MB")
+    print(f"from SQLite:   {timings['sqlite']:.3f} s")
+    print(f"from snapshot: {timings['snapshot']:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
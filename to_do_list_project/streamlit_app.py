@@ -4,15 +4,213 @@ streamlit_app.py.
 This is the script launching the web UI of the Task Manager application.
 It drives the UI of the Task Manager application using the
 Streamlit framework.
+
+Streamlit runs the whole script again on every interaction, so the task
+manager is created once and shared by all the sessions, and the pages of
+tasks read are cached until the database is written, by the app or by
+any other process. Each session keeps its own position in the change
+log of the tasks, so that when only tasks of the page shown were modified
+or completed, their rows are read again and patched into the page
+instead. Nothing is registered on the shared task manager, so sessions
+that end leave nothing behind.
 """
 
 from datetime import datetime
-from PIL import Image
+import math
+from typing import List
+
 import streamlit as st
 
+from to_do_list_project.arrow_io import rows_to_table
+from to_do_list_project.changes import ChangeEvent, change_events
+from to_do_list_project.db import INDEXED_COLUMNS, TaskQuery
+from to_do_list_project.profiling import profile_session, profiling_enabled
 from to_do_list_project.task import TaskData, TaskStatus, TaskPriority
 from to_do_list_project.task_manager import TaskManager
 
+LOGO_PATH = "assets/img/logo.png"
+PAGE_SIZES = [25, 50, 100, 500]
+SORT_COLUMNS = ["id", *INDEXED_COLUMNS]
+# Changes and orders that never move a task to another page: modifying
+# or completing a task leaves its id and creation date as they are.
+PATCHABLE_CHANGES = {"modified", "completed"}
+PATCHABLE_ORDERS = {"id", "creation_date"}
+
+
+@st.cache_resource
+def get_task_manager() -> TaskManager:
+    """
+    Create the task manager shared by all the sessions and reruns.
+
+    Streamlit runs each session on a thread of its own. The pages only
+    use the database and the lazy reads of the manager, and the database
+    opens one connection per thread, so the sessions never share one.
+    """
+    task_manager = TaskManager(lazy=True)
+    task_manager._db.create_indexes()
+    return task_manager
+
+
+@st.cache_data
+def load_logo(path: str) -> bytes:
+    """Read the logo once."""
+    with open(path, "rb") as logo:
+        return logo.read()
+
+
+# The cached reads take the database and its data version as arguments,
+# so that they are read again exactly when the database has been written.
+@st.cache_data(max_entries=100)
+def count_tasks(
+    _task_manager: TaskManager, db_name: str, version: int, query: TaskQuery
+) -> int:
+    """Count the tasks matching the filter of a query."""
+    return _task_manager.count_tasks(query)
+
+
+@st.cache_data(max_entries=100)
+def read_page(
+    _task_manager: TaskManager, db_name: str, version: int, query: TaskQuery
+):
+    """Read a page of tasks as an Arrow table."""
+    return _task_manager.to_arrow(query)
+
+
+def patch_page(
+    task_manager: TaskManager,
+    table,
+    query: TaskQuery,
+    events: List[ChangeEvent],
+):
+    """
+    Read again the rows of a page for the changes of its tasks.
+
+    Args:
+        task_manager (TaskManager): Task manager the page was read from.
+        table (pyarrow.Table): Page shown before the changes.
+        query (TaskQuery): Query of the page.
+        events (List[ChangeEvent]): Changes delivered since it was read.
+
+    Returns:
+        Optional[pyarrow.Table]: The updated page, None when the changes
+        can add tasks to the page or remove tasks from it.
+    """
+    if (
+        not events
+        or any(event["kind"] not in PATCHABLE_CHANGES for event in events)
+        or query.get("order_by", "id") not in PATCHABLE_ORDERS
+        or query.get("status") is not None
+        or query.get("priority") is not None
+    ):
+        return None
+    shown = table.column("id").to_pylist()
+    changed = {
+        task_id for event in events for task_id in event["task_ids"]
+    }.intersection(shown)
+    if not changed:
+        return table
+    rows = [task_manager.find_task(task_id) for task_id in sorted(changed)]
+    if None in rows:
+        return None
+    patched = {
+        record["id"]: record for record in rows_to_table([rows]).to_pylist()
+    }
+    records = [
+        patched.get(record["id"], record) for record in table.to_pylist()
+    ]
+    return table.from_pylist(records, schema=table.schema)
+
+
+def session_view(task_manager: TaskManager) -> dict:
+    """
+    Return the page shown to this session, with its position in the log.
+
+    Returns:
+        dict: Query, data version, total and table of the page, and the
+        change counter and highest task id it was read at.
+    """
+    view = st.session_state.get("task_view")
+    if view is None:
+        position = task_manager._db.changes_since()
+        view = st.session_state["task_view"] = {
+            "query": None,
+            "version": None,
+            "total": 0,
+            "table": None,
+            "change_counter": position["change_counter"],
+            "last_id": position["last_id"],
+        }
+    return view
+
+
+def session_events(
+    task_manager: TaskManager, view: dict, version: int
+) -> List[ChangeEvent]:
+    """
+    Read the changes made since the page of a session was read.
+
+    The log is only read when the database was written since, and the
+    session moves its own position forward, so no other session or
+    thread takes the events from it.
+    """
+    if view["version"] in (None, version):
+        return []
+    changes = task_manager._db.changes_since(
+        view["change_counter"], view["last_id"]
+    )
+    view.update(
+        change_counter=changes["change_counter"], last_id=changes["last_id"]
+    )
+    return change_events(changes)
+
+
+def view_tasks(task_manager: TaskManager) -> None:
+    """
+    Display one page of tasks, filtered and sorted by the database.
+
+    Only the rows of the page are read, as an Arrow table handed to
+    Streamlit as is, so the page stays fast on large databases. When the
+    database was only written to modify or complete tasks, the rows of
+    the page that changed are patched in place.
+    """
+    filters, order, size = st.columns(3)
+    status = filters.selectbox(
+        "Status", ["All"] + [status.name for status in TaskStatus]
+    )
+    order_by = order.selectbox("Sort by", SORT_COLUMNS)
+    page_size = size.selectbox("Tasks per page", PAGE_SIZES)
+    descending = st.checkbox("Descending")
+
+    query: TaskQuery = {"order_by": order_by, "descending": descending}
+    if status != "All":
+        query["status"] = TaskStatus[status]
+    view = session_view(task_manager)
+    db_name, version = task_manager._db.db_name, task_manager.data_version()
+    events = session_events(task_manager, view, version)
+    patched = None
+    shown = view["query"] or {}
+    if view["version"] not in (None, version) and query == {
+        key: value
+        for key, value in shown.items()
+        if key not in ("limit", "offset")
+    }:
+        patched = patch_page(task_manager, view["table"], query, events)
+    if patched is None:
+        total = count_tasks(task_manager, db_name, version, query)
+    else:
+        total = view["total"]
+    pages = max(1, math.ceil(total / page_size))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1)
+
+    query["limit"] = page_size
+    query["offset"] = (int(page) - 1) * page_size
+    table = patched
+    if patched is None or query != shown:
+        table = read_page(task_manager, db_name, version, query)
+    view.update(query=dict(query), version=version, total=total, table=table)
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    st.caption(f"Page {page} of {pages}, {total} tasks")
+
 
 def main(task_manager: TaskManager) -> None:
     """
@@ -25,7 +223,7 @@ def main(task_manager: TaskManager) -> None:
     - Complete Task: Mark tasks as complete.
     - Delete Task: Remove tasks using their ID.
     """
-    st.image(Image.open('assets/img/logo.png'))
+    st.image(load_logo(LOGO_PATH))
 
     # Navigation
     menu = [
@@ -72,6 +270,7 @@ def main(task_manager: TaskManager) -> None:
 
     elif choice == "View Tasks":
         st.subheader("Existing Tasks")
+        view_tasks(task_manager)
 
     elif choice == "Complete Task":
         st.subheader("Mark a Task as Complete")
@@ -89,5 +288,5 @@ def main(task_manager: TaskManager) -> None:
 
 
 if __name__ == "__main__":
-    task_manager = TaskManager()
-    main(task_manager)
+    with profile_session("streamlit", enabled=profiling_enabled()):
+        main(get_task_manager())
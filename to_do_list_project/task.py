@@ -10,7 +10,9 @@ priority, and categories.
 from datetime import datetime
 from enum import Enum, unique
 import re
-from typing import List, TypedDict, Union
+from typing import List, Optional, TypedDict, Union
+
+from .recurrence import RecurrenceRule
 
 
 def parse_date(date_string: str) -> datetime:
@@ -65,7 +67,13 @@ class TaskPriority(Enum):
         return self.name.title()
 
 
-class TaskData(TypedDict):
+class _OptionalTaskData(TypedDict, total=False):
+    """Keys a TaskData may leave out."""
+
+    recurrence: Optional[RecurrenceRule]
+
+
+class TaskData(_OptionalTaskData):
     """A dictionary representing the data structure of a Task."""
 
     name: str
@@ -85,6 +93,9 @@ class Task:
     It has attributes such as ID, name, description, etc.
     """
 
+    # Tasks rebuilt from the database or a snapshot do not recur.
+    _recurrence: Optional[RecurrenceRule] = None
+
     def __init__(
         self,
         id: int,
@@ -95,6 +106,7 @@ class Task:
         status: TaskStatus = TaskStatus.IN_PROGRESS,
         priority: TaskPriority = TaskPriority.MEDIUM,
         categories: list[str] = None,
+        recurrence: Optional[RecurrenceRule] = None,
     ) -> None:
         """
         Initialize a Task object.
@@ -112,6 +124,8 @@ class Task:
         Default is MEDIUM.
         categories (list[str], optional): Categories the task belongs to.
         Default is None.
+        recurrence (RecurrenceRule, optional): When the task comes back,
+        from its due date on. Default is None.
         """
         self.id = id
         self.name = name
@@ -138,6 +152,129 @@ class Task:
         self.status = status
         self.priority = priority
         self._categories = categories
+        self.recurrence = recurrence
+
+    @classmethod
+    def from_db(
+        cls,
+        id: int,
+        name: str,
+        description: str,
+        creation_date: datetime,
+        due_date: datetime,
+        assignee: list[str],
+        status: TaskStatus,
+        priority: TaskPriority,
+        categories: list[str],
+    ) -> "Task":
+        """
+        Rebuild a task that is already stored in the database.
+
+        Stored tasks may be overdue, so the future due date rule that
+        applies when a task is created is not checked again: the due date
+        and the categories are assigned as stored, and the other
+        attributes go through their usual setters.
+
+        Returns:
+        Task: The rebuilt task.
+        """
+        task = cls.__new__(cls)
+        task.id = id
+        task.name = name
+        task.description = description
+        task.creation_date = creation_date
+        task._due_date = due_date
+        task.assignee = assignee
+        task.status = status
+        task.priority = priority
+        task._categories = categories
+        return task
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        id: int,
+        name: str,
+        description: str,
+        creation_date: datetime,
+        due_date: datetime,
+        assignee: list[str],
+        status: TaskStatus,
+        priority: TaskPriority,
+        categories: list[str],
+    ) -> "Task":
+        """
+        Rebuild a task saved in a snapshot.
+
+        Snapshots are only written from tasks that passed validation, so
+        no setter is run again.
+
+        Returns:
+        Task: The rebuilt task.
+        """
+        task = cls.__new__(cls)
+        task.__dict__.update(
+            _id=id,
+            _name=name,
+            _description=description,
+            creation_date=creation_date,
+            _due_date=due_date,
+            _assignee=assignee,
+            _status=status,
+            _priority=priority,
+            _categories=categories,
+        )
+        return task
+
+    @staticmethod
+    def validate(
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        due_date: Optional[datetime] = None,
+        assignee: Optional[list[str]] = None,
+    ) -> None:
+        """
+        Check new values of a task with the rules of its setters.
+
+        Values left to None are not checked, so that the changes to a
+        stored task can be refused before they are written, whether the
+        task is loaded in memory or not.
+
+        Raises:
+        ValueError: If a value is not valid.
+        """
+        if name is not None:
+            Task._check_name(name)
+        if description is not None:
+            Task._check_description(description)
+        if due_date is not None:
+            Task._check_due_date(due_date)
+        if assignee is not None:
+            Task._check_assignee(assignee)
+
+    @staticmethod
+    def _check_name(name: str) -> None:
+        if not name:
+            raise ValueError("Name must be a non-empty string")
+
+    @staticmethod
+    def _check_description(description: str) -> None:
+        if not description:
+            raise ValueError("Description must be a non-empty string")
+
+    @staticmethod
+    def _check_due_date(due_date: datetime) -> None:
+        if due_date <= datetime.now():
+            raise ValueError("Due date must be a future date")
+
+    @staticmethod
+    def _check_assignee(assignee: list[str]) -> None:
+        if not assignee or not all(
+            isinstance(person, str) and person for person in assignee
+        ):
+            raise ValueError(
+                "Assignee list must be a non-empty list of non-empty strings"
+            )
 
     @property
     def id(self) -> int:
@@ -157,8 +294,7 @@ class Task:
 
     @name.setter
     def name(self, new_name: str) -> None:
-        if not new_name:
-            raise ValueError("Name must be a non-empty string")
+        Task._check_name(new_name)
         self._name = new_name
 
     @property
@@ -168,13 +304,11 @@ class Task:
 
     @description.setter
     def description(self, new_description: str) -> None:
-        if not new_description:
-            raise ValueError("Description must be a non-empty string")
+        Task._check_description(new_description)
         self._description = new_description
 
     def _set_initial_due_date(self, date: datetime) -> None:
-        if date <= datetime.now():
-            raise ValueError("Due date must be a future date")
+        Task._check_due_date(date)
         self._due_date = date
 
     @property
@@ -184,8 +318,7 @@ class Task:
 
     @due_date.setter
     def due_date(self, new_due_date: datetime) -> None:
-        if new_due_date <= datetime.now():
-            raise ValueError("Due date must be a future date")
+        Task._check_due_date(new_due_date)
         self._due_date = new_due_date
 
     @property
@@ -195,12 +328,7 @@ class Task:
 
     @assignee.setter
     def assignee(self, new_assignee: list[str]) -> None:
-        if not new_assignee or not all(
-            isinstance(assignee, str) and assignee for assignee in new_assignee
-        ):
-            raise ValueError(
-                "Assignee list must be a non-empty list of non-empty strings"
-            )
+        Task._check_assignee(new_assignee)
         self._assignee = new_assignee
 
     @property
@@ -238,3 +366,16 @@ class Task:
         ):
             raise ValueError("Categories must be a list of non-empty strings")
         self._categories = new_categories
+
+    @property
+    def recurrence(self) -> Optional[RecurrenceRule]:
+        """Getter for the rule the task recurs by, None if it does not."""
+        return self._recurrence
+
+    @recurrence.setter
+    def recurrence(self, new_recurrence: Optional[RecurrenceRule]) -> None:
+        if new_recurrence is not None and not isinstance(
+            new_recurrence, RecurrenceRule
+        ):
+            raise ValueError("Invalid recurrence type")
+        self._recurrence = new_recurrence
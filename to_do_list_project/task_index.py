@@ -0,0 +1,488 @@
+"""
+task_index.py.
+
+This script maintains a binary index of the task metadata for read-only
+consumers such as reports and dashboards.
+
+The index is a file next to the database holding one fixed-width record
+per task: id, due date in seconds since the epoch, assignee code, status
+and priority. Readers map it in memory and see it as a NumPy structured
+array, so any number of processes share the same page-cached copy and
+nothing is parsed when it is opened. The assignee codes index the list of
+assignees stored in a small JSON file next to it.
+
+The index is tagged with the change counter of the database. Updates are
+incremental: new tasks are appended, and only the tasks listed in the
+change log since the last update are read again and patched in place.
+Removed tasks stay as records with a status of 0 until the next full
+rebuild. Writers take an exclusive lock on a file next to the index, so
+the updates of several processes never interleave.
+
+Usage:
+    python -m to_do_list_project.task_index --db task_manager.db
+"""
+
+import argparse
+from contextlib import contextmanager
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, TypedDict
+
+from .db import SQLiteDB
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+INDEX_SUFFIX = ".index"
+INDEX_MAGIC = b"TIDX"
+INDEX_VERSION = 1
+# Magic, version, change counter, number of records and highest task id,
+# padded to 64 bytes so the records start aligned.
+HEADER = struct.Struct("<4sIqqq")
+HEADER_SIZE = 64
+# Status of the records of removed tasks, TaskStatus values start at 1.
+DELETED = 0
+
+
+class IndexHeader(TypedDict):
+    """Header of a task index file."""
+
+    change_counter: int
+    count: int
+    last_id: int
+
+
+class IndexUpdate(TypedDict):
+    """Outcome of an index update."""
+
+    full: bool
+    appended: int
+    updated: int
+    change_counter: int
+
+
+def index_dtype():
+    """
+    Return the NumPy record type of the index.
+
+    Returns:
+        numpy.dtype: Aligned record of 24 bytes.
+    """
+    import numpy as np
+
+    return np.dtype(
+        [
+            ("id", "<i8"),
+            ("due", "<i8"),
+            ("assignee", "<u4"),
+            ("status", "u1"),
+            ("priority", "u1"),
+        ],
+        align=True,
+    )
+
+
+def index_path(db_name: str) -> str:
+    """Return the index file of a database."""
+    return db_name + INDEX_SUFFIX
+
+
+def assignees_path(path: str) -> str:
+    """Return the assignee list file of an index."""
+    return path + ".assignees.json"
+
+
+def read_header(path: str) -> Optional[IndexHeader]:
+    """
+    Read the header of an index file.
+
+    Args:
+        path (str): Index file.
+
+    Returns:
+        Optional[IndexHeader]: The header, None when the file is missing
+        or was not written by this version.
+    """
+    try:
+        with open(path, "rb") as index_file:
+            return parse_header(index_file.read(HEADER.size))
+    except OSError:
+        return None
+
+
+def parse_header(data: bytes) -> Optional[IndexHeader]:
+    """
+    Decode the header at the start of an index file.
+
+    Args:
+        data (bytes): First bytes of the file.
+
+    Returns:
+        Optional[IndexHeader]: The header, None when the data was not
+        written by this version.
+    """
+    if len(data) < HEADER.size:
+        return None
+    magic, version, change_counter, count, last_id = HEADER.unpack(
+        data[:HEADER.size]
+    )
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None
+    return {
+        "change_counter": change_counter,
+        "count": count,
+        "last_id": last_id,
+    }
+
+
+def _pack_header(change_counter: int, count: int, last_id: int) -> bytes:
+    """Encode an index header."""
+    header = HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, change_counter, count, last_id
+    )
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+def lock_path(path: str) -> str:
+    """Return the lock file of an index."""
+    return path + ".lock"
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """
+    Hold the exclusive lock of an index while it is written.
+
+    The lock is taken on a separate file, which is never replaced, so it
+    also covers full rebuilds that swap the index file.
+
+    Args:
+        path (str): Index file.
+    """
+    with open(lock_path(path), "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _load_assignees(path: str) -> List[str]:
+    """Read the assignee list of an index."""
+    try:
+        with open(assignees_path(path)) as assignees_file:
+            return json.load(assignees_file)
+    except (OSError, ValueError):
+        return []
+
+
+def _save_assignees(path: str, assignees: List[str]) -> None:
+    """Write the assignee list of an index, replacing it at once."""
+    temporary_path = f"{assignees_path(path)}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as assignees_file:
+        json.dump(assignees, assignees_file)
+    os.replace(temporary_path, assignees_path(path))
+
+
+def _to_records(rows: List[tuple], codes: Dict[str, int], assignees):
+    """
+    Convert index rows of the database into index records.
+
+    Args:
+        rows (List[tuple]): Rows from `SQLiteDB.iter_index_rows`.
+        codes (Dict[str, int]): Code of every known assignee, completed
+            with the new ones.
+        assignees (List[str]): Assignees by code, completed too.
+
+    Returns:
+        numpy.ndarray: Records of the rows.
+    """
+    import numpy as np
+
+    records = []
+    for task_id, status, priority, due, assignee in rows:
+        code = codes.get(assignee)
+        if code is None:
+            code = codes[assignee] = len(assignees)
+            assignees.append(assignee)
+        records.append((task_id, due, code, status, priority))
+    return np.array(records, dtype=index_dtype())
+
+
+def build_index(
+    db: SQLiteDB, path: Optional[str] = None, batch_size: int = 100000
+) -> IndexUpdate:
+    """
+    Write the whole index of a database.
+
+    The index is written to a temporary file and renamed, so readers
+    that still map the previous file keep a consistent view of it.
+
+    Args:
+        db (SQLiteDB): Database to index.
+        path (str, optional): Index file. Defaults to the database path
+            followed by ".index".
+        batch_size (int): Number of tasks converted at a time.
+
+    Returns:
+        IndexUpdate: Number of tasks written.
+    """
+    path = path or index_path(db.db_name)
+    with _locked(path):
+        return _build_index(db, path, batch_size)
+
+
+def _build_index(db: SQLiteDB, path: str, batch_size: int) -> IndexUpdate:
+    """Write the whole index of a database, its lock being held."""
+    change_counter = db.change_counter()
+    assignees: List[str] = []
+    codes: Dict[str, int] = {}
+    count, last_id = 0, 0
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as index_file:
+        index_file.write(_pack_header(change_counter, 0, 0))
+        for rows in db.iter_index_rows(batch_size):
+            index_file.write(_to_records(rows, codes, assignees).tobytes())
+            count += len(rows)
+            last_id = rows[-1][0]
+        index_file.seek(0)
+        index_file.write(_pack_header(change_counter, count, last_id))
+    _save_assignees(path, assignees)
+    os.replace(temporary_path, path)
+    return {
+        "full": True,
+        "appended": count,
+        "updated": 0,
+        "change_counter": change_counter,
+    }
+
+
+def update_index(
+    db: SQLiteDB,
+    path: Optional[str] = None,
+    full: bool = False,
+    batch_size: int = 100000,
+) -> IndexUpdate:
+    """
+    Bring the index of a database up to date.
+
+    Nothing is read when the database has not changed. Otherwise the new
+    tasks are appended and the tasks modified or removed since the last
+    update are patched in place; the header, written last, makes the new
+    records visible to readers. The index is locked for the whole
+    update, so that a concurrent one cannot append records the header
+    does not count.
+
+    Args:
+        db (SQLiteDB): Database to index.
+        path (str, optional): Index file. Defaults to the database path
+            followed by ".index".
+        full (bool): Rebuild the whole index, which also drops the
+            records of removed tasks.
+        batch_size (int): Number of tasks converted at a time.
+
+    Returns:
+        IndexUpdate: Numbers of tasks appended and updated.
+    """
+    path = path or index_path(db.db_name)
+    with _locked(path):
+        return _update_index(db, path, full, batch_size)
+
+
+def _update_index(
+    db: SQLiteDB, path: str, full: bool, batch_size: int
+) -> IndexUpdate:
+    """Bring the index of a database up to date, its lock being held."""
+    import numpy as np
+
+    # Read under the lock, as another process may just have written it.
+    header = read_header(path)
+    if full or header is None:
+        return _build_index(db, path, batch_size)
+    change_counter = db.change_counter()
+    result: IndexUpdate = {
+        "full": False,
+        "appended": 0,
+        "updated": 0,
+        "change_counter": change_counter,
+    }
+    if change_counter == header["change_counter"]:
+        return result
+
+    dtype = index_dtype()
+    assignees = _load_assignees(path)
+    known_assignees = len(assignees)
+    codes = {assignee: code for code, assignee in enumerate(assignees)}
+    logged = db.changed_task_ids(header["change_counter"])
+    if logged is None:
+        # The log was pruned past the index, which is rebuilt.
+        return _build_index(db, path, batch_size)
+    changed = [task_id for task_id in logged if task_id <= header["last_id"]]
+    with open(path, "r+b") as index_file:
+        if changed and header["count"]:
+            rows = {
+                row[0]: row
+                for batch in db.iter_index_rows(ids=changed)
+                for row in batch
+            }
+            index_map = mmap.mmap(index_file.fileno(), 0)
+            records = np.frombuffer(
+                index_map, dtype, header["count"], HEADER_SIZE
+            )
+            positions = np.searchsorted(records["id"], changed)
+            for task_id, position in zip(changed, positions):
+                if (
+                    position >= header["count"]
+                    or records["id"][position] != task_id
+                ):
+                    if task_id in rows:
+                        # A task that was never indexed, with an id that
+                        # was reused: the index is rebuilt to keep ids
+                        # sorted.
+                        del records
+                        index_map.close()
+                        return _build_index(db, path, batch_size)
+                    continue
+                if task_id in rows:
+                    records[position] = _to_records(
+                        [rows[task_id]], codes, assignees
+                    )[0]
+                else:
+                    records["status"][position] = DELETED
+                result["updated"] += 1
+            del records
+            index_map.flush()
+            index_map.close()
+
+        count, last_id = header["count"], header["last_id"]
+        index_file.seek(HEADER_SIZE + count * dtype.itemsize)
+        for rows in db.iter_index_rows(batch_size, after_id=last_id):
+            index_file.write(_to_records(rows, codes, assignees).tobytes())
+            count += len(rows)
+            last_id = rows[-1][0]
+        result["appended"] = count - header["count"]
+        if len(assignees) > known_assignees:
+            _save_assignees(path, assignees)
+        index_file.flush()
+        index_file.seek(0)
+        index_file.write(_pack_header(change_counter, count, last_id))
+    return result
+
+
+class TaskIndex:
+    """Read-only, memory-mapped view of a task index."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize the TaskIndex object.
+
+        Args:
+            path (str): Index file written by `update_index`.
+
+        Raises:
+            ValueError: If the file is not a task index.
+        """
+        self.path = path
+        self._map = None
+        self.tasks = None
+        self.assignees: List[str] = []
+        self.header: Optional[IndexHeader] = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        Map the index again if it has been updated since it was opened.
+
+        Returns:
+            bool: True if a new version of the index was mapped.
+        """
+        import numpy as np
+
+        header = read_header(self.path)
+        if header is None:
+            raise ValueError(f"{self.path} is not a task index")
+        if header == self.header:
+            return False
+        self.close()
+        with open(self.path, "rb") as index_file:
+            self._map = mmap.mmap(
+                index_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        # The header is read again from the mapping, in case the file was
+        # replaced in between.
+        header = parse_header(self._map[:HEADER.size])
+        self.tasks = np.frombuffer(
+            self._map, index_dtype(), header["count"], HEADER_SIZE
+        )
+        self.assignees = _load_assignees(self.path)
+        self.header = header
+        return True
+
+    def close(self) -> None:
+        """Release the mapping of the index."""
+        self.tasks = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __enter__(self) -> "TaskIndex":
+        """Return the index for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Release the mapping at the end of a with statement."""
+        self.close()
+
+    def live(self):
+        """Return the records of the tasks that still exist."""
+        return self.tasks[self.tasks["status"] != DELETED]
+
+    def assignee_code(self, assignee: str) -> Optional[int]:
+        """Return the code of an assignee, None if no task has it."""
+        try:
+            return self.assignees.index(assignee)
+        except ValueError:
+            return None
+
+    def count_by_status(self) -> Dict[int, int]:
+        """Count the existing tasks by status value."""
+        import numpy as np
+
+        values, counts = np.unique(self.live()["status"], return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Update the task index of a database from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Build or update the binary task index of a database."
+    )
+    parser.add_argument("--db", default="task_manager.db",
+                        help="database file to index")
+    parser.add_argument("--full", action="store_true",
+                        help="rebuild the whole index")
+    args = parser.parse_args(argv)
+
+    result = update_index(SQLiteDB(args.db), full=args.full)
+    kind = "rebuilt" if result["full"] else "updated"
+    print(
+        f"Index {kind} at change {result['change_counter']}: "
+        f"{result['appended']} tasks appended, {result['updated']} updated."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,45 @@ Classes:
 """
 
 from datetime import datetime
-from typing import List, Optional
+from heapq import merge
+import os
+import sqlite3
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
 
-from .db import SQLiteDB
+from .arrow_io import DEFAULT_ROW_GROUP_SIZE, rows_to_table, write_parquet
+from .db import (
+    DB_DATE_FORMAT,
+    KEEP_CHANGES,
+    MaintenanceReport,
+    SQLiteDB,
+    task_filter,
+    TaskConflictError,
+    TaskQuery,
+)
+from .dependencies import DependencyGraph
+from .due_index import DueIndex
+from .recurrence import Occurrence, RecurrenceRule
+from .snapshot import read_snapshot, snapshot_path, write_snapshot
 from .task import Task, TaskData, TaskStatus, TaskPriority
 
+if TYPE_CHECKING:
+    from .changes import ChangeCallback, ChangeFeed, ChangeFilter
+    from .importer import ImportReport
+    from .reminders import ReminderSweeper
+
+
+# Times `modify_task` applies its changes to the latest version of a task
+# that other writers keep changing.
+MODIFY_ATTEMPTS = 5
+
 
 class TaskNotFoundError(Exception):
     """Exception raised when a task is not found in the manager."""
@@ -36,60 +70,184 @@ class TaskManager:
     related to tasks.
     """
 
-    def __init__(self, db: Optional[SQLiteDB] = None) -> None:
+    def __init__(
+        self,
+        db: Optional[SQLiteDB] = None,
+        lazy: bool = False,
+        snapshot: bool = False,
+    ) -> None:
         """
         Initialize the TaskManager object.
 
         Args:
             db_name (str): Name of the database.
+            lazy (bool): Defer loading the tasks in memory until they are
+                first needed. Operations that only touch the database,
+                like the script commands, then never load them.
+            snapshot (bool): Load the tasks from the snapshot file next to
+                the database when it is current, and save a new one when
+                they have to be loaded from the database.
 
         Raises:
             DatabaseConnectionError: If the database connection fails.
         """
         self._db = db or SQLiteDB()
-        self._tasks = self.load_tasks_from_db()
+        self._snapshot = snapshot
+        self._loaded_tasks: Optional[List[Task]] = None
+        self._loaded_due_index: Optional[DueIndex] = None
+        self._loaded_graph: Optional[DependencyGraph] = None
+        # Change counter the graph is in sync with, and data version at
+        # which that was last checked.
+        self._graph_counter = 0
+        self._graph_version: Optional[int] = None
+        self._sweeper: Optional["ReminderSweeper"] = None
+        self._feed: Optional["ChangeFeed"] = None
+        if not lazy:
+            self._loaded_tasks = self.load_tasks_from_db()
+
+    @property
+    def _tasks(self) -> List[Task]:
+        """Tasks held in memory, loaded from the database on first use."""
+        if self._loaded_tasks is None:
+            self._loaded_tasks = self.load_tasks_from_db()
+        return self._loaded_tasks
+
+    @_tasks.setter
+    def _tasks(self, tasks: List[Task]) -> None:
+        self._loaded_tasks = tasks
+        self._loaded_due_index = None
+
+    @property
+    def _due_index(self) -> DueIndex:
+        """Open tasks by due date, built on first use and kept in sync."""
+        if self._loaded_due_index is None:
+            self._loaded_due_index = DueIndex(self._tasks)
+        return self._loaded_due_index
+
+    @property
+    def _graph(self) -> DependencyGraph:
+        """
+        Dependencies between the tasks, built on first use and kept in sync.
+
+        The graph only needs the id, status and due date of the tasks, so
+        it is read from the database without loading the tasks. It is
+        updated by the writes of this manager, and built again once the
+        database was written by anything else: when the data version
+        moved, the change counter is compared to the one it is in sync
+        with.
+        """
+        if self._loaded_graph is not None:
+            version = self._db.data_version()
+            if version != self._graph_version:
+                if self._db.change_counter() != self._graph_counter:
+                    self._loaded_graph = None
+                self._graph_version = version
+        if self._loaded_graph is None:
+            # Read first, so a write made during the build is noticed.
+            self._graph_version = self._db.data_version()
+            self._graph_counter = self._db.change_counter()
+            complete = TaskStatus.COMPLETE.value
+            self._loaded_graph = DependencyGraph(
+                (
+                    (
+                        task_id,
+                        status == complete,
+                        datetime.strptime(due_date, DB_DATE_FORMAT),
+                    )
+                    for task_id, status, due_date in self._db.get_task_states()
+                ),
+                self._db.get_dependencies(),
+            )
+        return self._loaded_graph
+
+    def _synced_graph(self) -> Optional[DependencyGraph]:
+        """
+        Return the graph in memory after a write of this manager, if any.
+
+        Every write transaction increases the change counter by one, so
+        the graph missed no other write only if the counter moved by one
+        since it was in sync. Otherwise, or if the write failed, it is
+        dropped and built again on next use.
+        """
+        if self._loaded_graph is None:
+            return None
+        counter = self._db.change_counter()
+        if counter != self._graph_counter + 1:
+            self._loaded_graph = None
+            return None
+        self._graph_counter = counter
+        return self._loaded_graph
+
+    def _loaded_task(self, task_id: int) -> Optional[Task]:
+        """Return a task held in memory, without loading the tasks."""
+        for task in self._loaded_tasks or []:
+            if task.id == task_id:
+                return task
+        return None
 
     def load_tasks_from_db(self) -> List[Task]:
-        """Load all tasks from database."""
+        """Load all tasks from database, or from a current snapshot."""
+        path = snapshot_path(self._db.db_name) if self._snapshot else None
+        if path is None:
+            return self._read_tasks()
+        # The counter is read before the tasks, so a write made while they
+        # are read leaves the snapshot stale rather than wrong.
+        change_counter = self._db.change_counter()
+        tasks = read_snapshot(path, change_counter)
+        if tasks is None:
+            tasks = self._read_tasks()
+            try:
+                write_snapshot(path, change_counter, tasks)
+            except OSError as e:
+                self._db.logger.warning(f"Could not write snapshot: {e}")
+        return tasks
+
+    def _read_tasks(self) -> List[Task]:
+        """Build the tasks from the rows of the database."""
         all_tasks = self._db.get_all_tasks()
         tasks = []
         if all_tasks:
             for task_tuple in all_tasks:
-                (
-                    task_id,
-                    name,
-                    description,
-                    creation_date,
-                    due_date,
-                    assignee,
-                    status,
-                    priority,
-                    categories,
-                ) = task_tuple
-
-                status = [
-                    c_status
-                    for c_status in TaskStatus
-                    if c_status.value == status
-                ][0]
-                priority = [
-                    c_priority
-                    for c_priority in TaskPriority
-                    if c_priority.value == priority
-                ][0]
-                task = Task(
-                    task_id,
-                    name,
-                    description,
-                    datetime.strptime(due_date, "%Y/%m/%d %H:%M:%S"),
-                    assignee.split(","),
-                    status,
-                    priority,
-                    categories.split(","),
-                )
-                tasks.append(task)
+                tasks.append(self._task_from_row(task_tuple))
         return tasks
 
+    @staticmethod
+    def _task_from_row(task_tuple: tuple) -> Task:
+        """Build a task from a row of the database."""
+        (
+            task_id,
+            name,
+            description,
+            creation_date,
+            due_date,
+            assignee,
+            status,
+            priority,
+            categories,
+        ) = task_tuple
+
+        status = [
+            c_status
+            for c_status in TaskStatus
+            if c_status.value == status
+        ][0]
+        priority = [
+            c_priority
+            for c_priority in TaskPriority
+            if c_priority.value == priority
+        ][0]
+        return Task.from_db(
+            task_id,
+            name,
+            description,
+            datetime.strptime(creation_date, DB_DATE_FORMAT),
+            datetime.strptime(due_date, DB_DATE_FORMAT),
+            assignee.split(","),
+            status,
+            priority,
+            categories.split(","),
+        )
+
     def add_task(
         self,
         name: str,
@@ -112,9 +270,10 @@ class TaskManager:
             "categories": categories if categories is not None else [],
         }
 
-        task_id = self._db.insert_data("tasks", task_data)
+        # The task is validated before it is written, with a temporary id
+        # replaced by the one given by the database.
         task = Task(
-            task_id,
+            -1,
             name,
             description,
             due_date,
@@ -123,20 +282,159 @@ class TaskManager:
             priority,
             categories,
         )
-        self._tasks.append(task)
+        task_id = self._db.insert_data("tasks", task_data)
+        task.id = task_id
+        self._synced_graph()
+        self._track_added(task)
+        self.poll_changes()
         return task_id
 
+    def _track_added(self, task: Task) -> None:
+        """Add a task just stored to the structures held in memory."""
+        if self._loaded_tasks is not None:
+            self._loaded_tasks.append(task)
+        if self._loaded_due_index is not None:
+            self._loaded_due_index.add(task)
+        if self._loaded_graph is not None:
+            self._loaded_graph.add_task(
+                task.id, task.due_date, task.status is TaskStatus.COMPLETE
+            )
+        if self._sweeper is not None:
+            self._sweeper.schedule(task)
+
+    def import_file(
+        self,
+        path: str,
+        format: str = "csv",
+        batch_size: int = 5000,
+        allow_past_due: bool = False,
+    ) -> "ImportReport":
+        """
+        Import the tasks of a CSV or JSON lines file.
+
+        The file is streamed and its records are validated with the Task
+        rules, then inserted in transactions of `batch_size` rows, so the
+        memory used stays the same whatever the size of the file.
+
+        Args:
+            path (str): Path of the file to import.
+            format (str): "csv" or "jsonl".
+            batch_size (int): Number of rows inserted per transaction.
+            allow_past_due (bool): Accept due dates in the past, for tasks
+                migrated with their history.
+
+        Returns:
+            ImportReport: Number of imported tasks and the rejected rows
+            with their line number and error.
+        """
+        from .importer import IMPORT_FORMATS, iter_valid_rows
+
+        if format not in IMPORT_FORMATS:
+            raise ValueError(
+                f"Unknown import format '{format}', use csv or jsonl"
+            )
+        rejected = []
+        rows = iter_valid_rows(path, format, rejected, allow_past_due)
+        imported = self._db.bulk_insert("tasks", rows, batch_size)
+        if imported:
+            # The new ids are not returned by bulk inserts, so the tasks
+            # in memory are reloaded on their next use.
+            self._loaded_tasks = None
+            self._loaded_due_index = None
+            self._loaded_graph = None
+            if self._sweeper is not None:
+                self._sweeper.schedule_all(self._tasks)
+            self.poll_changes()
+        return {"imported": imported, "rejected": rejected}
+
+    def export_parquet(
+        self, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+    ) -> int:
+        """
+        Export the tasks table to a Parquet file.
+
+        The table is walked with a streaming cursor and written one row
+        group at a time, so exports never hold the whole table in memory.
+
+        Args:
+            path (str): Parquet file to write.
+            row_group_size (int): Number of tasks per row group.
+
+        Returns:
+            int: Number of tasks exported.
+
+        Raises:
+            sqlite3.Error: If the tasks cannot be read, in which case the
+                file written so far is deleted.
+        """
+        try:
+            return write_parquet(
+                self._db.iter_task_batches(row_group_size), path
+            )
+        except sqlite3.Error:
+            # A file holding part of the tasks would pass for an export.
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+    def to_arrow(
+        self, query: Optional[TaskQuery] = None, batch_size: int = 10000
+    ):
+        """
+        Read the tasks matching a query as an Arrow table.
+
+        The table is built from the cursor batches directly, without
+        going through Task objects or a list of all the rows, and the
+        filtering, sorting and paging are done by the database.
+
+        Args:
+            query (TaskQuery, optional): Status, priority, order_by,
+                descending, limit and offset of the tasks. Defaults to
+                all the tasks ordered by id.
+            batch_size (int): Number of rows converted at a time.
+
+        Returns:
+            pyarrow.Table: Typed table of the tasks.
+
+        Raises:
+            sqlite3.Error: If the tasks cannot be read.
+        """
+        query = query or {}
+        condition, params = task_filter(query)
+        return rows_to_table(
+            self._db.iter_task_batches(
+                batch_size,
+                condition,
+                params,
+                order_by=query.get("order_by", "id"),
+                descending=query.get("descending", False),
+                limit=query.get("limit"),
+                offset=query.get("offset", 0),
+            )
+        )
+
+    def count_tasks(self, query: Optional[TaskQuery] = None) -> int:
+        """Count the tasks of database matching the filter of a query."""
+        return self._db.count_tasks(*task_filter(query or {}))
+
     def remove_task(self, task_id: int) -> None:
         """Remove task from database."""
-        print(f"Tasks before attempting removal: {len(self._tasks)}")
-
         self._db.remove_task(task_id)
+        if self._loaded_due_index is not None:
+            self._loaded_due_index.discard(task_id)
+        graph = self._synced_graph()
+        if graph is not None:
+            graph.remove(task_id)
+        if self._sweeper is not None:
+            self._sweeper.cancel(task_id)
+        self.poll_changes()
 
+        if self._loaded_tasks is None:
+            return
         for index, task in enumerate(self._tasks):
             if task.id == task_id:
                 del self._tasks[index]
-
-        print(f"Tasks after removal: {len(self._tasks)}")
+                break
 
     def complete_task(self, task_id: int) -> None:
         """
@@ -146,11 +444,679 @@ class TaskManager:
             TaskNotFoundError: If the task is not found.
         """
         self._db.fetch_data(task_id, to_do="COMPLETE")
-        self.get_task_by_id(task_id).status = TaskStatus.COMPLETE
+        if self._loaded_tasks is not None:
+            self.get_task_by_id(task_id).status = TaskStatus.COMPLETE
+        if self._loaded_due_index is not None:
+            self._loaded_due_index.discard(task_id)
+        graph = self._synced_graph()
+        if graph is not None:
+            graph.complete(task_id)
+        if self._sweeper is not None:
+            self._sweeper.cancel(task_id)
+        self.poll_changes()
+
+    def _selection(
+        self, query: Optional[TaskQuery], task_ids: Optional[Iterable[int]]
+    ) -> Tuple[Optional[str], tuple]:
+        """
+        Build the condition of a set-based write.
+
+        Raises:
+            ValueError: If neither a filter nor task ids are given, so that
+                a missing filter never touches every task.
+        """
+        condition, params = task_filter(query or {})
+        if condition is None and task_ids is None:
+            raise ValueError("Give task ids or a filter to select the tasks")
+        return condition, params
+
+    def _update_loaded(
+        self, task_ids: List[int], update: Callable[[Task], None]
+    ) -> None:
+        """Apply a change to the tasks held in memory among some ids."""
+        if self._loaded_tasks is None or not task_ids:
+            return
+        selected = set(task_ids)
+        for task in self._loaded_tasks:
+            if task.id in selected:
+                update(task)
+
+    def _forget_due(self, task_ids: List[int]) -> None:
+        """Drop tasks no longer open from the due index and reminders."""
+        for task_id in task_ids:
+            if self._loaded_due_index is not None:
+                self._loaded_due_index.discard(task_id)
+            if self._sweeper is not None:
+                self._sweeper.cancel(task_id)
+
+    def complete_where(
+        self,
+        query: Optional[TaskQuery] = None,
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Mark the open tasks matching a filter as complete.
+
+        All of them are completed by one statement in one transaction.
+
+        Args:
+            query (TaskQuery, optional): Status, priority, assignee,
+                category and due_before of the tasks.
+            task_ids (Iterable[int], optional): Only complete these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks completed.
+
+        Raises:
+            ValueError: If neither a filter nor task ids are given.
+        """
+        completed = self._db.complete_where(
+            *self._selection(query, task_ids), task_ids
+        )
+
+        def complete(task: Task) -> None:
+            task.status = TaskStatus.COMPLETE
+
+        self._update_loaded(completed, complete)
+        self._forget_due(completed)
+        graph = self._synced_graph()
+        if graph is not None:
+            for task_id in completed:
+                graph.complete(task_id)
+        self.poll_changes()
+        return completed
+
+    def remove_where(
+        self,
+        query: Optional[TaskQuery] = None,
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Remove the tasks matching a filter in one statement.
+
+        Args:
+            query (TaskQuery, optional): Filter of the tasks.
+            task_ids (Iterable[int], optional): Only remove these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks removed.
+
+        Raises:
+            ValueError: If neither a filter nor task ids are given.
+        """
+        removed = self._db.remove_where(
+            *self._selection(query, task_ids), task_ids
+        )
+        self._forget_due(removed)
+        graph = self._synced_graph()
+        if graph is not None:
+            for task_id in removed:
+                graph.remove(task_id)
+        if self._loaded_tasks is not None and removed:
+            selected = set(removed)
+            self._loaded_tasks[:] = [
+                task for task in self._loaded_tasks
+                if task.id not in selected
+            ]
+        self.poll_changes()
+        return removed
+
+    def reassign(
+        self,
+        from_assignee: str,
+        to_assignee: str,
+        query: Optional[TaskQuery] = None,
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Give the tasks of an assignee to another one in one statement.
 
-    def get_all_tasks(self) -> List[tuple]:
-        """Get all the tasks of database."""
-        return self._db.get_all_tasks()
+        Args:
+            from_assignee (str): Assignee whose tasks are given away.
+            to_assignee (str): Assignee receiving them.
+            query (TaskQuery, optional): Only reassign the tasks matching
+                this filter; all the tasks of the assignee by default.
+            task_ids (Iterable[int], optional): Only reassign these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks reassigned.
+
+        Raises:
+            ValueError: If an assignee is empty or holds a comma.
+        """
+        from_assignee, to_assignee = from_assignee.strip(), to_assignee.strip()
+        if not from_assignee or not to_assignee or "," in (
+            from_assignee + to_assignee
+        ):
+            raise ValueError("Assignees must be non-empty names without comma")
+        reassigned = self._db.reassign(
+            from_assignee,
+            to_assignee,
+            *task_filter(query or {}),
+            task_ids,
+        )
+
+        def replace(task: Task) -> None:
+            names: List[str] = []
+            for name in task.assignee:
+                name = name.strip()
+                name = to_assignee if name == from_assignee else name
+                if name not in names:
+                    names.append(name)
+            task.assignee = names
+
+        self._update_loaded(reassigned, replace)
+        self._synced_graph()
+        self.poll_changes()
+        return reassigned
+
+    def set_priority_where(
+        self,
+        priority: TaskPriority,
+        query: Optional[TaskQuery] = None,
+        task_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Change the priority of the tasks matching a filter in one statement.
+
+        Args:
+            priority (TaskPriority): New priority.
+            query (TaskQuery, optional): Filter of the tasks.
+            task_ids (Iterable[int], optional): Only change these tasks.
+
+        Returns:
+            List[int]: Ids of the tasks whose priority changed.
+
+        Raises:
+            ValueError: If neither a filter nor task ids are given.
+        """
+        changed = self._db.set_priority_where(
+            priority, *self._selection(query, task_ids), task_ids
+        )
+
+        def prioritize(task: Task) -> None:
+            task.priority = priority
+
+        self._update_loaded(changed, prioritize)
+        self._synced_graph()
+        self.poll_changes()
+        return changed
+
+    def add_dependency(self, task_id: int, depends_on: int) -> bool:
+        """
+        Make a task wait for another one to be completed.
+
+        The dependency is checked against the graph held in memory, which
+        only searches the tasks between the two in its topological order
+        for a cycle, then stored.
+
+        Args:
+            task_id (int): Task that has to wait.
+            depends_on (int): Task to complete first.
+
+        Returns:
+            bool: False if the dependency already existed or could not
+            be stored.
+
+        Raises:
+            TaskNotFoundError: If a task is not found.
+            DependencyCycleError: If the other task already depends on the
+                task, directly or not, or if both are the same.
+        """
+        try:
+            added = self._graph.add_dependency(task_id, depends_on)
+        except KeyError:
+            raise TaskNotFoundError("Task not found.") from None
+        if not added:
+            return False
+        stored = self._db.add_dependencies([(task_id, depends_on)])
+        # Not stored, the graph is dropped and read again from the database.
+        self._synced_graph()
+        if stored:
+            self.poll_changes()
+        return bool(stored)
+
+    def remove_dependency(self, task_id: int, depends_on: int) -> bool:
+        """
+        Stop a task from waiting for another one.
+
+        Returns:
+            bool: False if there was no such dependency.
+        """
+        removed = self._db.remove_dependency(task_id, depends_on)
+        graph = self._synced_graph()
+        if graph is not None:
+            graph.remove_dependency(task_id, depends_on)
+        if removed:
+            self.poll_changes()
+        return removed
+
+    def ready_tasks(self, limit: Optional[int] = None) -> List[int]:
+        """
+        Return the open tasks whose prerequisites are all completed.
+
+        The set is kept up to date by the writes of this manager, so it
+        is returned without walking the dependencies.
+
+        Args:
+            limit (int, optional): Only return the ones due first.
+
+        Returns:
+            List[int]: Ids of the tasks, by due date.
+        """
+        return self._graph.ready(limit)
+
+    def blocked_by(self, task_id: int) -> List[int]:
+        """
+        Return the open tasks a task waits for.
+
+        Raises:
+            TaskNotFoundError: If the task is not found.
+        """
+        try:
+            return self._graph.blocked_by(task_id)
+        except KeyError:
+            raise TaskNotFoundError("Task not found.") from None
+
+    def critical_path(self) -> List[Tuple[int, datetime]]:
+        """
+        Return the longest chain of open tasks waiting for each other.
+
+        Returns:
+            List[Tuple[int, datetime]]: Ids of the tasks in the order they
+            have to be completed, each with the latest date it can be
+            completed for every task after it to be on time.
+        """
+        return self._graph.critical_path()
+
+    def add_recurring_task(
+        self,
+        name: str,
+        description: str,
+        due_date: datetime,
+        assignee: List[str],
+        recurrence: RecurrenceRule,
+        priority: TaskPriority = TaskPriority.MEDIUM,
+        categories: List[str] = None,
+    ) -> int:
+        """
+        Add a task that comes back by a rule, stored once.
+
+        Its occurrences are listed by `occurrences`, and only stored as
+        tasks once completed or edited.
+
+        Args:
+            due_date (datetime): Start of the series, which gives the
+                time of day of its occurrences.
+            recurrence (RecurrenceRule): When the task comes back.
+
+        Returns:
+            int: Id of the series.
+        """
+        # Validated as a task, like the ones added by `add_task`.
+        task = Task(
+            -1,
+            name,
+            description,
+            due_date,
+            assignee,
+            TaskStatus.IN_PROGRESS,
+            priority,
+            categories,
+            recurrence,
+        )
+        series_id = self._db.insert_series({
+            "name": name,
+            "description": description,
+            "creation_date": datetime.now(),
+            "due_date": due_date,
+            "assignee": task.assignee,
+            "status": task.status,
+            "priority": priority,
+            "categories": task.categories,
+            "recurrence": recurrence,
+        })
+        self._synced_graph()
+        self.poll_changes()
+        return series_id
+
+    def remove_recurring_task(self, series_id: int) -> bool:
+        """
+        Stop a task from coming back.
+
+        Its occurrences already completed or edited stay as tasks.
+
+        Returns:
+            bool: False if there was no such series.
+        """
+        removed = self._db.remove_series(series_id)
+        self._synced_graph()
+        if removed:
+            self.poll_changes()
+        return removed
+
+    def occurrences(
+        self,
+        start: datetime,
+        end: datetime,
+        series_id: Optional[int] = None,
+    ) -> Iterator[Occurrence]:
+        """
+        Generate the occurrences of the recurring tasks in a period.
+
+        They are computed from the rules, and the ones stored as tasks
+        are read with an indexed query on the period, so the cost is that
+        of the occurrences listed, not of the tasks stored. Occurrences
+        whose task was removed are skipped.
+
+        Args:
+            start (datetime): Earliest occurrence date.
+            end (datetime): Latest occurrence date.
+            series_id (int, optional): Only list this series.
+
+        Yields:
+            Occurrence: Occurrences by date, then series id.
+        """
+        stored = {
+            (row[0], row[1]): row[2:]
+            for row in self._db.query_occurrences(start, end)
+            if series_id is None or row[0] == series_id
+        }
+
+        def expand(series: tuple) -> Iterator[Occurrence]:
+            rule = RecurrenceRule.parse(series[9])
+            first = datetime.strptime(series[4], DB_DATE_FORMAT)
+            for date in rule.occurrences(first, start, end):
+                due_date = date.strftime(DB_DATE_FORMAT)
+                row = stored.get((series[0], due_date))
+                if row is None:
+                    yield Occurrence(
+                        series[0],
+                        date,
+                        None,
+                        (None, *series[1:4], due_date, *series[5:9]),
+                    )
+                elif row[0] is not None:
+                    yield Occurrence(series[0], date, row[0], tuple(row))
+
+        yield from merge(
+            *(expand(series) for series in self._db.get_series(series_id)),
+            key=lambda occurrence: (
+                occurrence.due_date, occurrence.series_id
+            ),
+        )
+
+    def _materialize(self, series_id: int, due_date: datetime) -> int:
+        """
+        Store an occurrence as a task, or find the task storing it.
+
+        Raises:
+            TaskNotFoundError: If the series does not exist, if it has no
+                occurrence at that date or if its task was removed.
+        """
+        series = self._db.get_series(series_id)
+        task_id = None
+        if series:
+            rule = RecurrenceRule.parse(series[0][9])
+            first = datetime.strptime(series[0][4], DB_DATE_FORMAT)
+            if due_date in rule.occurrences(first, due_date, due_date):
+                task_id = self._db.materialize_occurrence(series_id, due_date)
+                self._synced_graph()
+        if task_id is None:
+            raise TaskNotFoundError("Occurrence not found.")
+        if self._loaded_task(task_id) is None:
+            # Stored now, or by another process since the tasks were read.
+            self._track_added(self._task_from_row(self._db.get_task(task_id)))
+        return task_id
+
+    def complete_occurrence(self, series_id: int, due_date: datetime) -> int:
+        """
+        Mark an occurrence of a recurring task as complete.
+
+        Args:
+            series_id (int): Id of the series.
+            due_date (datetime): Date of the occurrence.
+
+        Returns:
+            int: Id of the task now storing the occurrence.
+
+        Raises:
+            TaskNotFoundError: If the series has no such occurrence.
+        """
+        task_id = self._materialize(series_id, due_date)
+        self.complete_task(task_id)
+        return task_id
+
+    def edit_occurrence(
+        self,
+        series_id: int,
+        due_date: datetime,
+        new_name: str = "",
+        new_description: str = "",
+        new_due_date: Optional[datetime] = None,
+        new_assignee: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Modify one occurrence of a recurring task, not the others.
+
+        The occurrence keeps its place in the series even when it is
+        moved to another due date.
+
+        Returns:
+            int: Id of the task now storing the occurrence.
+
+        Raises:
+            TaskNotFoundError: If the series has no such occurrence.
+        """
+        task_id = self._materialize(series_id, due_date)
+        self.modify_task(
+            task_id, new_name, new_description, new_due_date, new_assignee
+        )
+        return task_id
+
+    def attach_reminders(self, sweeper: "ReminderSweeper") -> None:
+        """
+        Schedule the reminders of the open tasks and start sending them.
+
+        The sweeper is kept in sync with the tasks added, modified,
+        completed or removed through this manager.
+
+        Args:
+            sweeper (ReminderSweeper): Sweeper sending the reminders.
+        """
+        self.detach_reminders()
+        sweeper.schedule_all(self._tasks)
+        sweeper.start()
+        self._sweeper = sweeper
+
+    def detach_reminders(self) -> None:
+        """Stop the reminder sweeper, if one is attached."""
+        if self._sweeper is not None:
+            self._sweeper.stop()
+            self._sweeper = None
+
+    def subscribe(
+        self,
+        callback: "ChangeCallback",
+        filter: Optional["ChangeFilter"] = None,
+        poll_interval: Optional[float] = 1.0,
+    ) -> int:
+        """
+        Call a function with the tasks added, modified, completed or removed.
+
+        The changes made through this manager are delivered as soon as
+        they are written, and those of other processes, or of direct
+        database writes, at the next poll.
+
+        Args:
+            callback (ChangeCallback): Function receiving the events, each
+                with a kind and the ids of the tasks concerned.
+            filter (ChangeFilter, optional): Kinds of events and task ids
+                the callback receives. Defaults to everything.
+            poll_interval (float, optional): Seconds between two polls of
+                the background thread, started by the first subscription
+                asking for one. With None, changes from elsewhere are only
+                delivered when `poll_changes` is called.
+
+        Returns:
+            int: Subscription id, to unsubscribe.
+        """
+        if self._feed is None:
+            from .changes import ChangeFeed
+
+            self._feed = ChangeFeed(self._db)
+        subscription = self._feed.subscribe(callback, filter)
+        if poll_interval is not None:
+            self._feed.start(poll_interval)
+        return subscription
+
+    def unsubscribe(self, subscription: int) -> None:
+        """Stop a subscription, and the polling once none is left."""
+        if self._feed is None:
+            return
+        self._feed.unsubscribe(subscription)
+        if not len(self._feed):
+            self._feed.stop()
+            self._feed = None
+
+    def poll_changes(self) -> int:
+        """
+        Deliver the changes not delivered yet to the subscribers.
+
+        Returns:
+            int: Number of events delivered, 0 without subscribers.
+        """
+        if self._feed is None:
+            return 0
+        return self._feed.poll()
+
+    def next_due(self, n: int = 1) -> List[Task]:
+        """Return the n open tasks with the earliest due dates."""
+        return self._due_index.next_due(n)
+
+    def overdue(self, now: Optional[datetime] = None) -> List[Task]:
+        """Return the open tasks past their due date, oldest first."""
+        return self._due_index.overdue(now or datetime.now())
+
+    def due_between(self, start: datetime, end: datetime) -> List[Task]:
+        """Return the open tasks due from start to end included."""
+        return self._due_index.due_between(start, end)
+
+    def query_due(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[tuple]:
+        """Get the open tasks of database by due date, without loading them."""
+        return self._db.query_due(start, end, limit)
+
+    def get_all_tasks(self, include_archived: bool = False) -> List[tuple]:
+        """Get all the tasks of database, archived ones on request."""
+        return self._db.get_all_tasks(include_archived)
+
+    def query_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        after_id: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> List[tuple]:
+        """Get the tasks of database in a status, without loading them."""
+        return self._db.query_tasks(
+            status, limit, offset, after_id, include_archived
+        )
+
+    def search_tasks(
+        self,
+        text: str,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[tuple]:
+        """Get the tasks of database whose text contains a string."""
+        return self._db.search_tasks(text, limit, after_id)
+
+    def find_task(
+        self, task_id: int, include_archived: bool = False
+    ) -> Optional[tuple]:
+        """Get one task of database, None if it does not exist."""
+        return self._db.get_task(task_id, include_archived)
+
+    def find_versioned_task(
+        self, task_id: int
+    ) -> Optional[Tuple[tuple, int]]:
+        """Get one task of database and its version, to modify it later."""
+        return self._db.get_versioned_task(task_id)
+
+    def archive_completed(
+        self, older_than_days: float = 30, batch_size: int = 1000
+    ) -> int:
+        """
+        Move the tasks completed long ago out of the active tasks.
+
+        Archived tasks are no longer loaded in memory nor returned by the
+        queries, unless these are asked to include the archive.
+
+        Args:
+            older_than_days (float): Days since completion after which a
+                task is archived.
+            batch_size (int): Number of tasks moved per transaction.
+
+        Returns:
+            int: Number of tasks archived.
+        """
+        archived = self._db.archive_completed(older_than_days, batch_size)
+        if archived and self._loaded_tasks is not None:
+            # Only completed tasks are archived, so the due index and the
+            # reminders, which hold open tasks, stay valid.
+            completed = {
+                row[0] for row in self._db.query_tasks(TaskStatus.COMPLETE)
+            }
+            self._loaded_tasks = [
+                task
+                for task in self._loaded_tasks
+                if task.status is not TaskStatus.COMPLETE
+                or task.id in completed
+            ]
+        if archived:
+            self.poll_changes()
+        return archived
+
+    def get_stats(self) -> dict:
+        """Count the tasks of database by status and priority."""
+        return self._db.task_stats()
+
+    def data_version(self) -> int:
+        """Get a number that changes whenever the database is written."""
+        return self._db.data_version()
+
+    def maintain(
+        self,
+        pages_per_step: int = 256,
+        pause: float = 0.02,
+        analyze: bool = False,
+        migrate: bool = False,
+        keep_changes: Optional[int] = KEEP_CHANGES,
+    ) -> MaintenanceReport:
+        """
+        Shrink the database file and refresh its statistics.
+
+        Args:
+            pages_per_step (int): Pages released per transaction.
+            pause (float): Seconds between two transactions.
+            analyze (bool): Run a sampled ANALYZE of every index.
+            migrate (bool): First switch an existing database to
+                incremental vacuum, which rebuilds it while locked.
+            keep_changes (int, optional): Writes whose entries stay in the
+                change log, None to keep them all.
+
+        Returns:
+            MaintenanceReport: Sizes before and after and freed space.
+        """
+        if migrate:
+            self._db.enable_incremental_vacuum()
+        return self._db.maintain(pages_per_step, pause, analyze, keep_changes)
 
     def get_task_by_id(self, task_id: int) -> Task:
         """List all the tasks of database."""
@@ -166,10 +1132,16 @@ class TaskManager:
         new_description: str,
         new_due_date: datetime,
         new_assignee: List[str],
-    ) -> None:
+        expected_version: Optional[int] = None,
+    ) -> Optional[int]:
         """
         Modify an existing task's attributes.
 
+        The task is written with a compare-and-swap on its version, so a
+        concurrent write is never overwritten: without `expected_version`
+        the changes are applied again to the latest version of the task,
+        otherwise the conflict is raised.
+
         Args:
             task_id (int): The ID of the task to modify.
             new_name (str, optional): New name for the task.
@@ -179,32 +1151,90 @@ class TaskManager:
             new_status (TaskStatus, optional): New status for the task.
             new_priority (TaskPriority, optional): New priority for the task.
             new_categories (List[str], optional): New categories for the task.
+            expected_version (int, optional): Version of the task the
+                changes are based on, from `find_versioned_task`.
 
+        Returns:
+            Optional[int]: New version of the task, None if the database
+            could not be written.
+
+        Raises:
+            TaskNotFoundError: If the task is not found.
+            TaskConflictError: If the task is no longer at
+                `expected_version`, or kept changing while retried.
+            ValueError: If a new value breaks the rules of `Task`, in
+                which case nothing is written.
         """
-        tasks_list = self._db.get_all_tasks()
-
-        for index, task in enumerate(tasks_list):
-            if task_id == task[0]:
-                name = tasks_list[index][1]
-                description = tasks_list[index][2]
-                due_date = tasks_list[index][4]
-                assignee = tasks_list[index][5]
-
-        if new_name:
-            name = new_name
-        if new_description:
-            description = new_description
-        if new_due_date:
-            due_date = new_due_date
-        if new_assignee:
-            assignee = new_assignee
-
-        data = name, description, due_date.strftime(
-            "%Y/%m/%d %H:%M:%S"), assignee
-        self._db.fetch_data(task_id, to_do="MODIFY", task=data)
-
-        task = self.get_task_by_id(task_id)
-        task.name = name
-        task.description = description
-        task.due_date = due_date
-        task.assignee = assignee
+        if new_assignee and isinstance(new_assignee, str):
+            new_assignee = [
+                person.strip() for person in new_assignee.split(",")
+            ]
+        # Checked before the write: the task may not be in memory, and
+        # its setters would only run once the changes are committed.
+        Task.validate(
+            name=new_name or None,
+            due_date=new_due_date or None,
+            assignee=new_assignee or None,
+        )
+        for attempt in range(MODIFY_ATTEMPTS):
+            versioned = self._db.get_versioned_task(task_id)
+            if versioned is None:
+                raise TaskNotFoundError("Task not found.")
+            task_row, version = versioned
+            name, description, _, due_date, assignee = task_row[1:6]
+            due_date = datetime.strptime(due_date, DB_DATE_FORMAT)
+
+            if new_name:
+                name = new_name
+            if new_description:
+                description = new_description
+            if new_due_date:
+                due_date = new_due_date
+            if new_assignee:
+                assignee = new_assignee
+            if isinstance(assignee, str):
+                assignee = [person.strip() for person in assignee.split(",")]
+
+            data = (
+                name,
+                description,
+                due_date.strftime(DB_DATE_FORMAT),
+                ", ".join(assignee),
+            )
+            try:
+                new_version = self._db.update_task(
+                    task_id,
+                    data,
+                    version if expected_version is None else expected_version,
+                )
+                break
+            except TaskConflictError:
+                if (
+                    expected_version is not None
+                    or attempt == MODIFY_ATTEMPTS - 1
+                ):
+                    raise
+        if new_version is None:
+            return None
+
+        graph = self._synced_graph()
+        if new_due_date and graph is not None:
+            graph.set_due_date(task_id, due_date)
+        task = self._loaded_task(task_id)
+        if task is not None:
+            task.name = name
+            task.description = description
+            if new_due_date:
+                due_index = self._loaded_due_index
+                if due_index is not None:
+                    due_index.discard(task_id)
+                try:
+                    task.due_date = due_date
+                finally:
+                    if due_index is not None:
+                        due_index.add(task)
+                if self._sweeper is not None:
+                    self._sweeper.schedule(task)
+            task.assignee = assignee
+        self.poll_changes()
+        return new_version